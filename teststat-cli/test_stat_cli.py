@@ -17,6 +17,7 @@ from utils import ProjectList
 from utils import FileScanner
 from utils import ConsoleFormatter
 from utils import RemoteSource
+from utils.ApiIntegration import build_subtask_progress_payloads
 
 def get_script_root_dir():
     """スクリプトのルートディレクトリのパスを返す"""
@@ -207,41 +208,8 @@ def _has_subtask_id(subtask_id):
     return subtask_id is not None and subtask_id != ""
 
 def _build_file_api_payloads(results, skipped_subtask_ids=None):
-    skipped_subtask_ids = set(skipped_subtask_ids or [])
-    api_payloads = {}
-
-    # 同じサブタスクIDを持つ複数のlabel/ファイルを合算する
-    # （1プロジェクト内で同一サブタスクIDが複数labelに指定された場合、
-    #   合算した進捗率を当該サブタスクIDへ1回だけ送信する）
-    for filepath, result in results:
-        if not isinstance(result, dict) or "subtask_id" not in result or "error" in result or "total" not in result:
-            continue
-
-        subtask_id = result["subtask_id"]
-        if subtask_id in skipped_subtask_ids:
-            continue
-
-        completed = result["total"].get("完了数", 0)
-        available = result.get("stats", {}).get("available", 0)
-        start_date = result.get("run", {}).get("start_date")
-        label = result.get("label", "")
-
-        if subtask_id not in api_payloads:
-            api_payloads[subtask_id] = {
-                "completed": completed,
-                "available": available,
-                "start_dates": [start_date] if start_date else [],
-                "labels": [label] if label else []
-            }
-        else:
-            api_payloads[subtask_id]["completed"] += completed
-            api_payloads[subtask_id]["available"] += available
-            if start_date:
-                api_payloads[subtask_id]["start_dates"].append(start_date)
-            if label and label not in api_payloads[subtask_id]["labels"]:
-                api_payloads[subtask_id]["labels"].append(label)
-
-    return api_payloads
+    # 同じサブタスクIDを持つ複数のlabel/ファイルは合算する（サーバーの in-process 収集と共通）
+    return build_subtask_progress_payloads(results, skipped_subtask_ids)
 
 def _build_summary_json_output(output_data, results, settings, is_multiple_files, current_load_time, project_info=None):
     if is_multiple_files:
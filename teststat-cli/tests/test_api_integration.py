@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import patch
 
-from utils.ApiIntegration import update_subtask_progress
+from utils.ApiIntegration import build_subtask_progress_payloads, update_subtask_progress
 
 
 class ApiIntegrationTests(unittest.TestCase):
@@ -50,6 +50,20 @@ class ApiIntegrationTests(unittest.TestCase):
         self.assertTrue(success)
         self.assertEqual(requests[0].full_url, "http://localhost:5173/api/subtasks/123")
 
+    def test_build_subtask_progress_payloads_merges_labels_sharing_subtask(self):
+        results = [
+            ("a.xlsx", {"label": "A", "subtask_id": 10, "total": {"完了数": 3}, "stats": {"available": 5}, "run": {"start_date": "2026-07-01"}}),
+            ("b.xlsx", {"label": "B", "subtask_id": 10, "total": {"完了数": 1}, "stats": {"available": 5}, "run": {"start_date": ""}}),
+            ("c.xlsx", {"label": "C", "subtask_id": 20, "error": {"message": "sheet not found"}}),
+            ("d.xlsx", {"label": "D", "subtask_id": 30, "total": {"完了数": 2}, "stats": {"available": 2}}),
+        ]
+
+        payloads = build_subtask_progress_payloads(results, skipped_subtask_ids={30})
+
+        self.assertEqual(payloads, {
+            10: {"completed": 4, "available": 10, "start_dates": ["2026-07-01"], "labels": ["A", "B"]},
+        })
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,14 +1,16 @@
+import json
 import unittest
 import urllib.error
 from unittest.mock import patch
 
-from utils.ReportingClient import build_progress_payload, fetch_active_project_ids, fetch_project_list_yaml, send_progress
+from utils.ReportingClient import build_progress_payload, fetch_active_project_ids, fetch_project_list_yaml, send_progress, to_columnar_payload
 
 
 class FakeResponse:
-    def __init__(self, status=200, body="{}"):
+    def __init__(self, status=200, body="{}", headers=None):
         self.status = status
         self._body = body.encode("utf-8")
+        self.headers = headers or {}
 
     def read(self):
         return self._body
@@ -121,6 +123,40 @@ class ReportingClientPayloadTests(unittest.TestCase):
         self.assertEqual(payload["files"][0]["available_cases"], 0)
         self.assertEqual(payload["files"][0]["error"], "sheet missing")
 
+    def test_to_columnar_payload_packs_rows_into_arrays(self):
+        payload = {
+            "testing_id": 1001,
+            "files": [{
+                "file_name": "a.xlsx",
+                "daily": [
+                    {"date": "2026-05-01", "Pass": 3, "Fixed": 0, "Fail": 1, "Blocked": 0, "Suspend": 0, "N/A": 0,
+                     "completed": 3, "executed": 4, "planned": None},
+                    {"date": "2026-05-02", "Pass": 1, "Fixed": 1, "Fail": 0, "Blocked": 0, "Suspend": 0, "N/A": 0,
+                     "completed": 2, "executed": 2, "planned": 5},
+                ],
+                "by_person": [
+                    {"date": "2026-05-01", "person": "Alice", "count": 3},
+                    {"date": "2026-05-01", "person": "Bob", "count": 2, "completed": 1, "executed": 2},
+                ],
+            }],
+        }
+
+        file_payload = to_columnar_payload(payload)["files"][0]
+
+        self.assertEqual(file_payload["daily"]["date"], ["2026-05-01", "2026-05-02"])
+        self.assertEqual(file_payload["daily"]["Fail"], [1, 0])
+        self.assertEqual(file_payload["daily"]["planned"], [None, 5])
+        self.assertEqual(file_payload["by_person"], {
+            "date": ["2026-05-01", "2026-05-01"],
+            "person": ["Alice", "Bob"],
+            "count": [3, 2],
+            "completed": [None, 1],
+            "executed": [None, 2],
+        })
+        # 変換済みの payload はそのまま、元の payload は行形式のまま
+        self.assertEqual(to_columnar_payload(to_columnar_payload(payload)), to_columnar_payload(payload))
+        self.assertIsInstance(payload["files"][0]["daily"], list)
+
 
 class ReportingClientProjectListTests(unittest.TestCase):
     def test_fetch_active_project_ids_excludes_archived_projects(self):
@@ -185,14 +221,17 @@ class ReportingClientSendTests(unittest.TestCase):
                 return FakeResponse(body='{"testing_id":1001,"archived":false}')
             return FakeResponse(body='{"testing_id":1001,"inserted_files":0,"inserted_daily_rows":0,"inserted_person_rows":0}')
 
+        payload = {"testing_id": 1001, "files": [{"file_name": "a.xlsx", "daily": [{"date": "2026-05-01", "Pass": 1}]}]}
         with patch("utils.ReportingClient.urllib.request.urlopen", side_effect=fake_urlopen):
-            success, _ = send_progress("http://localhost:18000/api", {"testing_id": 1001, "files": []})
+            success, _ = send_progress("http://localhost:18000/api", payload)
 
         self.assertTrue(success)
         self.assertEqual([req.full_url for req in requests], [
             "http://localhost:18000/api/v1/projects/1001",
             "http://localhost:18000/api/v1/progress",
         ])
+        # 対応形式のヘッダーが無い（古い）サーバーには行形式のまま送る
+        self.assertEqual(json.loads(requests[1].data)["files"][0]["daily"], [{"date": "2026-05-01", "Pass": 1}])
 
     def test_send_progress_posts_when_project_is_not_registered(self):
         requests = []
@@ -209,6 +248,27 @@ class ReportingClientSendTests(unittest.TestCase):
         self.assertTrue(success)
         self.assertEqual(len(requests), 2)
 
+    def test_send_progress_uses_columnar_payload_when_server_advertises_it(self):
+        requests = []
+        payload = {"testing_id": 1001, "files": [{"file_name": "a.xlsx", "daily": [{"date": "2026-05-01", "Pass": 1}]}]}
+
+        def fake_urlopen(req, timeout=10):
+            requests.append(req)
+            if req.full_url.endswith("/api/v1/projects/1001"):
+                return FakeResponse(
+                    body='{"testing_id":1001,"archived":false}',
+                    headers={"X-Progress-Formats": "rows, columnar"},
+                )
+            return FakeResponse(body='{"testing_id":1001,"inserted_files":1,"inserted_daily_rows":1,"inserted_person_rows":0}')
+
+        with patch("utils.ReportingClient.urllib.request.urlopen", side_effect=fake_urlopen):
+            success, _ = send_progress("http://localhost:18000/api", payload)
+
+        self.assertTrue(success)
+        sent = json.loads(requests[1].data)
+        self.assertEqual(sent["files"][0]["daily"], {"date": ["2026-05-01"], "Pass": [1]})
+        self.assertEqual(sent["files"][0]["by_person"], {"date": [], "person": [], "count": []})
+
 
 if __name__ == "__main__":
     unittest.main()
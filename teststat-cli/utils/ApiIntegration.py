@@ -51,3 +51,51 @@ def update_subtask_progress(base_url, subtask_id, progress_percent, logger=None,
         if logger:
             logger.log(msg)
         return False, msg
+
+
+def build_subtask_progress_payloads(results, skipped_subtask_ids=None):
+    """
+    集計結果をサブタスクIDごとに合算し、進捗率更新に使う値をまとめます。
+
+    1プロジェクト内で同一サブタスクIDが複数labelに指定された場合は合算し、
+    当該サブタスクIDへ1回だけ送信できるようにします。
+
+    Args:
+        results (list): (filepath, result) のリスト
+        skipped_subtask_ids (iterable, optional): 送信済みなどで除外するサブタスクID
+
+    Returns:
+        dict: subtask_id -> {"completed", "available", "start_dates", "labels"}
+    """
+    skipped_subtask_ids = set(skipped_subtask_ids or [])
+    api_payloads = {}
+
+    for filepath, result in results:
+        if not isinstance(result, dict) or "subtask_id" not in result or "error" in result or "total" not in result:
+            continue
+
+        subtask_id = result["subtask_id"]
+        if subtask_id in skipped_subtask_ids:
+            continue
+
+        completed = result["total"].get("完了数", 0)
+        available = result.get("stats", {}).get("available", 0)
+        start_date = result.get("run", {}).get("start_date")
+        label = result.get("label", "")
+
+        if subtask_id not in api_payloads:
+            api_payloads[subtask_id] = {
+                "completed": completed,
+                "available": available,
+                "start_dates": [start_date] if start_date else [],
+                "labels": [label] if label else []
+            }
+        else:
+            api_payloads[subtask_id]["completed"] += completed
+            api_payloads[subtask_id]["available"] += available
+            if start_date:
+                api_payloads[subtask_id]["start_dates"].append(start_date)
+            if label and label not in api_payloads[subtask_id]["labels"]:
+                api_payloads[subtask_id]["labels"].append(label)
+
+    return api_payloads
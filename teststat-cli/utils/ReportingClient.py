@@ -14,6 +14,14 @@ RESULT_KEY_MAP = {
     "N/A": "N/A",
 }
 
+# 列形式に変換する項目と、0 行でも省けない必須の列
+DAILY_COLUMN_KEYS = ("date", "Pass", "Fixed", "Fail", "Blocked", "Suspend", "N/A", "completed", "executed", "planned")
+DAILY_REQUIRED_COLUMNS = ("date",)
+PERSON_COLUMN_KEYS = ("date", "person", "count", "completed", "executed")
+PERSON_REQUIRED_COLUMNS = ("date", "person", "count")
+# サーバーが受け付ける進捗 payload の形式（GET /v1/projects/{testing_id} のレスポンスヘッダー）
+PROGRESS_FORMATS_HEADER = "X-Progress-Formats"
+
 CLI_OPTION_KEYS = (
     "target_sheets",
     "ignore_sheets",
@@ -78,7 +86,35 @@ def _build_person_rows(by_name, metrics=None):
     return rows
 
 
-def build_progress_payload(project_info, results):
+def _rows_to_columns(rows, keys, required):
+    """行の配列を列ごとの配列に変換する。行に無い任意項目は None、全行で無い任意の列は省く。"""
+    if not isinstance(rows, list):
+        return rows
+    columns = {}
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        if key in required or any(value is not None for value in values):
+            columns[key] = values
+    return columns
+
+
+def to_columnar_payload(payload):
+    """daily / by_person を列形式（{"date": [...], "Pass": [...], ...}）にした payload を返す。
+
+    行ごとのオブジェクトより JSON が小さく、サーバー側の検証も配列単位で済む。
+    """
+    files = []
+    for file_payload in payload.get("files", []):
+        converted = dict(file_payload)
+        converted["daily"] = _rows_to_columns(file_payload.get("daily", []), DAILY_COLUMN_KEYS, DAILY_REQUIRED_COLUMNS)
+        converted["by_person"] = _rows_to_columns(
+            file_payload.get("by_person", []), PERSON_COLUMN_KEYS, PERSON_REQUIRED_COLUMNS
+        )
+        files.append(converted)
+    return {**payload, "files": files}
+
+
+def build_progress_payload(project_info, results, columnar=False):
     files = []
     for filepath, result in results:
         if not isinstance(result, dict):
@@ -142,15 +178,22 @@ def build_progress_payload(project_info, results):
         _copy_cli_options(file_payload, result)
         files.append(file_payload)
 
-    return {
+    payload = {
         "testing_id": project_info["testing_id"],
         "project_name": project_info["project_name"],
         "sent_at": datetime.now().isoformat(timespec="seconds"),
         "files": files,
     }
+    return to_columnar_payload(payload) if columnar else payload
+
+
+def _progress_formats(headers):
+    value = headers.get(PROGRESS_FORMATS_HEADER) if headers is not None else None
+    return {item.strip() for item in (value or "rows").split(",") if item.strip()}
 
 
 def _get_project_status(base_url, testing_id, timeout=10):
+    """プロジェクトの状態とサーバーが受け付ける進捗 payload の形式を返す。未登録なら (True, None, {"rows"})。"""
     url = f"{base_url.rstrip('/')}/v1/projects/{testing_id}"
     req = urllib.request.Request(url, method="GET")
 
@@ -158,17 +201,17 @@ def _get_project_status(base_url, testing_id, timeout=10):
         with urllib.request.urlopen(req, timeout=timeout) as response:
             body = response.read().decode("utf-8")
             if 200 <= response.status < 300:
-                return True, json.loads(body)
-            return False, f"プロジェクト状態の確認に失敗しました: ステータスコード {response.status}"
+                return True, json.loads(body), _progress_formats(response.headers)
+            return False, f"プロジェクト状態の確認に失敗しました: ステータスコード {response.status}", None
     except urllib.error.HTTPError as e:
         if e.code == 404:
-            return True, None
+            return True, None, _progress_formats(e.headers)
         body = e.read().decode("utf-8", errors="replace")
-        return False, f"プロジェクト状態の確認に失敗しました: ステータスコード {e.code}, レスポンス: {body}"
+        return False, f"プロジェクト状態の確認に失敗しました: ステータスコード {e.code}, レスポンス: {body}", None
     except urllib.error.URLError as e:
-        return False, f"プロジェクト状態の確認に失敗しました: {e}"
+        return False, f"プロジェクト状態の確認に失敗しました: {e}", None
     except Exception as e:
-        return False, f"プロジェクト状態の確認に失敗しました: {e}"
+        return False, f"プロジェクト状態の確認に失敗しました: {e}", None
 
 
 def fetch_active_project_ids(base_url, timeout=10, logger=None):
@@ -239,11 +282,14 @@ def send_progress(base_url, payload, timeout=10, logger=None):
 
     testing_id = payload.get("testing_id")
     if testing_id is not None:
-        ok, project = _get_project_status(base_url, testing_id, timeout=timeout)
+        ok, project, formats = _get_project_status(base_url, testing_id, timeout=timeout)
         if not ok:
             return False, project
         if project and project.get("archived"):
             return False, f"testing_id={testing_id} はアーカイブ済みのため進捗データを送信しません。"
+        # 列形式に対応したサーバーには daily / by_person を列形式で送る（古いサーバーには行形式のまま）
+        if "columnar" in formats:
+            payload = to_columnar_payload(payload)
 
     url = f"{base_url.rstrip('/')}/v1/progress"
     data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
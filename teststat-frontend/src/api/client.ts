@@ -28,6 +28,8 @@ import type {
   BugSyncResult,
   OpenBugItem,
   CollectResult,
+  DashboardField,
+  DashboardResponse,
 } from './types'
 
 // 本番では IIS の /tstat 配下で同一オリジン配信し、/tstat/api と /tstat/health を
@@ -70,10 +72,31 @@ export const fetchProgressSummary = (testing_id: number) =>
   get<ProgressSummaryResponse>(`/api/v1/progress/${testing_id}`)
 export const fetchProgressFiles = (testing_id: number) =>
   get<FileProgressItem[]>(`/api/v1/progress/${testing_id}/files`)
-export const fetchProgressDaily = (testing_id: number) =>
-  get<DailyProgressItem[]>(`/api/v1/progress/${testing_id}/daily`)
-export const fetchProgressPeople = (testing_id: number) =>
-  get<PersonProgressItem[]>(`/api/v1/progress/${testing_id}/people`)
+
+// 日別・担当者別実績の絞り込み・集計粒度。limit を指定したときの続きは X-Next-Cursor で返る
+export interface ProgressRowOptions {
+  dateFrom?: string
+  dateTo?: string
+  labels?: string[]
+  persons?: string[]
+  granularity?: 'day' | 'week' | 'total'
+}
+
+function progressRowQuery(options: ProgressRowOptions): string {
+  const params = new URLSearchParams()
+  if (options.dateFrom) params.set('date_from', options.dateFrom)
+  if (options.dateTo) params.set('date_to', options.dateTo)
+  options.labels?.forEach((label) => params.append('label', label))
+  options.persons?.forEach((person) => params.append('person', person))
+  if (options.granularity && options.granularity !== 'day') params.set('granularity', options.granularity)
+  const query = params.toString()
+  return query ? `?${query}` : ''
+}
+
+export const fetchProgressDaily = (testing_id: number, options: ProgressRowOptions = {}) =>
+  get<DailyProgressItem[]>(`/api/v1/progress/${testing_id}/daily${progressRowQuery(options)}`)
+export const fetchProgressPeople = (testing_id: number, options: ProgressRowOptions = {}) =>
+  get<PersonProgressItem[]>(`/api/v1/progress/${testing_id}/people${progressRowQuery(options)}`)
 
 function withProjectActualFallback(project: ProjectItem, summary?: ProgressSummaryResponse): ProjectItem {
   return {
@@ -148,6 +171,25 @@ export const fetchPbChart = (
   return get<PbChartResponse>(`/api/v1/projects/${testing_id}/pb-chart${query ? `?${query}` : ''}`)
 }
 
+// プロジェクト画面の複合取得（summary/files/daily/people/PB図/label を 1 リクエストで）
+export const fetchDashboard = (
+  testing_id: number,
+  options: { fields?: DashboardField[]; label?: string | null; includePastPlans?: boolean } = {},
+) => {
+  const params = new URLSearchParams()
+  if (options.fields) {
+    params.set('fields', options.fields.join(','))
+  }
+  if (options.label) {
+    params.set('label', options.label)
+  }
+  if (options.includePastPlans) {
+    params.set('include_past_plans', 'true')
+  }
+  const query = params.toString()
+  return get<DashboardResponse>(`/api/v1/projects/${testing_id}/dashboard${query ? `?${query}` : ''}`)
+}
+
 // 計画編集（Phase F3）
 export const fetchPlans = (testing_id: number) =>
   get<PlanItem[]>(`/api/v1/projects/${testing_id}/plans`)
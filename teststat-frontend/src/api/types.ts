@@ -353,3 +353,16 @@ export interface CollectResult {
   started_at: string
   finished_at: string | null
 }
+
+// プロジェクト画面の複合取得（GET /projects/{id}/dashboard）。fields で選ばなかった項目は省略される。
+export type DashboardField = 'summary' | 'files' | 'daily' | 'people' | 'pb_chart' | 'plan_labels'
+
+export interface DashboardResponse {
+  testing_id: number
+  summary?: ProgressSummaryResponse | null
+  files?: FileProgressItem[]
+  daily?: DailyProgressItem[]
+  people?: PersonProgressItem[]
+  pb_chart?: PbChartResponse
+  plan_labels?: PlanLabelItem[]
+}
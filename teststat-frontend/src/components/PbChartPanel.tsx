@@ -11,13 +11,10 @@ import {
 } from 'echarts/components'
 import { CanvasRenderer } from 'echarts/renderers'
 import {
+  fetchDashboard,
   fetchPbChart,
   fetchOpenBugs,
-  fetchPlanLabels,
   fetchPlans,
-  fetchProgressDaily,
-  fetchProgressPeople,
-  fetchProgressFiles,
   syncAzureDevOpsBugs,
   updateProject,
 } from '../api/client'
@@ -99,26 +96,25 @@ function fetchChartData(
     return current
   }
 
-  const chartRequests =
-    labels.length === 0
-      ? [fetchPbChart(testingId, { label: null, includePastPlans })]
-      : labels.map((label) => fetchPbChart(testingId, { label, includePastPlans }))
+  // 1 つ目の PB図と実績・label は dashboard API でまとめて取得し、2 つ目以降の label の PB図だけ個別に取る
+  const [firstLabel, ...restLabels] = labels.length === 0 ? [null] : labels
   const request = Promise.all([
-    Promise.all(chartRequests),
-    fetchProgressFiles(testingId).catch(() => [] as FileProgressItem[]),
-    fetchProgressDaily(testingId).catch(() => [] as DailyProgressItem[]),
+    fetchDashboard(testingId, {
+      fields: ['files', 'daily', 'people', 'pb_chart', 'plan_labels'],
+      label: firstLabel,
+      includePastPlans,
+    }),
+    Promise.all(restLabels.map((label) => fetchPbChart(testingId, { label, includePastPlans }))),
     fetchPlans(testingId).catch(() => [] as PlanItem[]),
-    fetchPlanLabels(testingId).catch(() => [] as PlanLabelItem[]),
     fetchOpenBugs(testingId).catch(() => [] as OpenBugItem[]),
-    fetchProgressPeople(testingId).catch(() => [] as PersonProgressItem[]),
-  ]).then(([charts, files, daily, plans, planLabels, openBugs, people]) => ({
-    charts,
-    files,
-    daily,
+  ]).then(([dashboard, restCharts, plans, openBugs]) => ({
+    charts: [dashboard.pb_chart as PbChartResponse, ...restCharts],
+    files: dashboard.files ?? ([] as FileProgressItem[]),
+    daily: dashboard.daily ?? ([] as DailyProgressItem[]),
     plans,
-    planLabels,
+    planLabels: dashboard.plan_labels ?? ([] as PlanLabelItem[]),
     openBugs,
-    people,
+    people: dashboard.people ?? ([] as PersonProgressItem[]),
   }))
 
   inFlightChartData.set(requestKey, request)
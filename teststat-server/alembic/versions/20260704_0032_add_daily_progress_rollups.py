@@ -0,0 +1,85 @@
+"""add daily progress rollups
+
+Revision ID: 20260704_0032
+Revises: 20260703_0031
+Create Date: 2026-07-04 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260704_0032"
+down_revision: Union[str, None] = "20260703_0031"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_progress_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("testing_id", sa.Integer(), nullable=False),
+        sa.Column("label", sa.String(length=255), nullable=True),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("result_pass", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("result_fixed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("result_fail", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("result_blocked", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("result_suspend", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("result_na", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("executed", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["testing_id"], ["testings.testing_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_daily_progress_rollups_id"), "daily_progress_rollups", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_daily_progress_rollups_testing_id"), "daily_progress_rollups", ["testing_id"], unique=False
+    )
+    op.create_index(
+        "ix_daily_progress_rollups_testing_label_date",
+        "daily_progress_rollups",
+        ["testing_id", "label", "date"],
+        unique=False,
+    )
+
+    # 既存の daily_progress から集計済み行を作成する（以降は取り込み時に洗替）。
+    op.execute(
+        """
+        INSERT INTO daily_progress_rollups (
+            testing_id,
+            label,
+            date,
+            result_pass,
+            result_fixed,
+            result_fail,
+            result_blocked,
+            result_suspend,
+            result_na,
+            completed,
+            executed
+        )
+        SELECT
+            testing_id,
+            label,
+            date,
+            SUM(result_pass),
+            SUM(result_fixed),
+            SUM(result_fail),
+            SUM(result_blocked),
+            SUM(result_suspend),
+            SUM(result_na),
+            SUM(completed),
+            SUM(executed)
+        FROM daily_progress
+        GROUP BY testing_id, label, date
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_daily_progress_rollups_testing_label_date", table_name="daily_progress_rollups")
+    op.drop_index(op.f("ix_daily_progress_rollups_testing_id"), table_name="daily_progress_rollups")
+    op.drop_index(op.f("ix_daily_progress_rollups_id"), table_name="daily_progress_rollups")
+    op.drop_table("daily_progress_rollups")
@@ -0,0 +1,62 @@
+"""add collect runs
+
+Revision ID: 20260705_0033
+Revises: 20260704_0032
+Create Date: 2026-07-05 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260705_0033"
+down_revision: Union[str, None] = "20260704_0032"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "collect_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("testing_id", sa.Integer(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("targets", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("concurrency", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("auth_error", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_collect_runs_id"), "collect_runs", ["id"], unique=False)
+    op.create_index(op.f("ix_collect_runs_status"), "collect_runs", ["status"], unique=False)
+
+    op.create_table(
+        "collect_run_targets",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=False),
+        sa.Column("testing_id", sa.Integer(), nullable=False),
+        sa.Column("project_name", sa.String(length=255), nullable=False),
+        sa.Column("state", sa.String(length=20), nullable=False),
+        sa.Column("reason", sa.String(length=50), nullable=True),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["run_id"], ["collect_runs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_collect_run_targets_id"), "collect_run_targets", ["id"], unique=False)
+    op.create_index(
+        "ix_collect_run_targets_run_testing", "collect_run_targets", ["run_id", "testing_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_collect_run_targets_run_testing", table_name="collect_run_targets")
+    op.drop_index(op.f("ix_collect_run_targets_id"), table_name="collect_run_targets")
+    op.drop_table("collect_run_targets")
+    op.drop_index(op.f("ix_collect_runs_status"), table_name="collect_runs")
+    op.drop_index(op.f("ix_collect_runs_id"), table_name="collect_runs")
+    op.drop_table("collect_runs")
@@ -0,0 +1,27 @@
+"""add plan label source etag
+
+Revision ID: 20260706_0034
+Revises: 20260705_0033
+Create Date: 2026-07-06 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260706_0034"
+down_revision: Union[str, None] = "20260705_0033"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("plan_labels", sa.Column("source_etag", sa.String(length=255), nullable=True))
+    op.add_column("plan_labels", sa.Column("source_etag_url", sa.String(length=2048), nullable=True))
+    op.add_column("plan_labels", sa.Column("source_last_modified", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("plan_labels", "source_last_modified")
+    op.drop_column("plan_labels", "source_etag_url")
+    op.drop_column("plan_labels", "source_etag")
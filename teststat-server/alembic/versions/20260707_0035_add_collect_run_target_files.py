@@ -0,0 +1,29 @@
+"""add collect run target files
+
+Revision ID: 20260707_0035
+Revises: 20260706_0034
+Create Date: 2026-07-07 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260707_0035"
+down_revision: Union[str, None] = "20260706_0034"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("collect_run_targets", sa.Column("files", sa.Integer(), nullable=True))
+    op.create_index(
+        "ix_collect_run_targets_testing_finished",
+        "collect_run_targets",
+        ["testing_id", "finished_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_collect_run_targets_testing_finished", table_name="collect_run_targets")
+    op.drop_column("collect_run_targets", "files")
@@ -0,0 +1,48 @@
+"""add collect logs
+
+Revision ID: 20260708_0036
+Revises: 20260707_0035
+Create Date: 2026-07-08 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260708_0036"
+down_revision: Union[str, None] = "20260707_0035"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "collect_logs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("run_id", sa.Integer(), nullable=True),
+        sa.Column("testing_id", sa.Integer(), nullable=False),
+        sa.Column("project_name", sa.String(length=255), nullable=False),
+        sa.Column("mode", sa.String(length=20), nullable=False),
+        sa.Column("exit_code", sa.Integer(), nullable=False),
+        sa.Column("reason", sa.String(length=50), nullable=True),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("output", sa.JSON(), nullable=True),
+        sa.Column("stdout_bytes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("stderr_bytes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("log_path", sa.String(length=500), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=False),
+        sa.Column("duration_ms", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["run_id"], ["collect_runs.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_collect_logs_id"), "collect_logs", ["id"], unique=False)
+    op.create_index("ix_collect_logs_testing_finished", "collect_logs", ["testing_id", "finished_at"], unique=False)
+    op.create_index("ix_collect_logs_reason_finished", "collect_logs", ["reason", "finished_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_collect_logs_reason_finished", table_name="collect_logs")
+    op.drop_index("ix_collect_logs_testing_finished", table_name="collect_logs")
+    op.drop_index(op.f("ix_collect_logs_id"), table_name="collect_logs")
+    op.drop_table("collect_logs")
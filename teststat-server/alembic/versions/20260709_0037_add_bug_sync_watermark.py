@@ -0,0 +1,37 @@
+"""add bug sync watermark
+
+Revision ID: 20260709_0037
+Revises: 20260708_0036
+Create Date: 2026-07-09 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260709_0037"
+down_revision: Union[str, None] = "20260708_0036"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("projects", sa.Column("bug_changed_watermark", sa.DateTime(), nullable=True))
+    op.add_column("projects", sa.Column("bug_reconciled_at", sa.DateTime(), nullable=True))
+    # 洗替で重複は作られないが、一意インデックスを張る前に念のため最新行だけを残す
+    op.execute(
+        "DELETE FROM bug_snapshots WHERE id NOT IN ("
+        "SELECT MAX(id) FROM bug_snapshots GROUP BY testing_id, bug_work_item_id)"
+    )
+    op.create_index(
+        "ix_bug_snapshots_testing_work_item",
+        "bug_snapshots",
+        ["testing_id", "bug_work_item_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bug_snapshots_testing_work_item", table_name="bug_snapshots")
+    op.drop_column("projects", "bug_reconciled_at")
+    op.drop_column("projects", "bug_changed_watermark")
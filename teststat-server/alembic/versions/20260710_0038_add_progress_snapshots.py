@@ -0,0 +1,54 @@
+"""add progress snapshots
+
+Revision ID: 20260710_0038
+Revises: 20260709_0037
+Create Date: 2026-07-10 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260710_0038"
+down_revision: Union[str, None] = "20260709_0037"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "progress_snapshots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("testing_id", sa.Integer(), nullable=False),
+        sa.Column("label", sa.String(length=255), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("file_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_cases", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("available_cases", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("executed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("start_date", sa.Date(), nullable=True),
+        sa.Column("end_date", sa.Date(), nullable=True),
+        sa.Column("daily", sa.LargeBinary(), nullable=False),
+        sa.Column("downsampled", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.ForeignKeyConstraint(["testing_id"], ["testings.testing_id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_progress_snapshots_id"), "progress_snapshots", ["id"], unique=False)
+    op.create_index(
+        "ix_progress_snapshots_testing_label_sent",
+        "progress_snapshots",
+        ["testing_id", "label", "sent_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_progress_snapshots_sent_downsampled", "progress_snapshots", ["sent_at", "downsampled"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_progress_snapshots_sent_downsampled", table_name="progress_snapshots")
+    op.drop_index("ix_progress_snapshots_testing_label_sent", table_name="progress_snapshots")
+    op.drop_index(op.f("ix_progress_snapshots_id"), table_name="progress_snapshots")
+    op.drop_table("progress_snapshots")
@@ -0,0 +1,38 @@
+"""add project metrics
+
+Revision ID: 20260711_0039
+Revises: 20260710_0038
+Create Date: 2026-07-11 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260711_0039"
+down_revision: Union[str, None] = "20260710_0038"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 既存プロジェクトの行は移行後に python -m scripts.rebuild_project_metrics で作成する（それまで一覧は既定値で返す）。
+    op.create_table(
+        "project_metrics",
+        sa.Column("testing_id", sa.Integer(), nullable=False),
+        sa.Column("has_actuals", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("actuals_updated_at", sa.DateTime(), nullable=True),
+        sa.Column("actual_available_cases", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("actual_completed", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("actual_completed_rate", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("actual_all_completed", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("actual_vs_plan_rate", sa.Float(), nullable=True),
+        sa.Column("actual_vs_plan_delay_days", sa.Float(), nullable=True),
+        sa.Column("active_plan_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("refreshed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("testing_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("project_metrics")
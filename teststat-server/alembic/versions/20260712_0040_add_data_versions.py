@@ -0,0 +1,28 @@
+"""add data versions
+
+Revision ID: 20260712_0040
+Revises: 20260711_0039
+Create Date: 2026-07-12 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260712_0040"
+down_revision: Union[str, None] = "20260711_0039"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "data_versions",
+        sa.Column("testing_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("testing_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("data_versions")
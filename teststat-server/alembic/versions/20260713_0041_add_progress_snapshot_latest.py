@@ -0,0 +1,37 @@
+"""add progress snapshot latest flag
+
+Revision ID: 20260713_0041
+Revises: 20260712_0040
+Create Date: 2026-07-13 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "20260713_0041"
+down_revision: Union[str, None] = "20260712_0040"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "progress_snapshots",
+        sa.Column("is_latest", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    # 既存の履歴は label ごとに最新（sent_at, id の降順で先頭）の 1 行に印を付ける
+    op.execute(
+        "UPDATE progress_snapshots SET is_latest = TRUE WHERE id IN ("
+        "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+        "PARTITION BY testing_id, label ORDER BY sent_at DESC, id DESC) AS rank "
+        "FROM progress_snapshots) ranked WHERE rank = 1)"
+    )
+    op.create_index(
+        "ix_progress_snapshots_testing_latest", "progress_snapshots", ["testing_id", "is_latest"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_progress_snapshots_testing_latest", table_name="progress_snapshots")
+    op.drop_column("progress_snapshots", "is_latest")
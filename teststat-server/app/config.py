@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -6,7 +7,34 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     database_url: str = Field(..., alias="DATABASE_URL")
+    # 非同期ルート用。空なら DATABASE_URL のドライバを asyncpg / aiosqlite に置き換えて使う
+    async_database_url: str = Field("", alias="ASYNC_DATABASE_URL")
+    # 同期・非同期それぞれの接続プール。RECYCLE は秒（-1 で無効）。SQLite のメモリ DB には適用しない。
+    db_pool_size: int = Field(5, alias="DB_POOL_SIZE", ge=1)
+    db_max_overflow: int = Field(10, alias="DB_MAX_OVERFLOW", ge=0)
+    db_pool_timeout_sec: float = Field(30, alias="DB_POOL_TIMEOUT_SEC", gt=0)
+    db_pool_recycle_sec: int = Field(1800, alias="DB_POOL_RECYCLE_SEC", ge=-1)
+    # PostgreSQL の statement_timeout（ミリ秒）。0 は無制限。収集の一括書き込みより長くすること。
+    db_statement_timeout_ms: int = Field(0, alias="DB_STATEMENT_TIMEOUT_MS", ge=0)
+    # SQLite の接続ごとの PRAGMA（journal_mode=WAL・synchronous=NORMAL は常に設定する）
+    sqlite_busy_timeout_ms: int = Field(5000, alias="SQLITE_BUSY_TIMEOUT_MS", ge=0)
+    sqlite_cache_size_kb: int = Field(65536, alias="SQLITE_CACHE_SIZE_KB", ge=0)
+    sqlite_mmap_size_mb: int = Field(256, alias="SQLITE_MMAP_SIZE_MB", ge=0)
     allowed_origins: str = Field("*", alias="ALLOWED_ORIGINS")
+    # これより小さいレスポンスは圧縮しない（0 で全件圧縮）
+    response_compression_min_bytes: int = Field(1024, alias="RESPONSE_COMPRESSION_MIN_BYTES", ge=0)
+    # GET /metrics（Prometheus 形式）の計測。SLOW_QUERY_MS 以上掛かった SQL はパラメータ付きでログに出す（0 で無効）
+    metrics_enabled: bool = Field(True, alias="METRICS_ENABLED")
+    slow_query_ms: int = Field(500, alias="SLOW_QUERY_MS", ge=0)
+    # 進捗の履歴（progress_snapshots）。DOWNSAMPLE_DAYS より古い行は label ごとに 1 日 1 行へ間引き、
+    # RETENTION_DAYS より古い行は削除する（その時点で有効だった最新の 1 行は残す）。どちらも 0 で無効。
+    progress_snapshot_downsample_days: int = Field(30, alias="PROGRESS_SNAPSHOT_DOWNSAMPLE_DAYS", ge=0)
+    progress_snapshot_retention_days: int = Field(730, alias="PROGRESS_SNAPSHOT_RETENTION_DAYS", ge=0)
+    # 収集の後の間引き・削除は全 testing_id の履歴を見るため、この時間に 1 回まで（プロセスごと）にする。
+    # 0 なら収集の後には行わない（POST /api/v1/admin/progress-snapshots/compact で実行する）。
+    progress_snapshot_compact_interval_hours: int = Field(
+        24, alias="PROGRESS_SNAPSHOT_COMPACT_INTERVAL_HOURS", ge=0
+    )
 
     # === Azure DevOps 連携 ===
     azure_devops_pat: str = Field("", alias="AZURE_DEVOPS_PAT")
@@ -35,6 +63,11 @@ class Settings(BaseSettings):
         "Microsoft.VSTS.Common.ClosedDate", alias="AZURE_DEVOPS_BUG_FINISH_DATE_FIELD"
     )
     azure_devops_bug_state_field: str = Field("System.State", alias="AZURE_DEVOPS_BUG_STATE_FIELD")
+    # 子 Bug のフィールド取得（200 件ずつ）を同時に投げる数と、429/503 を Retry-After に従って再試行する回数
+    azure_devops_max_concurrency: int = Field(4, alias="AZURE_DEVOPS_MAX_CONCURRENCY", ge=1)
+    azure_devops_max_retries: int = Field(3, alias="AZURE_DEVOPS_MAX_RETRIES", ge=0)
+    # 不具合の差分同期で、削除・親の付け替えを ID のみの WIQL で突き合わせる間隔（時間）。0 は毎回。
+    azure_devops_bug_reconcile_hours: int = Field(24, alias="AZURE_DEVOPS_BUG_RECONCILE_HOURS", ge=0)
 
     # === SharePoint URL 登録済み識別子の自動収集 ===
     collect_enabled: bool = Field(True, alias="COLLECT_ENABLED")
@@ -42,7 +75,27 @@ class Settings(BaseSettings):
     tstat_config: str = Field("", alias="TSTAT_CONFIG")
     collect_work_dir: str = Field("", alias="COLLECT_WORK_DIR")
     collect_log_dir: str = Field("logs", alias="COLLECT_LOG_DIR")
+    # 実行ログ（collect_logs と失敗時の出力全文）の保持日数。0 は削除しない。
+    collect_log_retention_days: int = Field(30, alias="COLLECT_LOG_RETENTION_DAYS", ge=0)
+    # testing_id ごとのタイムアウトの上限。履歴がある target は
+    # 「直近の成功で最も遅かった 1 ファイルあたり秒数 × ファイル数 × COLLECT_TIMEOUT_FACTOR」に縮める
+    # （COLLECT_TIMEOUT_MIN_SEC 未満にはしない。FACTOR=0 で常に COLLECT_TIMEOUT_SEC）。
     collect_timeout_sec: int = Field(600, alias="COLLECT_TIMEOUT_SEC")
+    collect_timeout_factor: float = Field(3.0, alias="COLLECT_TIMEOUT_FACTOR", ge=0)
+    collect_timeout_min_sec: int = Field(120, alias="COLLECT_TIMEOUT_MIN_SEC", ge=1)
+    # tstat 1 プロセスあたりのメモリ（RLIMIT_AS）・CPU 時間（RLIMIT_CPU）の上限。0 は無制限。Linux のみ有効。
+    # inprocess ではメモリは集計ワーカーごと、CPU 時間はワーカーが集計する target 1 件ごとに効く。
+    collect_memory_limit_mb: int = Field(0, alias="COLLECT_MEMORY_LIMIT_MB", ge=0)
+    collect_cpu_limit_sec: int = Field(0, alias="COLLECT_CPU_LIMIT_SEC", ge=0)
+    # 同時に起動する tstat の数。1 なら従来どおり 1 件ずつ順に収集する。
+    collect_concurrency: int = Field(1, alias="COLLECT_CONCURRENCY", ge=1)
+    # subprocess: tstat を起動する / inprocess: teststat-cli の集計ライブラリを常駐の子プロセス（ワーカー）で直接呼び、
+    # 結果を HTTP 送信せずに DB へ書き込む（TSTAT_CLI_DIR に teststat-cli のディレクトリを指定）
+    collect_mode: Literal["subprocess", "inprocess"] = Field("subprocess", alias="COLLECT_MODE")
+    tstat_cli_dir: str = Field("", alias="TSTAT_CLI_DIR")
+    # 変更検知モード（収集元ファイルの eTag 比較）で使う Graph API と Azure CLI
+    graph_endpoint: str = Field("https://graph.microsoft.com/v1.0", alias="GRAPH_ENDPOINT")
+    az_command: str = Field("az", alias="AZ_COMMAND")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
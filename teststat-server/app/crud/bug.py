@@ -2,14 +2,16 @@ from collections import defaultdict
 from datetime import date, datetime
 from urllib.parse import quote
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
 
 from app.config import Settings
 from app.models.bug import BugSnapshot
 from app.models.progress import TestResultBugSnapshot
+from app.models.project import Project
 from app.schemas.bug import BugSyncResponse, OpenBugItem
 from app.services.azure_devops import BugWorkItem
+from app.services.data_version import bump_data_version
 
 
 def _is_suspended(state: str | None, suspend_states: set[str]) -> bool:
@@ -23,34 +25,121 @@ def replace_bugs(
     suspend_states: set[str],
     fetched_at: datetime,
 ) -> BugSyncResponse:
-    """Testing ID 単位で洗替（delete → insert）し、現時点のカテゴリ別件数を返す。"""
+    """Testing ID 単位で洗替（delete → insert）し、現時点のカテゴリ別件数を返す。
+
+    取得した Bug の System.ChangedDate の最大値を差分同期の基準として記録する。
+    """
     db.execute(delete(BugSnapshot).where(BugSnapshot.testing_id == testing_id))
-    db.add_all(
-        BugSnapshot(
-            testing_id=testing_id,
-            bug_work_item_id=bug.work_item_id,
-            title=bug.title or None,
-            state=bug.state or None,
-            created_date=bug.created_date,
-            finish_date=bug.finish_date,
-            fetched_at=fetched_at,
+    db.add_all(_to_snapshot(testing_id, bug, fetched_at) for bug in bugs)
+    db.execute(
+        update(Project)
+        .where(Project.testing_id == testing_id)
+        .values(
+            bug_changed_watermark=_max_changed_at(bugs, None),
+            bug_reconciled_at=fetched_at,
         )
-        for bug in bugs
     )
+    bump_data_version(db, testing_id)
     db.commit()
+    return _sync_response(testing_id, [(bug.state, bug.finish_date) for bug in bugs], suspend_states, fetched_at)
+
+
+def apply_bug_changes(
+    db: Session,
+    testing_id: int,
+    changed: list[BugWorkItem],
+    removed_ids: set[int],
+    suspend_states: set[str],
+    fetched_at: datetime,
+    *,
+    keep_ids: set[int] | None = None,
+) -> BugSyncResponse:
+    """差分同期の結果を反映し、反映後のカテゴリ別件数を返す。
+
+    changed は bug_work_item_id で upsert し、removed_ids（IGNORE 対象 State に変わった Bug）は削除する。
+    keep_ids（ID のみの WIQL で得た現在の子 Bug 全件）を渡すと、それ以外の行も削除して突き合わせを記録する。
+    """
+    existing = {
+        row.bug_work_item_id: row
+        for row in db.scalars(select(BugSnapshot).where(BugSnapshot.testing_id == testing_id))
+    }
+    for bug in changed:
+        row = existing.get(bug.work_item_id)
+        if row is None:
+            db.add(_to_snapshot(testing_id, bug, fetched_at))
+            continue
+        row.title = bug.title or None
+        row.state = bug.state or None
+        row.created_date = bug.created_date
+        row.finish_date = bug.finish_date
+        row.fetched_at = fetched_at
+    stale = set(removed_ids)
+    if keep_ids is not None:
+        stale |= set(existing) - keep_ids
+    stale -= {bug.work_item_id for bug in changed}
+    if stale:
+        db.execute(
+            delete(BugSnapshot).where(
+                BugSnapshot.testing_id == testing_id,
+                BugSnapshot.bug_work_item_id.in_(stale),
+            )
+        )
+    project_values = {}
+    watermark = db.scalar(select(Project.bug_changed_watermark).where(Project.testing_id == testing_id))
+    new_watermark = _max_changed_at(changed, watermark)
+    if new_watermark != watermark:
+        project_values["bug_changed_watermark"] = new_watermark
+    if keep_ids is not None:
+        project_values["bug_reconciled_at"] = fetched_at
+    if project_values:
+        db.execute(update(Project).where(Project.testing_id == testing_id).values(**project_values))
+    if changed or stale:
+        bump_data_version(db, testing_id)
+    db.commit()
+
+    rows = db.execute(
+        select(BugSnapshot.state, BugSnapshot.finish_date).where(BugSnapshot.testing_id == testing_id)
+    ).all()
+    return _sync_response(testing_id, [tuple(row) for row in rows], suspend_states, fetched_at)
+
+
+def _to_snapshot(testing_id: int, bug: BugWorkItem, fetched_at: datetime) -> BugSnapshot:
+    return BugSnapshot(
+        testing_id=testing_id,
+        bug_work_item_id=bug.work_item_id,
+        title=bug.title or None,
+        state=bug.state or None,
+        created_date=bug.created_date,
+        finish_date=bug.finish_date,
+        fetched_at=fetched_at,
+    )
+
+
+def _max_changed_at(bugs: list[BugWorkItem], current: datetime | None) -> datetime | None:
+    candidates = [bug.changed_at for bug in bugs if bug.changed_at is not None]
+    if current is not None:
+        candidates.append(current)
+    return max(candidates, default=None)
 
+
+def _sync_response(
+    testing_id: int,
+    rows: list[tuple[str | None, date | None]],
+    suspend_states: set[str],
+    fetched_at: datetime,
+) -> BugSyncResponse:
     open_count = suspended_count = resolved_count = 0
-    for bug in bugs:
-        if _is_suspended(bug.state, suspend_states):
+    for state, finish_date in rows:
+        if _is_suspended(state or None, suspend_states):
             suspended_count += 1
-        elif bug.finish_date is None:
+        elif finish_date is None:
             open_count += 1
         else:
             resolved_count += 1
 
     return BugSyncResponse(
         testing_id=testing_id,
-        fetched=len(bugs),
+        fetched=len(rows),
         open_count=open_count,
         suspended_count=suspended_count,
         resolved_count=resolved_count,
@@ -58,27 +147,45 @@ def replace_bugs(
     )
 
 
+def load_bug_chart_rows(db: Session, testing_id: int) -> list[tuple[str | None, date | None, date | None, datetime]]:
+    """PB図の不具合系列・メタデータ計算に使う (state, created_date, finish_date, fetched_at) を一括取得する。"""
+    return [
+        tuple(row)
+        for row in db.execute(
+            select(
+                BugSnapshot.state,
+                BugSnapshot.created_date,
+                BugSnapshot.finish_date,
+                BugSnapshot.fetched_at,
+            ).where(BugSnapshot.testing_id == testing_id)
+        )
+    ]
+
+
 def get_bug_cumulative(
     db: Session,
     testing_id: int,
     date_range: list[date],
     suspend_states: set[str],
 ) -> dict[date, tuple[int, int, int]]:
-    """日付ごとの (未解消 open, 対応見送り suspended, 完了 resolved) を返す。
+    """日付ごとの (未解消 open, 対応見送り suspended, 完了 resolved) を返す。"""
+    return compute_bug_cumulative(load_bug_chart_rows(db, testing_id), date_range, suspend_states)
+
+
+def compute_bug_cumulative(
+    rows: list[tuple[str | None, date | None, date | None, datetime]],
+    date_range: list[date],
+    suspend_states: set[str],
+) -> dict[date, tuple[int, int, int]]:
+    """load_bug_chart_rows の結果から日付ごとの (未解消 open, 対応見送り suspended, 完了 resolved) を返す。
 
     検出累積(d)  = created_date <= d
     見送り累積(d) = state∈suspend かつ finish_date<=d
     完了累積(d)   = state∉suspend かつ finish_date<=d
     未解消(d)     = 検出累積(d) - 見送り累積(d) - 完了累積(d)
     """
-    rows = db.execute(
-        select(BugSnapshot.state, BugSnapshot.created_date, BugSnapshot.finish_date).where(
-            BugSnapshot.testing_id == testing_id
-        )
-    ).all()
-
     events: dict[date, list[int]] = defaultdict(lambda: [0, 0, 0])
-    for state, created_date, finish_date in rows:
+    for state, created_date, finish_date, _fetched_at in rows:
         if created_date is not None:
             events[created_date][0] += 1
         if _is_suspended(state, suspend_states):
@@ -118,6 +225,13 @@ def delete_bug_count_data(db: Session, testing_id: int) -> tuple[int, int]:
     test_result = db.execute(
         delete(TestResultBugSnapshot).where(TestResultBugSnapshot.testing_id == testing_id)
     )
+    # 次回の同期は全件取得からやり直す
+    db.execute(
+        update(Project)
+        .where(Project.testing_id == testing_id)
+        .values(bug_changed_watermark=None, bug_reconciled_at=None)
+    )
+    bump_data_version(db, testing_id)
     db.commit()
     return azure_result.rowcount or 0, test_result.rowcount or 0
 
@@ -142,6 +256,16 @@ def get_bug_chart_metadata(db: Session, testing_id: int) -> tuple[bool, datetime
     return (count or 0) > 0, updated_at, min_created, max_date
 
 
+def compute_bug_chart_metadata(
+    rows: list[tuple[str | None, date | None, date | None, datetime]],
+) -> tuple[bool, datetime | None, date | None, date | None]:
+    """load_bug_chart_rows の結果から get_bug_chart_metadata と同じ値を返す。"""
+    updated_at = max((row[3] for row in rows if row[3] is not None), default=None)
+    min_created = min((row[1] for row in rows if row[1] is not None), default=None)
+    max_date = max((d for row in rows for d in (row[1], row[2]) if d is not None), default=None)
+    return bool(rows), updated_at, min_created, max_date
+
+
 def get_bug_date_bounds(db: Session, testing_id: int) -> tuple[date | None, date | None]:
     """range 拡張用に、起票日の最小と (起票日/完了日) の最大を返す。"""
     min_created = db.scalar(
@@ -0,0 +1,319 @@
+import math
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.models.collect import CollectLog, CollectRun, CollectRunTarget
+from app.schemas.collect import (
+    CollectFailure,
+    CollectLogItem,
+    CollectResult,
+    CollectRunStatus,
+    CollectRunTargetItem,
+)
+
+# running のまま updated_at がこれ以上更新されていない実行は、プロセスが落ちたものとみなす。
+# 1 target の実行中は更新が止まるため、tstat のタイムアウトに余裕を足した値にする。
+STALE_MARGIN_SEC = 120
+# 所要時間の見積もりに使う履歴（testing_id ごとの直近の成功件数・参照する期間）
+COST_HISTORY_RUNS = 5
+COST_HISTORY_DAYS = 30
+# 履歴が 1 件もないときの 1 ファイルあたりの見積もり（秒）。ファイル数の多い順に並ぶだけの値でよい。
+DEFAULT_SEC_PER_FILE = 60.0
+
+
+def create_collect_run(
+    db: Session,
+    targets: list[tuple[int, str]],
+    *,
+    kind: str,
+    testing_id: int | None,
+    concurrency: int,
+    started_at: datetime,
+    file_counts: dict[int, int] | None = None,
+) -> int:
+    """(testing_id, project_name) の一覧を queued として登録し、実行記録 ID を返す。
+
+    file_counts（testing_id → 収集ファイル数）は次回以降の所要時間の見積もりに使う。
+    """
+    file_counts = file_counts or {}
+    run = CollectRun(
+        kind=kind,
+        testing_id=testing_id,
+        status="running",
+        targets=len(targets),
+        concurrency=concurrency,
+        started_at=started_at,
+        updated_at=started_at,
+    )
+    db.add(run)
+    db.flush()
+    db.add_all(
+        CollectRunTarget(
+            run_id=run.id,
+            testing_id=target_id,
+            project_name=project_name,
+            state="queued",
+            files=file_counts.get(target_id),
+        )
+        for target_id, project_name in targets
+    )
+    db.commit()
+    return run.id
+
+
+def mark_collect_target_running(db: Session, run_id: int, testing_id: int, started_at: datetime) -> None:
+    db.execute(
+        update(CollectRunTarget)
+        .where(CollectRunTarget.run_id == run_id, CollectRunTarget.testing_id == testing_id)
+        .values(state="running", started_at=started_at)
+    )
+    _touch(db, run_id, started_at)
+    db.commit()
+
+
+def mark_collect_target_finished(
+    db: Session,
+    run_id: int,
+    testing_id: int,
+    failure: CollectFailure | None,
+    finished_at: datetime,
+) -> None:
+    db.execute(
+        update(CollectRunTarget)
+        .where(CollectRunTarget.run_id == run_id, CollectRunTarget.testing_id == testing_id)
+        .values(
+            state="failed" if failure else "succeeded",
+            reason=failure.reason if failure else None,
+            message=failure.message if failure else None,
+            finished_at=finished_at,
+        )
+    )
+    _touch(db, run_id, finished_at)
+    db.commit()
+
+
+def finish_collect_run(db: Session, run_id: int, result: CollectResult, *, cancelled: bool = False) -> None:
+    finished_at = result.finished_at or datetime.now()
+    db.execute(
+        update(CollectRun)
+        .where(CollectRun.id == run_id)
+        .values(status="cancelled" if cancelled else "finished", auth_error=result.auth_error, finished_at=finished_at, updated_at=finished_at)
+    )
+    db.commit()
+
+
+def estimate_collect_costs(
+    db: Session,
+    file_counts: dict[int, int],
+    *,
+    now: datetime | None = None,
+) -> dict[int, float]:
+    """testing_id ごとの tstat 所要時間（秒）を成功履歴から見積もる。
+
+    直近 COST_HISTORY_RUNS 件の成功の 1 ファイルあたり平均 × 現在のファイル数。
+    履歴のない testing_id は、全体の 1 ファイルあたり平均（それもなければ DEFAULT_SEC_PER_FILE）を使う。
+    """
+    history = _success_history(db, list(file_counts), now=now)
+    total_seconds = sum(seconds for runs in history.values() for seconds, _ in runs)
+    total_files = sum(files for runs in history.values() for _, files in runs)
+    fallback = total_seconds / total_files if total_files else DEFAULT_SEC_PER_FILE
+    costs: dict[int, float] = {}
+    for testing_id, files in file_counts.items():
+        runs = history.get(testing_id, [])
+        file_total = sum(run_files for _, run_files in runs)
+        per_file = sum(seconds for seconds, _ in runs) / file_total if file_total else fallback
+        costs[testing_id] = per_file * max(files, 1)
+    return costs
+
+
+def estimate_collect_timeouts(
+    db: Session,
+    file_counts: dict[int, int],
+    *,
+    max_sec: int,
+    factor: float,
+    min_sec: int,
+    now: datetime | None = None,
+) -> dict[int, int]:
+    """testing_id ごとの tstat のタイムアウト（秒）を成功履歴から決める。
+
+    直近の成功で最も遅かった 1 ファイルあたりの秒数 × 現在のファイル数 × factor を、
+    min_sec〜max_sec に収める。履歴がない・factor が 0 以下なら max_sec（COLLECT_TIMEOUT_SEC）。
+    """
+    if factor <= 0:
+        return {testing_id: max_sec for testing_id in file_counts}
+    history = _success_history(db, list(file_counts), now=now)
+    timeouts: dict[int, int] = {}
+    for testing_id, files in file_counts.items():
+        runs = history.get(testing_id)
+        if not runs:
+            timeouts[testing_id] = max_sec
+            continue
+        slowest_per_file = max(seconds / run_files for seconds, run_files in runs)
+        estimate = math.ceil(slowest_per_file * max(files, 1) * factor)
+        timeouts[testing_id] = min(max_sec, max(min_sec, estimate))
+    return timeouts
+
+
+def _success_history(
+    db: Session,
+    testing_ids: list[int],
+    *,
+    now: datetime | None = None,
+) -> dict[int, list[tuple[float, int]]]:
+    """testing_id ごとの直近 COST_HISTORY_RUNS 件の成功の (所要秒数, ファイル数)。"""
+    if not testing_ids:
+        return {}
+    now = now or datetime.now()
+    rows = db.execute(
+        select(
+            CollectRunTarget.testing_id,
+            CollectRunTarget.files,
+            CollectRunTarget.started_at,
+            CollectRunTarget.finished_at,
+        )
+        .where(
+            CollectRunTarget.testing_id.in_(testing_ids),
+            CollectRunTarget.state == "succeeded",
+            CollectRunTarget.files > 0,
+            CollectRunTarget.started_at.is_not(None),
+            CollectRunTarget.finished_at >= now - timedelta(days=COST_HISTORY_DAYS),
+        )
+        .order_by(CollectRunTarget.testing_id, CollectRunTarget.finished_at.desc())
+    ).all()
+
+    history: dict[int, list[tuple[float, int]]] = {}
+    for testing_id, files, started_at, finished_at in rows:
+        runs = history.setdefault(testing_id, [])
+        if len(runs) < COST_HISTORY_RUNS:
+            runs.append(((finished_at - started_at).total_seconds(), files))
+    return history
+
+
+def get_collect_run_status(
+    db: Session,
+    run_id: int | None = None,
+    *,
+    timeout_sec: int,
+    now: datetime | None = None,
+) -> CollectRunStatus | None:
+    """実行記録の進捗を返す。run_id 省略時は最新の実行。"""
+    query = select(CollectRun)
+    if run_id is not None:
+        query = query.where(CollectRun.id == run_id)
+    run = db.scalar(query.order_by(CollectRun.id.desc()).limit(1))
+    if run is None:
+        return None
+    now = now or datetime.now()
+    rows = list(db.scalars(
+        select(CollectRunTarget).where(CollectRunTarget.run_id == run.id).order_by(CollectRunTarget.id)
+    ))
+    items = [
+        CollectRunTargetItem(
+            testing_id=row.testing_id,
+            project_name=row.project_name,
+            state=row.state,
+            reason=row.reason,
+            message=row.message,
+            started_at=row.started_at,
+            finished_at=row.finished_at,
+            elapsed_sec=_elapsed(row.started_at, row.finished_at or (now if row.state == "running" else None)),
+        )
+        for row in rows
+    ]
+    counts = {state: 0 for state in ("queued", "running", "succeeded", "failed")}
+    for item in items:
+        counts[item.state] = counts.get(item.state, 0) + 1
+
+    run_status = run.status
+    if run_status == "running" and now - run.updated_at > timedelta(seconds=timeout_sec + STALE_MARGIN_SEC):
+        run_status = "interrupted"
+
+    eta_sec = None
+    finished_elapsed = [
+        item.elapsed_sec for item in items
+        if item.state in ("succeeded", "failed") and item.elapsed_sec is not None
+    ]
+    if run_status == "running" and finished_elapsed:
+        average = sum(finished_elapsed) / len(finished_elapsed)
+        running_left = sum(
+            max(average - (item.elapsed_sec or 0), 0) for item in items if item.state == "running"
+        )
+        workers = max(run.concurrency, 1)
+        eta_sec = round((running_left + average * counts["queued"]) / workers, 1)
+
+    return CollectRunStatus(
+        run_id=run.id,
+        kind=run.kind,
+        testing_id=run.testing_id,
+        status=run_status,
+        targets=run.targets,
+        queued=counts["queued"],
+        running=counts["running"],
+        succeeded=counts["succeeded"],
+        failed=counts["failed"],
+        auth_error=run.auth_error,
+        started_at=run.started_at,
+        finished_at=run.finished_at,
+        elapsed_sec=_elapsed(run.started_at, run.finished_at or now) or 0.0,
+        eta_sec=eta_sec,
+        items=items,
+    )
+
+
+def require_collect_run_status(db: Session, run_id: int, *, timeout_sec: int) -> CollectRunStatus:
+    result = get_collect_run_status(db, run_id, timeout_sec=timeout_sec)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="collect run not found")
+    return result
+
+
+def add_collect_log(db: Session, log: CollectLog) -> None:
+    db.add(log)
+    db.commit()
+
+
+def list_collect_logs(
+    db: Session,
+    *,
+    testing_id: int | None = None,
+    failed_only: bool = False,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = 100,
+) -> list[CollectLogItem]:
+    """実行ログを新しい順に返す。testing_id・期間（finished_at）・失敗のみで絞り込む。"""
+    query = select(CollectLog)
+    if testing_id is not None:
+        query = query.where(CollectLog.testing_id == testing_id)
+    if failed_only:
+        query = query.where(CollectLog.reason.is_not(None))
+    if since is not None:
+        query = query.where(CollectLog.finished_at >= since)
+    if until is not None:
+        query = query.where(CollectLog.finished_at < until)
+    rows = db.scalars(query.order_by(CollectLog.finished_at.desc(), CollectLog.id.desc()).limit(limit))
+    return [CollectLogItem.model_validate(row) for row in rows]
+
+
+def prune_collect_logs(db: Session, before: datetime) -> list[str]:
+    """before より前の実行ログを削除し、削除した行が指していた出力ファイルのパスを返す。"""
+    paths = list(db.scalars(
+        select(CollectLog.log_path).where(CollectLog.finished_at < before, CollectLog.log_path.is_not(None))
+    ))
+    db.execute(delete(CollectLog).where(CollectLog.finished_at < before))
+    db.commit()
+    return paths
+
+
+def _touch(db: Session, run_id: int, at: datetime) -> None:
+    db.execute(update(CollectRun).where(CollectRun.id == run_id).values(updated_at=at))
+
+
+def _elapsed(started_at: datetime | None, finished_at: datetime | None) -> float | None:
+    if started_at is None or finished_at is None:
+        return None
+    return round((finished_at - started_at).total_seconds(), 1)
@@ -0,0 +1,121 @@
+"""プロジェクト画面用の複合レスポンス（GET /projects/{testing_id}/dashboard）。
+
+個別 API（/progress/{id}・/files・/daily・/people・/pb-chart・/plan-labels）と同じ内容を
+1 セッションで組み立てる。Project・Testing・PlanLabel・FileProgress は 1 回だけ読み、
+サマリーは FileProgress 行から、PB図は同じ行を PbChartPreload で渡して計算する。
+PB図はシリアライズ済みキャッシュ（pb_chart_cache）があればそのまま埋め込む。
+"""
+
+from __future__ import annotations
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.crud.pb_chart import PbChartPreload, get_pb_chart
+from app.crud.plan import load_plan_labels
+from app.crud.progress import (
+    get_file_progress,
+    stream_daily_progress_json,
+    stream_person_progress_json,
+    summarize_file_progress,
+)
+from app.models.progress import Testing
+from app.models.project import Project
+from app.schemas.dashboard import DASHBOARD_FIELDS
+from app.schemas.plan import PlanLabelItem
+from app.schemas.progress import FileProgressItem
+from app.services.data_version import get_data_version
+from app.services.pb_chart_cache import get_cached_pb_chart, store_pb_chart
+
+_FILES_ADAPTER = TypeAdapter(list[FileProgressItem])
+_LABELS_ADAPTER = TypeAdapter(list[PlanLabelItem])
+
+
+def parse_dashboard_fields(value: str | None) -> tuple[str, ...]:
+    """カンマ区切りの fields を DASHBOARD_FIELDS の順に正規化する。未指定は全項目。"""
+    if value is None or not value.strip():
+        return DASHBOARD_FIELDS
+    requested = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = sorted(requested - set(DASHBOARD_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"unknown dashboard fields: {', '.join(unknown)}",
+        )
+    return tuple(field for field in DASHBOARD_FIELDS if field in requested)
+
+
+def build_dashboard_json(
+    db: Session,
+    testing_id: int,
+    fields: tuple[str, ...],
+    label: str | None = None,
+    include_past_plans: bool = False,
+) -> bytes:
+    """DashboardResponse の JSON を返す。各項目は個別にシリアライズして連結する。
+
+    個別 API と同じく alias（pass_count → "Pass" など）で出力する。
+    """
+    row = db.execute(
+        select(Project, Testing)
+        .outerjoin(Testing, Testing.testing_id == Project.testing_id)
+        .where(Project.testing_id == testing_id)
+    ).one_or_none()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
+    project, testing = row
+
+    wanted = set(fields)
+    need_files = bool(wanted & {"summary", "files", "pb_chart"})
+    files = get_file_progress(db, testing_id) if need_files else []
+    need_labels = bool(wanted & {"plan_labels", "pb_chart"})
+    plan_labels = load_plan_labels(db, testing_id) if need_labels else []
+
+    parts: list[tuple[str, bytes]] = [("testing_id", str(testing_id).encode())]
+    for field in fields:
+        if field == "summary":
+            body = summarize_file_progress(testing, files).model_dump_json(by_alias=True).encode() if testing else b"null"
+        elif field == "files":
+            body = _FILES_ADAPTER.dump_json(_FILES_ADAPTER.validate_python(files, from_attributes=True), by_alias=True)
+        elif field == "daily":
+            body = b"".join(stream_daily_progress_json(db, testing_id))
+        elif field == "people":
+            body = b"".join(stream_person_progress_json(db, testing_id))
+        elif field == "plan_labels":
+            body = _LABELS_ADAPTER.dump_json(
+                _LABELS_ADAPTER.validate_python(plan_labels, from_attributes=True), by_alias=True
+            )
+        else:
+            body = _pb_chart_json(
+                db,
+                testing_id,
+                label,
+                include_past_plans,
+                PbChartPreload(
+                    project=project,
+                    actuals_updated_at=testing.updated_at if testing else None,
+                    plan_labels=plan_labels,
+                    files=files,
+                ),
+            )
+        parts.append((field, body))
+    return b"{" + b",".join(b'"' + name.encode() + b'":' + body for name, body in parts) + b"}"
+
+
+def _pb_chart_json(
+    db: Session,
+    testing_id: int,
+    label: str | None,
+    include_past_plans: bool,
+    preload: PbChartPreload,
+) -> bytes:
+    key = (testing_id, label, include_past_plans)
+    version = get_data_version(db, testing_id)
+    body = get_cached_pb_chart(key, version)
+    if body is None:
+        chart = get_pb_chart(db, testing_id, label=label, include_past_plans=include_past_plans, preload=preload)
+        body = chart.model_dump_json().encode("utf-8")
+        store_pb_chart(key, version, body)
+    return body
@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 
 from app.models.holiday import Holiday
 from app.schemas.holiday import HolidayCreate, HolidayItem, HolidaySyncResult
+from app.services.data_version import bump_data_version
 
 CAO_HOLIDAY_CSV_URL = "https://www8.cao.go.jp/chosei/shukujitsu/syukujitsu.csv"
 HOLIDAY_START_YEAR = 2025
@@ -39,6 +40,7 @@ def upsert_holiday(db: Session, payload: HolidayCreate) -> HolidayItem:
     else:
         holiday = Holiday(date=payload.date, name=name)
         db.add(holiday)
+    bump_data_version(db)
     db.commit()
     db.refresh(holiday)
     return HolidayItem.model_validate(holiday)
@@ -53,6 +55,7 @@ def sync_holidays_from_cao(db: Session) -> HolidaySyncResult:
             existing.name = name
         else:
             db.add(Holiday(date=holiday_date, name=name))
+    bump_data_version(db)
     db.commit()
     return HolidaySyncResult(updated=len(rows), holidays=list_holidays(db))
 
@@ -1,4 +1,5 @@
 from collections import defaultdict
+from dataclasses import dataclass
 from datetime import date, datetime, timedelta
 
 from fastapi import HTTPException, status
@@ -7,247 +8,317 @@ from sqlalchemy.orm import Session
 
 from app.config import get_settings
 from app.crud.bug import (
-    get_bug_chart_metadata,
-    get_bug_cumulative,
+    compute_bug_chart_metadata,
+    compute_bug_cumulative,
+    load_bug_chart_rows,
 )
 from app.crud.setting import get_pb_chart_settings
 from app.models.plan import Plan, PlanDaily, PlanLabel
-from app.models.progress import DailyProgress, FileProgress, TestResultBugSnapshot, Testing
+from app.models.progress import DailyProgressRollup, FileProgress, TestResultBugSnapshot, Testing
 from app.models.project import Project
 from app.schemas.pb_chart import (
     PastPlanSeries,
-    PastPlanSeriesItem,
-    PbChartRange,
     PbChartResponse,
-    PbChartSeriesItem,
 )
+from app.services.date_series import DayRange, cumulative_columns, remaining
+from app.services.request_metrics import instrumented
 
 
-# ---------- helpers ----------
-
-def _label_filter(label: str | None):
-    return Plan.label.is_(None) if label is None else Plan.label == label
-
-
-def _get_disabled_labels(db: Session, testing_id: int) -> set[str]:
-    return set(
-        db.scalars(
-            select(PlanLabel.label).where(
-                PlanLabel.testing_id == testing_id,
-                PlanLabel.is_disabled.is_(True),
-            )
-        )
-    )
+@dataclass(frozen=True)
+class PbChartPreload:
+    """呼び出し側（ダッシュボード API）で読み込み済みの行。_load_context はこれらを再取得しない。"""
 
+    project: Project
+    actuals_updated_at: datetime | None
+    plan_labels: list[PlanLabel]
+    files: list[FileProgress]
 
-def _label_is_disabled(db: Session, testing_id: int, label: str | None) -> bool:
-    if label is None:
-        return False
-    return db.scalar(
-        select(PlanLabel.id).where(
-            PlanLabel.testing_id == testing_id,
-            PlanLabel.label == label,
-            PlanLabel.is_disabled.is_(True),
-        )
-    ) is not None
 
+# ---------- helpers ----------
 
 def _date_range(start: date, end: date) -> list[date]:
-    result = []
-    d = start
-    while d <= end:
-        result.append(d)
-        d += timedelta(days=1)
-    return result
-
+    return DayRange(start, end).dates()
 
-# ---------- データ取得 ----------
 
-def _get_active_plans(db: Session, testing_id: int, label: str | None) -> list[Plan]:
-    """有効な計画を取得。label=None の場合は無効 label を除いた全 label の有効計画を返す。"""
-    if _label_is_disabled(db, testing_id, label):
-        return []
-    q = select(Plan).where(Plan.testing_id == testing_id, Plan.is_active.is_(True))
-    if label is not None:
-        q = q.where(Plan.label == label)
-    plans = list(db.scalars(q))
-    if label is None:
-        disabled_labels = _get_disabled_labels(db, testing_id)
-        plans = [plan for plan in plans if plan.label not in disabled_labels]
-    return plans
-
-
-def _get_plan_daily_map(db: Session, plan_ids: list[int]) -> dict[date, int]:
+def _sum_plan_daily(plans: list[Plan], daily_by_plan: dict[int, dict[date, int]]) -> dict[date, int]:
     """日付ごとの計画消化数合計 {date: sum(planned_count)}"""
-    if not plan_ids:
-        return {}
-    rows = db.execute(
-        select(PlanDaily.date, func.sum(PlanDaily.planned_count))
-        .where(PlanDaily.plan_id.in_(plan_ids))
-        .group_by(PlanDaily.date)
-    ).all()
-    return {r[0]: r[1] for r in rows}
+    result: dict[date, int] = defaultdict(int)
+    for plan in plans:
+        for d, count in daily_by_plan.get(plan.id, {}).items():
+            result[d] += count
+    return dict(result)
 
 
-def _get_actual_daily_map(
-    db: Session, testing_id: int, label: str | None, actual_metric: str
-) -> dict[date, int]:
-    """日付ごとの実績数合計。actual_metric に completed / executed を指定する。
+# ---------- データ取得 ----------
 
-    結果なしで日付だけ入力された行は DailyProgress に executed=0 として保存されるが、
-    PB 図上の実績日ではないため系列から除外する。負の実績（修正差分）は保持する。
-    """
-    if _label_is_disabled(db, testing_id, label):
-        return {}
-    metric_column = getattr(DailyProgress, actual_metric)
-    q = select(DailyProgress.date, func.sum(metric_column)).where(
-        DailyProgress.testing_id == testing_id
-    )
-    if label is not None:
-        q = q.where(DailyProgress.label == label)
-    else:
-        disabled_labels = _get_disabled_labels(db, testing_id)
-        if disabled_labels:
-            q = q.where((DailyProgress.label.is_(None)) | (DailyProgress.label.not_in(disabled_labels)))
-    rows = db.execute(q.group_by(DailyProgress.date)).all()
-    return {r[0]: r[1] for r in rows if r[1] != 0}
+@dataclass
+class _PbChartContext:
+    """get_pb_chart 1 リクエスト分の取得済みデータ。
 
+    無効 label・PlanLabel 設定・計画・計画日別・実績集計・不具合スナップショットを
+    _load_context() でまとめて読み込み、以降の系列計算は DB に触れずこの中だけで行う。
+    """
 
-def _get_test_result_bug_daily_map(
-    db: Session, testing_id: int, label: str | None = None
-) -> dict[date, tuple[int, int, int]]:
-    """日付ごとのテスト結果由来の (検出増分, 見送り件数, 完了件数) スナップショットを返す。
+    testing_id: int
+    label: str | None
+    project: Project
+    actuals_updated_at: datetime | None
+    disabled_labels: set[str]
+    offset_settings: dict[str, bool]
+    active_plans: list[Plan]
+    past_plans: list[Plan]
+    plan_daily_by_plan: dict[int, dict[date, int]]
+    # (label, date) -> (completed, executed)
+    daily_totals: dict[tuple[str | None, date], tuple[int, int]]
+    # label -> (available_cases, completed, executed, result_na)
+    file_totals: dict[str | None, tuple[int, int, int, int]]
+    # (label, date) -> (detected, suspend, fixed, sent_at)
+    test_result_bugs: dict[tuple[str | None, date], tuple[int, int, int, datetime | None]]
+    bug_rows: list[tuple[str | None, date | None, date | None, datetime]]
+
+    @property
+    def label_disabled(self) -> bool:
+        return self.label is not None and self.label in self.disabled_labels
+
+    def is_enabled(self, row_label: str | None) -> bool:
+        return row_label is None or row_label not in self.disabled_labels
+
+    def is_visible(self, row_label: str | None) -> bool:
+        """表示対象（指定 label、または label=None のとき無効 label 以外の全 label）か。"""
+        if self.label_disabled:
+            return False
+        if self.label is not None:
+            return row_label == self.label
+        return self.is_enabled(row_label)
+
+    def plan_daily_map(self, plans: list[Plan]) -> dict[date, int]:
+        return _sum_plan_daily(plans, self.plan_daily_by_plan)
+
+    def actual_daily_map(self, actual_metric: str) -> dict[date, int]:
+        """日付ごとの実績数合計。actual_metric に completed / executed を指定する。
+
+        結果なしで日付だけ入力された行は DailyProgress に executed=0 として保存されるが、
+        PB 図上の実績日ではないため系列から除外する。負の実績（修正差分）は保持する。
+        """
+        index = 0 if actual_metric == "completed" else 1
+        totals: dict[date, int] = defaultdict(int)
+        for (row_label, d), values in self.daily_totals.items():
+            if self.is_visible(row_label):
+                totals[d] += values[index]
+        return {d: value for d, value in totals.items() if value != 0}
+
+    def actual_metadata(self) -> tuple[int, int, int, int]:
+        """実績の対象件数・完了数・消化数・N/A 件数。実績なし=0。"""
+        available_cases = completed_cases = executed_cases = na_cases = 0
+        for row_label, (available, completed, executed, na) in self.file_totals.items():
+            if self.is_visible(row_label):
+                available_cases += available
+                completed_cases += completed
+                executed_cases += executed
+                na_cases += na
+        return available_cases, completed_cases, executed_cases, na_cases
+
+    def actual_data_labels(self) -> set[str | None]:
+        """実績が一度でも送信された label を返す。件数 0 のファイルも送信済みとして扱う。"""
+        labels = {row_label for row_label in self.file_totals if self.is_visible(row_label)}
+        labels.update(row_label for row_label, _ in self.daily_totals if self.is_visible(row_label))
+        return labels
+
+    def plan_actual_offset(self, actual_data_labels: set[str | None]) -> int:
+        """未送信 label の計画件数を、設定に従って実績未実施数の初期値へ加算する。"""
+        return sum(
+            plan.planned_total_cases
+            for plan in self.active_plans
+            if plan.label not in actual_data_labels
+            and self.offset_settings.get(plan.label, True)
+        )
 
-    label 指定時はそのテスト種別のみ。label=None（全て）は全 label を日付ごとに合算する。
-    """
-    if _label_is_disabled(db, testing_id, label):
-        return {}
-    q = select(
-        TestResultBugSnapshot.snapshot_date,
-        func.sum(TestResultBugSnapshot.detected_count),
-        func.sum(TestResultBugSnapshot.suspend_count),
-        func.sum(TestResultBugSnapshot.fixed_count),
-    ).where(TestResultBugSnapshot.testing_id == testing_id)
-    if label is not None:
-        q = q.where(TestResultBugSnapshot.label == label)
-    else:
-        disabled_labels = _get_disabled_labels(db, testing_id)
-        if disabled_labels:
-            q = q.where((TestResultBugSnapshot.label.is_(None)) | (TestResultBugSnapshot.label.not_in(disabled_labels)))
-    rows = db.execute(
-        q.group_by(TestResultBugSnapshot.snapshot_date).order_by(TestResultBugSnapshot.snapshot_date)
-    ).all()
-    return {row[0]: (int(row[1]), int(row[2]), int(row[3])) for row in rows}
-
-
-def _get_test_result_bug_metadata(db: Session, testing_id: int) -> tuple[bool, datetime | None]:
-    q = select(
-        func.count(TestResultBugSnapshot.id),
-        func.max(TestResultBugSnapshot.sent_at),
-    ).where(TestResultBugSnapshot.testing_id == testing_id)
-    disabled_labels = _get_disabled_labels(db, testing_id)
-    if disabled_labels:
-        q = q.where((TestResultBugSnapshot.label.is_(None)) | (TestResultBugSnapshot.label.not_in(disabled_labels)))
-    count, updated_at = db.execute(q).one()
-    return (count or 0) > 0, updated_at
-
-
-def _get_actual_metadata(
-    db: Session, testing_id: int, label: str | None
-) -> tuple[int, int, int, int, datetime | None]:
-    """実績の対象件数・完了数・消化数と更新日時。実績なし=0。"""
-    if _label_is_disabled(db, testing_id, label):
-        updated_at = db.scalar(select(Testing.updated_at).where(Testing.testing_id == testing_id))
-        return 0, 0, 0, 0, updated_at
-    file_query = select(
-        func.coalesce(func.sum(FileProgress.available_cases), 0).label("available_cases"),
-        func.coalesce(func.sum(FileProgress.completed), 0).label("completed_cases"),
-        func.coalesce(func.sum(FileProgress.executed), 0).label("executed_cases"),
-        func.coalesce(func.sum(FileProgress.result_na), 0).label("na_cases"),
-    ).where(FileProgress.testing_id == testing_id)
-    if label is not None:
-        file_query = file_query.where(FileProgress.label == label)
+    def test_result_bug_daily_map(self) -> dict[date, tuple[int, int, int]]:
+        """日付ごとのテスト結果由来の (検出増分, 見送り件数, 完了件数) スナップショットを返す。
+
+        label 指定時はそのテスト種別のみ。label=None（全て）は全 label を日付ごとに合算する。
+        """
+        totals: dict[date, list[int]] = defaultdict(lambda: [0, 0, 0])
+        for (row_label, d), (detected, suspended, fixed, _sent_at) in self.test_result_bugs.items():
+            if self.is_visible(row_label):
+                counts = totals[d]
+                counts[0] += detected
+                counts[1] += suspended
+                counts[2] += fixed
+        return {d: tuple(totals[d]) for d in sorted(totals)}
+
+    def test_result_bug_metadata(self) -> tuple[bool, datetime | None]:
+        """表示 label に依らず、無効 label 以外に不具合スナップショットがあるかと最終送信日時。"""
+        sent_ats = [
+            sent_at
+            for (row_label, _), (*_, sent_at) in self.test_result_bugs.items()
+            if self.is_enabled(row_label)
+        ]
+        return bool(sent_ats), max((s for s in sent_ats if s is not None), default=None)
+
+
+def _load_context(
+    db: Session,
+    testing_id: int,
+    label: str | None,
+    include_past_plans: bool,
+    preload: PbChartPreload | None = None,
+) -> _PbChartContext:
+    """get_pb_chart に必要なデータを最小限のクエリで読み込む。"""
+    if preload is not None:
+        project, actuals_updated_at = preload.project, preload.actuals_updated_at
+        label_rows = [
+            (plan_label.label, plan_label.is_disabled, plan_label.use_plan_as_actual_offset)
+            for plan_label in preload.plan_labels
+        ]
     else:
-        disabled_labels = _get_disabled_labels(db, testing_id)
-        if disabled_labels:
-            file_query = file_query.where((FileProgress.label.is_(None)) | (FileProgress.label.not_in(disabled_labels)))
-
-    file_totals = file_query.subquery()
-    available_cases, completed_cases, executed_cases, na_cases, updated_at = db.execute(
-        select(
-            file_totals.c.available_cases,
-            file_totals.c.completed_cases,
-            file_totals.c.executed_cases,
-            file_totals.c.na_cases,
-            select(Testing.updated_at)
-            .where(Testing.testing_id == testing_id)
-            .scalar_subquery(),
-        )
-    ).one()
-    return available_cases or 0, completed_cases or 0, executed_cases or 0, na_cases or 0, updated_at
-
-def _get_actual_data_labels(db: Session, testing_id: int, label: str | None) -> set[str | None]:
-    """実績が一度でも送信された label を返す。件数 0 のファイルも送信済みとして扱う。"""
-    disabled_labels = _get_disabled_labels(db, testing_id) if label is None else set()
-    file_query = select(FileProgress.label).where(FileProgress.testing_id == testing_id)
-    daily_query = select(DailyProgress.label).where(DailyProgress.testing_id == testing_id)
-    if label is not None:
-        file_query = file_query.where(FileProgress.label == label)
-        daily_query = daily_query.where(DailyProgress.label == label)
-    elif disabled_labels:
-        file_query = file_query.where(
-            (FileProgress.label.is_(None)) | (FileProgress.label.not_in(disabled_labels))
-        )
-        daily_query = daily_query.where(
-            (DailyProgress.label.is_(None)) | (DailyProgress.label.not_in(disabled_labels))
+        row = db.execute(
+            select(
+                Project,
+                select(Testing.updated_at).where(Testing.testing_id == testing_id).scalar_subquery(),
+            ).where(Project.testing_id == testing_id)
+        ).one_or_none()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
+        project, actuals_updated_at = row
+        label_rows = db.execute(
+            select(PlanLabel.label, PlanLabel.is_disabled, PlanLabel.use_plan_as_actual_offset)
+            .where(PlanLabel.testing_id == testing_id)
         )
-    return set(db.scalars(file_query.distinct())) | set(db.scalars(daily_query.distinct()))
 
+    disabled_labels: set[str] = set()
+    offset_settings: dict[str, bool] = {}
+    for plan_label, is_disabled, use_offset in label_rows:
+        if is_disabled:
+            disabled_labels.add(plan_label)
+        offset_settings[plan_label] = use_offset
+    label_disabled = label is not None and label in disabled_labels
+
+    active_plans: list[Plan] = []
+    past_plans: list[Plan] = []
+    if not label_disabled:
+        plan_query = select(Plan).where(Plan.testing_id == testing_id)
+        if not include_past_plans:
+            plan_query = plan_query.where(Plan.is_active.is_(True))
+        elif label is not None:
+            plan_query = plan_query.where(Plan.label == label)
+        for plan in db.scalars(plan_query.order_by(Plan.label.nullsfirst(), Plan.version.desc())):
+            if plan.label is not None and plan.label in disabled_labels:
+                continue
+            if plan.is_active:
+                if label is None or plan.label == label:
+                    active_plans.append(plan)
+            else:
+                past_plans.append(plan)
+
+    plan_daily_by_plan: dict[int, dict[date, int]] = defaultdict(dict)
+    plan_ids = [plan.id for plan in [*active_plans, *past_plans]]
+    if plan_ids:
+        for plan_id, plan_date, planned_count in db.execute(
+            select(PlanDaily.plan_id, PlanDaily.date, PlanDaily.planned_count)
+            .where(PlanDaily.plan_id.in_(plan_ids))
+        ):
+            daily_map = plan_daily_by_plan[plan_id]
+            daily_map[plan_date] = daily_map.get(plan_date, 0) + planned_count
+
+    daily_totals: dict[tuple[str | None, date], tuple[int, int]] = {}
+    file_totals: dict[str | None, tuple[int, int, int, int]] = {}
+    if not label_disabled:
+        daily_query = select(
+            DailyProgressRollup.label,
+            DailyProgressRollup.date,
+            DailyProgressRollup.completed,
+            DailyProgressRollup.executed,
+        ).where(DailyProgressRollup.testing_id == testing_id)
+        file_query = select(
+            FileProgress.label,
+            func.coalesce(func.sum(FileProgress.available_cases), 0),
+            func.coalesce(func.sum(FileProgress.completed), 0),
+            func.coalesce(func.sum(FileProgress.executed), 0),
+            func.coalesce(func.sum(FileProgress.result_na), 0),
+        ).where(FileProgress.testing_id == testing_id)
+        if label is not None:
+            daily_query = daily_query.where(DailyProgressRollup.label == label)
+            file_query = file_query.where(FileProgress.label == label)
+        for row_label, row_date, completed, executed in db.execute(daily_query):
+            daily_totals[(row_label, row_date)] = (int(completed or 0), int(executed or 0))
+        if preload is not None:
+            file_totals = _sum_file_totals(preload.files, label)
+        else:
+            for row_label, available, completed, executed, na in db.execute(
+                file_query.group_by(FileProgress.label)
+            ):
+                file_totals[row_label] = (int(available), int(completed), int(executed), int(na))
+
+    test_result_bugs: dict[tuple[str | None, date], tuple[int, int, int, datetime | None]] = {}
+    bug_rows: list[tuple[str | None, date | None, date | None, datetime]] = []
+    if project.bug_count_source == "test_result":
+        # 不具合有無・更新日時は表示 label に依らず全 label で判定するため、label では絞り込まない。
+        for row_label, snapshot_date, detected, suspended, fixed, sent_at in db.execute(
+            select(
+                TestResultBugSnapshot.label,
+                TestResultBugSnapshot.snapshot_date,
+                func.sum(TestResultBugSnapshot.detected_count),
+                func.sum(TestResultBugSnapshot.suspend_count),
+                func.sum(TestResultBugSnapshot.fixed_count),
+                func.max(TestResultBugSnapshot.sent_at),
+            )
+            .where(TestResultBugSnapshot.testing_id == testing_id)
+            .group_by(TestResultBugSnapshot.label, TestResultBugSnapshot.snapshot_date)
+        ):
+            test_result_bugs[(row_label, snapshot_date)] = (int(detected), int(suspended), int(fixed), sent_at)
+    else:
+        bug_rows = load_bug_chart_rows(db, testing_id)
 
-def _get_plan_actual_offset(
-    db: Session,
-    testing_id: int,
-    active_plans: list[Plan],
-    actual_data_labels: set[str | None],
-) -> int:
-    """未送信 label の計画件数を、設定に従って実績未実施数の初期値へ加算する。"""
-    label_settings = {
-        item.label: item.use_plan_as_actual_offset
-        for item in db.scalars(select(PlanLabel).where(PlanLabel.testing_id == testing_id))
-    }
-    return sum(
-        plan.planned_total_cases
-        for plan in active_plans
-        if plan.label not in actual_data_labels
-        and label_settings.get(plan.label, True)
+    return _PbChartContext(
+        testing_id=testing_id,
+        label=label,
+        project=project,
+        actuals_updated_at=actuals_updated_at,
+        disabled_labels=disabled_labels,
+        offset_settings=offset_settings,
+        active_plans=active_plans,
+        past_plans=past_plans,
+        plan_daily_by_plan=dict(plan_daily_by_plan),
+        daily_totals=daily_totals,
+        file_totals=file_totals,
+        test_result_bugs=test_result_bugs,
+        bug_rows=bug_rows,
     )
 
 
+def _sum_file_totals(
+    files: list[FileProgress],
+    label: str | None,
+) -> dict[str | None, tuple[int, int, int, int]]:
+    totals: dict[str | None, tuple[int, int, int, int]] = {}
+    for file in files:
+        if label is not None and file.label != label:
+            continue
+        available, completed, executed, na = totals.get(file.label, (0, 0, 0, 0))
+        totals[file.label] = (
+            available + (file.available_cases or 0),
+            completed + (file.completed or 0),
+            executed + (file.executed or 0),
+            na + (file.result_na or 0),
+        )
+    return totals
+
+
 # ---------- 系列計算 ----------
 
 def _compute_plan_series(
-    plans: list[Plan],
     plan_daily_map: dict[date, int],
-    plan_start: date,
-    plan_end: date,
+    days: DayRange,
     planned_total: int,
-) -> tuple[dict[date, int], dict[date, int]]:
+) -> tuple[list[int], list[int]]:
     """
-    計画系列を計算。
-    戻り値: (planned_remaining_map, planned_daily_map)
-    planned_remaining_map: {date: remaining} — plan_start の前日〜plan_end の全日
-    planned_daily_map: {date: count} — 同上（開始前日は 0、エントリなし日は 0）
+    計画系列を計算。days は計画開始前日〜計画終了日。
+    戻り値: (planned_remaining, planned_daily) — days の各日に対応する配列
+    planned_daily はエントリなし日（開始前日を含む）を 0 とする。
     """
-    dates = _date_range(plan_start - timedelta(days=1), plan_end)
-    cumsum = 0
-    remaining_map: dict[date, int] = {}
-    daily_map: dict[date, int] = {}
-    for d in dates:
-        cnt = plan_daily_map.get(d, 0)
-        cumsum += cnt
-        daily_map[d] = cnt
-        remaining_map[d] = planned_total - cumsum
-    return remaining_map, daily_map
+    daily = days.dense(plan_daily_map, 0)
+    return remaining(planned_total, daily), daily
 
 
 def _compute_actual_series(
@@ -259,6 +330,7 @@ def _compute_actual_series(
     実績系列（actual_remaining）を計算。
     DailyProgress は日付あり実績、FileProgress.executed は no_date を含む最新総数。
     日付なし実績は配置日がないため、実績線の初期オフセットとして扱う。
+    実績日は疎なので dict のまま返し、全日への補完は DayRange.forward_fill で行う。
     """
     if not actual_daily_map or available_cases == 0:
         return {}
@@ -273,109 +345,102 @@ def _compute_actual_series(
         remaining_map[d] = available_cases - cumsum
     return remaining_map
 
+
 def _compute_test_result_bug_series(
-    date_range: list[date],
+    days: DayRange,
     daily_map: dict[date, tuple[int, int, int]],
-) -> dict[date, tuple[int, int, int]]:
-    """テスト結果由来の不具合バーンダウン系列を date_range に補完する。
+) -> list[tuple[int, int, int]]:
+    """テスト結果由来の不具合バーンダウン系列を days の全日に補完する。
 
     daily_map は日付ごとの (検出増分, 見送り件数, 完了件数)。Azure DevOps と同じ考え方で、
     各日について 未解消(open) = 検出累積 − 見送り累積 − 完了累積 を算出する。
     一度検出した不具合（検出累積）は減らないが、完了・見送りが増えると未解消は減る。
-    戻り値: {date: (open, suspended, resolved)}。データがない日は直前の累積を引き継ぐ。
+    戻り値: days の各日の (open, suspended, resolved)。データがない日は直前の累積を引き継ぐ。
     """
-    result: dict[date, tuple[int, int, int]] = {}
-    cum_detected = cum_suspended = cum_resolved = 0
-    for d in date_range:
-        if d in daily_map:
-            detected, suspended, resolved = daily_map[d]
-            cum_detected += detected
-            cum_suspended += suspended
-            cum_resolved += resolved
-        open_count = max(cum_detected - cum_suspended - cum_resolved, 0)
-        result[d] = (open_count, cum_suspended, cum_resolved)
-    return result
+    return cumulative_columns(
+        days.dense(daily_map, (0, 0, 0)),
+        lambda totals: (max(totals[0] - totals[1] - totals[2], 0), totals[1], totals[2]),
+    )
 
 
 def _build_series(
-    date_range: list[date],
-    plan_remaining: dict[date, int],
-    plan_daily: dict[date, int],
-    completed_remaining_sparse: dict[date, int],
-    executed_remaining_sparse: dict[date, int],
-    executed_daily: dict[date, int],
-    bug_cumulative: dict[date, tuple[int, int, int]] | None = None,
-) -> list[PbChartSeriesItem]:
-    """全日付に対して計画、完了実績、消化実績の系列を生成する。"""
-    last_completed: int | None = None
-    last_executed: int | None = None
-    last_completed_date = max(completed_remaining_sparse) if completed_remaining_sparse else None
-    last_executed_date = max(executed_remaining_sparse) if executed_remaining_sparse else None
-    items: list[PbChartSeriesItem] = []
-
-    for d in date_range:
-        if d in completed_remaining_sparse:
-            last_completed = completed_remaining_sparse[d]
-        if d in executed_remaining_sparse:
-            last_executed = executed_remaining_sparse[d]
-        completed_remaining = last_completed
-        executed_remaining = last_executed
-        if last_completed_date is not None and d > last_completed_date:
-            completed_remaining = None
-        if last_executed_date is not None and d > last_executed_date:
-            executed_remaining = None
-
-        bug_open = bug_suspended = bug_resolved = None
-        if bug_cumulative is not None:
-            bug_open, bug_suspended, bug_resolved = bug_cumulative.get(d, (0, 0, 0))
-
-        items.append(PbChartSeriesItem(
-            date=d,
-            planned_remaining=plan_remaining.get(d),
-            actual_remaining=completed_remaining,
-            actual_executed_remaining=executed_remaining,
-            planned_completed_daily=plan_daily.get(d),
-            actual_completed_daily=executed_daily.get(d),
-            bug_open=bug_open,
-            bug_suspended=bug_suspended,
-            bug_resolved=bug_resolved,
-        ))
-    return items
+    days: DayRange,
+    plan_remaining: list[int | None],
+    plan_daily: list[int | None],
+    completed_remaining: list[int | None],
+    executed_remaining: list[int | None],
+    executed_daily: list[int | None],
+    bug_cumulative: list[tuple[int, int, int]] | None = None,
+) -> list[dict]:
+    """days の各日について計画、完了実績、消化実績の列を 1 件ずつの系列要素に組み立てる。
+
+    要素は dict のまま返し、PbChartResponse の検証時にまとめて PbChartSeriesItem にする
+    （日ごとにモデルを生成するより速い）。
+    """
+    bugs: list[tuple[int | None, int | None, int | None]] = (
+        bug_cumulative if bug_cumulative is not None else [(None, None, None)] * len(days)
+    )
+    return [
+        {
+            "date": d,
+            "planned_remaining": planned_remaining,
+            "actual_remaining": actual_remaining,
+            "actual_executed_remaining": actual_executed_remaining,
+            "planned_completed_daily": planned_completed_daily,
+            "actual_completed_daily": actual_completed_daily,
+            "bug_open": bug_open,
+            "bug_suspended": bug_suspended,
+            "bug_resolved": bug_resolved,
+        }
+        for (
+            d,
+            planned_remaining,
+            planned_completed_daily,
+            actual_remaining,
+            actual_executed_remaining,
+            actual_completed_daily,
+            (bug_open, bug_suspended, bug_resolved),
+        ) in zip(
+            days.dates(),
+            plan_remaining,
+            plan_daily,
+            completed_remaining,
+            executed_remaining,
+            executed_daily,
+            bugs,
+        )
+    ]
 
 # ---------- 過去計画 ----------
 
-def _compute_past_plans(
-    db: Session,
-    testing_id: int,
-    label: str | None,
-) -> list[PastPlanSeries]:
+def _past_plan_series_items(
+    plans: list[Plan],
+    daily_by_plan: dict[int, dict[date, int]],
+    planned_total_cases: int,
+) -> list[dict]:
+    """計画群の日別残数系列。要素は PastPlanSeries の検証時に PastPlanSeriesItem になる。"""
+    days = DayRange(
+        min(p.start_date for p in plans) - timedelta(days=1),
+        max(p.end_date for p in plans),
+    )
+    planned_remaining, planned_daily = _compute_plan_series(
+        _sum_plan_daily(plans, daily_by_plan), days, planned_total_cases
+    )
+    return [
+        {"date": d, "planned_remaining": remaining_count, "planned_completed_daily": count}
+        for d, remaining_count, count in zip(days.dates(), planned_remaining, planned_daily)
+    ]
+
+
+def _compute_past_plans(ctx: _PbChartContext) -> list[PastPlanSeries]:
     """is_active=False の計画バージョンを系列化。"""
-    if _label_is_disabled(db, testing_id, label):
-        return []
-    q = select(Plan).where(Plan.testing_id == testing_id, Plan.is_active.is_(False))
-    if label is not None:
-        q = q.where(Plan.label == label)
-    past_plans = list(db.scalars(q.order_by(Plan.label.nullsfirst(), Plan.version.desc())))
-    if label is None:
-        disabled_labels = _get_disabled_labels(db, testing_id)
-        past_plans = [plan for plan in past_plans if plan.label not in disabled_labels]
+    past_plans = ctx.past_plans
     if not past_plans:
         return []
 
-    active_plans = _get_active_plans(db, testing_id, None) if label is None else []
-    active_plans_by_label = {p.label: p for p in active_plans}
-
-    all_ids = list({p.id for p in [*past_plans, *active_plans]})
-    daily_rows = db.execute(
-        select(PlanDaily.plan_id, PlanDaily.date, PlanDaily.planned_count)
-        .where(PlanDaily.plan_id.in_(all_ids))
-        .order_by(PlanDaily.date)
-    ).all()
-
-    # plan_id ごとにグループ化
-    daily_by_plan: dict[int, dict[date, int]] = defaultdict(dict)
-    for row in daily_rows:
-        daily_by_plan[row[0]][row[1]] = row[2]
+    label = ctx.label
+    active_plans_by_label = {p.label: p for p in ctx.active_plans} if label is None else {}
+    daily_by_plan = ctx.plan_daily_by_plan
 
     result: list[PastPlanSeries] = []
     if label is None:
@@ -394,99 +459,68 @@ def _compute_past_plans(
                     if active_label not in past_labels
                 ],
             ]
-            start_date = min(p.start_date for p in plans)
-            end_date = max(p.end_date for p in plans)
             planned_total_cases = sum(p.planned_total_cases for p in plans)
-            daily_map: dict[date, int] = defaultdict(int)
-            for plan in plans:
-                for d, count in daily_by_plan.get(plan.id, {}).items():
-                    daily_map[d] += count
-
-            cumsum = 0
-            series_items: list[PastPlanSeriesItem] = []
-            for d in _date_range(start_date - timedelta(days=1), end_date):
-                cnt = daily_map.get(d, 0)
-                cumsum += cnt
-                series_items.append(PastPlanSeriesItem(
-                    date=d,
-                    planned_remaining=planned_total_cases - cumsum,
-                    planned_completed_daily=cnt,
-                ))
             result.append(PastPlanSeries(
                 plan_id=min(p.id for p in version_past_plans),
                 version=version,
                 label=None,
                 reason=None,
                 planned_total_cases=planned_total_cases,
-                series=series_items,
+                series=_past_plan_series_items(plans, daily_by_plan, planned_total_cases),
             ))
         return result
 
     for plan in past_plans:
-        dm = daily_by_plan.get(plan.id, {})
-        dates = _date_range(plan.start_date - timedelta(days=1), plan.end_date)
-        cumsum = 0
-        series_items: list[PastPlanSeriesItem] = []
-        for d in dates:
-            cnt = dm.get(d, 0)
-            cumsum += cnt
-            series_items.append(PastPlanSeriesItem(
-                date=d,
-                planned_remaining=plan.planned_total_cases - cumsum,
-                planned_completed_daily=cnt,
-            ))
         result.append(PastPlanSeries(
             plan_id=plan.id,
             version=plan.version,
             label=plan.label,
             reason=plan.reason,
             planned_total_cases=plan.planned_total_cases,
-            series=series_items,
+            series=_past_plan_series_items([plan], daily_by_plan, plan.planned_total_cases),
         ))
     return result
 
 
 # ---------- メイン ----------
 
+@instrumented("get_pb_chart")
 def get_pb_chart(
     db: Session,
     testing_id: int,
     label: str | None = None,
     include_past_plans: bool = False,
+    preload: PbChartPreload | None = None,
 ) -> PbChartResponse:
-    # プロジェクト存在確認
-    project = db.scalar(select(Project).where(Project.testing_id == testing_id))
-    if project is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
+    ctx = _load_context(db, testing_id, label, include_past_plans, preload)
+    project = ctx.project
+    actuals_updated_at = ctx.actuals_updated_at
 
     # 有効な計画
-    active_plans = _get_active_plans(db, testing_id, label)
+    active_plans = ctx.active_plans
     has_plan = bool(active_plans)
 
     plan_start: date | None = min(p.start_date for p in active_plans) if has_plan else None
     plan_end: date | None = max(p.end_date for p in active_plans) if has_plan else None
     planned_total: int | None = sum(p.planned_total_cases for p in active_plans) if has_plan else None
 
-    plan_daily_map: dict[date, int] = {}
-    plan_remaining_map: dict[date, int] = {}
-    plan_d_map: dict[date, int] = {}
+    plan_days: DayRange | None = None
+    plan_remaining: list[int] = []
+    plan_daily: list[int] = []
     if has_plan:
-        plan_daily_map = _get_plan_daily_map(db, [p.id for p in active_plans])
-        plan_remaining_map, plan_d_map = _compute_plan_series(
-            active_plans, plan_daily_map, plan_start, plan_end, planned_total  # type: ignore[arg-type]
+        plan_days = DayRange(plan_start - timedelta(days=1), plan_end)  # type: ignore[operator]
+        plan_remaining, plan_daily = _compute_plan_series(
+            ctx.plan_daily_map(active_plans), plan_days, planned_total  # type: ignore[arg-type]
         )
 
     # 実績（完了数と消化数を独立した線として返す）
-    pb_chart_settings = get_pb_chart_settings(db)
-    completed_daily_map = _get_actual_daily_map(db, testing_id, label, "completed")
-    executed_daily_map = _get_actual_daily_map(db, testing_id, label, "executed")
+    completed_daily_map = ctx.actual_daily_map("completed")
+    executed_daily_map = ctx.actual_daily_map("executed")
     for actual_date in executed_daily_map:
         completed_daily_map.setdefault(actual_date, 0)
-    available_cases, completed_cases, executed_cases, actual_na_cases, actuals_updated_at = _get_actual_metadata(
-        db, testing_id, label
-    )
-    actual_data_labels = _get_actual_data_labels(db, testing_id, label)
-    actual_offset = _get_plan_actual_offset(db, testing_id, active_plans, actual_data_labels)
+    available_cases, completed_cases, executed_cases, actual_na_cases = ctx.actual_metadata()
+    actual_data_labels = ctx.actual_data_labels()
+    actual_offset = ctx.plan_actual_offset(actual_data_labels)
     undated_result_cases = max(executed_cases - sum(executed_daily_map.values()), 0)
     actual_plan_comparable_cases = available_cases
     comparable_planned_total = sum(
@@ -494,19 +528,15 @@ def get_pb_chart(
     )
     plan_case_mismatch = bool(actual_data_labels) and comparable_planned_total != actual_plan_comparable_cases
 
-    label_offset_settings = {
-        item.label: item.use_plan_as_actual_offset
-        for item in db.scalars(select(PlanLabel).where(PlanLabel.testing_id == testing_id))
-    }
     metric_plans = [
         plan for plan in active_plans
-        if plan.label in actual_data_labels or label_offset_settings.get(plan.label, True)
+        if plan.label in actual_data_labels or ctx.offset_settings.get(plan.label, True)
     ]
     actual_executed_to_latest = sum(executed_daily_map.values())
     planned_completed_to_latest_actual = 0
     if executed_daily_map and metric_plans:
         latest_actual_date = max(executed_daily_map)
-        metric_plan_daily_map = _get_plan_daily_map(db, [plan.id for plan in metric_plans])
+        metric_plan_daily_map = ctx.plan_daily_map(metric_plans)
         planned_completed_to_latest_actual = sum(
             count for target_date, count in metric_plan_daily_map.items()
             if target_date <= latest_actual_date
@@ -516,18 +546,18 @@ def get_pb_chart(
     #   (全て)=label=None のときは全 label を日付ごとに合算する。
     # - azure_devops ソース: チケットはテストに紐付かないため、従来どおり (全て) 表示時のみ描画する。
     bug_count_source = project.bug_count_source
-    bug_axis_max = project.bug_axis_max or pb_chart_settings.bug_axis_max
+    bug_axis_max = project.bug_axis_max or get_pb_chart_settings(db).bug_axis_max
     test_result_bug_daily_map: dict[date, tuple[int, int, int]] = {}
     bug_from = bug_to = None
     if bug_count_source == "test_result":
-        test_result_bug_daily_map = _get_test_result_bug_daily_map(db, testing_id, label)
-        bugs_present, bugs_updated_at = _get_test_result_bug_metadata(db, testing_id)
+        test_result_bug_daily_map = ctx.test_result_bug_daily_map()
+        bugs_present, bugs_updated_at = ctx.test_result_bug_metadata()
         bugs_visible = bool(test_result_bug_daily_map)         # 表示中の label に不具合があるか
         if bugs_visible:
             bug_from = min(test_result_bug_daily_map)
             bug_to = max(test_result_bug_daily_map)
     else:
-        bugs_present, bugs_updated_at, bug_from, bug_to = get_bug_chart_metadata(db, testing_id)
+        bugs_present, bugs_updated_at, bug_from, bug_to = compute_bug_chart_metadata(ctx.bug_rows)
         bugs_visible = bugs_present and label is None
         if not bugs_visible:
             bug_from = bug_to = None
@@ -586,7 +616,7 @@ def get_pb_chart(
             bugs_updated_at=bugs_updated_at,
         )
 
-    date_list = _date_range(range_from, range_to)
+    days = DayRange(range_from, range_to)
     actual_series_total = available_cases + actual_offset
     completed_remaining_sparse = _compute_actual_series(
         completed_daily_map, actual_series_total, completed_cases
@@ -594,34 +624,53 @@ def get_pb_chart(
     executed_remaining_sparse = _compute_actual_series(
         executed_daily_map, actual_series_total, executed_cases
     )
+    actual_columns: list[list[int | None]] = []
     for daily_map, remaining_sparse in (
         (completed_daily_map, completed_remaining_sparse),
         (executed_daily_map, executed_remaining_sparse),
     ):
         if daily_map and actual_series_total > 0:
+            # 最初の実績日より前は全件残り。開始前日の日付なし実績オフセットもこれで上書きする。
             first_actual_date = min(daily_map)
-            for d in date_list:
-                if d < first_actual_date:
-                    remaining_sparse[d] = actual_series_total
-        elif actual_offset > 0:
-            remaining_sparse[range_from] = actual_offset
-    bug_cumulative = None
+            remaining_sparse = {d: v for d, v in remaining_sparse.items() if d >= first_actual_date}
+            column = days.forward_fill(
+                remaining_sparse,
+                leading=actual_series_total if range_from < first_actual_date else None,
+                until=max(remaining_sparse),
+            )
+        else:
+            if actual_offset > 0:
+                remaining_sparse[range_from] = actual_offset
+            column = days.forward_fill(remaining_sparse)
+        actual_columns.append(column)
+    completed_remaining, executed_remaining = actual_columns
+
+    bug_cumulative: list[tuple[int, int, int]] | None = None
     if bugs_visible:
         if bug_count_source == "test_result":
             bug_series_start = min(bug_from, range_from) if bug_from is not None else range_from
-            bug_cumulative = _compute_test_result_bug_series(
-                _date_range(bug_series_start, range_to),
-                test_result_bug_daily_map,
+            bug_days = DayRange(bug_series_start, range_to)
+            bug_cumulative = days.reindex(
+                bug_days,
+                _compute_test_result_bug_series(bug_days, test_result_bug_daily_map),
+                (0, 0, 0),
             )
         else:
             suspend_states = get_settings().azure_devops_bug_suspend_status_set
-            bug_cumulative = get_bug_cumulative(db, testing_id, date_list, suspend_states)
+            bug_cumulative = days.dense(
+                compute_bug_cumulative(ctx.bug_rows, days.dates(), suspend_states), (0, 0, 0)
+            )
     series = _build_series(
-        date_list, plan_remaining_map, plan_d_map, completed_remaining_sparse,
-        executed_remaining_sparse, executed_daily_map, bug_cumulative,
+        days,
+        days.reindex(plan_days, plan_remaining, None) if plan_days else [None] * len(days),
+        days.reindex(plan_days, plan_daily, None) if plan_days else [None] * len(days),
+        completed_remaining,
+        executed_remaining,
+        days.dense(executed_daily_map, None),
+        bug_cumulative,
     )
 
-    past_plans = _compute_past_plans(db, testing_id, label) if include_past_plans else []
+    past_plans = _compute_past_plans(ctx) if include_past_plans else []
 
     return PbChartResponse(
         testing_id=testing_id,
@@ -2,9 +2,10 @@ from fastapi import HTTPException, status
 from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
 
+from app.crud.project import refresh_project_metrics
 from app.models.plan import Plan, PlanDaily, PlanLabel
 from app.models.project import Project
-from app.models.progress import DailyPersonProgress, DailyProgress, FileProgress, TestResultBugSnapshot
+from app.models.progress import DailyPersonProgress, DailyProgress, DailyProgressRollup, FileProgress, TestResultBugSnapshot
 from app.schemas.plan import (
     PlanCreate,
     PlanDetail,
@@ -16,6 +17,7 @@ from app.schemas.plan import (
     PlanLabelUpdate,
     ProjectLabelUpdate,
 )
+from app.services.data_version import bump_data_version
 
 
 # ---------- helpers ----------
@@ -140,6 +142,10 @@ def _apply_plan_label_payload(label: PlanLabel, payload: PlanLabelCreate) -> Non
     label.include_hidden_sheets = payload.include_hidden_sheets
     label.target_environments = payload.target_environments
     label.ignore_environments = payload.ignore_environments
+    # 収集設定が変わったら、次回の変更検知で必ず再収集されるよう記録済み eTag を捨てる
+    label.source_etag = None
+    label.source_etag_url = None
+    label.source_last_modified = None
 
 
 def _next_plan_label_display_order(db: Session, testing_id: int) -> int:
@@ -172,14 +178,18 @@ def list_plans(db: Session, testing_id: int) -> list[PlanItem]:
 
 def list_plan_labels(db: Session, testing_id: int) -> list[PlanLabelItem]:
     _require_project(db, testing_id)
-    labels = list(
+    return [PlanLabelItem.model_validate(label) for label in load_plan_labels(db, testing_id)]
+
+
+def load_plan_labels(db: Session, testing_id: int) -> list[PlanLabel]:
+    """表示順の PlanLabel 行（プロジェクトの存在確認はしない）。"""
+    return list(
         db.scalars(
             select(PlanLabel)
             .where(PlanLabel.testing_id == testing_id)
             .order_by(PlanLabel.display_order, PlanLabel.label, PlanLabel.id)
         )
     )
-    return [PlanLabelItem.model_validate(label) for label in labels]
 
 
 def create_plan_label(db: Session, testing_id: int, payload: PlanLabelCreate) -> PlanLabelItem:
@@ -208,6 +218,8 @@ def create_plan_label(db: Session, testing_id: int, payload: PlanLabelCreate) ->
         display_order=_next_plan_label_display_order(db, testing_id),
     )
     db.add(label)
+    refresh_project_metrics(db, [testing_id])
+    bump_data_version(db, testing_id)
     db.commit()
     db.refresh(label)
     return PlanLabelItem.model_validate(label)
@@ -221,6 +233,8 @@ def update_project_label(db: Session, testing_id: int, payload: ProjectLabelUpda
         )
         if existing is not None:
             _apply_plan_label_payload(existing, payload)
+            refresh_project_metrics(db, [testing_id])
+            bump_data_version(db, testing_id)
             db.commit()
             db.refresh(existing)
             return PlanLabelItem.model_validate(existing)
@@ -232,6 +246,8 @@ def update_project_label(db: Session, testing_id: int, payload: ProjectLabelUpda
         )
         if existing is not None:
             _apply_plan_label_payload(existing, payload)
+            refresh_project_metrics(db, [testing_id])
+            bump_data_version(db, testing_id)
             db.commit()
             db.refresh(existing)
             return PlanLabelItem.model_validate(existing)
@@ -266,12 +282,14 @@ def update_project_label(db: Session, testing_id: int, payload: ProjectLabelUpda
         label.label = payload.label
         _apply_plan_label_payload(label, payload)
 
-    for model in (Plan, FileProgress, DailyProgress, DailyPersonProgress, TestResultBugSnapshot):
+    for model in (Plan, FileProgress, DailyProgress, DailyProgressRollup, DailyPersonProgress, TestResultBugSnapshot):
         db.execute(
             update(model)
             .where(model.testing_id == testing_id, model.label == payload.old_label)
             .values(label=payload.label)
         )
+    refresh_project_metrics(db, [testing_id])
+    bump_data_version(db, testing_id)
     db.commit()
     db.refresh(label)
     return PlanLabelItem.model_validate(label)
@@ -295,8 +313,11 @@ def delete_project_label(db: Session, testing_id: int, label: str) -> None:
     db.execute(delete(Plan).where(Plan.testing_id == testing_id, Plan.label == label))
     db.execute(delete(FileProgress).where(FileProgress.testing_id == testing_id, FileProgress.label == label))
     db.execute(delete(DailyProgress).where(DailyProgress.testing_id == testing_id, DailyProgress.label == label))
+    db.execute(delete(DailyProgressRollup).where(DailyProgressRollup.testing_id == testing_id, DailyProgressRollup.label == label))
     db.execute(delete(DailyPersonProgress).where(DailyPersonProgress.testing_id == testing_id, DailyPersonProgress.label == label))
     db.execute(delete(TestResultBugSnapshot).where(TestResultBugSnapshot.testing_id == testing_id, TestResultBugSnapshot.label == label))
+    refresh_project_metrics(db, [testing_id])
+    bump_data_version(db, testing_id)
     db.commit()
 
 
@@ -331,6 +352,7 @@ def update_plan_label_order(db: Session, testing_id: int, payload: PlanLabelOrde
 
         for index, label_name in enumerate(unique_labels):
             labels_by_name[label_name].display_order = index
+        bump_data_version(db, testing_id)
         db.commit()
         return list_plan_labels(db, testing_id)
 
@@ -353,6 +375,7 @@ def update_plan_label_order(db: Session, testing_id: int, payload: PlanLabelOrde
 
     for index, label_id in enumerate(unique_ids):
         labels_by_id[label_id].display_order = index
+    bump_data_version(db, testing_id)
     db.commit()
     return list_plan_labels(db, testing_id)
 
@@ -402,6 +425,8 @@ def create_plan(db: Session, testing_id: int, payload: PlanCreate) -> PlanDetail
         for d in payload.daily
     ]
     db.add_all(daily_rows)
+    refresh_project_metrics(db, [testing_id])
+    bump_data_version(db, testing_id)
     db.commit()
 
     return get_plan_detail(db, plan.id)
@@ -412,6 +437,8 @@ def activate_plan(db: Session, plan_id: int) -> PlanItem:
     _require_writable_project(db, plan.testing_id)
     _deactivate_label(db, plan.testing_id, plan.label)
     plan.is_active = True
+    refresh_project_metrics(db, [plan.testing_id])
+    bump_data_version(db, plan.testing_id)
     db.commit()
     return _to_item(plan, _daily_total(db, plan_id))
 
@@ -419,6 +446,9 @@ def activate_plan(db: Session, plan_id: int) -> PlanItem:
 def delete_plan(db: Session, plan_id: int) -> None:
     plan = _require_plan(db, plan_id)
     _require_writable_project(db, plan.testing_id)
+    testing_id = plan.testing_id
     db.delete(plan)
+    refresh_project_metrics(db, [testing_id])
+    bump_data_version(db, testing_id)
     db.commit()
 
@@ -1,14 +1,37 @@
+import base64
+import json
 from collections import defaultdict
-from datetime import date, datetime, timezone
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal
 
 from fastapi import HTTPException, status
-from sqlalchemy import delete, func, select
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Select, delete, func, insert, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.crud.progress_snapshot import record_progress_snapshots
+from app.crud.project import refresh_project_metrics
 from app.models.plan import PlanLabel
+from app.models.progress import DailyPersonProgress, DailyProgress, DailyProgressRollup, FileProgress, TestResultBugSnapshot, Testing
 from app.models.project import Project
-from app.models.progress import DailyPersonProgress, DailyProgress, FileProgress, TestResultBugSnapshot, Testing
-from app.schemas.progress import DailyProgressItem, PersonProgressItem, ProgressPostResponse, ProgressRequest, ProgressSummaryResponse, ResultCounts, SummaryCounts
+from app.schemas.progress import (
+    DailyProgressColumns,
+    DailyProgressIn,
+    DailyProgressItem,
+    PersonProgressColumns,
+    PersonProgressIn,
+    PersonProgressItem,
+    ProgressPostResponse,
+    ProgressRequest,
+    ProgressSummaryResponse,
+    ResultCounts,
+    SummaryCounts,
+)
+from app.services.data_version import bump_data_version
+from app.services.json_stream import JSON_CHUNK_ROWS, aiter_json_array, iter_json_array
 
 
 PLAN_LABEL_OPTION_FIELDS = (
@@ -20,6 +43,26 @@ PLAN_LABEL_OPTION_FIELDS = (
     "ignore_environments",
 )
 
+# DailyProgressItem / PersonProgressItem を by_alias で出力したときと同じキー・順序
+DAILY_PROGRESS_KEYS = (
+    "Pass", "Fixed", "Fail", "Blocked", "Suspend", "N/A",
+    "date", "file_name", "label", "environment", "completed", "executed", "planned",
+)
+PERSON_PROGRESS_KEYS = ("date", "label", "person", "count", "completed", "executed")
+
+ProgressGranularity = Literal["day", "week", "total"]
+
+ROLLUP_FIELDS = (
+    "result_pass",
+    "result_fixed",
+    "result_fail",
+    "result_blocked",
+    "result_suspend",
+    "result_na",
+    "completed",
+    "executed",
+)
+
 
 def _validate_replace_payload(payload: ProgressRequest) -> None:
     if not payload.files:
@@ -101,12 +144,15 @@ def replace_progress(db: Session, payload: ProgressRequest) -> ProgressPostRespo
     db.execute(delete(FileProgress).where(FileProgress.testing_id == payload.testing_id))
     db.execute(delete(DailyProgress).where(DailyProgress.testing_id == payload.testing_id))
     db.execute(delete(DailyPersonProgress).where(DailyPersonProgress.testing_id == payload.testing_id))
+    db.execute(delete(DailyProgressRollup).where(DailyProgressRollup.testing_id == payload.testing_id))
 
     file_rows: list[FileProgress] = []
-    daily_rows: list[DailyProgress] = []
-    person_rows: list[DailyPersonProgress] = []
+    daily_rows: list[dict[str, object]] = []
+    person_rows: list[dict[str, object]] = []
     # (label, date) -> [fail, suspend, fixed]。label 別に不具合バーンダウンを蓄積するため。
     bug_counts_by_label_date: dict[tuple[str | None, date], list[int]] = defaultdict(lambda: [0, 0, 0])
+    # (label, date) -> ROLLUP_FIELDS の順の合計。ファイル・環境をまたいだ日別集計を取り込み時に作る。
+    rollup_by_label_date: dict[tuple[str | None, date], list[int]] = defaultdict(lambda: [0] * len(ROLLUP_FIELDS))
 
     for file in payload.files:
         file_rows.append(
@@ -134,48 +180,53 @@ def replace_progress(db: Session, payload: ProgressRequest) -> ProgressPostRespo
                 sent_at=payload.sent_at,
             )
         )
-        for daily in file.daily:
-            bug_counts = bug_counts_by_label_date[(file.label, daily.date)]
-            bug_counts[0] += daily.fail
-            bug_counts[1] += daily.suspend
-            bug_counts[2] += daily.fixed
-            daily_rows.append(
-                DailyProgress(
-                    testing_id=payload.testing_id,
-                    file_name=file.file_name,
-                    label=file.label,
-                    environment=file.environment,
-                    date=daily.date,
-                    result_pass=daily.pass_count,
-                    result_fixed=daily.fixed,
-                    result_fail=daily.fail,
-                    result_blocked=daily.blocked,
-                    result_suspend=daily.suspend,
-                    result_na=daily.na,
-                    completed=daily.completed,
-                    executed=daily.executed,
-                    planned=daily.planned,
-                )
-            )
-        for person in file.by_person:
-            if person.person.strip():
-                person_rows.append(
-                    DailyPersonProgress(
-                        testing_id=payload.testing_id,
-                        file_name=file.file_name,
-                        label=file.label,
-                        environment=file.environment,
-                        date=person.date,
-                        person=person.person,
-                        count=person.count,
-                        completed=person.completed if person.completed is not None else person.count,
-                        executed=person.executed if person.executed is not None else person.count,
-                    )
-                )
-
-    db.add_all(file_rows + daily_rows + person_rows)
+        keys = {
+            "testing_id": payload.testing_id,
+            "file_name": file.file_name,
+            "label": file.label,
+            "environment": file.environment,
+        }
+        for row_date, *counts, planned in _daily_values(file.daily):
+            values = dict(zip(ROLLUP_FIELDS, counts))
+            bug_counts = bug_counts_by_label_date[(file.label, row_date)]
+            bug_counts[0] += values["result_fail"]
+            bug_counts[1] += values["result_suspend"]
+            bug_counts[2] += values["result_fixed"]
+            rollup = rollup_by_label_date[(file.label, row_date)]
+            for index, value in enumerate(counts):
+                rollup[index] += value
+            daily_rows.append({**keys, "date": row_date, **values, "planned": planned})
+        for row_date, person, count, completed, executed in _person_values(file.by_person):
+            if person.strip():
+                person_rows.append({
+                    **keys,
+                    "date": row_date,
+                    "person": person,
+                    "count": count,
+                    "completed": completed if completed is not None else count,
+                    "executed": executed if executed is not None else count,
+                })
+
+    # 日別・担当者別は行数が多いため ORM オブジェクトを作らず、Core の executemany でまとめて入れる
+    db.add_all(file_rows)
+    if daily_rows:
+        db.execute(insert(DailyProgress), daily_rows)
+    if person_rows:
+        db.execute(insert(DailyPersonProgress), person_rows)
+    db.add_all(
+        DailyProgressRollup(
+            testing_id=payload.testing_id,
+            label=label,
+            date=d,
+            **dict(zip(ROLLUP_FIELDS, values)),
+        )
+        for (label, d), values in rollup_by_label_date.items()
+    )
 
     _merge_test_result_bug_snapshots(db, payload.testing_id, bug_counts_by_label_date, payload.sent_at)
+    record_progress_snapshots(db, payload.testing_id, payload.sent_at, payload.files, rollup_by_label_date)
+    refresh_project_metrics(db, [payload.testing_id])
+    bump_data_version(db, payload.testing_id)
     db.commit()
 
     return ProgressPostResponse(
@@ -186,6 +237,26 @@ def replace_progress(db: Session, payload: ProgressRequest) -> ProgressPostRespo
     )
 
 
+def _daily_values(daily: list[DailyProgressIn] | DailyProgressColumns) -> Iterator[tuple]:
+    """日別の行を (date, ROLLUP_FIELDS の順の件数..., planned) のタプルで返す。行形式・列形式の両方を受ける。"""
+    if isinstance(daily, DailyProgressColumns):
+        zeros = [0] * len(daily.date)
+        columns = (daily.pass_count, daily.fixed, daily.fail, daily.blocked, daily.suspend, daily.na, daily.completed, daily.executed)
+        return zip(daily.date, *(column or zeros for column in columns), daily.planned or [None] * len(daily.date))
+    return (
+        (row.date, row.pass_count, row.fixed, row.fail, row.blocked, row.suspend, row.na, row.completed, row.executed, row.planned)
+        for row in daily
+    )
+
+
+def _person_values(by_person: list[PersonProgressIn] | PersonProgressColumns) -> Iterator[tuple]:
+    """担当者別の行を (date, person, count, completed, executed) のタプルで返す。"""
+    if isinstance(by_person, PersonProgressColumns):
+        nones = [None] * len(by_person.date)
+        return zip(by_person.date, by_person.person, by_person.count, by_person.completed or nones, by_person.executed or nones)
+    return ((row.date, row.person, row.count, row.completed, row.executed) for row in by_person)
+
+
 def _merge_test_result_bug_snapshots(
     db: Session,
     testing_id: int,
@@ -256,6 +327,33 @@ def _merge_test_result_bug_snapshots(
     )
 
 
+def rebuild_daily_progress_rollups(db: Session, testing_id: int) -> int:
+    """DailyProgress から DailyProgressRollup を作り直す（整合性確認・手動投入データ用）。"""
+    db.execute(delete(DailyProgressRollup).where(DailyProgressRollup.testing_id == testing_id))
+    rows = db.execute(
+        select(
+            DailyProgress.label,
+            DailyProgress.date,
+            *(func.sum(getattr(DailyProgress, field)) for field in ROLLUP_FIELDS),
+        )
+        .where(DailyProgress.testing_id == testing_id)
+        .group_by(DailyProgress.label, DailyProgress.date)
+    ).all()
+    db.add_all(
+        DailyProgressRollup(
+            testing_id=testing_id,
+            label=label,
+            date=d,
+            **{field: int(value or 0) for field, value in zip(ROLLUP_FIELDS, values)},
+        )
+        for label, d, *values in rows
+    )
+    refresh_project_metrics(db, [testing_id])
+    bump_data_version(db, testing_id)
+    db.commit()
+    return len(rows)
+
+
 def get_progress_summary(db: Session, testing_id: int) -> ProgressSummaryResponse | None:
     testing = db.scalar(select(Testing).where(Testing.testing_id == testing_id))
     if testing is None:
@@ -275,6 +373,30 @@ def get_progress_summary(db: Session, testing_id: int) -> ProgressSummaryRespons
             func.coalesce(func.sum(FileProgress.result_na), 0),
         ).where(FileProgress.testing_id == testing_id)
     ).one()
+    return _summary_response(testing, tuple(totals))
+
+
+def summarize_file_progress(testing: Testing, files: list[FileProgress]) -> ProgressSummaryResponse:
+    """読み込み済みの FileProgress 行から get_progress_summary と同じ集計を作る（追加のクエリなし）。"""
+    totals = [0] * 10
+    for file in files:
+        for index, value in enumerate((
+            file.total_cases,
+            file.available_cases,
+            file.completed,
+            file.executed,
+            file.result_pass,
+            file.result_fixed,
+            file.result_fail,
+            file.result_blocked,
+            file.result_suspend,
+            file.result_na,
+        )):
+            totals[index] += value or 0
+    return _summary_response(testing, tuple(totals))
+
+
+def _summary_response(testing: Testing, totals: tuple[int, ...]) -> ProgressSummaryResponse:
     total_cases, available_cases, completed, executed, passed, fixed, fail, blocked, suspend, na = totals
     completed_rate = round((completed / available_cases * 100), 2) if available_cases else 0
     executed_rate = round((executed / available_cases * 100), 2) if available_cases else 0
@@ -307,7 +429,7 @@ def get_file_progress(db: Session, testing_id: int) -> list[FileProgress]:
 
 
 def get_daily_progress(db: Session, testing_id: int) -> list[DailyProgressItem]:
-    rows = db.scalars(select(DailyProgress).where(DailyProgress.testing_id == testing_id).order_by(DailyProgress.date, DailyProgress.file_name, DailyProgress.label)).all()
+    rows = db.scalars(select(DailyProgress).where(DailyProgress.testing_id == testing_id).order_by(*_daily_order())).all()
     return [
         DailyProgressItem(
             date=row.date,
@@ -329,9 +451,249 @@ def get_daily_progress(db: Session, testing_id: int) -> list[DailyProgressItem]:
 
 
 def get_person_progress(db: Session, testing_id: int) -> list[PersonProgressItem]:
-    rows = db.scalars(select(DailyPersonProgress).where(DailyPersonProgress.testing_id == testing_id).order_by(DailyPersonProgress.date, DailyPersonProgress.person)).all()
+    rows = db.scalars(select(DailyPersonProgress).where(DailyPersonProgress.testing_id == testing_id).order_by(*_person_order())).all()
     return [PersonProgressItem(date=row.date, label=row.label, person=row.person, count=row.count, completed=row.completed, executed=row.executed) for row in rows]
 
 
+@dataclass(frozen=True)
+class ProgressRowQuery:
+    """日別・担当者別実績の絞り込み・集計粒度・ページング条件。
+
+    granularity=week は週（月曜始まり）ごと、total は期間全体で日付を畳み込み、date には
+    週の月曜日／期間内の最終日を入れる。ページング（limit・cursor）は day のときだけ使える。
+    """
+
+    date_from: date | None = None
+    date_to: date | None = None
+    labels: tuple[str, ...] = ()
+    persons: tuple[str, ...] = ()
+    granularity: ProgressGranularity = "day"
+    cursor: str | None = None
+    limit: int | None = None
+
+
+@dataclass
+class ProgressRowsPage:
+    """JSON 配列の本体（チャンク列。非同期版では AsyncIterator）と、続きがある場合の次ページ cursor。"""
+
+    body: Iterator[bytes] | AsyncIterator[bytes]
+    next_cursor: str | None = None
+
+
+def stream_daily_progress_json(db: Session, testing_id: int) -> Iterator[bytes]:
+    """get_daily_progress と同じ内容の JSON 配列を、ORM・Pydantic を経由せずに出力する。"""
+    return daily_progress_page(db, testing_id, ProgressRowQuery()).body
+
+
+def stream_person_progress_json(db: Session, testing_id: int) -> Iterator[bytes]:
+    """get_person_progress と同じ内容の JSON 配列を、ORM・Pydantic を経由せずに出力する。"""
+    return person_progress_page(db, testing_id, ProgressRowQuery()).body
+
+
+def daily_progress_page(db: Session, testing_id: int, query: ProgressRowQuery) -> ProgressRowsPage:
+    return _progress_page(db, _daily_spec(testing_id, query), query)
+
+
+def person_progress_page(db: Session, testing_id: int, query: ProgressRowQuery) -> ProgressRowsPage:
+    return _progress_page(db, _person_spec(testing_id, query), query)
+
+
+async def daily_progress_page_async(db: AsyncSession, testing_id: int, query: ProgressRowQuery) -> ProgressRowsPage:
+    """daily_progress_page の非同期版。全件取得は AsyncSession.stream で読みながら流す。"""
+    return await _progress_page_async(db, _daily_spec(testing_id, query), query)
+
+
+async def person_progress_page_async(db: AsyncSession, testing_id: int, query: ProgressRowQuery) -> ProgressRowsPage:
+    """person_progress_page の非同期版。"""
+    return await _progress_page_async(db, _person_spec(testing_id, query), query)
+
+
+@dataclass(frozen=True)
+class _PageSpec:
+    """絞り込み・ページング済みの select と、cursor・日付の畳み込みに使う列位置（keys 上の位置）。"""
+
+    statement: Select
+    keys: tuple[str, ...]
+    cursor_fields: tuple[int, ...]
+    group_fields: tuple[int, ...]
+    sum_fields: tuple[int, ...]
+
+
+def _daily_spec(testing_id: int, query: ProgressRowQuery) -> _PageSpec:
+    if query.persons:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="person filter is not supported for daily progress")
+    statement = select(
+        DailyProgress.result_pass,
+        DailyProgress.result_fixed,
+        DailyProgress.result_fail,
+        DailyProgress.result_blocked,
+        DailyProgress.result_suspend,
+        DailyProgress.result_na,
+        DailyProgress.date,
+        DailyProgress.file_name,
+        DailyProgress.label,
+        DailyProgress.environment,
+        DailyProgress.completed,
+        DailyProgress.executed,
+        DailyProgress.planned,
+        DailyProgress.id,
+    ).where(DailyProgress.testing_id == testing_id)
+    # 集計時は (date, file_name, label, environment) ごとに結果・件数を合算する
+    return _PageSpec(
+        statement=_filter_page(statement, DailyProgress, _daily_order(), query),
+        keys=DAILY_PROGRESS_KEYS,
+        cursor_fields=(7,),
+        group_fields=(7, 8, 9),
+        sum_fields=(0, 1, 2, 3, 4, 5, 10, 11, 12),
+    )
+
+
+def _person_spec(testing_id: int, query: ProgressRowQuery) -> _PageSpec:
+    statement = select(
+        DailyPersonProgress.date,
+        DailyPersonProgress.label,
+        DailyPersonProgress.person,
+        DailyPersonProgress.count,
+        DailyPersonProgress.completed,
+        DailyPersonProgress.executed,
+        DailyPersonProgress.id,
+    ).where(DailyPersonProgress.testing_id == testing_id)
+    if query.persons:
+        statement = statement.where(DailyPersonProgress.person.in_(query.persons))
+    return _PageSpec(
+        statement=_filter_page(statement, DailyPersonProgress, _person_order(), query),
+        keys=PERSON_PROGRESS_KEYS,
+        cursor_fields=(2,),
+        group_fields=(1, 2),
+        sum_fields=(3, 4, 5),
+    )
+
+
+def _daily_order() -> tuple:
+    return (DailyProgress.date, DailyProgress.file_name, func.coalesce(DailyProgress.label, ""), DailyProgress.id)
+
+
+def _person_order() -> tuple:
+    return (DailyPersonProgress.date, DailyPersonProgress.person, func.coalesce(DailyPersonProgress.label, ""), DailyPersonProgress.id)
+
+
+def _filter_page(statement: Select, model, order: tuple, query: ProgressRowQuery) -> Select:
+    """日別・担当者別で共通の絞り込み・keyset ページング。
+
+    行の先頭付近に date、末尾に id を置いた select を受け取る。cursor は並び順
+    （date, cursor_fields, label, id）の最終行の値で、次ページは tuple 比較で続きから読む。
+    limit 指定時は続きの有無を知るため 1 行多く読む。
+    """
+    if query.granularity != "day" and (query.limit is not None or query.cursor is not None):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="pagination is only available for granularity=day")
+    if query.date_from is not None:
+        statement = statement.where(model.date >= query.date_from)
+    if query.date_to is not None:
+        statement = statement.where(model.date <= query.date_to)
+    if query.labels:
+        statement = statement.where(model.label.in_(query.labels))
+    if query.cursor is not None:
+        values = _decode_cursor(query.cursor, len(order))
+        statement = statement.where(
+            tuple_(*order) > tuple_(*(literal(value, type_=column.type) for column, value in zip(order, values)))
+        )
+    statement = statement.order_by(*order)
+    if query.limit is not None:
+        statement = statement.limit(query.limit + 1)
+    return statement
+
+
+def _streams(query: ProgressRowQuery) -> bool:
+    """畳み込み・ページングがなければ、全件を読みながらそのまま JSON にして流す。"""
+    return query.granularity == "day" and query.limit is None
+
+
+def _progress_page(db: Session, spec: _PageSpec, query: ProgressRowQuery) -> ProgressRowsPage:
+    if _streams(query):
+        result = db.execute(spec.statement, execution_options={"yield_per": JSON_CHUNK_ROWS})
+        return ProgressRowsPage(body=iter_json_array(result, spec.keys))
+    return _rows_page(db.execute(spec.statement).all(), spec, query)
+
+
+async def _progress_page_async(db: AsyncSession, spec: _PageSpec, query: ProgressRowQuery) -> ProgressRowsPage:
+    if _streams(query):
+        result = await db.stream(spec.statement, execution_options={"yield_per": JSON_CHUNK_ROWS})
+        return ProgressRowsPage(body=aiter_json_array(result, spec.keys))
+    rows = (await db.execute(spec.statement)).all()
+    # 週・期間合計への畳み込みは CPU を使うため、取得だけを非同期で行いスレッドプールで組み立てる
+    return await run_in_threadpool(_rows_page, rows, spec, query)
+
+
+def _rows_page(rows: list, spec: _PageSpec, query: ProgressRowQuery) -> ProgressRowsPage:
+    keys = spec.keys
+    date_index = keys.index("date")
+    if query.granularity != "day":
+        return ProgressRowsPage(body=iter_json_array(
+            _fold_dates(rows, query.granularity, date_index, spec.group_fields, spec.sum_fields, len(keys)),
+            keys,
+        ))
+    next_cursor = None
+    if len(rows) > query.limit:
+        rows = rows[:query.limit]
+        last = rows[-1]
+        next_cursor = _encode_cursor((
+            last[date_index],
+            *(last[index] for index in spec.cursor_fields),
+            last[keys.index("label")] or "",
+            last[-1],
+        ))
+    return ProgressRowsPage(body=iter_json_array(rows, keys), next_cursor=next_cursor)
+
+
+def _fold_dates(
+    rows: list,
+    granularity: ProgressGranularity,
+    date_index: int,
+    group_fields: tuple[int, ...],
+    sum_fields: tuple[int, ...],
+    width: int,
+) -> list[list]:
+    """date を週の月曜日（week）／期間内の最終日（total）に畳み込み、group_fields ごとに合算する。"""
+    folded: dict[tuple, list] = {}
+    for row in rows:
+        row_date = row[date_index]
+        bucket = row_date - timedelta(days=row_date.weekday()) if granularity == "week" else None
+        key = (bucket, *(row[index] for index in group_fields))
+        current = folded.get(key)
+        if current is None:
+            folded[key] = list(row[:width])
+            if bucket is not None:
+                folded[key][date_index] = bucket
+            continue
+        for index in sum_fields:
+            if row[index] is not None:
+                current[index] = (current[index] or 0) + row[index]
+        if bucket is None:
+            current[date_index] = max(current[date_index], row_date)
+    return sorted(
+        folded.values(),
+        key=lambda item: (item[date_index], *(item[index] or "" for index in group_fields)),
+    )
+
+
+def _encode_cursor(values: tuple) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, date) else value for value in values], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, size: int) -> tuple:
+    """cursor を並び順（date, 名前・ラベルの文字列, id）の値に戻す。型の合わない cursor は 422 にする。"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8"))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError(cursor)
+        *names, row_id = values[1:]
+        if not all(isinstance(name, str) for name in names) or type(row_id) is not int:
+            raise TypeError(cursor)
+        return (date.fromisoformat(values[0]), *names, row_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="invalid cursor")
+
+
 def list_testings(db: Session) -> list[Testing]:
     return list(db.scalars(select(Testing).order_by(Testing.updated_at.desc(), Testing.testing_id)))
@@ -0,0 +1,242 @@
+"""進捗の履歴（progress_snapshots）の追記・時点指定の参照・間引き。
+
+replace_progress は最新の状態で FileProgress / DailyProgress を洗替する。同じトランザクションで
+label ごとの日別集計を列形式に詰めて 1 行ずつ追記し、「ある日時にどう見えていたか」をここから復元する。
+
+- 追記は前回から内容が変わった label だけ（content_hash の比較）。毎日の収集で変化のない label は行が増えない。
+  比較する前回の行は is_latest で引き、取り込みの処理量は履歴の長さによらず label 数だけで決まる。
+- 時点指定は label ごとに sent_at <= at の最新行を返す（墓標＝file_count 0 の行なら、その時点では無い label）。
+- 古い行は label ごとに 1 日 1 行へ間引き、保持期間を過ぎた行は削除する。ただし各 label の
+  保持期間の境界時点で有効だった行は残し、変化の無い label の状態が消えないようにする。
+"""
+
+import hashlib
+import json
+import zlib
+from collections import defaultdict
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Row, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.progress import ProgressSnapshot
+from app.schemas.admin import SnapshotCompactionResponse
+from app.schemas.progress import (
+    FileProgressIn,
+    ProgressAsOfResponse,
+    ProgressSnapshotDailyItem,
+    ProgressSnapshotItem,
+    ProgressSnapshotSummary,
+)
+from app.services.json_stream import dumps
+
+# daily に詰める列。値の並びは DailyProgressRollup の ROLLUP_FIELDS と同じ
+SNAPSHOT_DAILY_KEYS = ("Pass", "Fixed", "Fail", "Blocked", "Suspend", "N/A", "completed", "executed")
+SUMMARY_FIELDS = ("file_count", "total_cases", "available_cases", "completed", "executed")
+
+
+def record_progress_snapshots(
+    db: Session,
+    testing_id: int,
+    sent_at: datetime,
+    files: Iterable[FileProgressIn],
+    daily_by_label_date: Mapping[tuple[str | None, date], Sequence[int]],
+) -> int:
+    """今回の取り込みを label ごとの履歴として追記し、追加した行数を返す（commit は呼び出し側）。
+
+    daily_by_label_date: {(label, date): SNAPSHOT_DAILY_KEYS の順の件数}
+    """
+    summaries: dict[str | None, list[int]] = defaultdict(lambda: [0] * len(SUMMARY_FIELDS))
+    for file in files:
+        summary = summaries[file.label]
+        summary[0] += 1
+        summary[1] += file.total_cases
+        summary[2] += file.available_cases
+        summary[3] += file.completed
+        summary[4] += file.executed
+    daily_by_label: dict[str | None, list[tuple[date, Sequence[int]]]] = defaultdict(list)
+    for (label, d), counts in daily_by_label_date.items():
+        daily_by_label[label].append((d, counts))
+
+    latest = _latest_heads(db, testing_id)
+    rows: list[ProgressSnapshot] = []
+    superseded: list[int] = []
+    for label in set(summaries) | set(latest):
+        if label in summaries:
+            days = sorted(daily_by_label.get(label, ()))
+            row = _pack(testing_id, label, sent_at, summaries[label], days)
+        else:
+            # 今回の取り込みに無い label は墓標を残す（既に墓標なら何もしない）
+            row = _pack(testing_id, label, sent_at, [0] * len(SUMMARY_FIELDS), [])
+        head = latest.get(label)
+        if head is not None and head.content_hash == row.content_hash:
+            continue
+        # sent_at が前回より古い取り込み（遅れて届いた送信）は、最新の行を置き換えない
+        if head is None or sent_at >= head.sent_at:
+            row.is_latest = True
+            if head is not None:
+                superseded.append(head.id)
+        rows.append(row)
+    if superseded:
+        db.execute(update(ProgressSnapshot).where(ProgressSnapshot.id.in_(superseded)).values(is_latest=False))
+    db.add_all(rows)
+    return len(rows)
+
+
+def get_progress_as_of(
+    db: Session,
+    testing_id: int,
+    at: datetime,
+    labels: Sequence[str] = (),
+) -> ProgressAsOfResponse | None:
+    """at 時点で有効だった label ごとの状態。履歴が 1 行も無ければ None。"""
+    latest = _latest_rows(testing_id, ProgressSnapshot.sent_at <= at)
+    if labels:
+        latest = latest.where(ProgressSnapshot.label.in_(labels))
+    latest_ids = latest.subquery()
+    rows = db.scalars(
+        select(ProgressSnapshot)
+        .join(latest_ids, ProgressSnapshot.id == latest_ids.c.id)
+        .where(latest_ids.c.rank == 1, ProgressSnapshot.file_count > 0)
+        .order_by(ProgressSnapshot.label)
+    ).all()
+    if not rows and db.scalar(
+        select(ProgressSnapshot.id).where(ProgressSnapshot.testing_id == testing_id).limit(1)
+    ) is None:
+        return None
+    return ProgressAsOfResponse(testing_id=testing_id, as_of=at, labels=[_unpack(row) for row in rows])
+
+
+def list_progress_snapshots(
+    db: Session,
+    testing_id: int,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = 200,
+) -> list[ProgressSnapshotSummary]:
+    """履歴の一覧（新しい順、日別の中身は含めない）。"""
+    query = select(ProgressSnapshot).where(ProgressSnapshot.testing_id == testing_id)
+    if since is not None:
+        query = query.where(ProgressSnapshot.sent_at >= since)
+    if until is not None:
+        query = query.where(ProgressSnapshot.sent_at < until)
+    rows = db.scalars(query.order_by(ProgressSnapshot.sent_at.desc(), ProgressSnapshot.id.desc()).limit(limit))
+    return [ProgressSnapshotSummary.model_validate(row) for row in rows]
+
+
+def compact_progress_snapshots(
+    db: Session,
+    now: datetime,
+    downsample_days: int,
+    retention_days: int,
+) -> SnapshotCompactionResponse:
+    """古い履歴を間引き・削除して commit する。どちらも 0 日なら何もしない。
+
+    間引きはまだ間引いていない行だけを見るため、定期的に呼べば 1 回あたりの処理は前回以降の増分で済む。
+    """
+    result = SnapshotCompactionResponse()
+    if downsample_days:
+        result.downsampled = _downsample(db, now - timedelta(days=downsample_days))
+    if retention_days:
+        result.expired = _expire(db, now - timedelta(days=retention_days))
+    db.commit()
+    return result
+
+
+def _latest_rows(testing_id: int | None, *conditions):
+    """label ごとに新しい順の順位（rank）を付けた id の select。testing_id=None なら全 testing_id。"""
+    query = select(
+        ProgressSnapshot.id,
+        ProgressSnapshot.testing_id,
+        ProgressSnapshot.label,
+        ProgressSnapshot.file_count,
+        func.row_number()
+        .over(
+            partition_by=(ProgressSnapshot.testing_id, ProgressSnapshot.label),
+            order_by=(ProgressSnapshot.sent_at.desc(), ProgressSnapshot.id.desc()),
+        )
+        .label("rank"),
+    ).where(*conditions)
+    if testing_id is not None:
+        query = query.where(ProgressSnapshot.testing_id == testing_id)
+    return query
+
+
+def _latest_heads(db: Session, testing_id: int) -> dict[str | None, Row]:
+    """label ごとの最新行（is_latest）の id・sent_at・content_hash。"""
+    rows = db.execute(
+        select(ProgressSnapshot.id, ProgressSnapshot.label, ProgressSnapshot.sent_at, ProgressSnapshot.content_hash)
+        .where(ProgressSnapshot.testing_id == testing_id, ProgressSnapshot.is_latest.is_(True))
+    )
+    return {row.label: row for row in rows}
+
+
+def _downsample(db: Session, before: datetime) -> int:
+    """before より前の未間引きの行を testing_id × label × 日ごとに最後の 1 行だけ残す。"""
+    rows = db.execute(
+        select(ProgressSnapshot.id, ProgressSnapshot.testing_id, ProgressSnapshot.label, ProgressSnapshot.sent_at)
+        .where(ProgressSnapshot.sent_at < before, ProgressSnapshot.downsampled.is_(False))
+        .order_by(ProgressSnapshot.sent_at, ProgressSnapshot.id)
+    ).all()
+    last_by_day: dict[tuple[int, str | None, date], int] = {}
+    for row_id, testing_id, label, sent_at in rows:
+        last_by_day[(testing_id, label, sent_at.date())] = row_id
+    keep_ids = set(last_by_day.values())
+    drop_ids = [row.id for row in rows if row.id not in keep_ids]
+    for chunk in _chunks(drop_ids):
+        db.execute(delete(ProgressSnapshot).where(ProgressSnapshot.id.in_(chunk)))
+    for chunk in _chunks(sorted(keep_ids)):
+        db.execute(update(ProgressSnapshot).where(ProgressSnapshot.id.in_(chunk)).values(downsampled=True))
+    return len(drop_ids)
+
+
+def _expire(db: Session, before: datetime) -> int:
+    """before より前の行を削除する。label ごとに before 時点で有効な 1 行（墓標でなければ）は残す。"""
+    ranked = _latest_rows(None, ProgressSnapshot.sent_at < before).subquery()
+    drop_ids = list(db.scalars(
+        select(ranked.c.id).where((ranked.c.rank > 1) | (ranked.c.file_count == 0))
+    ))
+    for chunk in _chunks(drop_ids):
+        db.execute(delete(ProgressSnapshot).where(ProgressSnapshot.id.in_(chunk)))
+    return len(drop_ids)
+
+
+def _chunks(ids: list[int], size: int = 500) -> Iterable[list[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _pack(
+    testing_id: int,
+    label: str | None,
+    sent_at: datetime,
+    summary: Sequence[int],
+    days: Sequence[tuple[date, Sequence[int]]],
+) -> ProgressSnapshot:
+    columns: dict[str, list] = {"date": [d.isoformat() for d, _ in days]}
+    for index, key in enumerate(SNAPSHOT_DAILY_KEYS):
+        columns[key] = [counts[index] for _, counts in days]
+    packed = dumps(columns)
+    content_hash = hashlib.sha256(dumps(list(summary)) + packed).hexdigest()
+    return ProgressSnapshot(
+        testing_id=testing_id,
+        label=label,
+        sent_at=sent_at,
+        content_hash=content_hash,
+        **dict(zip(SUMMARY_FIELDS, summary)),
+        start_date=days[0][0] if days else None,
+        end_date=days[-1][0] if days else None,
+        daily=zlib.compress(packed),
+        downsampled=False,
+    )
+
+
+def _unpack(row: ProgressSnapshot) -> ProgressSnapshotItem:
+    columns = json.loads(zlib.decompress(row.daily))
+    daily = [
+        ProgressSnapshotDailyItem.model_validate(dict(zip(("date", *SNAPSHOT_DAILY_KEYS), values)))
+        for values in zip(columns["date"], *(columns[key] for key in SNAPSHOT_DAILY_KEYS))
+    ]
+    summary = ProgressSnapshotSummary.model_validate(row)
+    return ProgressSnapshotItem(**summary.model_dump(), daily=daily)
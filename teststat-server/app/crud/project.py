@@ -1,29 +1,24 @@
-from datetime import datetime, timezone
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
 
 from fastapi import HTTPException, status
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
 
+from app.database import upsert
 from app.models.plan import Plan, PlanDaily, PlanLabel
-from app.models.progress import DailyProgress, FileProgress, Testing
-from app.models.project import Project
-from app.schemas.project import ProjectCreate, ProjectOrderUpdate, ProjectResponse, ProjectUpdate
+from app.models.progress import DailyProgressRollup, FileProgress, Testing
+from app.models.project import Project, ProjectMetrics
+from app.schemas.project import ProjectCreate, ProjectMetricsCheck, ProjectOrderUpdate, ProjectResponse, ProjectUpdate
+from app.services.data_version import bump_data_version
+from app.services.request_metrics import instrumented
 
 
 ActualSummary = tuple[int, int, float, bool]
 
 
-def _disabled_labels_subquery(testing_id: int):
-    return select(PlanLabel.label).where(
-        PlanLabel.testing_id == testing_id,
-        PlanLabel.is_disabled.is_(True),
-    )
-
-
-def _enabled_label_condition(label_column, testing_id: int):
-    return (label_column.is_(None)) | (label_column.not_in(_disabled_labels_subquery(testing_id)))
-
-
 def _blank_to_none(value: str | None) -> str | None:
     if value is None:
         return None
@@ -54,126 +49,137 @@ def _ensure_archived_project_update_allowed(project: Project, payload: ProjectUp
     )
 
 
-def _active_plan_count(db: Session, testing_id: int) -> int:
-    return db.scalar(
-        select(func.count()).select_from(Plan)
-        .where(
-            Plan.testing_id == testing_id,
-            Plan.is_active.is_(True),
-            _enabled_label_condition(Plan.label, testing_id),
+@dataclass
+class _PlanMetricInputs:
+    """一覧の計画比較指標の入力を testing_id 横断でまとめて読み込んだもの。
+
+    件数を増やしてもクエリ数が一定になるよう、testing_id ごとの絞り込みは Python 側で行う。
+    """
+
+    disabled_labels: dict[int, set[str]] = field(default_factory=lambda: defaultdict(set))
+    offset_settings: dict[int, dict[str, bool]] = field(default_factory=lambda: defaultdict(dict))
+    actual_labels: dict[int, set[str | None]] = field(default_factory=lambda: defaultdict(set))
+    # testing_id -> [(plan_id, label, planned_total_cases)]
+    active_plans: dict[int, list[tuple[int, str | None, int]]] = field(default_factory=lambda: defaultdict(list))
+    # testing_id -> [(label, 最終実績日, executed 合計)]
+    actual_by_label: dict[int, list[tuple[str | None, date, int]]] = field(default_factory=lambda: defaultdict(list))
+    # plan_id -> [(date, planned_count)]
+    plan_daily: dict[int, list[tuple[date, int]]] = field(default_factory=lambda: defaultdict(list))
+
+    def plan_actual_offset(self, testing_id: int) -> int:
+        """実績未送信で、実績オフセット対象になっている有効計画の件数。"""
+        disabled_labels = self.disabled_labels[testing_id]
+        actual_labels = self.actual_labels[testing_id]
+        label_settings = self.offset_settings[testing_id]
+        return sum(
+            planned_total_cases
+            for _, label, planned_total_cases in self.active_plans[testing_id]
+            if label not in disabled_labels
+            and label not in actual_labels
+            and label_settings.get(label, True)
         )
-    ) or 0
-
-
-def _plan_actual_offset(db: Session, testing_id: int) -> int:
-    """実績未送信で、実績オフセット対象になっている有効計画の件数。"""
-    disabled_labels = set(db.scalars(_disabled_labels_subquery(testing_id)))
-    actual_labels = set(db.scalars(
-        select(FileProgress.label).where(FileProgress.testing_id == testing_id).distinct()
-    )) | set(db.scalars(
-        select(DailyProgress.label).where(DailyProgress.testing_id == testing_id).distinct()
-    ))
-    label_settings = {
-        item.label: item.use_plan_as_actual_offset
-        for item in db.scalars(select(PlanLabel).where(PlanLabel.testing_id == testing_id))
-    }
-    return sum(
-        plan.planned_total_cases
-        for plan in db.scalars(select(Plan).where(Plan.testing_id == testing_id, Plan.is_active.is_(True)))
-        if plan.label not in disabled_labels
-        and plan.label not in actual_labels
-        and label_settings.get(plan.label, True)
-    )
 
-def _actual_summary(db: Session, testing_id: int) -> ActualSummary:
-    available_cases, completed, file_count, min_completed_rate = db.execute(
+    def actual_vs_plan_metrics(self, testing_id: int) -> tuple[float | None, float | None]:
+        disabled_labels = self.disabled_labels[testing_id]
+        enabled_actuals = [
+            (latest_date, executed)
+            for label, latest_date, executed in self.actual_by_label[testing_id]
+            if label is None or label not in disabled_labels
+        ]
+        if not enabled_actuals:
+            return None, None
+        latest_actual_date = max(latest_date for latest_date, _ in enabled_actuals)
+        actual_executed = sum(executed for _, executed in enabled_actuals)
+
+        actual_labels = self.actual_labels[testing_id]
+        label_settings = self.offset_settings[testing_id]
+        included_plan_ids = [
+            plan_id
+            for plan_id, label, _ in self.active_plans[testing_id]
+            if label not in disabled_labels
+            and (label in actual_labels or label_settings.get(label, True))
+        ]
+        if not included_plan_ids:
+            return None, None
+        planned_by_date: dict[date, int] = defaultdict(int)
+        for plan_id in included_plan_ids:
+            for plan_date, planned_count in self.plan_daily[plan_id]:
+                planned_by_date[plan_date] += planned_count
+        planned_completed = sum(
+            planned_count for plan_date, planned_count in planned_by_date.items() if plan_date <= latest_actual_date
+        )
+        if planned_completed <= 0:
+            return None, None
+
+        rate = round(actual_executed / planned_completed * 100, 2)
+        delay_days = 0.0
+        if actual_executed < planned_completed:
+            cumulative = 0
+            for plan_date, count in sorted(planned_by_date.items()):
+                if count <= 0:
+                    continue
+                if actual_executed <= cumulative + count:
+                    fraction = max(0.0, (actual_executed - cumulative) / count)
+                    planned_position = plan_date.toordinal() + fraction
+                    actual_position = latest_actual_date.toordinal() + 1
+                    delay_days = round(max(0.0, actual_position - planned_position), 1)
+                    break
+                cumulative += count
+        return rate, delay_days
+
+
+def _load_plan_metric_inputs(db: Session, testing_ids: list[int]) -> _PlanMetricInputs:
+    inputs = _PlanMetricInputs()
+    for testing_id, label, is_disabled, use_plan_as_actual_offset in db.execute(
         select(
-            func.coalesce(func.sum(FileProgress.available_cases), 0),
-            func.coalesce(func.sum(FileProgress.completed), 0),
-            func.count(FileProgress.id),
-            func.min(FileProgress.completed_rate),
-        ).where(
-            FileProgress.testing_id == testing_id,
-            _enabled_label_condition(FileProgress.label, testing_id),
+            PlanLabel.testing_id,
+            PlanLabel.label,
+            PlanLabel.is_disabled,
+            PlanLabel.use_plan_as_actual_offset,
+        ).where(PlanLabel.testing_id.in_(testing_ids))
+    ):
+        if is_disabled:
+            inputs.disabled_labels[testing_id].add(label)
+        inputs.offset_settings[testing_id][label] = use_plan_as_actual_offset
+    for testing_id, label in db.execute(
+        select(FileProgress.testing_id, FileProgress.label)
+        .where(FileProgress.testing_id.in_(testing_ids))
+        .distinct()
+    ):
+        inputs.actual_labels[testing_id].add(label)
+    for testing_id, label, latest_date, executed in db.execute(
+        select(
+            DailyProgressRollup.testing_id,
+            DailyProgressRollup.label,
+            func.max(DailyProgressRollup.date),
+            func.coalesce(func.sum(DailyProgressRollup.executed), 0),
         )
-    ).one()
-    total_cases = available_cases + _plan_actual_offset(db, testing_id)
-    completed_rate = round((completed / total_cases * 100), 2) if total_cases else 0
-    actual_all_completed = bool(
-        total_cases == available_cases and file_count and min_completed_rate is not None and min_completed_rate >= 100
-    )
-    return int(available_cases), int(completed), completed_rate, actual_all_completed
+        .where(DailyProgressRollup.testing_id.in_(testing_ids))
+        .group_by(DailyProgressRollup.testing_id, DailyProgressRollup.label)
+    ):
+        inputs.actual_labels[testing_id].add(label)
+        inputs.actual_by_label[testing_id].append((label, latest_date, int(executed)))
+    for plan_id, testing_id, label, planned_total_cases in db.execute(
+        select(Plan.id, Plan.testing_id, Plan.label, Plan.planned_total_cases)
+        .where(Plan.testing_id.in_(testing_ids), Plan.is_active.is_(True))
+    ):
+        inputs.active_plans[testing_id].append((plan_id, label, planned_total_cases))
+    if any(inputs.actual_by_label.values()):
+        for plan_id, plan_date, planned_count in db.execute(
+            select(PlanDaily.plan_id, PlanDaily.date, PlanDaily.planned_count)
+            .join(Plan, Plan.id == PlanDaily.plan_id)
+            .where(
+                Plan.testing_id.in_(list(inputs.actual_by_label)),
+                Plan.is_active.is_(True),
+            )
+        ):
+            inputs.plan_daily[plan_id].append((plan_date, int(planned_count or 0)))
+    return inputs
 
 
-def _actual_vs_plan_metrics(db: Session, testing_id: int) -> tuple[float | None, float | None]:
-    latest_actual_date = db.scalar(
-        select(func.max(DailyProgress.date)).where(
-            DailyProgress.testing_id == testing_id,
-            _enabled_label_condition(DailyProgress.label, testing_id),
-        )
-    )
-    if latest_actual_date is None:
-        return None, None
-
-    actual_executed = db.scalar(
-        select(func.coalesce(func.sum(DailyProgress.executed), 0)).where(
-            DailyProgress.testing_id == testing_id,
-            DailyProgress.date <= latest_actual_date,
-            _enabled_label_condition(DailyProgress.label, testing_id),
-        )
-    ) or 0
-    disabled_labels = set(db.scalars(_disabled_labels_subquery(testing_id)))
-    actual_labels = set(db.scalars(
-        select(FileProgress.label).where(FileProgress.testing_id == testing_id).distinct()
-    )) | set(db.scalars(
-        select(DailyProgress.label).where(DailyProgress.testing_id == testing_id).distinct()
-    ))
-    label_settings = {
-        item.label: item.use_plan_as_actual_offset
-        for item in db.scalars(select(PlanLabel).where(PlanLabel.testing_id == testing_id))
-    }
-    included_plan_ids = [
-        plan.id
-        for plan in db.scalars(select(Plan).where(Plan.testing_id == testing_id, Plan.is_active.is_(True)))
-        if plan.label not in disabled_labels
-        and (plan.label in actual_labels or label_settings.get(plan.label, True))
-    ]
-    if not included_plan_ids:
-        return None, None
-    planned_completed = db.scalar(
-        select(func.coalesce(func.sum(PlanDaily.planned_count), 0)).where(
-            PlanDaily.plan_id.in_(included_plan_ids),
-            PlanDaily.date <= latest_actual_date,
-        )
-    ) or 0
-    if planned_completed <= 0:
-        return None, None
-
-    rate = round(actual_executed / planned_completed * 100, 2)
-    delay_days = 0.0
-    if actual_executed < planned_completed:
-        cumulative = 0
-        daily_plan = db.execute(
-            select(PlanDaily.date, func.sum(PlanDaily.planned_count))
-            .where(PlanDaily.plan_id.in_(included_plan_ids))
-            .group_by(PlanDaily.date)
-            .order_by(PlanDaily.date)
-        ).all()
-        for plan_date, planned_count in daily_plan:
-            count = int(planned_count or 0)
-            if count <= 0:
-                continue
-            if actual_executed <= cumulative + count:
-                fraction = max(0.0, (actual_executed - cumulative) / count)
-                planned_position = plan_date.toordinal() + fraction
-                actual_position = latest_actual_date.toordinal() + 1
-                delay_days = round(max(0.0, actual_position - planned_position), 1)
-                break
-            cumulative += count
-    return rate, delay_days
-
-
-def _actual_summaries(db: Session, testing_ids: list[int]) -> dict[int, ActualSummary]:
+def _actual_summaries(
+    db: Session, testing_ids: list[int], inputs: _PlanMetricInputs | None = None
+) -> dict[int, ActualSummary]:
     rows = db.execute(
         select(
             FileProgress.testing_id,
@@ -190,9 +196,13 @@ def _actual_summaries(db: Session, testing_ids: list[int]) -> dict[int, ActualSu
         .where((PlanLabel.id.is_(None)) | (PlanLabel.is_disabled.is_(False)))
         .group_by(FileProgress.testing_id)
     ).all()
+    if not rows:
+        return {}
+    if inputs is None:
+        inputs = _load_plan_metric_inputs(db, [row[0] for row in rows])
     summaries: dict[int, ActualSummary] = {}
     for testing_id, available_cases, completed, file_count, min_completed_rate in rows:
-        total_cases = available_cases + _plan_actual_offset(db, testing_id)
+        total_cases = available_cases + inputs.plan_actual_offset(testing_id)
         completed_rate = round((completed / total_cases * 100), 2) if total_cases else 0
         actual_all_completed = bool(
             total_cases == available_cases and file_count and min_completed_rate is not None and min_completed_rate >= 100
@@ -202,20 +212,18 @@ def _actual_summaries(db: Session, testing_ids: list[int]) -> dict[int, ActualSu
 
 
 def _actual_vs_plan_metrics_by_project(
-    db: Session, testing_ids: list[int]
+    db: Session, testing_ids: list[int], inputs: _PlanMetricInputs | None = None
 ) -> dict[int, tuple[float | None, float | None]]:
-    return {testing_id: _actual_vs_plan_metrics(db, testing_id) for testing_id in testing_ids}
-
-
-def _to_response(
-    project: Project,
-    testing: Testing | None,
-    active_plan_count: int = 0,
-    actual_summary: ActualSummary = (0, 0, 0, False),
-    actual_vs_plan_rate: float | None = None,
-    actual_vs_plan_delay_days: float | None = None,
-) -> ProjectResponse:
-    actual_available_cases, actual_completed, actual_completed_rate, actual_all_completed = actual_summary
+    if inputs is None:
+        inputs = _load_plan_metric_inputs(db, testing_ids)
+    return {testing_id: inputs.actual_vs_plan_metrics(testing_id) for testing_id in testing_ids}
+
+
+def _to_response(project: Project, metrics: ProjectMetrics | None) -> ProjectResponse:
+    metrics = metrics or ProjectMetrics(
+        actual_available_cases=0, actual_completed=0, actual_completed_rate=0, actual_all_completed=False,
+        has_actuals=False, active_plan_count=0,
+    )
     return ProjectResponse(
         testing_id=project.testing_id,
         name=project.name,
@@ -232,41 +240,43 @@ def _to_response(
         display_order=project.display_order,
         created_at=project.created_at,
         updated_at=project.updated_at,
-        has_actuals=testing is not None,
-        actuals_updated_at=testing.updated_at if testing else None,
-        actual_available_cases=actual_available_cases,
-        actual_completed=actual_completed,
-        actual_completed_rate=actual_completed_rate,
-        actual_vs_plan_rate=actual_vs_plan_rate,
-        actual_vs_plan_delay_days=actual_vs_plan_delay_days,
-        actual_all_completed=actual_all_completed,
-        active_plan_count=active_plan_count,
+        has_actuals=metrics.has_actuals,
+        actuals_updated_at=metrics.actuals_updated_at,
+        actual_available_cases=metrics.actual_available_cases,
+        actual_completed=metrics.actual_completed,
+        actual_completed_rate=metrics.actual_completed_rate,
+        actual_vs_plan_rate=metrics.actual_vs_plan_rate,
+        actual_vs_plan_delay_days=metrics.actual_vs_plan_delay_days,
+        actual_all_completed=metrics.actual_all_completed,
+        active_plan_count=metrics.active_plan_count,
     )
 
 
-def _get_testing(db: Session, testing_id: int) -> Testing | None:
-    return db.scalar(select(Testing).where(Testing.testing_id == testing_id))
-
-
-def list_projects(db: Session) -> list[ProjectResponse]:
-    projects = list(
-        db.scalars(
-            select(Project).order_by(
-                Project.archived,
-                Project.display_order,
-                Project.updated_at.desc(),
-                Project.testing_id,
-            )
-        )
+# ProjectMetrics のうち集計で決まる列（refreshed_at 以外）
+PROJECT_METRIC_FIELDS = (
+    "has_actuals",
+    "actuals_updated_at",
+    "actual_available_cases",
+    "actual_completed",
+    "actual_completed_rate",
+    "actual_all_completed",
+    "actual_vs_plan_rate",
+    "actual_vs_plan_delay_days",
+    "active_plan_count",
+)
+
+
+def _compute_project_metrics(db: Session, testing_ids: list[int]) -> dict[int, ProjectMetrics]:
+    """実績・計画・ラベル設定から一覧の集計値を求める（未保存の ProjectMetrics で返す）。クエリ数は件数によらず一定。"""
+    if not testing_ids:
+        return {}
+    testings = dict(
+        db.execute(select(Testing.testing_id, Testing.updated_at).where(Testing.testing_id.in_(testing_ids))).all()
     )
-    if not projects:
-        return []
-    tids = [p.testing_id for p in projects]
-    testings = {t.testing_id: t for t in db.scalars(select(Testing).where(Testing.testing_id.in_(tids)))}
     plan_counts = dict(
         db.execute(
             select(Plan.testing_id, func.count())
-            .where(Plan.testing_id.in_(tids), Plan.is_active.is_(True))
+            .where(Plan.testing_id.in_(testing_ids), Plan.is_active.is_(True))
             .outerjoin(
                 PlanLabel,
                 (PlanLabel.testing_id == Plan.testing_id) & (PlanLabel.label == Plan.label),
@@ -275,31 +285,105 @@ def list_projects(db: Session) -> list[ProjectResponse]:
             .group_by(Plan.testing_id)
         ).all()
     )
-    actual_summaries = _actual_summaries(db, tids)
-    actual_vs_plan_metrics = _actual_vs_plan_metrics_by_project(db, tids)
-    return [
-        _to_response(
-            p,
-            testings.get(p.testing_id),
-            plan_counts.get(p.testing_id, 0),
-            actual_summaries.get(p.testing_id, (0, 0, 0, False)),
-            *actual_vs_plan_metrics.get(p.testing_id, (None, None)),
+    metric_inputs = _load_plan_metric_inputs(db, testing_ids)
+    actual_summaries = _actual_summaries(db, testing_ids, metric_inputs)
+    actual_vs_plan_metrics = _actual_vs_plan_metrics_by_project(db, testing_ids, metric_inputs)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    computed: dict[int, ProjectMetrics] = {}
+    for testing_id in testing_ids:
+        available_cases, completed, completed_rate, all_completed = actual_summaries.get(testing_id, (0, 0, 0, False))
+        vs_plan_rate, delay_days = actual_vs_plan_metrics.get(testing_id, (None, None))
+        computed[testing_id] = ProjectMetrics(
+            testing_id=testing_id,
+            has_actuals=testing_id in testings,
+            actuals_updated_at=testings.get(testing_id),
+            actual_available_cases=available_cases,
+            actual_completed=completed,
+            actual_completed_rate=completed_rate,
+            actual_all_completed=all_completed,
+            actual_vs_plan_rate=vs_plan_rate,
+            actual_vs_plan_delay_days=delay_days,
+            active_plan_count=plan_counts.get(testing_id, 0),
+            refreshed_at=now,
         )
-        for p in projects
+    return computed
+
+
+def refresh_project_metrics(db: Session, testing_ids: Iterable[int]) -> dict[int, ProjectMetrics]:
+    """testing_ids の project_metrics を今のデータで作り直す。
+
+    書き込みと同じトランザクションで呼ぶ（commit は呼び出し側）。未 flush の変更も集計に含めるため先に flush する。
+    同じプロジェクトへの初回の書き込みが同時に来ても主キーで衝突しないよう、upsert で書き込む。
+    """
+    ids = sorted(set(testing_ids))
+    if not ids:
+        return {}
+    db.flush()
+    computed = _compute_project_metrics(db, ids)
+    values = [
+        {
+            "testing_id": testing_id,
+            **{field_name: getattr(metrics, field_name) for field_name in (*PROJECT_METRIC_FIELDS, "refreshed_at")},
+        }
+        for testing_id, metrics in computed.items()
     ]
+    # 読み込み済みの行もセッション上で新しい値に置き換える
+    rows = db.scalars(
+        upsert(db, ProjectMetrics, values, ["testing_id"]).returning(ProjectMetrics),
+        execution_options={"populate_existing": True},
+    )
+    return {row.testing_id: row for row in rows}
+
+
+def check_project_metrics(db: Session, *, repair: bool = False) -> list[ProjectMetricsCheck]:
+    """全プロジェクトの project_metrics を計算し直した値と比べ、食い違い（行が無いものを含む）を返す。
+
+    repair=True なら食い違った行を作り直して commit する。
+    """
+    testing_ids = list(db.scalars(select(Project.testing_id).order_by(Project.testing_id)))
+    stored = {
+        row.testing_id: row
+        for row in db.scalars(select(ProjectMetrics).where(ProjectMetrics.testing_id.in_(testing_ids)))
+    }
+    computed = _compute_project_metrics(db, testing_ids)
+    mismatches: list[ProjectMetricsCheck] = []
+    for testing_id in testing_ids:
+        row = stored.get(testing_id)
+        fields = [
+            field_name
+            for field_name in PROJECT_METRIC_FIELDS
+            if row is None or getattr(row, field_name) != getattr(computed[testing_id], field_name)
+        ]
+        if fields:
+            mismatches.append(ProjectMetricsCheck(testing_id=testing_id, missing=row is None, fields=fields))
+    if repair and mismatches:
+        refresh_project_metrics(db, [item.testing_id for item in mismatches])
+        db.commit()
+    return mismatches
+
+
+@instrumented("list_projects")
+def list_projects(db: Session) -> list[ProjectResponse]:
+    """一覧は書き込み時に更新した project_metrics を結合して 1 クエリで返す。"""
+    rows = db.execute(
+        select(Project, ProjectMetrics)
+        .outerjoin(ProjectMetrics, ProjectMetrics.testing_id == Project.testing_id)
+        .order_by(
+            Project.archived,
+            Project.display_order,
+            Project.updated_at.desc(),
+            Project.testing_id,
+        )
+    ).all()
+    # 参照では書き込まない。行の無いプロジェクト（scripts.rebuild_project_metrics の実行前）は既定値で返す
+    return [_to_response(project, metrics) for project, metrics in rows]
 
 
 def get_project(db: Session, testing_id: int) -> ProjectResponse:
     project = db.scalar(select(Project).where(Project.testing_id == testing_id))
     if project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
-    return _to_response(
-        project,
-        _get_testing(db, testing_id),
-        _active_plan_count(db, testing_id),
-        _actual_summary(db, testing_id),
-        *_actual_vs_plan_metrics(db, testing_id),
-    )
+    return _to_response(project, _compute_project_metrics(db, [testing_id])[testing_id])
 
 
 def create_project(db: Session, payload: ProjectCreate) -> ProjectResponse:
@@ -325,14 +409,10 @@ def create_project(db: Session, payload: ProjectCreate) -> ProjectResponse:
         display_order=(max_display_order + 1) if max_display_order is not None else 0,
     )
     db.add(project)
+    metrics = refresh_project_metrics(db, [payload.testing_id])[payload.testing_id]
+    bump_data_version(db, payload.testing_id)
     db.commit()
-    return _to_response(
-        project,
-        _get_testing(db, payload.testing_id),
-        0,
-        _actual_summary(db, payload.testing_id),
-        *_actual_vs_plan_metrics(db, payload.testing_id),
-    )
+    return _to_response(project, metrics)
 
 
 def update_project(db: Session, testing_id: int, payload: ProjectUpdate) -> ProjectResponse:
@@ -340,6 +420,7 @@ def update_project(db: Session, testing_id: int, payload: ProjectUpdate) -> Proj
     if project is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="project not found")
     _ensure_archived_project_update_allowed(project, payload)
+    bug_query = _bug_query_fields(project)
     if payload.name is not None:
         project.name = payload.name
     if payload.ticket_ref is not None:
@@ -363,14 +444,23 @@ def update_project(db: Session, testing_id: int, payload: ProjectUpdate) -> Proj
     if payload.archived is not None:
         project.archived = payload.archived
     _validate_project_planned_date_range(project)
+    if _bug_query_fields(project) != bug_query:
+        # 取得条件が変わったら差分同期の基準時刻を捨て、次回は全件取得する
+        project.bug_changed_watermark = None
+        project.bug_reconciled_at = None
     project.updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    bump_data_version(db, testing_id)
     db.commit()
-    return _to_response(
-        project,
-        _get_testing(db, testing_id),
-        _active_plan_count(db, testing_id),
-        _actual_summary(db, testing_id),
-        *_actual_vs_plan_metrics(db, testing_id),
+    # 一覧の集計値はプロジェクトの設定に依らないため、ここでは project_metrics を更新しない
+    return _to_response(project, _compute_project_metrics(db, [testing_id])[testing_id])
+
+
+def _bug_query_fields(project: Project) -> tuple:
+    return (
+        project.bug_count_source,
+        project.bug_parent_work_item_id,
+        project.bug_work_item_type,
+        project.bug_tag,
     )
 
 
@@ -384,6 +474,8 @@ def delete_project(db: Session, testing_id: int) -> None:
             detail="archived project cannot be deleted",
         )
     db.delete(project)
+    db.execute(delete(ProjectMetrics).where(ProjectMetrics.testing_id == testing_id))
+    bump_data_version(db, testing_id)
     db.commit()
 
 
@@ -400,5 +492,6 @@ def update_project_order(db: Session, payload: ProjectOrderUpdate) -> list[Proje
 
     for index, testing_id in enumerate(unique_ids):
         projects_by_id[testing_id].display_order = index
+    bump_data_version(db)
     db.commit()
     return list_projects(db)
@@ -7,6 +7,7 @@ from app.schemas.setting import (
     PbChartSettings,
     ProgressStatusThresholds,
 )
+from app.services.data_version import bump_data_version
 
 PROGRESS_STATUS_SETTING_ID = 1
 PB_CHART_SETTING_ID = 1
@@ -73,6 +74,7 @@ def update_progress_status_thresholds(
 
     setting.caution_threshold = payload.caution
     setting.warning_threshold = payload.warning
+    bump_data_version(db)
     db.commit()
     db.refresh(setting)
     return _to_schema(setting)
@@ -102,6 +104,7 @@ def update_pb_chart_settings(
         db.add(setting)
 
     setting.bug_axis_max = payload.bug_axis_max
+    bump_data_version(db)
     db.commit()
     db.refresh(setting)
     return _pb_chart_to_schema(setting)
@@ -137,6 +140,7 @@ def update_bug_state_color_settings(
                 display_order=index,
             )
         )
+    bump_data_version(db)
     db.commit()
     return get_bug_state_color_settings(db)
 
@@ -1,18 +1,126 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator, Mapping, Sequence
+from typing import Any
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
-from app.config import get_settings
+from app.config import Settings, get_settings
+from app.services.db_pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
+from app.services.request_metrics import install_query_hooks
+
+# 同期ドライバの URL を非同期ルート用に読み替えるときのドライバ
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(get_settings().database_url, pool_pre_ping=True)
+def async_database_url(url: str) -> str:
+    """DATABASE_URL（psycopg2 / pysqlite）を asyncpg / aiosqlite の URL に変換する。"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"非同期ドライバが未対応のデータベースです: {backend}（ASYNC_DATABASE_URL を指定してください）")
+    return parsed.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def upsert(
+    db: Session,
+    model: type["Base"],
+    rows: Sequence[Mapping[str, Any]],
+    key_columns: Sequence[str],
+    set_: Mapping[str, Any] | None = None,
+):
+    """主キー（key_columns）が衝突したら更新する INSERT 文（PostgreSQL / SQLite の ON CONFLICT）。
+
+    set_ 未指定ならキー以外の列を挿入しようとした値で上書きする。同時に初回の書き込みが来ても
+    一方が IntegrityError にならない。
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(model).values(list(rows))
+    elif dialect == "sqlite":
+        statement = sqlite.insert(model).values(list(rows))
+    else:
+        raise ValueError(f"upsert が未対応のデータベースです: {dialect}")
+    if set_ is None:
+        set_ = {column: statement.excluded[column] for column in rows[0] if column not in key_columns}
+    return statement.on_conflict_do_update(index_elements=list(key_columns), set_=dict(set_))
+
+
+def _is_sqlite_memory(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def engine_options(url: str, settings: Settings, *, is_async: bool = False) -> dict[str, Any]:
+    """create_engine / create_async_engine に渡すプール・接続オプション。
+
+    SQLite のメモリ DB は接続ごとに別の DB になるため、SQLAlchemy 既定のプール（接続 1 本）のままにする。
+    """
+    parsed = make_url(url)
+    options: dict[str, Any] = {"pool_pre_ping": True}
+    if _is_sqlite_memory(parsed):
+        return options
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_sec,
+        pool_recycle=settings.db_pool_recycle_sec,
+    )
+    if parsed.get_backend_name() == "postgresql" and settings.db_statement_timeout_ms:
+        timeout = str(settings.db_statement_timeout_ms)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+def install_sqlite_pragmas(engine: Engine, settings: Settings) -> None:
+    """SQLite の接続ごとに WAL などの PRAGMA を設定する（SQLite 以外は何もしない）。
+
+    WAL では読み取りが書き込みを待たないため、収集の一括書き込み中にダッシュボードを開いても
+    "database is locked" にならない。書き込み同士の競合は busy_timeout の間待つ。
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, _connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+            # 負の値は KiB 単位の指定
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kb)}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_mb) * 1024 * 1024}")
+        finally:
+            cursor.close()
+
+
+_settings = get_settings()
+_async_url = _settings.async_database_url or async_database_url(_settings.database_url)
+
+engine = create_engine(_settings.database_url, **engine_options(_settings.database_url, _settings))
+install_sqlite_pragmas(engine, _settings)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
+# 読み取り中心のルート（実績・プロジェクト・PB図）はイベントループ上で DB を待ち、スレッドプールを占有しない
+async_engine = create_async_engine(_async_url, **engine_options(_async_url, _settings, is_async=True))
+install_sqlite_pragmas(async_engine.sync_engine, _settings)
+if _settings.metrics_enabled:
+    install_query_hooks(engine, _settings.slow_query_ms)
+    install_query_hooks(async_engine.sync_engine, _settings.slow_query_ms)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -20,3 +128,8 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
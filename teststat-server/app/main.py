@@ -1,11 +1,16 @@
-from fastapi import Depends, FastAPI
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
-from app.database import get_db
+from app.database import async_engine, engine, get_db
+from app.middleware import CompressionMiddleware, DataVersionETagMiddleware, RequestMetricsMiddleware
 from app.routers import (
+    admin_router,
     azure_devops_router,
     bug_router,
     collect_router,
@@ -15,17 +20,38 @@ from app.routers import (
     plan_router,
     setting_router,
 )
+from app.services import azure_devops
+from app.services.collector_inprocess import shutdown_inprocess_workers
+from app.services.db_pool import pool_status
+from app.services.request_metrics import render_metrics
 
 settings = get_settings()
 
-app = FastAPI(title="TestStat Server", version="0.1.0")
 
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    yield
+    # Azure DevOps の共有クライアント（keep-alive 中の接続）と非同期 DB 接続、inprocess 収集の常駐ワーカーを閉じる
+    await azure_devops.aclose_clients()
+    await async_engine.dispose()
+    shutdown_inprocess_workers()
+
+
+app = FastAPI(title="TestStat Server", version="0.1.0", lifespan=lifespan)
+
+# 後から追加したものが外側になる（CORS → 計測 → ETag → 圧縮 → ルート）。304 はルート・圧縮より前で返す
+app.add_middleware(CompressionMiddleware, minimum_size=settings.response_compression_min_bytes)
+app.add_middleware(DataVersionETagMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 別オリジンのフロントエンドが次ページの cursor と条件付き GET 用の ETag を読めるようにする
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(progress_router)
@@ -36,6 +62,7 @@ app.include_router(setting_router)
 app.include_router(azure_devops_router)
 app.include_router(bug_router)
 app.include_router(collect_router)
+app.include_router(admin_router)
 
 
 @app.get("/health")
@@ -43,3 +70,11 @@ def health(db: Session = Depends(get_db)) -> dict[str, object]:
     db.execute(text("SELECT 1"))
     return {"status": "ok", "db": "connected", "collect_enabled": settings.collect_enabled}
 
+
+
+if settings.metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics() -> Response:
+        pools = [pool_status("sync", engine), pool_status("async", async_engine.sync_engine)]
+        return Response(render_metrics(pools), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,203 @@
+"""API 全体に掛けるレスポンス圧縮・条件付き GET・性能計測。
+
+- CompressionMiddleware: Accept-Encoding に応じて brotli（brotli パッケージがある場合）または gzip で圧縮する。
+  RESPONSE_COMPRESSION_MIN_BYTES 未満の本文は圧縮しない。StreamingResponse はチャンクごとに圧縮して流す。
+- DataVersionETagMiddleware: Testing ID 単位の表示データ（実績・計画・PB図など）の GET に、
+  data_version から作った弱い ETag を付ける。If-None-Match が一致すればルートを呼ばずに 304 を返す
+  （DB はバージョンの 1〜2 行を読むだけ）。
+- RequestMetricsMiddleware: ルートごとの処理時間・SQL 件数・DB 時間を app.services.request_metrics に記録する。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from collections.abc import AsyncGenerator, Callable
+from contextlib import aclosing
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import get_async_db
+from app.services.data_version import get_data_version, get_global_data_version
+from app.services.request_metrics import finish_request, start_request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli は任意依存
+    brotli = None
+
+# data_version で内容が決まる GET。Azure DevOps を都度参照する bugs/open などは含めない。
+_TESTING_PATHS = (
+    re.compile(r"^/api/v1/progress/(?P<testing_id>\d+)(?:/files|/daily|/people)?$"),
+    re.compile(r"^/api/v1/projects/(?P<testing_id>\d+)(?:/pb-chart|/dashboard|/plan-labels|/plans)?$"),
+)
+# 全プロジェクトにまたがる一覧は、どの Testing ID の書き込みでも変わる
+_GLOBAL_PATHS = frozenset({"/api/v1/projects", "/api/v1/testings"})
+
+
+def _accepts(accept_encoding: str, encoding: str) -> bool:
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip() != encoding:
+            continue
+        quality = params.strip()
+        return not (quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"))
+    return False
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = 5) -> None:
+        super().__init__(app, minimum_size)
+        self._compressor = brotli.Compressor(quality=quality)
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if more_body:
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        responder: ASGIApp
+        if brotli is not None and _accepts(accept_encoding, "br"):
+            responder = BrotliResponder(self.app, self.minimum_size)
+        elif _accepts(accept_encoding, "gzip"):
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            await self.app(scope, receive, send)
+            return
+        await responder(scope, receive, send)
+
+
+def is_data_version_path(path: str) -> bool:
+    return path in _GLOBAL_PATHS or any(pattern.match(path) for pattern in _TESTING_PATHS)
+
+
+def data_version_etag(db: Session, path: str, query_string: bytes) -> str | None:
+    """パスに対応するデータバージョンを DB から読み、弱い ETag を作る。対象外のパスは None。"""
+    version = None
+    if path in _GLOBAL_PATHS:
+        version = get_global_data_version(db)
+    else:
+        for pattern in _TESTING_PATHS:
+            match = pattern.match(path)
+            if match:
+                version = get_data_version(db, int(match.group("testing_id")))
+                break
+    if version is None:
+        return None
+    digest = hashlib.sha1(path.encode("utf-8") + b"?" + query_string + b"\0" + version.encode("ascii")).hexdigest()[:20]
+    return f'W/"dv-{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {value.strip() for value in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class DataVersionETagMiddleware:
+    """session_dependency はルートと同じ形の非同期セッションの依存関係（テストで差し替える）。"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        session_dependency: Callable[[], AsyncGenerator[AsyncSession, None]] = get_async_db,
+    ) -> None:
+        self.app = app
+        self.session_dependency = session_dependency
+
+    async def _etag(self, scope: Scope) -> str | None:
+        if not is_data_version_path(scope["path"]):
+            return None
+        async with aclosing(self.session_dependency()) as sessions:
+            async for db in sessions:
+                return await db.run_sync(data_version_etag, scope["path"], scope.get("query_string", b""))
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        etag = await self._etag(scope)
+        if etag is None:
+            await self.app(scope, receive, send)
+            return
+        if etag_matches(Headers(scope=scope).get("if-none-match"), etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [
+                    (b"etag", etag.encode("ascii")),
+                    (b"cache-control", b"no-cache"),
+                    (b"vary", b"Accept-Encoding"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                # ルートが独自の ETag（PB図のキャッシュなど）を付けている場合はそれを優先する
+                if "etag" not in headers:
+                    headers["ETag"] = etag
+                    headers["Cache-Control"] = "no-cache"
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+class RequestMetricsMiddleware:
+    """レスポンス本体を送り終えた時点までを計測する（BackgroundTasks の実行時間は含めない）。"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats, token = start_request()
+        started = time.perf_counter()
+        status_code = 500
+        finished = False
+
+        def finish() -> None:
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            # ルーティング後は scope["route"] にテンプレート（/api/v1/projects/{testing_id} など）が入る
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            finish_request(token, scope["method"], route, status_code, time.perf_counter() - started, stats)
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            finish()
@@ -1,17 +1,30 @@
-from app.models.progress import DailyPersonProgress, DailyProgress, FileProgress, TestResultBugSnapshot, Testing
-from app.models.project import Project
+from app.models.progress import (
+    DailyPersonProgress,
+    DailyProgress,
+    DailyProgressRollup,
+    FileProgress,
+    ProgressSnapshot,
+    TestResultBugSnapshot,
+    Testing,
+)
+from app.models.project import Project, ProjectMetrics
 from app.models.plan import Plan, PlanDaily, PlanLabel
 from app.models.holiday import Holiday
 from app.models.setting import BugStateColorSetting, PbChartSetting, ProgressStatusSetting
 from app.models.bug import BugSnapshot
+from app.models.collect import CollectLog, CollectRun, CollectRunTarget
+from app.models.data_version import DataVersion
 
 __all__ = [
     "Testing",
     "FileProgress",
     "DailyProgress",
+    "DailyProgressRollup",
     "DailyPersonProgress",
     "TestResultBugSnapshot",
+    "ProgressSnapshot",
     "Project",
+    "ProjectMetrics",
     "Plan",
     "PlanDaily",
     "PlanLabel",
@@ -20,5 +33,9 @@ __all__ = [
     "ProgressStatusSetting",
     "BugStateColorSetting",
     "BugSnapshot",
+    "CollectRun",
+    "CollectRunTarget",
+    "CollectLog",
+    "DataVersion",
 ]
 
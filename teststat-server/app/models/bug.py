@@ -9,7 +9,8 @@ from app.database import Base
 class BugSnapshot(Base):
     """Testing ID（親 Work Item）の子チケット Bug の現時点スナップショット。
 
-    Testing ID 単位で洗替（delete → insert）する。日次履歴は持たず、起票日・完了日・State から
+    全件同期では Testing ID 単位で洗替（delete → insert）し、差分同期では更新された Bug だけを
+    bug_work_item_id で upsert する。日次履歴は持たず、起票日・完了日・State から
     任意日付断面の検出累積／見送り／完了を計算で再現する。
     """
 
@@ -17,6 +18,8 @@ class BugSnapshot(Base):
     __table_args__ = (
         Index("ix_bug_snapshots_testing_created", "testing_id", "created_date"),
         Index("ix_bug_snapshots_testing_finish", "testing_id", "finish_date"),
+        # 差分同期で bug_work_item_id ごとに upsert する
+        Index("ix_bug_snapshots_testing_work_item", "testing_id", "bug_work_item_id", unique=True),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
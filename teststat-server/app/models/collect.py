@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, JSON, String, Text, false, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class CollectRun(Base):
+    """コレクター 1 回分の実行記録。
+
+    status は running / finished / cancelled。実行中プロセスが落ちた場合は running のまま残るため、
+    updated_at が古い running は読み取り時に interrupted として扱う。
+    """
+
+    __tablename__ = "collect_runs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)           # all / changed / project
+    testing_id: Mapped[int | None] = mapped_column(Integer)                 # kind=project の対象
+    status: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    targets: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    concurrency: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    auth_error: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+
+class CollectRunTarget(Base):
+    """実行記録ごとの testing_id 別状態（queued / running / succeeded / failed）。"""
+
+    __tablename__ = "collect_run_targets"
+    __table_args__ = (
+        Index("ix_collect_run_targets_run_testing", "run_id", "testing_id"),
+        Index("ix_collect_run_targets_testing_finished", "testing_id", "finished_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    run_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("collect_runs.id", ondelete="CASCADE"), nullable=False
+    )
+    # プロジェクト削除後も履歴として残すため FK は張らない
+    testing_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    project_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # 収集したファイル（ラベル）数。所要時間の見積もり（1 ファイルあたりの秒数）に使う
+    files: Mapped[int | None] = mapped_column(Integer)
+    state: Mapped[str] = mapped_column(String(20), nullable=False)
+    reason: Mapped[str | None] = mapped_column(String(50))
+    message: Mapped[str | None] = mapped_column(Text)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime)
+
+
+class CollectLog(Base):
+    """tstat 1 回（testing_id 1 件）分の実行ログ。
+
+    tstat の `--json` 出力は解析済みの dict を output に保持し、失敗分類・所要時間・出力サイズと合わせて
+    検索できるようにする。出力の全文は失敗時だけ COLLECT_LOG_DIR に gzip で残し、log_path に記録する。
+    """
+
+    __tablename__ = "collect_logs"
+    __table_args__ = (
+        Index("ix_collect_logs_testing_finished", "testing_id", "finished_at"),
+        Index("ix_collect_logs_reason_finished", "reason", "finished_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    # ラベル単位の同期収集は実行記録を作らないため NULL
+    run_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("collect_runs.id", ondelete="SET NULL"))
+    testing_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    project_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    mode: Mapped[str] = mapped_column(String(20), nullable=False)          # subprocess / inprocess
+    exit_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    reason: Mapped[str | None] = mapped_column(String(50))                 # 成功時は NULL
+    message: Mapped[str | None] = mapped_column(Text)
+    output: Mapped[dict | None] = mapped_column(JSON)
+    stdout_bytes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    stderr_bytes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    log_path: Mapped[str | None] = mapped_column(String(500))
+    started_at: Mapped[datetime | None] = mapped_column(DateTime)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    duration_ms: Mapped[int | None] = mapped_column(Integer)
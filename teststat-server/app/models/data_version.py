@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+# 祝日・設定など Testing ID に依らない書き込みのバージョンを持つ行
+GLOBAL_DATA_VERSION_ID = 0
+
+
+class DataVersion(Base):
+    """表示データの更新バージョン（app.services.data_version）。testing_id ごとに 1 行。
+
+    収集・不具合同期のスクリプトなど API 以外のプロセスの書き込みも同じ表を進めるため、
+    PB図のキャッシュや ETag がプロセスをまたいで無効になる。
+    """
+
+    __tablename__ = "data_versions"
+
+    testing_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
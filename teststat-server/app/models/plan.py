@@ -46,6 +46,10 @@ class PlanLabel(Base):
     target_environments: Mapped[list[str] | None] = mapped_column(JSON)
     ignore_environments: Mapped[list[str] | None] = mapped_column(JSON)
     display_order: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # 変更検知用: 最後に収集が成功した時点の収集元ファイルの eTag（source_etag_url はその時の URL）
+    source_etag: Mapped[str | None] = mapped_column(String(255))
+    source_etag_url: Mapped[str | None] = mapped_column(String(2048))
+    source_last_modified: Mapped[datetime | None] = mapped_column(DateTime)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
 
 
@@ -1,6 +1,6 @@
 from datetime import date, datetime
 
-from sqlalchemy import Date, DateTime, Float, ForeignKey, Index, Integer, String, UniqueConstraint, func
+from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -69,6 +69,32 @@ class DailyProgress(Base):
     planned: Mapped[int | None] = mapped_column(Integer)
 
 
+class DailyProgressRollup(Base):
+    """DailyProgress を testing_id × label × 日付で集計済みの行。
+
+    replace_progress で DailyProgress と同時に洗替し、PB図・プロジェクト一覧の
+    日別実績はファイル・環境をまたいだ GROUP BY をせずにこのテーブルを範囲参照する。
+    """
+
+    __tablename__ = "daily_progress_rollups"
+    __table_args__ = (
+        Index("ix_daily_progress_rollups_testing_label_date", "testing_id", "label", "date"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    testing_id: Mapped[int] = mapped_column(Integer, ForeignKey("testings.testing_id", ondelete="CASCADE"), nullable=False, index=True)
+    label: Mapped[str | None] = mapped_column(String(255))
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    result_pass: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    result_fixed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    result_fail: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    result_blocked: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    result_suspend: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    result_na: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    executed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class DailyPersonProgress(Base):
     __tablename__ = "daily_person_progress"
 
@@ -118,3 +144,41 @@ class TestResultBugSnapshot(Base):
     suspend_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     fixed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class ProgressSnapshot(Base):
+    """取り込みごとの label 単位の進捗の履歴（追記のみ）。
+
+    FileProgress / DailyProgress は取り込みのたびに洗替されるため、過去のある時点の状態はここから復元する。
+    1 行 = testing_id × label × sent_at で、日別集計（DailyProgressRollup と同じ項目）を列ごとの配列にして
+    圧縮した daily と、ファイル合計の件数を持つ。前回と内容が同じ label は行を追加しない（content_hash で比較）。
+    取り込みから label が消えたときは file_count=0 の行（墓標）を残す。
+    label ごとに最新の 1 行だけ is_latest=True にし、取り込み時の比較は履歴を遡らずにその行だけを読む。
+
+    古い行は compact_progress_snapshots で 1 日 1 行に間引き（downsampled=True）、保持期間を過ぎたら削除する。
+    """
+
+    __tablename__ = "progress_snapshots"
+    __table_args__ = (
+        Index("ix_progress_snapshots_testing_label_sent", "testing_id", "label", "sent_at"),
+        Index("ix_progress_snapshots_sent_downsampled", "sent_at", "downsampled"),
+        Index("ix_progress_snapshots_testing_latest", "testing_id", "is_latest"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    testing_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("testings.testing_id", ondelete="CASCADE"), nullable=False
+    )
+    label: Mapped[str | None] = mapped_column(String(255))
+    sent_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    file_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_cases: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    available_cases: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    executed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    start_date: Mapped[date | None] = mapped_column(Date)
+    end_date: Mapped[date | None] = mapped_column(Date)
+    daily: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    downsampled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    is_latest: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
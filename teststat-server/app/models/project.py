@@ -1,6 +1,6 @@
 from datetime import date, datetime
 
-from sqlalchemy import Boolean, Date, DateTime, Integer, String, func
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database import Base
@@ -19,9 +19,37 @@ class Project(Base):
     bug_parent_work_item_id: Mapped[int | None] = mapped_column(Integer)
     bug_work_item_type: Mapped[str | None] = mapped_column(String(255))
     bug_tag: Mapped[str | None] = mapped_column(String(255))
+    # 不具合の差分同期: 取得済み Bug の System.ChangedDate の最大値（UTC）と、削除の突き合わせを最後に行った日時。
+    # 親 Work Item・種別・タグを変えたときや不具合データを削除したときは NULL に戻し、次回は全件取得する。
+    bug_changed_watermark: Mapped[datetime | None] = mapped_column(DateTime)
+    bug_reconciled_at: Mapped[datetime | None] = mapped_column(DateTime)
     pb_chart_range_source: Mapped[str] = mapped_column(String(32), nullable=False, default="plan_actual")
     bug_axis_max: Mapped[int | None] = mapped_column(Integer)
     archived: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     display_order: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+
+class ProjectMetrics(Base):
+    """プロジェクト一覧（GET /api/v1/projects）の集計値。testing_id ごとに 1 行。
+
+    実績の合計・計画比較の指標は実績・計画・ラベル設定から決まるため、それらを書き換える CRUD
+    （replace_progress・計画/ラベルの CRUD・プロジェクトの作成）が同じトランザクションで
+    refresh_project_metrics により作り直す。一覧はこの表を projects に結合するだけで返す。
+    不整合の確認と作り直しは scripts/rebuild_project_metrics.py で行う。
+    """
+
+    __tablename__ = "project_metrics"
+
+    testing_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    has_actuals: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    actuals_updated_at: Mapped[datetime | None] = mapped_column(DateTime)
+    actual_available_cases: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    actual_completed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    actual_completed_rate: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    actual_all_completed: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    actual_vs_plan_rate: Mapped[float | None] = mapped_column(Float)
+    actual_vs_plan_delay_days: Mapped[float | None] = mapped_column(Float)
+    active_plan_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -6,6 +6,7 @@ from app.routers.setting import router as setting_router
 from app.routers.azure_devops import router as azure_devops_router
 from app.routers.bug import router as bug_router
 from app.routers.collect import router as collect_router
+from app.routers.admin import router as admin_router
 
 __all__ = [
     "progress_router",
@@ -16,6 +17,7 @@ __all__ = [
     "azure_devops_router",
     "bug_router",
     "collect_router",
+    "admin_router",
 ]
 
 
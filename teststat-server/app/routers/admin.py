@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.config import Settings, get_settings
+from app.crud.progress_snapshot import compact_progress_snapshots
+from app.database import async_engine, engine, get_db
+from app.schemas.admin import DbPoolResponse, SnapshotCompactionResponse
+from app.services.db_pool import pool_status
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+
+@router.get("/db-pool", response_model=DbPoolResponse)
+def read_db_pool() -> DbPoolResponse:
+    """同期（書き込み・収集）と非同期（参照ルート）の接続プールの状態と、接続取得の待ち時間の累計。"""
+    return DbPoolResponse(
+        backend=engine.dialect.name,
+        pools=[pool_status("sync", engine), pool_status("async", async_engine.sync_engine)],
+    )
+
+
+@router.post("/progress-snapshots/compact", response_model=SnapshotCompactionResponse)
+def post_compact_progress_snapshots(
+    db: Session = Depends(get_db),
+    settings: Settings = Depends(get_settings),
+) -> SnapshotCompactionResponse:
+    """進捗の履歴を PROGRESS_SNAPSHOT_DOWNSAMPLE_DAYS / RETENTION_DAYS に従って間引き・削除する（収集の後にも PROGRESS_SNAPSHOT_COMPACT_INTERVAL_HOURS に 1 回まで自動で行う）。"""
+    return compact_progress_snapshots(
+        db,
+        datetime.now(timezone.utc).replace(tzinfo=None),
+        settings.progress_snapshot_downsample_days,
+        settings.progress_snapshot_retention_days,
+    )
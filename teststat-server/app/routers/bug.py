@@ -1,13 +1,15 @@
+import threading
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
 from app.crud.bug import build_work_item_url, delete_bug_count_data, get_open_bugs, replace_bugs
 from app.crud.project import get_project
 from app.database import get_db
-from app.schemas.bug import BugSyncResponse, OpenBugItem
+from app.schemas.bug import BugBulkSyncStarted, BugBulkSyncStatus, BugSyncResponse, OpenBugItem
+from app.services import bug_sync
 from app.services.azure_devops import (
     AzureDevOpsAuthError,
     AzureDevOpsError,
@@ -17,6 +19,8 @@ from app.services.azure_devops import (
 )
 
 router = APIRouter(prefix="/api/v1", tags=["bugs"])
+# 一括同期は同時に 1 つだけ
+_bulk_sync_lock = threading.Lock()
 
 
 def _bug_fetch_args(project):
@@ -36,12 +40,18 @@ def _ensure_not_archived(project) -> None:
 
 
 @router.post("/projects/{testing_id}/bugs/sync", response_model=BugSyncResponse)
-def sync_bugs(testing_id: int, db: Session = Depends(get_db)) -> BugSyncResponse:
+def sync_bugs(testing_id: int, incremental: bool = False, db: Session = Depends(get_db)) -> BugSyncResponse:
+    """子 Bug を取得して BugSnapshot を洗い替える。
+
+    incremental=true では前回同期以降に更新された Bug だけを取得して反映する。
+    """
     project = get_project(db, testing_id)
     _ensure_not_archived(project)
     fetch_args = _bug_fetch_args(project)
 
     try:
+        if incremental:
+            return bug_sync.sync_project_bugs_incremental(db, project)
         bugs = fetch_child_bugs(
             fetch_args["work_item_id"],
             bug_work_item_type=fetch_args["bug_work_item_type"],
@@ -78,6 +88,36 @@ def sync_bugs(testing_id: int, db: Session = Depends(get_db)) -> BugSyncResponse
         raise
 
 
+@router.post("/bugs/sync", response_model=BugBulkSyncStarted, status_code=status.HTTP_202_ACCEPTED)
+def sync_all_bugs(
+    background_tasks: BackgroundTasks,
+    incremental: bool = False,
+    db: Session = Depends(get_db),
+) -> BugBulkSyncStarted:
+    """全プロジェクト（bug_count_source=azure_devops・未アーカイブ）の不具合をバックグラウンドで同期する。
+
+    進捗・結果は GET /bugs/sync/status で確認する。incremental=true で差分同期する。
+    """
+    projects = bug_sync.load_sync_targets(db)
+    if not _bulk_sync_lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="bug sync already running")
+    bug_sync.mark_started(projects)
+    background_tasks.add_task(_run_bulk_sync, incremental)
+    return BugBulkSyncStarted(started=True, targets=len(projects))
+
+
+@router.get("/bugs/sync/status", response_model=BugBulkSyncStatus | None)
+def get_bulk_sync_status() -> BugBulkSyncStatus | None:
+    return bug_sync.get_bug_sync_status()
+
+
+def _run_bulk_sync(incremental: bool) -> None:
+    try:
+        bug_sync.sync_all_bugs(incremental=incremental)
+    finally:
+        _bulk_sync_lock.release()
+
+
 @router.delete("/projects/{testing_id}/bugs", status_code=status.HTTP_204_NO_CONTENT)
 def delete_bugs(testing_id: int, db: Session = Depends(get_db)) -> None:
     project = get_project(db, testing_id)
@@ -1,17 +1,30 @@
 from __future__ import annotations
 
+import asyncio
 import threading
+import time
+from collections.abc import AsyncIterator
+from datetime import datetime
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
-from app.database import get_db
-from app.schemas.collect import CollectResult, CollectStarted
+from app.crud.collect_run import get_collect_run_status, list_collect_logs, require_collect_run_status
+from app.database import SessionLocal, get_db
+from app.schemas.collect import CollectLogItem, CollectResult, CollectRunStatus, CollectStarted
 from app.services import collector
 
 router = APIRouter(prefix="/api/v1", tags=["collect"])
+# 一括収集（全件・変更検知）は同時に 1 つだけ。画面からのプロジェクト単位の収集は
+# testing_id ごとに 1 つだけとし、一括収集の実行中でも受け付けて待ち行列の先頭に積む。
 _collect_lock = threading.Lock()
+_project_lock = threading.Lock()
+_active_projects: set[int] = set()
+PROGRESS_POLL_INTERVAL_SEC = 1.0
+PROGRESS_KEEPALIVE_SEC = 15.0
 
 
 def _run_collect_all() -> None:
@@ -24,6 +37,13 @@ def _run_collect_all() -> None:
 def _run_collect_project(testing_id: int) -> None:
     try:
         collector.collect_project_with_new_session(testing_id)
+    finally:
+        _end_project_collect(testing_id)
+
+
+def _run_collect_changed() -> None:
+    try:
+        collector.collect_changed_with_new_session()
     finally:
         _collect_lock.release()
 
@@ -36,6 +56,21 @@ def _begin_collect() -> None:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="collector already running")
 
 
+def _begin_project_collect(testing_id: int) -> None:
+    settings = get_settings()
+    if not settings.collect_enabled:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="collector disabled")
+    with _project_lock:
+        if testing_id in _active_projects:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="collector already running")
+        _active_projects.add(testing_id)
+
+
+def _end_project_collect(testing_id: int) -> None:
+    with _project_lock:
+        _active_projects.discard(testing_id)
+
+
 @router.post("/collect", response_model=CollectStarted, status_code=status.HTTP_202_ACCEPTED)
 def post_collect(background_tasks: BackgroundTasks, db: Session = Depends(get_db)) -> CollectStarted:
     targets = collector.count_collect_targets(db)
@@ -44,6 +79,18 @@ def post_collect(background_tasks: BackgroundTasks, db: Session = Depends(get_db
     return CollectStarted(started=True, targets=targets)
 
 
+@router.post("/collect/changed", response_model=CollectStarted, status_code=status.HTTP_202_ACCEPTED)
+def post_collect_changed(background_tasks: BackgroundTasks, db: Session = Depends(get_db)) -> CollectStarted:
+    """収集元ファイルが前回成功時から更新されたプロジェクトだけを収集する（定期実行用）。
+
+    targets は判定前の候補数。実際に収集した数は /collect/status・/collect/progress で確認する。
+    """
+    targets = collector.count_collect_targets(db)
+    _begin_collect()
+    background_tasks.add_task(_run_collect_changed)
+    return CollectStarted(started=True, targets=targets)
+
+
 @router.post("/projects/{testing_id}/collect", response_model=CollectStarted, status_code=status.HTTP_202_ACCEPTED)
 def post_project_collect(
     testing_id: int,
@@ -51,7 +98,7 @@ def post_project_collect(
     db: Session = Depends(get_db),
 ) -> CollectStarted:
     targets = collector.count_collect_targets(db, testing_id=testing_id)
-    _begin_collect()
+    _begin_project_collect(testing_id)
     background_tasks.add_task(_run_collect_project, testing_id)
     return CollectStarted(started=True, targets=targets)
 
@@ -63,13 +110,88 @@ def post_label_collect(
     db: Session = Depends(get_db),
 ) -> CollectResult:
     """1つの識別子だけを同期収集し、その結果（成功/失敗）を直接返す（情報更新ボタン用）。"""
-    _begin_collect()
+    _begin_project_collect(testing_id)
     try:
         return collector.collect_label(db, testing_id, label, settings=get_settings())
     finally:
-        _collect_lock.release()
+        _end_project_collect(testing_id)
 
 
 @router.get("/collect/status", response_model=CollectResult | None)
 def get_collect_status() -> CollectResult | None:
     return collector.get_last_result()
+
+
+@router.get("/collect/progress", response_model=CollectRunStatus | None)
+def get_collect_progress(db: Session = Depends(get_db)) -> CollectRunStatus | None:
+    """最新の収集実行の進捗（target 別状態・経過時間・残り時間見込み）。"""
+    return get_collect_run_status(db, timeout_sec=get_settings().collect_timeout_sec)
+
+
+@router.get("/collect/runs/{run_id}", response_model=CollectRunStatus)
+def get_collect_run(run_id: int, db: Session = Depends(get_db)) -> CollectRunStatus:
+    return require_collect_run_status(db, run_id, timeout_sec=get_settings().collect_timeout_sec)
+
+
+@router.post("/collect/runs/{run_id}/cancel", response_model=CollectRunStatus, status_code=status.HTTP_202_ACCEPTED)
+def cancel_collect_run(run_id: int, db: Session = Depends(get_db)) -> CollectRunStatus:
+    """実行中の収集を中断する。待機中の target は取りやめ、実行中の tstat は終了させる。
+
+    中断の完了（status=cancelled）は /collect/runs/{run_id} や進捗ストリームで確認する。
+    """
+    timeout_sec = get_settings().collect_timeout_sec
+    require_collect_run_status(db, run_id, timeout_sec=timeout_sec)
+    if not collector.cancel_collect_run(run_id):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="collect run is not running")
+    return require_collect_run_status(db, run_id, timeout_sec=timeout_sec)
+
+
+@router.get("/collect/logs", response_model=list[CollectLogItem])
+def get_collect_logs(
+    testing_id: int | None = None,
+    failed_only: bool = False,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+) -> list[CollectLogItem]:
+    """tstat の実行ログ（解析済みの出力・失敗分類・所要時間）を新しい順に返す。"""
+    return list_collect_logs(
+        db, testing_id=testing_id, failed_only=failed_only, since=since, until=until, limit=limit
+    )
+
+
+@router.get("/collect/progress/stream")
+async def stream_collect_progress(run_id: int | None = None) -> StreamingResponse:
+    """進捗を Server-Sent Events で配信する。実行が running でなくなった時点で終了する。"""
+    return StreamingResponse(
+        _progress_events(run_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _read_progress(run_id: int | None, timeout_sec: int) -> CollectRunStatus | None:
+    # 別プロセス・別スレッドの書き込みを読むため、ポーリングごとにセッションを開いて最新を取る
+    with SessionLocal() as db:
+        return get_collect_run_status(db, run_id, timeout_sec=timeout_sec)
+
+
+async def _progress_events(run_id: int | None) -> AsyncIterator[str]:
+    # 配信中はスレッドプールのワーカーも DB 接続も握らない。読み取りの間だけスレッドプールで接続を借りる
+    timeout_sec = get_settings().collect_timeout_sec
+    last_payload = None
+    last_sent = time.monotonic()
+    while True:
+        progress = await run_in_threadpool(_read_progress, run_id, timeout_sec)
+        payload = progress.model_dump_json() if progress else "null"
+        if payload != last_payload:
+            yield f"event: progress\ndata: {payload}\n\n"
+            last_payload = payload
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= PROGRESS_KEEPALIVE_SEC:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        if progress is None or progress.status != "running":
+            return
+        await asyncio.sleep(PROGRESS_POLL_INTERVAL_SEC)
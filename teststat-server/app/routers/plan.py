@@ -1,8 +1,9 @@
 from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 
+from app.crud.dashboard import build_dashboard_json, parse_dashboard_fields
 from app.crud.pb_chart import get_pb_chart
 from app.crud.plan import (
     activate_plan,
@@ -19,9 +20,13 @@ from app.crud.plan import (
     update_project_label,
 )
 from app.database import get_db
+from app.middleware import etag_matches
+from app.schemas.dashboard import DashboardResponse
 from app.schemas.pb_chart import PbChartResponse
 from app.schemas.plan import PlanCreate, PlanDetail, PlanItem, PlanLabelCreate, PlanLabelItem, PlanLabelOrderUpdate, PlanLabelUpdate, ProjectLabelUpdate
 from app.services.collector import build_project_list_yaml
+from app.services.data_version import get_data_version
+from app.services.pb_chart_cache import get_cached_pb_chart, pb_chart_etag, store_pb_chart
 
 router = APIRouter(prefix="/api/v1", tags=["plans"])
 
@@ -129,8 +134,43 @@ def delete_plan_route(plan_id: int, db: Session = Depends(get_db)) -> None:
 @router.get("/projects/{testing_id}/pb-chart", response_model=PbChartResponse)
 def read_pb_chart(
     testing_id: int,
+    request: Request,
     label: str | None = Query(default=None, description="テスト(label)で絞り込む。未指定=全テスト合算"),
     include_past_plans: bool = Query(default=False, description="過去の計画バージョンも返す"),
     db: Session = Depends(get_db),
-) -> PbChartResponse:
-    return get_pb_chart(db, testing_id, label=label, include_past_plans=include_past_plans)
+) -> Response:
+    # データバージョンが変わっていなければ ETag 照合で 304、またはキャッシュ済み JSON を返す。
+    key = (testing_id, label, include_past_plans)
+    version = get_data_version(db, testing_id)
+    etag = pb_chart_etag(key, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body = get_cached_pb_chart(key, version)
+    if body is None:
+        chart = get_pb_chart(db, testing_id, label=label, include_past_plans=include_past_plans)
+        body = chart.model_dump_json().encode("utf-8")
+        store_pb_chart(key, version, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+
+@router.get("/projects/{testing_id}/dashboard", response_model=DashboardResponse)
+def read_dashboard(
+    testing_id: int,
+    fields: str | None = Query(
+        default=None,
+        description="カンマ区切りで返す項目を選ぶ（summary,files,daily,people,pb_chart,plan_labels）。未指定=全項目",
+    ),
+    label: str | None = Query(default=None, description="PB図をテスト(label)で絞り込む。未指定=全テスト合算"),
+    include_past_plans: bool = Query(default=False, description="PB図に過去の計画バージョンも含める"),
+    db: Session = Depends(get_db),
+) -> Response:
+    """プロジェクト画面の個別 API をまとめて 1 セッション・1 レスポンスで返す。
+
+    ETag（304）と圧縮は app.middleware で付く。
+    """
+    selected = parse_dashboard_fields(fields)
+    body = build_dashboard_json(db, testing_id, selected, label=label, include_past_plans=include_past_plans)
+    return Response(content=body, media_type="application/json")
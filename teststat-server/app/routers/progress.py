@@ -1,11 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from dataclasses import replace
+from datetime import date, datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.crud.progress import get_daily_progress, get_file_progress, get_person_progress, get_progress_summary, list_testings, replace_progress
-from app.database import get_db
-from app.schemas.progress import DailyProgressItem, FileProgressItem, PersonProgressItem, ProgressPostResponse, ProgressRequest, ProgressSummaryResponse, TestingItem
+from app.crud.progress import (
+    ProgressGranularity,
+    ProgressRowQuery,
+    ProgressRowsPage,
+    daily_progress_page_async,
+    get_file_progress,
+    get_progress_summary,
+    list_testings,
+    person_progress_page_async,
+    replace_progress,
+)
+from app.crud.progress_snapshot import get_progress_as_of, list_progress_snapshots
+from app.database import get_async_db, get_db
+from app.schemas.progress import (
+    DailyProgressItem,
+    FileProgressItem,
+    PersonProgressItem,
+    ProgressAsOfResponse,
+    ProgressPostResponse,
+    ProgressRequest,
+    ProgressSnapshotSummary,
+    ProgressSummaryResponse,
+    TestingItem,
+)
+from app.services.json_stream import JSONStreamingResponse
 
 router = APIRouter(prefix="/api/v1", tags=["progress"])
+_MAX_PAGE_ROWS = 10000
+
+
+def _row_query(
+    date_from: date | None = Query(default=None, description="この日付以降（含む）"),
+    date_to: date | None = Query(default=None, description="この日付以前（含む）"),
+    label: list[str] | None = Query(default=None, description="テスト(label)で絞り込む。複数指定可"),
+    granularity: ProgressGranularity = Query(
+        default="day", description="day=日別 / week=週（月曜始まり）ごと / total=期間合計"
+    ),
+    limit: int | None = Query(default=None, ge=1, le=_MAX_PAGE_ROWS, description="1 ページの行数。未指定=全件"),
+    cursor: str | None = Query(default=None, description="前ページの X-Next-Cursor"),
+) -> ProgressRowQuery:
+    return ProgressRowQuery(
+        date_from=date_from,
+        date_to=date_to,
+        labels=tuple(label or ()),
+        granularity=granularity,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+def _page_response(page: ProgressRowsPage) -> JSONStreamingResponse:
+    # 本体は従来どおり配列のまま返し、続きがあるときだけ次ページの cursor をヘッダーで知らせる
+    headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else None
+    return JSONStreamingResponse(page.body, headers=headers)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # sent_at はタイムゾーンなし（既定値は UTC）で保存している
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
 
 
 @router.post("/progress", response_model=ProgressPostResponse)
@@ -17,6 +75,8 @@ def post_progress(payload: ProgressRequest, db: Session = Depends(get_db)) -> Pr
         raise
 
 
+# 集計を伴う参照は同期ルート（スレッドプール）で実行し、イベントループを止めない。
+# 行をそのまま流す daily・people だけが非同期セッションを使う。
 @router.get("/progress/{testing_id}", response_model=ProgressSummaryResponse)
 def read_progress_summary(testing_id: int, db: Session = Depends(get_db)) -> ProgressSummaryResponse:
     summary = get_progress_summary(db, testing_id)
@@ -25,6 +85,36 @@ def read_progress_summary(testing_id: int, db: Session = Depends(get_db)) -> Pro
     return summary
 
 
+@router.get("/progress/{testing_id}/as-of", response_model=ProgressAsOfResponse)
+def read_progress_as_of(
+    testing_id: int,
+    at: datetime = Query(..., description="この日時の時点の状態を返す（タイムゾーン付きは UTC に変換）"),
+    label: list[str] | None = Query(default=None, description="テスト(label)で絞り込む。複数指定可"),
+    db: Session = Depends(get_db),
+) -> ProgressAsOfResponse:
+    result = get_progress_as_of(db, testing_id, _naive_utc(at), tuple(label or ()))
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Progress history not found")
+    return result
+
+
+@router.get("/progress/{testing_id}/snapshots", response_model=list[ProgressSnapshotSummary])
+def read_progress_snapshots(
+    testing_id: int,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(default=200, ge=1, le=1000),
+    db: Session = Depends(get_db),
+) -> list[ProgressSnapshotSummary]:
+    return list_progress_snapshots(
+        db,
+        testing_id,
+        _naive_utc(since) if since else None,
+        _naive_utc(until) if until else None,
+        limit,
+    )
+
+
 @router.get("/progress/{testing_id}/files", response_model=list[FileProgressItem])
 def read_progress_files(testing_id: int, db: Session = Depends(get_db)) -> list[FileProgressItem]:
     # コレクション系は未開始（Testing 行なし）でも 200 + 空配列を返す。空集合は Not Found ではない。
@@ -32,14 +122,26 @@ def read_progress_files(testing_id: int, db: Session = Depends(get_db)) -> list[
 
 
 @router.get("/progress/{testing_id}/daily", response_model=list[DailyProgressItem])
-def read_progress_daily(testing_id: int, db: Session = Depends(get_db)) -> list[DailyProgressItem]:
+async def read_progress_daily(
+    testing_id: int,
+    query: ProgressRowQuery = Depends(_row_query),
+    db: AsyncSession = Depends(get_async_db),
+) -> JSONStreamingResponse:
     # コレクション系は未開始（Testing 行なし）でも 200 + 空配列を返す。空集合は Not Found ではない。
-    return get_daily_progress(db, testing_id)
+    # 行数が多いため response_model での再検証を通さず、select の結果をそのまま JSON にして流す。
+    return _page_response(await daily_progress_page_async(db, testing_id, query))
 
 
 @router.get("/progress/{testing_id}/people", response_model=list[PersonProgressItem])
-def read_progress_people(testing_id: int, db: Session = Depends(get_db)) -> list[PersonProgressItem]:
-    return get_person_progress(db, testing_id)
+async def read_progress_people(
+    testing_id: int,
+    query: ProgressRowQuery = Depends(_row_query),
+    person: list[str] | None = Query(default=None, description="担当者で絞り込む。複数指定可"),
+    db: AsyncSession = Depends(get_async_db),
+) -> JSONStreamingResponse:
+    if person:
+        query = replace(query, persons=tuple(person))
+    return _page_response(await person_progress_page_async(db, testing_id, query))
 
 
 @router.get("/testings", response_model=list[TestingItem])
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from app.config import Settings, get_settings
 from app.crud.project import create_project, delete_project, get_project, list_projects, update_project, update_project_order
 from app.database import get_db
+from app.schemas.progress import PROGRESS_FORMATS, PROGRESS_FORMATS_HEADER
 from app.schemas.project import ProjectCreate, ProjectOrderUpdate, ProjectResponse, ProjectUpdate
 from app.services.azure_devops import (
     AzureDevOpsAuthError,
@@ -58,8 +59,11 @@ def patch_project_order(payload: ProjectOrderUpdate, db: Session = Depends(get_d
 
 
 @router.get("/{testing_id}", response_model=ProjectResponse)
-def read_project(testing_id: int, db: Session = Depends(get_db)) -> ProjectResponse:
-    return get_project(db, testing_id)
+def read_project(testing_id: int, response: Response, db: Session = Depends(get_db)) -> ProjectResponse:
+    project = get_project(db, testing_id)
+    # CLI は送信前にこの API でアーカイブ状態を確認するため、ここで進捗 payload の対応形式を知らせる
+    response.headers[PROGRESS_FORMATS_HEADER] = ", ".join(PROGRESS_FORMATS)
+    return project
 
 
 @router.patch("/{testing_id}", response_model=ProjectResponse)
@@ -0,0 +1,27 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class DbPoolStatus(BaseModel):
+    name: Literal["sync", "async"]
+    pool_class: str
+    size: int | None = Field(None, description="常駐させる接続数（DB_POOL_SIZE）")
+    max_overflow: int | None = None
+    checked_out: int | None = Field(None, description="貸出中の接続数")
+    checked_in: int | None = Field(None, description="プール内で待機中の接続数")
+    overflow: int | None = Field(None, description="size を超えて開いている接続数")
+    waits: int = Field(0, description="接続の取得回数（起動後の累計）")
+    wait_total_ms: float = 0.0
+    wait_max_ms: float = 0.0
+    timeouts: int = Field(0, description="DB_POOL_TIMEOUT_SEC を超えて取得できなかった回数")
+
+
+class DbPoolResponse(BaseModel):
+    backend: str
+    pools: list[DbPoolStatus]
+
+
+class SnapshotCompactionResponse(BaseModel):
+    downsampled: int = Field(0, description="1 日 1 行に間引くために削除した行数")
+    expired: int = Field(0, description="保持期間を過ぎて削除した行数")
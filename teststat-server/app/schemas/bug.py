@@ -18,3 +18,26 @@ class OpenBugItem(BaseModel):
     state: str | None
     url: str | None
     is_suspended: bool = False
+
+
+class BugSyncFailure(BaseModel):
+    testing_id: int
+    reason: str             # not_found / not_configured / auth / other
+    message: str
+
+
+class BugBulkSyncStarted(BaseModel):
+    started: bool
+    targets: int
+
+
+class BugBulkSyncStatus(BaseModel):
+    status: str             # running / finished
+    targets: int            # 対象プロジェクト数
+    queries: int            # 実行する WIQL の数（親 Work Item・種別・タグの組み合わせ数）
+    work_items: int         # フィールドを取得した Bug 数（プロジェクト間の重複を除く）
+    synced: list[BugSyncResponse]
+    failed: list[BugSyncFailure]
+    auth_error: bool
+    started_at: datetime
+    finished_at: datetime | None = None
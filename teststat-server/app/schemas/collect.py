@@ -23,3 +23,52 @@ class CollectResult(BaseModel):
 class CollectStarted(BaseModel):
     started: bool
     targets: int
+
+
+class CollectRunTargetItem(BaseModel):
+    testing_id: int
+    project_name: str
+    state: str                       # queued / running / succeeded / failed
+    reason: str | None = None
+    message: str | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    elapsed_sec: float | None = None
+
+
+class CollectRunStatus(BaseModel):
+    run_id: int
+    kind: str
+    testing_id: int | None = None
+    status: str                      # running / finished / cancelled / interrupted
+    targets: int
+    queued: int
+    running: int
+    succeeded: int
+    failed: int
+    auth_error: bool
+    started_at: datetime
+    finished_at: datetime | None = None
+    elapsed_sec: float
+    eta_sec: float | None = None     # 完了済み target の平均所要時間から見積もった残り時間
+    items: list[CollectRunTargetItem]
+
+
+class CollectLogItem(BaseModel):
+    id: int
+    run_id: int | None = None
+    testing_id: int
+    project_name: str
+    mode: str                        # subprocess / inprocess
+    exit_code: int
+    reason: str | None = None        # 成功時は None
+    message: str | None = None
+    output: dict | None = None       # tstat の --json 出力
+    stdout_bytes: int
+    stderr_bytes: int
+    log_path: str | None = None      # 失敗時の出力全文（gzip）
+    started_at: datetime | None = None
+    finished_at: datetime
+    duration_ms: int | None = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+
+from app.schemas.pb_chart import PbChartResponse
+from app.schemas.plan import PlanLabelItem
+from app.schemas.progress import DailyProgressItem, FileProgressItem, PersonProgressItem, ProgressSummaryResponse
+
+DASHBOARD_FIELDS = ("summary", "files", "daily", "people", "pb_chart", "plan_labels")
+
+
+class DashboardResponse(BaseModel):
+    """プロジェクト画面 1 枚分のデータ。fields で選ばなかった項目はキーごと省略する。
+
+    summary は実績未取り込み（Testing 行なし）のとき null。
+    """
+
+    testing_id: int
+    summary: ProgressSummaryResponse | None = None
+    files: list[FileProgressItem] | None = None
+    daily: list[DailyProgressItem] | None = None
+    people: list[PersonProgressItem] | None = None
+    pb_chart: PbChartResponse | None = None
+    plan_labels: list[PlanLabelItem] | None = None
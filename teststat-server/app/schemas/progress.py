@@ -1,6 +1,14 @@
 from datetime import date, datetime, timezone
+from typing import Annotated
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Discriminator, Field, Tag, field_validator, model_validator
+
+# POST /api/v1/progress が受け付ける daily / by_person の形式。GET /api/v1/projects/{testing_id} の
+# レスポンスヘッダーで知らせ、CLI は columnar を含むときだけ列形式で送る。
+PROGRESS_FORMATS = ("rows", "columnar")
+PROGRESS_FORMATS_HEADER = "X-Progress-Formats"
+
+_Count = Annotated[int, Field(ge=0)]
 
 
 class ResultCounts(BaseModel):
@@ -29,6 +37,64 @@ class PersonProgressIn(BaseModel):
     executed: int | None = Field(None, ge=0)
 
 
+class _ColumnsIn(BaseModel):
+    """列形式（項目ごとの配列）の共通処理。配列は date と同じ長さでなければならない。
+
+    配列の各要素は pydantic-core が型・範囲をまとめて検証するため、行ごとにモデルを作る行形式より速い。
+    """
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        expected = len(self.date)
+        for name, value in self:
+            if value is not None and len(value) != expected:
+                field = type(self).model_fields[name]
+                raise ValueError(f"{field.alias or name} has {len(value)} items, expected {expected} (same as date)")
+        return self
+
+
+class DailyProgressColumns(_ColumnsIn):
+    """daily の列形式。{"date": [...], "Pass": [...], ...}。省略した列は 0（planned は null）扱い。"""
+
+    date: list[date]
+    pass_count: list[_Count] | None = Field(None, alias="Pass")
+    fixed: list[_Count] | None = Field(None, alias="Fixed")
+    fail: list[_Count] | None = Field(None, alias="Fail")
+    blocked: list[_Count] | None = Field(None, alias="Blocked")
+    suspend: list[_Count] | None = Field(None, alias="Suspend")
+    na: list[_Count] | None = Field(None, alias="N/A")
+    completed: list[_Count] | None = None
+    executed: list[_Count] | None = None
+    planned: list[_Count | None] | None = None
+
+
+class PersonProgressColumns(_ColumnsIn):
+    """by_person の列形式。completed / executed を省略（または null）した行は count と同じ値になる。"""
+
+    date: list[date]
+    person: list[Annotated[str, Field(min_length=1, max_length=255)]]
+    count: list[_Count]
+    completed: list[_Count | None] | None = None
+    executed: list[_Count | None] | None = None
+
+
+def _rows_or_columns(value: object) -> str:
+    return "rows" if isinstance(value, list) else "columnar"
+
+
+# 行形式（オブジェクトの配列）と列形式（配列のオブジェクト）を入力の型で振り分け、片方だけで検証する
+DailyProgressInput = Annotated[
+    Annotated[list[DailyProgressIn], Tag("rows")] | Annotated[DailyProgressColumns, Tag("columnar")],
+    Discriminator(_rows_or_columns),
+]
+PersonProgressInput = Annotated[
+    Annotated[list[PersonProgressIn], Tag("rows")] | Annotated[PersonProgressColumns, Tag("columnar")],
+    Discriminator(_rows_or_columns),
+]
+
+
 class FileProgressIn(BaseModel):
     file_name: str = Field(..., min_length=1, max_length=255)
     label: str | None = Field(None, max_length=255)
@@ -51,8 +117,8 @@ class FileProgressIn(BaseModel):
     start_date: date | None = None
     latest_update: date | None = None
     results: ResultCounts = Field(default_factory=ResultCounts)
-    daily: list[DailyProgressIn] = Field(default_factory=list)
-    by_person: list[PersonProgressIn] = Field(default_factory=list)
+    daily: DailyProgressInput = Field(default_factory=list)
+    by_person: PersonProgressInput = Field(default_factory=list)
     error: str | None = None
 
     @field_validator("source_url")
@@ -163,3 +229,36 @@ class TestingItem(BaseModel):
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ProgressSnapshotDailyItem(ResultCounts):
+    date: date
+    completed: int
+    executed: int
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ProgressSnapshotSummary(BaseModel):
+    label: str | None
+    sent_at: datetime = Field(..., description="この内容になった取り込みの日時")
+    file_count: int
+    total_cases: int
+    available_cases: int
+    completed: int
+    executed: int
+    start_date: date | None
+    end_date: date | None
+    downsampled: bool = Field(..., description="1 日 1 行に間引いた後の行か")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProgressSnapshotItem(ProgressSnapshotSummary):
+    daily: list[ProgressSnapshotDailyItem]
+
+
+class ProgressAsOfResponse(BaseModel):
+    testing_id: int
+    as_of: datetime
+    labels: list[ProgressSnapshotItem]
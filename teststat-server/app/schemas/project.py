@@ -88,3 +88,11 @@ class ProjectResponse(BaseModel):
 
 class ProjectOrderUpdate(BaseModel):
     testing_ids: list[int] = Field(..., min_length=1)
+
+
+class ProjectMetricsCheck(BaseModel):
+    """project_metrics の保存値と再計算値の食い違い（再構築コマンドの結果）。"""
+
+    testing_id: int
+    missing: bool
+    fields: list[str]
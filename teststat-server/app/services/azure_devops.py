@@ -3,21 +3,42 @@
 DevOps 側の情報取得のみ（読み取り専用）。PAT はユーザー環境変数 AZURE_DEVOPS_PAT
 から読み取る。AZURE_DEVOPS_USE_MOCK=true の場合は実接続せずモックデータを返す。
 
-HTTP 呼び出しは _request() に集約しており、将来の子チケット（バグ）件数取得など
-他エンドポイントからも再利用できるようにしている。
+HTTP 呼び出しは _request() / _request_async() に集約している。クライアントはプロセス内で共有し
+（keep-alive・h2 が入っていれば HTTP/2）、呼び出しごとの TLS ハンドシェイクを避ける。
+429/503 のスロットリング応答は Retry-After に従って待ってから再試行する。
 """
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import importlib.util
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
 
 import httpx
 
 from app.config import Settings, get_settings
 
 _HTTP_TIMEOUT = 10.0
+# 共有クライアントの接続プール。子 Bug のフィールド取得を並列に投げても足りる数にする。
+_POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+# HTTP/2 は h2 パッケージ（httpx[http2]）が入っている場合だけ使う
+_HTTP2 = importlib.util.find_spec("h2") is not None
+# Retry-After が無い・長すぎる場合の待ち時間（秒）
+_RETRY_DEFAULT_SEC = 5.0
+_RETRY_MAX_SEC = 60.0
+_RETRY_STATUS = (429, 503)
+
+_CLIENT: httpx.Client | None = None
+_CLIENT_FACTORY = None
+_ASYNC_CLIENT: httpx.AsyncClient | None = None
+_ASYNC_CLIENT_LOOP: asyncio.AbstractEventLoop | None = None
+_CLIENT_LOCK = threading.Lock()
 
 
 class AzureDevOpsError(Exception):
@@ -55,6 +76,7 @@ class BugWorkItem:
     state: str                  # 見送り/完了の判定に使う（Suspend 等）
     created_date: date | None   # 起票日
     finish_date: date | None    # 完了日／見送り確定日（None=未解消）
+    changed_at: datetime | None = None  # System.ChangedDate（UTC・naive）。差分同期の基準に使う
 
 
 def fetch_work_item(work_item_id: int, settings: Settings | None = None) -> WorkItemInfo:
@@ -120,7 +142,60 @@ def _mock_work_item_type(work_item_id: int, settings: Settings) -> str:
 
 def _build_client() -> httpx.Client:
     """HTTP クライアントを生成する。テストでは MockTransport 注入のため差し替える。"""
-    return httpx.Client(timeout=_HTTP_TIMEOUT)
+    return httpx.Client(timeout=_HTTP_TIMEOUT, limits=_POOL_LIMITS, http2=_HTTP2)
+
+
+def _build_async_client() -> httpx.AsyncClient:
+    """非同期 HTTP クライアントを生成する。テストでは MockTransport 注入のため差し替える。"""
+    return httpx.AsyncClient(timeout=_HTTP_TIMEOUT, limits=_POOL_LIMITS, http2=_HTTP2)
+
+
+def _get_client() -> httpx.Client:
+    """プロセス内で共有するクライアント。_build_client が差し替えられたら作り直す。"""
+    global _CLIENT, _CLIENT_FACTORY
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT.is_closed or _CLIENT_FACTORY is not _build_client:
+            if _CLIENT is not None:
+                _CLIENT.close()
+            _CLIENT = _build_client()
+            _CLIENT_FACTORY = _build_client
+        return _CLIENT
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """実行中のイベントループで共有する非同期クライアント。
+
+    AsyncClient の接続はイベントループに紐づくため、別のループ（asyncio.run ごと）では作り直す。
+    """
+    global _ASYNC_CLIENT, _ASYNC_CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    with _CLIENT_LOCK:
+        if _ASYNC_CLIENT is None or _ASYNC_CLIENT.is_closed or _ASYNC_CLIENT_LOOP is not loop:
+            _ASYNC_CLIENT = _build_async_client()
+            _ASYNC_CLIENT_LOOP = loop
+        return _ASYNC_CLIENT
+
+
+async def aclose_clients() -> None:
+    """共有クライアントを閉じる（アプリ終了時）。"""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        client, _CLIENT = _CLIENT, None
+    if client is not None:
+        client.close()
+    await aclose_async_client()
+
+
+async def aclose_async_client() -> None:
+    """実行中のイベントループの非同期クライアントを閉じる（asyncio.run で一時的に使った後など）。"""
+    global _ASYNC_CLIENT, _ASYNC_CLIENT_LOOP
+    with _CLIENT_LOCK:
+        if _ASYNC_CLIENT_LOOP is not asyncio.get_running_loop():
+            return
+        async_client = _ASYNC_CLIENT
+        _ASYNC_CLIENT = _ASYNC_CLIENT_LOOP = None
+    if async_client is not None:
+        await async_client.aclose()
 
 
 def _request(
@@ -136,6 +211,43 @@ def _request(
     GET（Work Item 取得）に加え、WIQL の POST も同じ認証・URL 構築・エラー変換で扱える。
     POST 時は `json=` を渡すと httpx が Content-Type: application/json を自動付与する。
     """
+    url, headers = _request_target(path, settings)
+    client = _get_client()
+    for attempt in range(settings.azure_devops_max_retries + 1):
+        try:
+            response = client.request(method, url, params=params, headers=headers, json=json)
+        except httpx.HTTPError as exc:  # タイムアウト・接続不可など
+            raise AzureDevOpsError(f"Azure DevOps への接続に失敗しました: {exc}") from exc
+        if response.status_code not in _RETRY_STATUS or attempt == settings.azure_devops_max_retries:
+            break
+        time.sleep(_retry_after(response))
+    return _check_response(response, path)
+
+
+async def _request_async(
+    path: str,
+    params: dict[str, str],
+    settings: Settings,
+    *,
+    method: str = "GET",
+    json: object | None = None,
+) -> httpx.Response:
+    """_request の非同期版。エラー変換・再試行は同じ。"""
+    url, headers = _request_target(path, settings)
+    client = _get_async_client()
+    for attempt in range(settings.azure_devops_max_retries + 1):
+        try:
+            response = await client.request(method, url, params=params, headers=headers, json=json)
+        except httpx.HTTPError as exc:
+            raise AzureDevOpsError(f"Azure DevOps への接続に失敗しました: {exc}") from exc
+        if response.status_code not in _RETRY_STATUS or attempt == settings.azure_devops_max_retries:
+            break
+        await asyncio.sleep(_retry_after(response))
+    return _check_response(response, path)
+
+
+def _request_target(path: str, settings: Settings) -> tuple[str, dict[str, str]]:
+    """URL と認証ヘッダを組み立てる。"""
     if not settings.azure_devops_pat or not settings.azure_devops_organization:
         raise AzureDevOpsNotConfigured(
             "AZURE_DEVOPS_PAT と AZURE_DEVOPS_ORGANIZATION を設定してください"
@@ -147,18 +259,18 @@ def _request(
     base = f"https://dev.azure.com/{settings.azure_devops_organization}"
     if settings.azure_devops_project:
         base = f"{base}/{settings.azure_devops_project}"
-    url = f"{base}/_apis/wit/{path}"
+    return f"{base}/_apis/wit/{path}", headers
 
-    try:
-        with _build_client() as client:
-            response = client.request(method, url, params=params, headers=headers, json=json)
-    except httpx.HTTPError as exc:  # タイムアウト・接続不可など
-        raise AzureDevOpsError(f"Azure DevOps への接続に失敗しました: {exc}") from exc
 
+def _check_response(response: httpx.Response, path: str) -> httpx.Response:
     if response.status_code == 404:
         raise WorkItemNotFound(f"Work Item が見つかりません: {path}")
     if response.status_code in (401, 403):
         raise AzureDevOpsAuthError("Azure DevOps の認証に失敗しました")
+    if response.status_code in _RETRY_STATUS:
+        raise AzureDevOpsError(
+            f"Azure DevOps のスロットリングにより再試行回数を超えました: {response.status_code}"
+        )
     if response.status_code >= 400:
         raise AzureDevOpsError(
             f"Azure DevOps が予期しない応答を返しました: {response.status_code}"
@@ -166,6 +278,24 @@ def _request(
     return response
 
 
+def _retry_after(response: httpx.Response) -> float:
+    """Retry-After（秒数または HTTP 日付）を待ち秒数にする。無い・解釈できない場合は既定値。"""
+    value = (response.headers.get("Retry-After") or "").strip()
+    if not value:
+        return _RETRY_DEFAULT_SEC
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return _RETRY_DEFAULT_SEC
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), _RETRY_MAX_SEC)
+
+
 def _fetch_work_item_remote(work_item_id: int, settings: Settings) -> WorkItemInfo:
     field_names = _configured_fields(settings)
     params = {"api-version": settings.azure_devops_api_version}
@@ -235,6 +365,8 @@ def _parse_date(value: object) -> date | None:
 
 # workitems?ids= は 1 リクエストあたり最大 200 件。
 _WORKITEMS_BATCH = 200
+# 差分同期の基準。フィールド設定に関わらず常に取得する。
+_CHANGED_DATE_FIELD = "System.ChangedDate"
 
 
 def fetch_child_bugs(
@@ -267,6 +399,7 @@ def _configured_bug_fields(settings: Settings) -> list[str]:
         settings.azure_devops_bug_state_field,
         *settings.azure_devops_bug_created_date_fields,
         *settings.azure_devops_bug_finish_date_fields,
+        _CHANGED_DATE_FIELD,
     ]
     result: list[str] = []
     for name in candidates:
@@ -285,6 +418,7 @@ def _wiql_child_bug_query(
     *,
     bug_work_item_type: str | None = None,
     bug_tag: str | None = None,
+    changed_since: datetime | None = None,
 ) -> str:
     bug_wit = _wiql_escape((bug_work_item_type or settings.azure_devops_bug_wit).strip())
     query = (
@@ -295,9 +429,20 @@ def _wiql_child_bug_query(
     tag = (bug_tag or "").strip()
     if tag:
         query += f" AND [System.Tags] Contains '{_wiql_escape(tag)}'"
+    if changed_since is not None:
+        # 同じ時刻に更新された Work Item を取りこぼさないよう >= で比較する（再取得は upsert で吸収する）
+        query += f" AND [{_CHANGED_DATE_FIELD}] >= '{changed_since.isoformat(timespec='milliseconds')}Z'"
     return query
 
 
+def _wiql_params(settings: Settings, changed_since: datetime | None) -> dict[str, str]:
+    params = {"api-version": settings.azure_devops_api_version}
+    if changed_since is not None:
+        # timePrecision を付けないと日付フィールドは日単位で比較される
+        params["timePrecision"] = "true"
+    return params
+
+
 def _fetch_child_bugs_remote(
     work_item_id: int,
     settings: Settings,
@@ -305,12 +450,28 @@ def _fetch_child_bugs_remote(
     bug_work_item_type: str | None = None,
     bug_tag: str | None = None,
 ) -> list[BugWorkItem]:
-    params = {"api-version": settings.azure_devops_api_version}
-
     # ① WIQL で子 Bug の ID 一覧を取得（fields と $expand の併用不可制約を回避）。
+    ids = fetch_child_bug_ids(
+        work_item_id, settings, bug_work_item_type=bug_work_item_type, bug_tag=bug_tag
+    )
+    # ② フィールドを 200 件ずつ一括取得。
+    return fetch_bugs_by_ids(ids, settings)
+
+
+def fetch_child_bug_ids(
+    work_item_id: int,
+    settings: Settings,
+    *,
+    bug_work_item_type: str | None = None,
+    bug_tag: str | None = None,
+    changed_since: datetime | None = None,
+) -> list[int]:
+    """子 Bug の ID 一覧だけを WIQL で取得する。changed_since 指定時はそれ以降に更新されたものだけ。"""
+    if settings.azure_devops_use_mock:
+        return [bug.work_item_id for bug in _mock_child_bugs(work_item_id, settings)]
     wiql_response = _request(
         "wiql",
-        params,
+        _wiql_params(settings, changed_since),
         settings,
         method="POST",
         json={
@@ -319,17 +480,112 @@ def _fetch_child_bugs_remote(
                 settings,
                 bug_work_item_type=bug_work_item_type,
                 bug_tag=bug_tag,
+                changed_since=changed_since,
             )
         },
     )
-    ids = [item["id"] for item in wiql_response.json().get("workItems", []) if "id" in item]
+    return _wiql_ids(wiql_response)
+
+
+def fetch_bugs_by_ids(ids: list[int], settings: Settings) -> list[BugWorkItem]:
+    """Work Item ID のフィールドを 200 件ずつ取得する。IGNORE 対象 State は除外する。
+
+    バッチは AZURE_DEVOPS_MAX_CONCURRENCY 件まで並列に投げる（結果は ID 順を保つ）。
+    """
     if not ids:
         return []
+    if settings.azure_devops_use_mock:
+        wanted = set(ids)
+        return [bug for bug in _mock_child_bugs(1, settings) if bug.work_item_id in wanted]
+    batches = _workitems_batch_params(ids, settings)
+    workers = min(settings.azure_devops_max_concurrency, len(batches))
+    if workers <= 1:
+        responses = [_request("workitems", batch_params, settings) for batch_params in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ado-workitems") as executor:
+            responses = list(executor.map(lambda batch_params: _request("workitems", batch_params, settings), batches))
+    return _bugs_from_responses(responses, settings)
+
+
+async def fetch_child_bugs_async(
+    work_item_id: int,
+    settings: Settings | None = None,
+    *,
+    bug_work_item_type: str | None = None,
+    bug_tag: str | None = None,
+) -> list[BugWorkItem]:
+    """fetch_child_bugs の非同期版。複数プロジェクトの取得を 1 つのイベントループで並行させる用途。"""
+    settings = settings or get_settings()
+    ids = await fetch_child_bug_ids_async(
+        work_item_id, settings, bug_work_item_type=bug_work_item_type, bug_tag=bug_tag
+    )
+    return await fetch_bugs_by_ids_async(ids, settings)
 
-    # ② フィールドを 200 件ずつ一括取得。
+
+async def fetch_child_bug_ids_async(
+    work_item_id: int,
+    settings: Settings,
+    *,
+    bug_work_item_type: str | None = None,
+    bug_tag: str | None = None,
+    changed_since: datetime | None = None,
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[int]:
+    """fetch_child_bug_ids の非同期版（フィールドは fetch_bugs_by_ids_async でまとめて取る）。"""
+    if settings.azure_devops_use_mock:
+        return [bug.work_item_id for bug in _mock_child_bugs(work_item_id, settings)]
+    semaphore = semaphore or asyncio.Semaphore(settings.azure_devops_max_concurrency)
+    async with semaphore:
+        wiql_response = await _request_async(
+            "wiql",
+            _wiql_params(settings, changed_since),
+            settings,
+            method="POST",
+            json={
+                "query": _wiql_child_bug_query(
+                    work_item_id,
+                    settings,
+                    bug_work_item_type=bug_work_item_type,
+                    bug_tag=bug_tag,
+                    changed_since=changed_since,
+                )
+            },
+        )
+    return _wiql_ids(wiql_response)
+
+
+async def fetch_bugs_by_ids_async(
+    ids: list[int],
+    settings: Settings,
+    *,
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[BugWorkItem]:
+    """Work Item ID のフィールドを 200 件ずつ並行に取得する。IGNORE 対象 State は除外する。
+
+    semaphore を渡すと、他の WIQL・フィールド取得と同時実行数の上限を共有する。
+    """
+    if not ids:
+        return []
+    if settings.azure_devops_use_mock:
+        wanted = set(ids)
+        return [bug for bug in _mock_child_bugs(1, settings) if bug.work_item_id in wanted]
+    semaphore = semaphore or asyncio.Semaphore(settings.azure_devops_max_concurrency)
+
+    async def fetch(batch_params: dict[str, str]) -> httpx.Response:
+        async with semaphore:
+            return await _request_async("workitems", batch_params, settings)
+
+    responses = await asyncio.gather(*(fetch(batch_params) for batch_params in _workitems_batch_params(ids, settings)))
+    return _bugs_from_responses(responses, settings)
+
+
+def _wiql_ids(response: httpx.Response) -> list[int]:
+    return [item["id"] for item in response.json().get("workItems", []) if "id" in item]
+
+
+def _workitems_batch_params(ids: list[int], settings: Settings) -> list[dict[str, str]]:
     field_names = _configured_bug_fields(settings)
-    bugs: list[BugWorkItem] = []
-    ignore_states = settings.azure_devops_bug_ignore_status_set
+    batches: list[dict[str, str]] = []
     for start in range(0, len(ids), _WORKITEMS_BATCH):
         batch = ids[start : start + _WORKITEMS_BATCH]
         batch_params = {
@@ -338,7 +594,14 @@ def _fetch_child_bugs_remote(
         }
         if field_names:
             batch_params["fields"] = ",".join(field_names)
-        response = _request("workitems", batch_params, settings)
+        batches.append(batch_params)
+    return batches
+
+
+def _bugs_from_responses(responses: list[httpx.Response], settings: Settings) -> list[BugWorkItem]:
+    bugs: list[BugWorkItem] = []
+    ignore_states = settings.azure_devops_bug_ignore_status_set
+    for response in responses:
         for item in response.json().get("value", []):
             bug = _build_bug(item, settings)
             if bug.state in ignore_states:  # Removed 等は完全除外
@@ -364,9 +627,23 @@ def _build_bug(item: dict, settings: Settings) -> BugWorkItem:
         state=fields.get(settings.azure_devops_bug_state_field) or "",
         created_date=_parse_first_date(fields, settings.azure_devops_bug_created_date_fields),
         finish_date=_parse_first_date(fields, settings.azure_devops_bug_finish_date_fields),
+        changed_at=_parse_utc_datetime(fields.get(_CHANGED_DATE_FIELD)),
     )
 
 
+def _parse_utc_datetime(value: object) -> datetime | None:
+    """ISO 8601 datetime を UTC の naive datetime にする（DB の DateTime はタイムゾーンなし）。"""
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
 def _mock_child_bugs(work_item_id: int, settings: Settings) -> list[BugWorkItem]:
     """動作確認用。実レスポンスの構造を模した決定的なサンプルを返す。
 
@@ -0,0 +1,330 @@
+"""全プロジェクトの不具合（子 Bug）一括同期。
+
+プロジェクトごとに `POST /projects/{testing_id}/bugs/sync` を繰り返す代わりに、
+① 親 Work Item・Work Item Type・タグの組み合わせごとに WIQL を 1 回だけ実行し、
+② 複数プロジェクトで重なる Work Item ID を除いてフィールドを 1 回だけ取得し、
+③ プロジェクトごとに BugSnapshot を洗い替える（1 プロジェクト 1 トランザクション）。
+
+Azure DevOps への問い合わせは 1 つのイベントループで並行させ、同時実行数は
+AZURE_DEVOPS_MAX_CONCURRENCY で抑える。進捗は get_bug_sync_status() で参照できる。
+
+incremental=True では、前回同期で記録した System.ChangedDate の最大値（Project.bug_changed_watermark）
+以降に更新された Bug だけを取得して upsert する。親から外れた Bug は差分に現れないため、
+AZURE_DEVOPS_BUG_RECONCILE_HOURS ごとに ID のみの WIQL で全件と突き合わせて削除する。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import Settings, get_settings
+from app.crud.bug import apply_bug_changes, replace_bugs
+from app.database import SessionLocal
+from app.models.project import Project
+from app.schemas.bug import BugBulkSyncStatus, BugSyncFailure, BugSyncResponse
+from app.services import azure_devops
+from app.services.azure_devops import (
+    AzureDevOpsAuthError,
+    AzureDevOpsError,
+    AzureDevOpsNotConfigured,
+    BugWorkItem,
+    WorkItemNotFound,
+)
+
+_STATUS: BugBulkSyncStatus | None = None
+_STATUS_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class _QueryKey:
+    parent_work_item_id: int
+    bug_work_item_type: str | None
+    bug_tag: str | None
+
+
+@dataclass(frozen=True)
+class _QueryPlan:
+    """組み合わせごとの取得方法。changed_since が None なら全件取得。"""
+
+    changed_since: datetime | None = None
+    reconcile: bool = False
+
+
+def get_bug_sync_status() -> BugBulkSyncStatus | None:
+    with _STATUS_LOCK:
+        return _STATUS.model_copy(deep=True) if _STATUS is not None else None
+
+
+def sync_all_bugs(
+    db: Session | None = None,
+    *,
+    settings: Settings | None = None,
+    incremental: bool = False,
+) -> BugBulkSyncStatus:
+    """bug_count_source=azure_devops の未アーカイブプロジェクトの不具合をまとめて同期する。"""
+    settings = settings or get_settings()
+    own_session = db is None
+    session = db or SessionLocal()
+    try:
+        projects = load_sync_targets(session)
+        keys = {project.testing_id: _query_key(project) for project in projects}
+        mark_started(projects)
+
+        fetched_at = _utcnow()
+        plans = _query_plans(projects, keys, settings, fetched_at) if incremental else {
+            key: _QueryPlan() for key in keys.values()
+        }
+        ids_by_key, keep_by_key, errors, bugs_by_id = asyncio.run(_fetch_all(plans, settings))
+        _update(lambda status: setattr(status, "work_items", len(bugs_by_id)))
+
+        suspend_states = settings.azure_devops_bug_suspend_status_set
+        for project in projects:
+            key = keys[project.testing_id]
+            if key in errors:
+                _add_failure(_failure(project.testing_id, errors[key]))
+                continue
+            ids = ids_by_key[key]
+            bugs = [bugs_by_id[work_item_id] for work_item_id in ids if work_item_id in bugs_by_id]
+            try:
+                if plans[key].changed_since is None:
+                    synced = replace_bugs(session, project.testing_id, bugs, suspend_states, fetched_at)
+                else:
+                    synced = apply_bug_changes(
+                        session,
+                        project.testing_id,
+                        bugs,
+                        set(ids) - bugs_by_id.keys(),
+                        suspend_states,
+                        fetched_at,
+                        keep_ids=keep_by_key.get(key),
+                    )
+            except Exception as exc:
+                session.rollback()
+                _add_failure(BugSyncFailure(testing_id=project.testing_id, reason="other", message=str(exc)))
+                continue
+            _update(lambda status: status.synced.append(synced))
+    finally:
+        # 途中で例外が出ても status が running のまま残らないようにする
+        _finish()
+        if own_session:
+            session.close()
+    return get_bug_sync_status()
+
+
+def sync_project_bugs_incremental(
+    db: Session,
+    project: Project,
+    *,
+    settings: Settings | None = None,
+) -> BugSyncResponse:
+    """1 プロジェクトの不具合を差分同期する。基準時刻が未記録なら全件取得して洗い替える。
+
+    Azure DevOps の例外はそのまま送出する（HTTP ステータスへの変換は呼び出し側）。
+    """
+    settings = settings or get_settings()
+    key = _query_key(project)
+    query_args = {"bug_work_item_type": key.bug_work_item_type, "bug_tag": key.bug_tag}
+    suspend_states = settings.azure_devops_bug_suspend_status_set
+    fetched_at = _utcnow()
+    watermark = project.bug_changed_watermark
+
+    if watermark is None:
+        ids = azure_devops.fetch_child_bug_ids(key.parent_work_item_id, settings, **query_args)
+        bugs = azure_devops.fetch_bugs_by_ids(ids, settings)
+        return _write(db, lambda: replace_bugs(db, project.testing_id, bugs, suspend_states, fetched_at))
+
+    changed_ids = azure_devops.fetch_child_bug_ids(
+        key.parent_work_item_id, settings, changed_since=watermark, **query_args
+    )
+    keep_ids = None
+    if _reconcile_due(project, settings, fetched_at):
+        keep_ids = set(azure_devops.fetch_child_bug_ids(key.parent_work_item_id, settings, **query_args))
+    bugs = azure_devops.fetch_bugs_by_ids(changed_ids, settings)
+    # 差分に含まれるのに取得結果にない ID は IGNORE 対象 State に変わったもの
+    removed_ids = set(changed_ids) - {bug.work_item_id for bug in bugs}
+    return _write(
+        db,
+        lambda: apply_bug_changes(
+            db, project.testing_id, bugs, removed_ids, suspend_states, fetched_at, keep_ids=keep_ids
+        ),
+    )
+
+
+def load_sync_targets(db: Session) -> list[Project]:
+    """一括同期の対象（bug_count_source=azure_devops の未アーカイブプロジェクト）。"""
+    return list(db.scalars(
+        select(Project)
+        .where(Project.bug_count_source == "azure_devops", Project.archived.is_(False))
+        .order_by(Project.testing_id)
+    ))
+
+
+def mark_started(projects: list[Project]) -> None:
+    """進捗を running で初期化する。
+
+    バックグラウンド実行の開始前に呼ぶと、直後の status 取得で前回の結果を返さない。
+    """
+    global _STATUS
+    with _STATUS_LOCK:
+        _STATUS = BugBulkSyncStatus(
+            status="running",
+            targets=len(projects),
+            queries=len({_query_key(project) for project in projects}),
+            work_items=0,
+            synced=[],
+            failed=[],
+            auth_error=False,
+            started_at=datetime.now(),
+        )
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _write(db: Session, apply):
+    try:
+        return apply()
+    except Exception:
+        db.rollback()
+        raise
+
+
+def _reconcile_due(project: Project, settings: Settings, now: datetime) -> bool:
+    hours = settings.azure_devops_bug_reconcile_hours
+    if hours <= 0 or project.bug_reconciled_at is None:
+        return True
+    return now - project.bug_reconciled_at >= timedelta(hours=hours)
+
+
+def _query_plans(
+    projects: list[Project],
+    keys: dict[int, _QueryKey],
+    settings: Settings,
+    now: datetime,
+) -> dict[_QueryKey, _QueryPlan]:
+    """組み合わせを共有するプロジェクトのうち最も古い基準時刻から差分を取る。
+
+    1 つでも基準時刻のないプロジェクトがあれば、その組み合わせは全件取得する。
+    """
+    grouped: dict[_QueryKey, list[Project]] = {}
+    for project in projects:
+        grouped.setdefault(keys[project.testing_id], []).append(project)
+    plans: dict[_QueryKey, _QueryPlan] = {}
+    for key, members in grouped.items():
+        watermarks = [project.bug_changed_watermark for project in members]
+        if any(watermark is None for watermark in watermarks):
+            plans[key] = _QueryPlan()
+            continue
+        plans[key] = _QueryPlan(
+            changed_since=min(watermarks),
+            reconcile=any(_reconcile_due(project, settings, now) for project in members),
+        )
+    return plans
+
+
+def _query_key(project: Project) -> _QueryKey:
+    return _QueryKey(
+        parent_work_item_id=project.bug_parent_work_item_id or project.testing_id,
+        bug_work_item_type=(project.bug_work_item_type or "").strip() or None,
+        bug_tag=(project.bug_tag or "").strip() or None,
+    )
+
+
+async def _fetch_all(
+    plans: dict[_QueryKey, _QueryPlan],
+    settings: Settings,
+) -> tuple[
+    dict[_QueryKey, list[int]],
+    dict[_QueryKey, set[int]],
+    dict[_QueryKey, AzureDevOpsError],
+    dict[int, BugWorkItem],
+]:
+    """組み合わせごとの子 Bug ID（差分なら変更分）・突き合わせ用の全 ID・失敗した組み合わせの例外・
+    ID ごとの Bug を返す。"""
+    semaphore = asyncio.Semaphore(settings.azure_devops_max_concurrency)
+    ordered = sorted(plans, key=lambda key: (key.parent_work_item_id, key.bug_work_item_type or "", key.bug_tag or ""))
+    reconciled = [key for key in ordered if plans[key].changed_since is not None and plans[key].reconcile]
+
+    def query(key: _QueryKey, changed_since: datetime | None):
+        return azure_devops.fetch_child_bug_ids_async(
+            key.parent_work_item_id,
+            settings,
+            bug_work_item_type=key.bug_work_item_type,
+            bug_tag=key.bug_tag,
+            changed_since=changed_since,
+            semaphore=semaphore,
+        )
+
+    try:
+        results = await asyncio.gather(
+            *(query(key, plans[key].changed_since) for key in ordered),
+            *(query(key, None) for key in reconciled),
+            return_exceptions=True,
+        )
+        ids_by_key: dict[_QueryKey, list[int]] = {}
+        keep_by_key: dict[_QueryKey, set[int]] = {}
+        errors: dict[_QueryKey, AzureDevOpsError] = {}
+        for index, result in enumerate(results):
+            key = ordered[index] if index < len(ordered) else reconciled[index - len(ordered)]
+            if isinstance(result, AzureDevOpsError):
+                errors[key] = result
+            elif isinstance(result, BaseException):
+                raise result
+            elif index < len(ordered):
+                ids_by_key[key] = result
+            else:
+                keep_by_key[key] = set(result)
+        for key in errors:
+            ids_by_key.pop(key, None)
+        unique_ids = sorted({work_item_id for ids in ids_by_key.values() for work_item_id in ids})
+        try:
+            bugs = await azure_devops.fetch_bugs_by_ids_async(unique_ids, settings, semaphore=semaphore)
+        except AzureDevOpsError as exc:
+            # フィールド取得に失敗した場合は、WIQL に成功した組み合わせもすべて失敗扱いにする
+            errors.update({key: exc for key in ids_by_key})
+            return {}, {}, errors, {}
+        return ids_by_key, keep_by_key, errors, {bug.work_item_id: bug for bug in bugs}
+    finally:
+        await azure_devops.aclose_async_client()
+
+
+def _failure(testing_id: int, exc: AzureDevOpsError) -> BugSyncFailure:
+    if isinstance(exc, WorkItemNotFound):
+        reason = "not_found"
+    elif isinstance(exc, AzureDevOpsNotConfigured):
+        reason = "not_configured"
+    elif isinstance(exc, AzureDevOpsAuthError):
+        reason = "auth"
+    else:
+        reason = "other"
+    return BugSyncFailure(testing_id=testing_id, reason=reason, message=str(exc))
+
+
+def _update(apply) -> None:
+    with _STATUS_LOCK:
+        if _STATUS is not None:
+            apply(_STATUS)
+
+
+def _add_failure(failure: BugSyncFailure) -> None:
+    def apply(status: BugBulkSyncStatus) -> None:
+        status.failed.append(failure)
+        if failure.reason == "auth":
+            status.auth_error = True
+
+    _update(apply)
+
+
+def _finish() -> None:
+    def apply(status: BugBulkSyncStatus) -> None:
+        status.status = "finished"
+        status.finished_at = datetime.now()
+
+    _update(apply)
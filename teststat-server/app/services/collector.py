@@ -1,27 +1,70 @@
 from __future__ import annotations
 
+import bisect
 import ctypes
+import gzip
+import itertools
 import json
 import os
+import queue
 import shlex
+import shutil
 import subprocess
 import tempfile
-from dataclasses import dataclass
-from datetime import datetime
+import threading
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from multiprocessing.process import BaseProcess
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable
 
-from sqlalchemy import func, select
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app.config import Settings, get_settings
+from app.crud.collect_run import (
+    add_collect_log,
+    create_collect_run,
+    estimate_collect_costs,
+    estimate_collect_timeouts,
+    finish_collect_run,
+    mark_collect_target_finished,
+    mark_collect_target_running,
+    prune_collect_logs,
+)
+from app.crud.progress import replace_progress
+from app.crud.progress_snapshot import compact_progress_snapshots
 from app.database import SessionLocal
+from app.models.collect import CollectLog
 from app.models.plan import PlanLabel
 from app.models.project import Project
 from app.schemas.collect import CollectFailure, CollectResult
+from app.schemas.progress import ProgressRequest
+from app.services.collector_inprocess import run_target_inprocess
+from app.services.sharepoint import SharePointAuthError, SharePointError, SourceVersion, fetch_source_versions
 
 _LAST_RESULT: CollectResult | None = None
 
+# 実行待ち行列の優先度（小さいほど先）。画面からの収集は定期の一括収集より先に実行する。
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+# tstat の出力はファイルへ書き出し、失敗理由の判定用にはこの末尾だけをメモリに読む
+OUTPUT_TAIL_BYTES = 256 * 1024
+TIMEOUT_RETURNCODE = 124
+CANCELLED_RETURNCODE = 130
+# terminate 後、kill するまで待つ秒数
+_TERMINATE_GRACE_SEC = 10
+
 
 @dataclass(frozen=True)
 class CollectFile:
@@ -42,6 +85,128 @@ class CollectTarget:
     files: tuple[CollectFile, ...]
 
 
+@dataclass(order=True)
+class _QueuedJob:
+    sort_key: tuple[int, float, int]
+    testing_id: int = field(compare=False)
+    run: Callable[[], object] = field(compare=False)
+    future: Future = field(compare=False)
+
+
+class _CollectQueue:
+    """プロセス内で共有する tstat の実行待ち行列。
+
+    優先度 → 見積もり所要時間の長い順（LPT）に取り出し、同じ testing_id は同時に実行しない。
+    一括収集の途中でも、後から積まれた画面からの収集が次に空いたワーカーで実行される。
+    ワーカースレッドは待ち行列が空になると終了し、投入時に必要な数だけ起動する。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: list[_QueuedJob] = []
+        self._running_ids: set[int] = set()
+        self._workers = 0
+        self._max_workers = 1
+        self._seq = itertools.count()
+
+    def submit(
+        self,
+        testing_id: int,
+        run: Callable[[], object],
+        *,
+        priority: int,
+        cost: float,
+        max_workers: int,
+    ) -> Future:
+        future: Future = Future()
+        with self._lock:
+            bisect.insort(self._pending, _QueuedJob((priority, -cost, next(self._seq)), testing_id, run, future))
+            self._max_workers = max(max_workers, 1)
+            start_worker = self._workers < self._max_workers
+            if start_worker:
+                self._workers += 1
+        if start_worker:
+            threading.Thread(target=self._work, name="tstat", daemon=True).start()
+        return future
+
+    def _take(self) -> _QueuedJob | None:
+        for index, job in enumerate(self._pending):
+            if job.testing_id not in self._running_ids:
+                self._running_ids.add(job.testing_id)
+                return self._pending.pop(index)
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                job = self._take()
+                if job is None:
+                    # 残りが実行中の testing_id 待ちだけなら、そのワーカーが続けて拾う
+                    self._workers -= 1
+                    return
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        job.future.set_result(job.run())
+                    except BaseException as exc:
+                        job.future.set_exception(exc)
+            finally:
+                with self._lock:
+                    self._running_ids.discard(job.testing_id)
+
+
+_QUEUE = _CollectQueue()
+
+
+class _RunControl:
+    """実行中の収集 1 回分の中断要求と、その実行で起動中の tstat（inprocess では集計用の子プロセス）。"""
+
+    def __init__(self) -> None:
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: set[subprocess.Popen | BaseProcess] = set()
+
+    def attach(self, process: subprocess.Popen | BaseProcess) -> bool:
+        """起動したプロセスを登録する。中断済みなら登録せず False を返す。"""
+        with self._lock:
+            if self.cancelled.is_set():
+                return False
+            self._processes.add(process)
+            return True
+
+    def detach(self, process: subprocess.Popen | BaseProcess) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled.set()
+            processes = list(self._processes)
+        for process in processes:
+            process.terminate()
+
+
+_RUN_CONTROLS: dict[int, _RunControl] = {}
+_RUN_CONTROLS_LOCK = threading.Lock()
+
+# このプロセスで最後に収集の後の履歴の間引き・削除を行った日時
+_LAST_SNAPSHOT_COMPACTION: datetime | None = None
+_SNAPSHOT_COMPACTION_LOCK = threading.Lock()
+
+
+def cancel_collect_run(run_id: int) -> bool:
+    """実行中の収集を中断する。待機中の target は実行せず、実行中の tstat（inprocess では集計中の子プロセス）は終了させる。
+
+    このプロセスで実行中の run_id でなければ False。
+    """
+    with _RUN_CONTROLS_LOCK:
+        control = _RUN_CONTROLS.get(run_id)
+    if control is None:
+        return False
+    control.cancel()
+    return True
+
+
 def get_last_result() -> CollectResult | None:
     return _LAST_RESULT
 
@@ -88,6 +253,11 @@ def collect_label(db: Session, testing_id: int, label: str, *, settings: Setting
     return _collect(db, settings=settings, testing_id=testing_id, label=label, record=False)
 
 
+def collect_changed(db: Session | None = None, *, settings: Settings | None = None) -> CollectResult:
+    """収集元ファイルの eTag が前回成功時から変わったプロジェクトだけを収集する（定期実行用）。"""
+    return _collect(db, settings=settings, testing_id=None, changed_only=True)
+
+
 def collect_all_with_new_session() -> CollectResult:
     with SessionLocal() as db:
         return collect_all(db, settings=get_settings())
@@ -98,6 +268,11 @@ def collect_project_with_new_session(testing_id: int) -> CollectResult:
         return collect_project(db, testing_id, settings=get_settings())
 
 
+def collect_changed_with_new_session() -> CollectResult:
+    with SessionLocal() as db:
+        return collect_changed(db, settings=get_settings())
+
+
 def _collect(
     db: Session | None,
     *,
@@ -105,57 +280,332 @@ def _collect(
     testing_id: int | None,
     label: str | None = None,
     record: bool = True,
+    changed_only: bool = False,
 ) -> CollectResult:
     settings = settings or get_settings()
     own_session = db is None
     session = db or SessionLocal()
     started_at = datetime.now()
     result = CollectResult(targets=0, succeeded=[], failed=[], auth_error=False, started_at=started_at)
+    run_id = None
+    control = None
+    aborted = False
 
     try:
         if not settings.collect_enabled:
             result.failed.append(CollectFailure(testing_id=testing_id or 0, reason="other", message="collector disabled"))
             return _finish(result, record=record)
         targets = _load_targets(session, testing_id=testing_id, label=label)
+        versions: dict[str, SourceVersion | None] = {}
+        if changed_only and targets:
+            try:
+                targets, versions = _select_changed_targets(session, targets, settings)
+            except SharePointError as exc:
+                auth_error = isinstance(exc, SharePointAuthError)
+                result.auth_error = auth_error
+                result.failed.append(CollectFailure(
+                    testing_id=0,
+                    reason="auth" if auth_error else "download",
+                    message=str(exc),
+                ))
+                return _finish(result, record=record)
         result.targets = len(targets)
         if not targets:
             return _finish(result, record=record)
-        if not settings.tstat_command.strip():
+        file_counts = {target.testing_id: len(target.files) for target in targets}
+        costs = estimate_collect_costs(session, file_counts)
+        timeouts = estimate_collect_timeouts(
+            session,
+            file_counts,
+            max_sec=settings.collect_timeout_sec,
+            factor=settings.collect_timeout_factor,
+            min_sec=settings.collect_timeout_min_sec,
+        )
+        targets.sort(key=lambda target: -costs[target.testing_id])
+        missing_setting = _missing_command_setting(settings)
+        if missing_setting:
             for target in targets:
                 result.failed.append(CollectFailure(
                     testing_id=target.testing_id,
                     reason="other",
-                    message="TSTAT_COMMAND is not configured",
+                    message=f"{missing_setting} is not configured",
                 ))
             return _finish(result, record=record)
 
         _ensure_log_dir(settings)
         base_work_dir = Path(settings.collect_work_dir) if settings.collect_work_dir.strip() else None
         with tempfile.TemporaryDirectory(prefix="teststat_collect_", dir=str(base_work_dir) if base_work_dir else None) as tmp:
+            # tstat はサブプロセスなので、共有待ち行列のワーカーは待ち合わせだけを担う。
+            # 開始・完了はキューでこのスレッドに集め、結果の集約・ログ・進捗の DB 書き込みは
+            # ここだけで行う（Session をスレッド間で共有しない、ログの行が混ざらない）。
+            workers = max(1, min(settings.collect_concurrency, len(targets)))
+            priority = PRIORITY_BULK if testing_id is None else PRIORITY_INTERACTIVE
+            if record:
+                run_id = create_collect_run(
+                    session,
+                    [(target.testing_id, target.project_name) for target in targets],
+                    kind=_run_kind(testing_id, changed_only),
+                    testing_id=testing_id,
+                    concurrency=workers,
+                    started_at=started_at,
+                    file_counts=file_counts,
+                )
+                control = _RunControl()
+                with _RUN_CONTROLS_LOCK:
+                    _RUN_CONTROLS[run_id] = control
+            events: queue.Queue[tuple[str, CollectTarget | Future]] = queue.Queue()
+            futures: list[Future] = []
             for target in targets:
-                yaml_path = Path(tmp) / f"collect_{target.testing_id}.yaml"
-                yaml_path.write_text(build_list_yaml(target), encoding="utf-8", newline="\n")
-                try:
-                    completed = _run_tstat(settings, yaml_path)
-                except subprocess.TimeoutExpired as exc:
-                    completed = subprocess.CompletedProcess(
-                        args=exc.cmd,
-                        returncode=124,
-                        stdout=exc.stdout or "",
-                        stderr=(exc.stderr or "") + f"\ntstat timed out after {settings.collect_timeout_sec} seconds",
+                future = _QUEUE.submit(
+                    target.testing_id,
+                    lambda target=target: _run_target_safely(
+                        settings,
+                        Path(tmp),
+                        target,
+                        events,
+                        timeout_sec=timeouts[target.testing_id],
+                        control=control,
+                    ),
+                    priority=priority,
+                    cost=costs[target.testing_id],
+                    max_workers=settings.collect_concurrency,
+                )
+                future.add_done_callback(lambda done: events.put(("finished", done)))
+                futures.append(future)
+            remaining = len(targets)
+            started_times: dict[int, datetime] = {}
+            try:
+                while remaining:
+                    kind, payload = events.get()
+                    if kind == "started":
+                        started_times[payload.testing_id] = datetime.now()
+                        if run_id is not None:
+                            mark_collect_target_running(
+                                session, run_id, payload.testing_id, started_times[payload.testing_id]
+                            )
+                        continue
+                    target, yaml_path, completed, progress = payload.result()
+                    if progress is not None:
+                        try:
+                            completed = _ingest_progress(session, completed, progress)
+                        except Exception as exc:
+                            session.rollback()
+                            completed = _failed_process(
+                                f"進捗データの取り込み中にエラーが発生しました: {type(exc).__name__}: {exc}", completed.args
+                            )
+                    output = _parse_output(completed, _output_paths(yaml_path)[0] if yaml_path is not None else None)
+                    failure = _record_completed(result, target, completed, output)
+                    _store_log(
+                        session,
+                        settings,
+                        run_id=run_id,
+                        target=target,
+                        yaml_path=yaml_path,
+                        completed=completed,
+                        output=output,
+                        failure=failure,
+                        started_at=started_times.get(target.testing_id),
                     )
-                if completed.returncode == 0:
-                    result.succeeded.append(target.testing_id)
-                else:
-                    failure = _classify_failure(target.testing_id, completed)
-                    if failure.reason == "auth":
-                        result.auth_error = True
-                    result.failed.append(failure)
-                _write_log(settings, target, yaml_path, completed)
-        return _finish(result, record=record)
+                    if changed_only and failure is None:
+                        _store_source_versions(session, target, versions)
+                    if run_id is not None:
+                        mark_collect_target_finished(
+                            session, run_id, target.testing_id, failure, datetime.now()
+                        )
+                    remaining -= 1
+            finally:
+                if remaining:
+                    # 途中で抜けるときは残りを取りやめ、実行中の target が作業ディレクトリを使い終わるのを待つ
+                    aborted = True
+                    _abandon_targets(futures, control)
+        _prune_logs(session, settings)
+        _compact_snapshots_if_due(session, settings)
+        _finish(result, record=record)
+        return result
+    except BaseException:
+        session.rollback()
+        raise
     finally:
-        if own_session:
-            session.close()
+        try:
+            if run_id is not None:
+                if result.finished_at is None:
+                    _finish(result, record=record)
+                with _RUN_CONTROLS_LOCK:
+                    _RUN_CONTROLS.pop(run_id, None)
+                finish_collect_run(session, run_id, result, cancelled=control.cancelled.is_set() and not aborted)
+        finally:
+            if own_session:
+                session.close()
+
+
+def _run_kind(testing_id: int | None, changed_only: bool) -> str:
+    if changed_only:
+        return "changed"
+    return "all" if testing_id is None else "project"
+
+
+def _select_changed_targets(
+    db: Session,
+    targets: list[CollectTarget],
+    settings: Settings,
+) -> tuple[list[CollectTarget], dict[str, SourceVersion | None]]:
+    """収集元の現在の eTag を取得し、前回成功時から変わったファイルを含む target だけを返す。
+
+    URL が変わった・eTag が取れなかった・未収集のラベルは「変更あり」として扱う。
+    """
+    versions = fetch_source_versions(
+        [file.source_url for target in targets for file in target.files],
+        settings,
+    )
+    rows = db.execute(
+        select(PlanLabel.testing_id, PlanLabel.label, PlanLabel.source_etag, PlanLabel.source_etag_url)
+        .where(PlanLabel.testing_id.in_([target.testing_id for target in targets]))
+    ).all()
+    seen = {(row.testing_id, row.label): (row.source_etag, row.source_etag_url) for row in rows}
+
+    def is_changed(testing_id: int, file: CollectFile) -> bool:
+        version = versions.get(file.source_url)
+        if version is None or not version.etag:
+            return True
+        etag, etag_url = seen.get((testing_id, file.label), (None, None))
+        return etag_url != file.source_url or etag != version.etag
+
+    changed = [
+        target for target in targets
+        if any(is_changed(target.testing_id, file) for file in target.files)
+    ]
+    return changed, versions
+
+
+def _store_source_versions(
+    db: Session,
+    target: CollectTarget,
+    versions: dict[str, SourceVersion | None],
+) -> None:
+    """収集に成功した target の各ラベルに、判定に使った eTag を記録する。"""
+    for file in target.files:
+        version = versions.get(file.source_url)
+        if version is None or not version.etag:
+            continue
+        db.execute(
+            update(PlanLabel)
+            .where(PlanLabel.testing_id == target.testing_id, PlanLabel.label == file.label)
+            .values(
+                source_etag=version.etag,
+                source_etag_url=file.source_url,
+                source_last_modified=version.last_modified,
+            )
+        )
+    db.commit()
+
+
+def _missing_command_setting(settings: Settings) -> str | None:
+    if settings.collect_mode == "inprocess":
+        return None if settings.tstat_cli_dir.strip() else "TSTAT_CLI_DIR"
+    return None if settings.tstat_command.strip() else "TSTAT_COMMAND"
+
+
+def _run_target(
+    settings: Settings,
+    work_dir: Path,
+    target: CollectTarget,
+    events: queue.Queue | None = None,
+    *,
+    timeout_sec: int | None = None,
+    control: _RunControl | None = None,
+) -> tuple[CollectTarget, Path | None, subprocess.CompletedProcess[str], dict | None]:
+    """target を 1 件収集する。戻り値の最後は inprocess モードで DB へ書き込む進捗 payload。"""
+    if control is not None and control.cancelled.is_set():
+        return target, None, _cancelled_process(), None
+    if events is not None:
+        events.put(("started", target))
+    timeout_sec = timeout_sec or settings.collect_timeout_sec
+    if settings.collect_mode == "inprocess":
+        outcome = run_target_inprocess(settings, target, timeout_sec, control=control)
+        if outcome.cancelled:
+            return target, None, _cancelled_process(), None
+        completed = outcome.to_completed()
+        if outcome.timed_out:
+            completed.returncode = TIMEOUT_RETURNCODE
+        return target, None, completed, outcome.payload
+    yaml_path = work_dir / f"collect_{target.testing_id}.yaml"
+    yaml_path.write_text(build_list_yaml(target), encoding="utf-8", newline="\n")
+    completed = _run_tstat(settings, yaml_path, timeout_sec=timeout_sec, control=control)
+    return target, yaml_path, completed, None
+
+
+def _run_target_safely(
+    settings: Settings,
+    work_dir: Path,
+    target: CollectTarget,
+    events: queue.Queue | None = None,
+    *,
+    timeout_sec: int | None = None,
+    control: _RunControl | None = None,
+) -> tuple[CollectTarget, Path | None, subprocess.CompletedProcess[str], dict | None]:
+    """_run_target の例外（TSTAT_COMMAND の誤りによる OSError など）をその target だけの失敗にする。"""
+    try:
+        return _run_target(settings, work_dir, target, events, timeout_sec=timeout_sec, control=control)
+    except Exception as exc:
+        return target, None, _failed_process(f"収集を実行できませんでした: {type(exc).__name__}: {exc}"), None
+
+
+def _abandon_targets(futures: list[Future], control: _RunControl | None) -> None:
+    if control is not None:
+        control.cancel()
+    for future in futures:
+        future.cancel()
+    wait(futures)
+
+
+def _failed_process(message: str, args: list[str] | None = None) -> subprocess.CompletedProcess[str]:
+    return subprocess.CompletedProcess(args=args or [], returncode=1, stdout="", stderr=message)
+
+
+def _cancelled_process() -> subprocess.CompletedProcess[str]:
+    return subprocess.CompletedProcess(
+        args=[], returncode=CANCELLED_RETURNCODE, stdout="", stderr="collect run cancelled"
+    )
+
+
+def _ingest_progress(
+    db: Session,
+    completed: subprocess.CompletedProcess[str],
+    payload: dict,
+) -> subprocess.CompletedProcess[str]:
+    """inprocess モードの集計結果を取り込む。失敗時は tstat の送信失敗と同じく report として分類させる。
+
+    SQLite のロック待ち切れ（database is locked）や一意制約違反などの DB エラーもここで扱い、
+    ロールバックしてその target だけの失敗にする。
+    """
+    try:
+        replace_progress(db, ProgressRequest.model_validate(payload))
+    except (ValidationError, HTTPException, SQLAlchemyError) as exc:
+        db.rollback()
+        detail = exc.detail if isinstance(exc, HTTPException) else str(exc)
+        return subprocess.CompletedProcess(
+            args=completed.args,
+            returncode=1,
+            stdout=completed.stdout,
+            stderr=f"進捗データの取り込みに失敗しました (progress): {detail}",
+        )
+    return completed
+
+
+def _record_completed(
+    result: CollectResult,
+    target: CollectTarget,
+    completed: subprocess.CompletedProcess[str],
+    output: dict | None = None,
+) -> CollectFailure | None:
+    if completed.returncode == 0:
+        result.succeeded.append(target.testing_id)
+        return None
+    failure = _classify_failure(target.testing_id, completed, output)
+    if failure.reason == "auth":
+        result.auth_error = True
+    result.failed.append(failure)
+    return failure
 
 
 def _finish(result: CollectResult, *, record: bool = True) -> CollectResult:
@@ -269,22 +719,93 @@ def _yaml_bool(value: bool) -> str:
     return "true" if value else "false"
 
 
-def _run_tstat(settings: Settings, yaml_path: Path) -> subprocess.CompletedProcess[str]:
+def _run_tstat(
+    settings: Settings,
+    yaml_path: Path,
+    *,
+    timeout_sec: int | None = None,
+    control: _RunControl | None = None,
+) -> subprocess.CompletedProcess[str]:
+    """tstat を起動して終了を待つ。
+
+    stdout/stderr はリスト YAML と同じ作業ディレクトリのファイルへ直接書き出し（メモリに溜めない）、
+    戻り値には末尾 OUTPUT_TAIL_BYTES だけを読み込む。全文は失敗時に _write_failure_output が実行ログへ転記する。
+    タイムアウト・中断時は子プロセスを終了させる。
+    """
+    timeout_sec = timeout_sec or settings.collect_timeout_sec
     command = split_command(settings.tstat_command)
     args = [*command, "-l", str(yaml_path), "--json"]
     if settings.tstat_config.strip():
         args.extend(["--config", settings.tstat_config.strip()])
-    return subprocess.run(
-        args,
-        capture_output=True,
-        text=True,
-        encoding="utf-8",
-        errors="replace",
-        timeout=settings.collect_timeout_sec,
-        shell=False,
+    stdout_path, stderr_path = _output_paths(yaml_path)
+    with stdout_path.open("wb") as stdout, stderr_path.open("wb") as stderr:
+        process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=stdout, stderr=stderr, shell=False)
+    _apply_resource_limits(settings, process)
+    if control is not None and not control.attach(process):
+        process.terminate()
+    note = ""
+    try:
+        process.wait(timeout=timeout_sec)
+    except subprocess.TimeoutExpired:
+        note = f"\ntstat timed out after {timeout_sec} seconds"
+        process.terminate()
+    finally:
+        if control is not None:
+            control.detach(process)
+    try:
+        process.wait(timeout=_TERMINATE_GRACE_SEC)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+    returncode = process.returncode
+    if note:
+        returncode = TIMEOUT_RETURNCODE
+    elif returncode != 0 and control is not None and control.cancelled.is_set():
+        returncode = CANCELLED_RETURNCODE
+        note = "\ncollect run cancelled"
+    if note:
+        with stderr_path.open("ab") as stderr:
+            stderr.write(note.encode("utf-8"))
+    return subprocess.CompletedProcess(
+        args=args,
+        returncode=returncode,
+        stdout=_read_tail(stdout_path),
+        stderr=_read_tail(stderr_path),
     )
 
 
+def _output_paths(yaml_path: Path) -> tuple[Path, Path]:
+    return yaml_path.with_suffix(".stdout"), yaml_path.with_suffix(".stderr")
+
+
+def _read_tail(path: Path, limit: int = OUTPUT_TAIL_BYTES) -> str:
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - limit, 0))
+        return f.read().decode("utf-8", errors="replace")
+
+
+def _apply_resource_limits(settings: Settings, process: subprocess.Popen) -> None:
+    """COLLECT_MEMORY_LIMIT_MB / COLLECT_CPU_LIMIT_SEC を起動直後の tstat に設定する。
+
+    スレッドから起動するため preexec_fn は使わず prlimit で外から設定する（Linux のみ。他の OS では無視）。
+    """
+    if resource is None or not hasattr(resource, "prlimit"):
+        return
+    limits = []
+    if settings.collect_memory_limit_mb:
+        limits.append((resource.RLIMIT_AS, settings.collect_memory_limit_mb * 1024 * 1024))
+    if settings.collect_cpu_limit_sec:
+        limits.append((resource.RLIMIT_CPU, settings.collect_cpu_limit_sec))
+    for kind, value in limits:
+        try:
+            resource.prlimit(process.pid, kind, (value, value))
+        except (OSError, ValueError):
+            # 既に終了している・上限を上げられない場合は、制限なしで続行する
+            pass
+
+
 def split_command(command: str) -> list[str]:
     if os.name != "nt":
         return shlex.split(command)
@@ -301,8 +822,16 @@ def split_command(command: str) -> list[str]:
         ctypes.windll.kernel32.LocalFree(argv)
 
 
-def _classify_failure(testing_id: int, completed: subprocess.CompletedProcess[str]) -> CollectFailure:
-    message = _extract_error_message(completed)
+def _classify_failure(
+    testing_id: int,
+    completed: subprocess.CompletedProcess[str],
+    output: dict | None = None,
+) -> CollectFailure:
+    if output is None:
+        output = _parse_output(completed)
+    message = _extract_error_message(completed, output)
+    if completed.returncode == CANCELLED_RETURNCODE:
+        return CollectFailure(testing_id=testing_id, reason="cancelled", message=message)
     lowered = message.lower()
     auth_markers = ("az login", "azure にログイン", "401", "403", "unauthorized", "forbidden", "access token")
     if any(marker in lowered for marker in auth_markers) or "アクセス権" in message:
@@ -316,21 +845,59 @@ def _classify_failure(testing_id: int, completed: subprocess.CompletedProcess[st
     return CollectFailure(testing_id=testing_id, reason="other", message=message)
 
 
-def _extract_error_message(completed: subprocess.CompletedProcess[str]) -> str:
+def _parse_output(completed: subprocess.CompletedProcess[str], stdout_path: Path | None = None) -> dict | None:
+    """tstat の `--json` 出力を解析する。JSON でなければ None。
+
+    tstat は JSON を stdout の最後に出力し、トップレベルの `{` だけが行頭に来る（入れ子はインデントされる）。
+    それより前の行（ダウンロードの進捗表示など）は読み飛ばし、最後の行頭の `{` から 1 回だけ解析する。
+    completed.stdout は末尾 OUTPUT_TAIL_BYTES だけなので、stdout がそれより大きければ stdout_path から読む。
+    """
+    text = completed.stdout or ""
+    if stdout_path is not None and stdout_path.exists() and stdout_path.stat().st_size > OUTPUT_TAIL_BYTES:
+        text = _read_last_json_block(stdout_path)
+    text = text.rstrip()
+    if not text.endswith("}"):
+        return None
+    index = text.rfind("\n{")
+    if index >= 0:
+        text = text[index + 1:]
+    elif not text.startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _read_last_json_block(path: Path) -> str:
+    """stdout ファイルの最後の行頭の `{` 以降を読む。ファイルを末尾から遡って探し、JSON 部分だけを読み込む。"""
+    with path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        carry = b""
+        while position > 0:
+            start = max(position - OUTPUT_TAIL_BYTES, 0)
+            f.seek(start)
+            # 前に読んだ範囲の先頭 1 バイトを付けて、境界をまたぐ "\n{" も見つける
+            chunk = f.read(position - start) + carry
+            index = chunk.rfind(b"\n{")
+            if index >= 0 or (start == 0 and chunk.startswith(b"{")):
+                f.seek(start + index + 1 if index >= 0 else 0)
+                return f.read().decode("utf-8", errors="replace")
+            carry = chunk[:1]
+            position = start
+    return ""
+
+
+def _extract_error_message(completed: subprocess.CompletedProcess[str], output: dict | None) -> str:
+    if output is not None:
+        messages = list(_collect_messages(output))
+        if messages:
+            return " / ".join(messages)
     text = "\n".join(part for part in [completed.stdout, completed.stderr] if part).strip()
     if not text:
         return f"tstat exited with code {completed.returncode}"
-    decoder = json.JSONDecoder()
-    for index, char in enumerate(text):
-        if char != "{":
-            continue
-        try:
-            data, _ = decoder.raw_decode(text[index:])
-        except json.JSONDecodeError:
-            continue
-        messages = list(_collect_messages(data))
-        if messages:
-            return " / ".join(messages)
     return text[-4000:]
 
 
@@ -352,19 +919,117 @@ def _ensure_log_dir(settings: Settings) -> None:
     Path(settings.collect_log_dir).mkdir(parents=True, exist_ok=True)
 
 
-def _write_log(settings: Settings, target: CollectTarget, yaml_path: Path, completed: subprocess.CompletedProcess[str]) -> None:
-    log_dir = Path(settings.collect_log_dir)
+def _store_log(
+    db: Session,
+    settings: Settings,
+    *,
+    run_id: int | None,
+    target: CollectTarget,
+    yaml_path: Path | None,
+    completed: subprocess.CompletedProcess[str],
+    output: dict | None,
+    failure: CollectFailure | None,
+    started_at: datetime | None,
+) -> None:
+    """target 1 件分の実行ログを collect_logs に記録する。失敗時だけ出力の全文を gzip で残す。"""
+    finished_at = datetime.now()
+    stdout_path, stderr_path = _output_paths(yaml_path) if yaml_path is not None else (None, None)
+    log_path = None
+    if failure is not None:
+        log_path = _write_failure_output(settings, target, yaml_path, completed, finished_at)
+    add_collect_log(db, CollectLog(
+        run_id=run_id,
+        testing_id=target.testing_id,
+        project_name=target.project_name,
+        mode=settings.collect_mode,
+        exit_code=completed.returncode,
+        reason=failure.reason if failure else None,
+        message=failure.message if failure else None,
+        output=output,
+        stdout_bytes=_output_size(stdout_path, completed.stdout),
+        stderr_bytes=_output_size(stderr_path, completed.stderr),
+        log_path=str(log_path) if log_path is not None else None,
+        started_at=started_at,
+        finished_at=finished_at,
+        duration_ms=round((finished_at - started_at).total_seconds() * 1000) if started_at else None,
+    ))
+
+
+def _output_size(path: Path | None, text: str) -> int:
+    if path is not None and path.exists():
+        return path.stat().st_size
+    return len(text.encode("utf-8")) if text else 0
+
+
+def _write_failure_output(
+    settings: Settings,
+    target: CollectTarget,
+    yaml_path: Path | None,
+    completed: subprocess.CompletedProcess[str],
+    at: datetime,
+) -> Path:
+    """失敗した target の stdout/stderr 全文を COLLECT_LOG_DIR/collect_YYYYMMDD/ に gzip で書き出す。"""
+    log_dir = Path(settings.collect_log_dir) / f"collect_{at:%Y%m%d}"
     log_dir.mkdir(parents=True, exist_ok=True)
-    stamp = datetime.now().strftime("%Y%m%d")
-    log_path = log_dir / f"collect_{stamp}.log"
-    with log_path.open("a", encoding="utf-8", newline="\n") as f:
-        f.write(f"[{datetime.now().isoformat(timespec='seconds')}] testing_id={target.testing_id} yaml={yaml_path}\n")
+    log_path = log_dir / f"{target.testing_id}_{at:%H%M%S_%f}.log.gz"
+    with gzip.open(log_path, "wt", encoding="utf-8", newline="\n") as f:
+        source = f"yaml={yaml_path}" if yaml_path is not None else f"mode={settings.collect_mode}"
+        f.write(f"[{at.isoformat(timespec='seconds')}] testing_id={target.testing_id} {source}\n")
         f.write(f"exit_code={completed.returncode}\n")
-        if completed.stdout:
-            f.write("--- stdout ---\n")
-            f.write(completed.stdout)
-            f.write("\n")
-        if completed.stderr:
-            f.write("--- stderr ---\n")
-            f.write(completed.stderr)
-            f.write("\n")
+        stdout_path, stderr_path = _output_paths(yaml_path) if yaml_path is not None else (None, None)
+        _write_log_section(f, "stdout", stdout_path, completed.stdout)
+        _write_log_section(f, "stderr", stderr_path, completed.stderr)
+    return log_path
+
+
+def _prune_logs(db: Session, settings: Settings) -> None:
+    """COLLECT_LOG_RETENTION_DAYS より古い実行ログと、その出力ファイルを削除する。"""
+    if not settings.collect_log_retention_days:
+        return
+    before = datetime.now() - timedelta(days=settings.collect_log_retention_days)
+    for log_path in prune_collect_logs(db, before):
+        path = Path(log_path)
+        path.unlink(missing_ok=True)
+        try:
+            # 日付ディレクトリが空になったら消す（まだ残りがあれば OSError）
+            path.parent.rmdir()
+        except OSError:
+            pass
+
+
+def _compact_snapshots_if_due(db: Session, settings: Settings) -> None:
+    """進捗の履歴の間引き・削除を PROGRESS_SNAPSHOT_COMPACT_INTERVAL_HOURS に 1 回まで行う。
+
+    全 testing_id の履歴を見るため、1 件ずつの収集（collect_label など）のたびには実行しない。
+    """
+    global _LAST_SNAPSHOT_COMPACTION
+    if not settings.progress_snapshot_compact_interval_hours:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with _SNAPSHOT_COMPACTION_LOCK:
+        last = _LAST_SNAPSHOT_COMPACTION
+        if last is not None and now - last < timedelta(hours=settings.progress_snapshot_compact_interval_hours):
+            return
+        _LAST_SNAPSHOT_COMPACTION = now
+    compact_progress_snapshots(
+        db,
+        now,
+        settings.progress_snapshot_downsample_days,
+        settings.progress_snapshot_retention_days,
+    )
+
+
+def _write_log_section(f, name: str, path: Path | None, text: str) -> None:
+    """tstat の出力ファイルがあれば全文をストリームで転記し、なければ手元の text を書く。"""
+    if path is not None and path.exists():
+        if path.stat().st_size == 0:
+            return
+        f.write(f"--- {name} ---\n")
+        with path.open("r", encoding="utf-8", errors="replace") as source:
+            shutil.copyfileobj(source, f)
+        f.write("\n")
+        return
+    if text:
+        f.write(f"--- {name} ---\n")
+        f.write(text)
+        f.write("\n")
@@ -0,0 +1,361 @@
+"""tstat を起動せず、CLI の集計ライブラリを子プロセスで直接呼び出す収集モード（COLLECT_MODE=inprocess）。
+
+子プロセスは TSTAT_CLI_DIR を sys.path に加えて teststat-cli の utils パッケージを import し、
+CollectTarget をそのまま受け取って集計する（リスト YAML を書き出さない）。結果は
+ReportingClient.build_progress_payload の dict で親プロセスへ返し、DB への書き込みは collector が
+replace_progress で直接行う（`POST /api/v1/progress` への折り返し送信をしない）。
+
+Excel の解析は CPU を使い、openpyxl の状態もプロセス内に残るため、スレッドではなくプロセスで並列化する。
+子プロセス（ワーカー）は常駐させて起動・import の時間を target ごとに払わないようにし、
+_MAX_TASKS_PER_WORKER 件集計したら入れ替える。タイムアウト・中断・異常終了したときはその target の
+ワーカーだけを終了させ、同時に集計中の他の target には影響させない。
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import math
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from typing import TYPE_CHECKING
+
+from app.config import Settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+if TYPE_CHECKING:
+    from app.services.collector import CollectFile, CollectTarget, _RunControl
+
+# サーバーはスレッドを使うため fork ではなく spawn で起動する
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+# タイムアウト時に terminate してから kill に切り替えるまでの待ち時間
+_TERMINATE_GRACE_SEC = 5
+# 1 つのワーカーで集計する target 数の上限（openpyxl などがプロセス内に残すメモリを手放すため入れ替える）
+_MAX_TASKS_PER_WORKER = 50
+
+_IDLE_WORKERS: list[_Worker] = []
+_WORKERS_LOCK = threading.Lock()
+
+_OPTION_KEYS = (
+    "target_sheets",
+    "ignore_sheets",
+    "include_hidden_sheets",
+    "target_environments",
+    "ignore_environments",
+)
+
+
+@dataclass
+class InprocessOutcome:
+    """子プロセスでの集計結果。payload は ProgressRequest と同じ形の dict。
+
+    timed_out・cancelled は collector が tstat と同じ終了コード（タイムアウト・中断）に読み替える。
+    """
+
+    payload: dict | None = None
+    error: str | None = None
+    warnings: list[str] = field(default_factory=list)
+    api_updates: list[dict] = field(default_factory=list)
+    timed_out: bool = False
+    cancelled: bool = False
+
+    def to_completed(self) -> subprocess.CompletedProcess[str]:
+        """`tstat --json` と同じ形の出力にし、失敗分類・ログ出力を subprocess モードと共通にする。"""
+        output: dict = {}
+        if self.error:
+            output["error"] = self.error
+        if self.api_updates:
+            output["api_updates"] = self.api_updates
+        if self.warnings:
+            output["warnings"] = self.warnings
+        return subprocess.CompletedProcess(
+            args=["inprocess"],
+            returncode=1 if self.error else 0,
+            stdout=json.dumps(output, ensure_ascii=False, indent=2) if output else "",
+            stderr="",
+        )
+
+
+def run_target_inprocess(
+    settings: Settings,
+    target: CollectTarget,
+    timeout_sec: int | None = None,
+    *,
+    control: _RunControl | None = None,
+) -> InprocessOutcome:
+    """空いている常駐ワーカーで target を集計し、完了まで待つ（collector の待ち行列ワーカーから呼ぶ）。
+
+    ワーカーは集計中だけ control に登録し、収集の中断（cancel_collect_run）で tstat と同じく終了させる。
+    タイムアウト・中断・異常終了したワーカーは捨て、次の target は新しいワーカーで集計する。
+    """
+    timeout_sec = timeout_sec or settings.collect_timeout_sec
+    cli_dir = os.path.abspath(settings.tstat_cli_dir.strip())
+    config_path = settings.tstat_config.strip() or os.path.join(cli_dir, "config.json")
+    worker = _acquire_worker(settings)
+    reusable = False
+    try:
+        if control is not None and not control.attach(worker.process):
+            return InprocessOutcome(error="collect run cancelled", cancelled=True)
+        try:
+            worker.connection.send((cli_dir, config_path, target))
+            if not worker.connection.poll(timeout_sec):
+                return InprocessOutcome(error=f"collector timed out after {timeout_sec} seconds", timed_out=True)
+            outcome = worker.connection.recv()
+        except (EOFError, OSError):
+            # ワーカーが結果を返さずに終了した（中断による terminate・上限超過・異常終了）
+            worker.process.join(_TERMINATE_GRACE_SEC)
+            if control is not None and control.cancelled.is_set():
+                return InprocessOutcome(error="collect run cancelled", cancelled=True)
+            if settings.collect_cpu_limit_sec and worker.process.exitcode == -getattr(signal, "SIGXCPU", 0):
+                return InprocessOutcome(
+                    error=f"集計プロセスが CPU 時間の上限（{settings.collect_cpu_limit_sec} 秒）を超えたため停止しました"
+                )
+            return InprocessOutcome(error=f"集計プロセスが異常終了しました: exitcode={worker.process.exitcode}")
+        reusable = True
+        return outcome
+    except Exception as exc:
+        return InprocessOutcome(error=f"ファイル処理中にエラーが発生しました: {exc}")
+    finally:
+        if control is not None:
+            control.detach(worker.process)
+        _release_worker(settings, worker, reusable)
+
+
+def shutdown_inprocess_workers() -> None:
+    """待機中の常駐ワーカーをすべて終了させる（サーバー停止時）。"""
+    with _WORKERS_LOCK:
+        workers = list(_IDLE_WORKERS)
+        _IDLE_WORKERS.clear()
+    for worker in workers:
+        worker.stop()
+
+
+@dataclass
+class _Worker:
+    """集計用の常駐子プロセス 1 つ。target はパイプで 1 件ずつ受け取り、結果を同じパイプで返す。"""
+
+    process: multiprocessing.process.BaseProcess
+    connection: Connection
+    limits: tuple[int, int]
+    tasks: int = 0
+
+    @classmethod
+    def start(cls, limits: tuple[int, int]) -> _Worker:
+        connection, child_connection = _MP_CONTEXT.Pipe()
+        process = _MP_CONTEXT.Process(target=_worker_main, args=(child_connection, *limits), daemon=True)
+        process.start()
+        # 親側で子の端を閉じておき、子が結果を送らずに終了したら recv が EOFError になるようにする
+        child_connection.close()
+        return cls(process=process, connection=connection, limits=limits)
+
+    def stop(self) -> None:
+        """終わっていなければこのワーカーのプロセスだけを終了させる。"""
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(_TERMINATE_GRACE_SEC)
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+
+
+def _acquire_worker(settings: Settings) -> _Worker:
+    limits = (settings.collect_memory_limit_mb, settings.collect_cpu_limit_sec)
+    with _WORKERS_LOCK:
+        while _IDLE_WORKERS:
+            worker = _IDLE_WORKERS.pop()
+            if worker.limits == limits and worker.process.is_alive():
+                return worker
+            _retire_later(worker)
+    return _Worker.start(limits)
+
+
+def _release_worker(settings: Settings, worker: _Worker, reusable: bool) -> None:
+    """集計を終えたワーカーを待機列へ戻す。使えない・使い切った・余ったワーカーは終了させる。"""
+    worker.tasks += 1
+    if reusable and worker.tasks < _MAX_TASKS_PER_WORKER:
+        with _WORKERS_LOCK:
+            if len(_IDLE_WORKERS) < settings.collect_concurrency:
+                _IDLE_WORKERS.append(worker)
+                return
+    worker.stop()
+
+
+def _retire_later(worker: _Worker) -> None:
+    # 終了待ちでロックを握らないよう、別スレッドで片付ける
+    threading.Thread(target=worker.stop, daemon=True).start()
+
+
+def _worker_main(connection: Connection, memory_limit_mb: int, cpu_limit_sec: int) -> None:
+    """常駐ワーカーの入口。メモリ上限は起動時に 1 回、CPU 時間の上限は target ごとに設定する。"""
+    _limit_worker_memory(memory_limit_mb)
+    while True:
+        try:
+            cli_dir, config_path, target = connection.recv()
+        except EOFError:
+            return
+        _limit_task_cpu(cpu_limit_sec)
+        try:
+            outcome = aggregate_target(cli_dir, config_path, target)
+        except Exception as exc:
+            outcome = InprocessOutcome(error=f"ファイル処理中にエラーが発生しました: {exc}")
+        connection.send(outcome)
+
+
+def _limit_worker_memory(limit_mb: int) -> None:
+    """COLLECT_MEMORY_LIMIT_MB をワーカー自身に設定する（POSIX のみ）。"""
+    if resource is None or not limit_mb:
+        return
+    limit = limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (OSError, ValueError):
+        pass
+
+
+def _limit_task_cpu(limit_sec: int) -> None:
+    """COLLECT_CPU_LIMIT_SEC をこれから集計する target 1 件分だけ設定する（POSIX のみ）。
+
+    RLIMIT_CPU はプロセスの累計 CPU 時間に効くため、ワーカーを使い回すときは target ごとに
+    「ここまでの使用時間 + 上限」へソフトリミットを引き上げる（ハードリミットは変えない）。
+    """
+    if resource is None or not limit_sec:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = math.ceil(usage.ru_utime + usage.ru_stime) + limit_sec
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (OSError, ValueError):
+        pass
+
+
+def aggregate_target(cli_dir: str, config_path: str, target: CollectTarget) -> InprocessOutcome:
+    """子プロセスで実行する。`tstat -l <list.yaml>` のファイル収集・集計・WBS 更新と同じ処理を行う。"""
+    if cli_dir not in sys.path:
+        sys.path.insert(0, cli_dir)
+    from utils import FileScanner, Logger, RemoteSource
+    from utils.ApiIntegration import build_subtask_progress_payloads, update_subtask_progress
+    from utils.ReportingClient import build_progress_payload
+
+    try:
+        with open(config_path, encoding="utf-8-sig") as f:
+            cli_settings = json.load(f)
+    except Exception as exc:
+        return InprocessOutcome(error=f"設定ファイルの読み込みに失敗しました: {config_path} ({exc})")
+    is_valid, message = FileScanner.validate_config(cli_settings)
+    if not is_valid:
+        return InprocessOutcome(error=message)
+
+    verbose_logger = Logger.VerboseLogger(False)
+    sp_config = cli_settings.get("sharepoint", {})
+    warnings: list[str] = []
+    results: list[tuple[str, dict]] = []
+    remote_mgr = RemoteSource.RemoteFileManager(sp_config, verbose_logger)
+    try:
+        remote_total = len(target.files)
+        for index, file in enumerate(target.files, start=1):
+            label_prefix = f"[{file.label}] " if file.label else ""
+            if RemoteSource.is_remote_path(file.source_url):
+                if not sp_config.get("enabled", True):
+                    warnings.append(f"{label_prefix}SharePoint連携が無効のためスキップします: {file.source_url}")
+                    continue
+                try:
+                    target_path = remote_mgr.fetch(
+                        file.source_url, label=file.label, item_index=index, item_total=remote_total
+                    )
+                except RemoteSource.RemoteSourceError as exc:
+                    warnings.append(f"{label_prefix}SharePointダウンロードに失敗しました: {file.source_url} ({exc})")
+                    continue
+            else:
+                target_path = file.source_url
+                if not os.path.exists(target_path):
+                    warnings.append(f"指定されたパスが存在しません: {target_path}")
+                    continue
+
+            is_valid_search, found_files = FileScanner.find_excel_files(target_path)
+            if not is_valid_search:
+                warnings.append(str(found_files))
+                continue
+            for filepath in found_files:
+                is_accessible, message = FileScanner.can_access_file(filepath)
+                if not is_accessible:
+                    warnings.append(message)
+                    continue
+                results.append((filepath, _aggregate_file(cli_settings, filepath, file, verbose_logger)))
+    finally:
+        if remote_mgr.cleanup_enabled:
+            remote_mgr.cleanup()
+
+    if not results:
+        return InprocessOutcome(error="処理可能なファイルが見つかりませんでした", warnings=warnings)
+
+    api_updates: list[dict] = []
+    api_config = cli_settings.get("wbs_api", {})
+    if api_config.get("enabled", True) and api_config.get("base_url"):
+        for subtask_id, data in build_subtask_progress_payloads(results).items():
+            available = data["available"]
+            progress_percent = (data["completed"] / available * 100) if available > 0 else 0
+            kwargs = {"actual_start_date": min(data["start_dates"])} if data["start_dates"] else {}
+            success, msg = update_subtask_progress(
+                api_config["base_url"], subtask_id, progress_percent, verbose_logger, **kwargs
+            )
+            api_updates.append({
+                "scope": "subtask",
+                "labels": data.get("labels", []),
+                "subtask_id": subtask_id,
+                "progress": int(progress_percent),
+                "success": success,
+                "message": msg,
+            })
+
+    payload = build_progress_payload(
+        {"testing_id": target.testing_id, "project_name": target.project_name},
+        results,
+        columnar=True,
+    )
+    return InprocessOutcome(payload=payload, warnings=warnings, api_updates=api_updates)
+
+
+def _aggregate_file(cli_settings: dict, filepath: str, file: CollectFile, verbose_logger) -> dict:
+    from utils import ReadData, RemoteSource
+
+    overrides = {
+        key: list(value) if isinstance(value, tuple) else value
+        for key in _OPTION_KEYS
+        if (value := getattr(file, key)) is not None
+    }
+    try:
+        file_settings = cli_settings
+        if overrides:
+            file_settings = copy.deepcopy(cli_settings)
+            file_settings["read_definition"].update(overrides)
+        result = ReadData.aggregate_results(filepath, file_settings, verbose_logger)
+    except Exception as exc:
+        result = {
+            "error": {
+                "type": "processing_error",
+                "message": f"ファイル処理中にエラーが発生しました: {filepath}",
+                "details": str(exc),
+            }
+        }
+    if file.label:
+        result["label"] = file.label
+    result.update(overrides)
+    if file.subtask_id is not None:
+        result["subtask_id"] = file.subtask_id
+    if RemoteSource.is_remote_path(file.source_url):
+        result["source_url"] = file.source_url
+    return result
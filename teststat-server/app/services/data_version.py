@@ -0,0 +1,51 @@
+"""データ更新バージョン。
+
+実績取り込み・計画/label 編集・不具合同期など、表示内容が変わる書き込みのたびに、commit の前に
+bump_data_version(db, testing_id) を呼ぶ。読み取り側はバージョンをキャッシュキーや ETag に使い、
+値が変わっていなければ再計算を省略する。
+
+バージョンは DB（data_versions）に持ち、書き込みと同じトランザクションで進める。収集
+（scripts.collect_labels）や不具合同期（scripts.sync_bugs）のように API の外のプロセスで
+書き込んでも、API 側の PB図キャッシュと ETag が古いまま残らない。
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.database import upsert
+from app.models.data_version import GLOBAL_DATA_VERSION_ID, DataVersion
+
+
+def bump_data_version(db: Session, testing_id: int | None = None) -> None:
+    """testing_id 指定時はその Testing ID、None の場合は全体（祝日・設定など）のバージョンを進める。
+
+    commit は呼び出し側（書き込みと同じトランザクションで進める）。
+    """
+    row_id = GLOBAL_DATA_VERSION_ID if testing_id is None else testing_id
+    db.execute(
+        upsert(
+            db,
+            DataVersion,
+            [{"testing_id": row_id, "version": 1}],
+            ["testing_id"],
+            {"version": DataVersion.version + 1},
+        )
+    )
+
+
+def get_data_version(db: Session, testing_id: int) -> str:
+    """Testing ID の表示内容に影響する全体・個別バージョンを 1 つの文字列にまとめて返す。"""
+    versions = dict(
+        db.execute(
+            select(DataVersion.testing_id, DataVersion.version)
+            .where(DataVersion.testing_id.in_((GLOBAL_DATA_VERSION_ID, testing_id)))
+        ).all()
+    )
+    return f"{versions.get(GLOBAL_DATA_VERSION_ID, 0)}.{versions.get(testing_id, 0)}"
+
+
+def get_global_data_version(db: Session) -> str:
+    """どの Testing ID の書き込みでも進むバージョン（全行の合計）。プロジェクト一覧など全件を返す表示に使う。"""
+    return str(db.scalar(select(func.coalesce(func.sum(DataVersion.version), 0))))
@@ -0,0 +1,97 @@
+"""日付系列を日番号（date.toordinal）の密な配列として扱う計算ヘルパー。
+
+PB 図の系列は期間内の全日に値を持つ。date をキーにした dict を日ごとに引く代わりに、
+開始日からのオフセットを添字にした list で疎→密の展開・累積・前方補完を行う。
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date
+from itertools import accumulate
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class DayRange:
+    """start〜end（両端含む）の日付範囲。"""
+
+    start: date
+    end: date
+
+    @property
+    def start_ordinal(self) -> int:
+        return self.start.toordinal()
+
+    def __len__(self) -> int:
+        return max(self.end.toordinal() - self.start_ordinal + 1, 0)
+
+    def dates(self) -> list[date]:
+        return [date.fromordinal(o) for o in range(self.start_ordinal, self.end.toordinal() + 1)]
+
+    def offset(self, d: date) -> int:
+        return d.toordinal() - self.start_ordinal
+
+    def dense(self, sparse: Mapping[date, T], default: T) -> list[T]:
+        """{date: value} を範囲内の配列に展開する。範囲外の日付は無視する。"""
+        length = len(self)
+        values = [default] * length
+        for d, value in sparse.items():
+            index = self.offset(d)
+            if 0 <= index < length:
+                values[index] = value
+        return values
+
+    def reindex(self, source: DayRange, values: list[T], default: T) -> list[T]:
+        """source 範囲の配列をこの範囲に合わせて切り出す。重ならない日は default。"""
+        length = len(self)
+        result = [default] * length
+        shift = source.start_ordinal - self.start_ordinal
+        begin = max(shift, 0)
+        end = min(shift + len(values), length)
+        if begin < end:
+            result[begin:end] = values[begin - shift:end - shift]
+        return result
+
+    def forward_fill(
+        self,
+        sparse: Mapping[date, int],
+        leading: int | None = None,
+        until: date | None = None,
+    ) -> list[int | None]:
+        """疎な値を直前の値で補完する。
+
+        最初の値より前は leading、until より後は None にする（until 省略時は最後の値の日付）。
+        """
+        length = len(self)
+        if until is None and sparse:
+            until = max(sparse)
+        stop = length if until is None else min(self.offset(until) + 1, length)
+        values: list[int | None] = [None] * length
+        current = leading
+        marks = self.dense(sparse, None)
+        for index in range(max(stop, 0)):
+            mark = marks[index]
+            if mark is not None:
+                current = mark
+            values[index] = current
+        return values
+
+
+def remaining(total: int, daily: Iterable[int]) -> list[int]:
+    """日別消化数から残数（total − 累積）の系列を作る。"""
+    return [total - cumulative for cumulative in accumulate(daily)]
+
+
+def cumulative_columns(
+    daily: Iterable[tuple[int, ...]],
+    finish: Callable[[tuple[int, ...]], T],
+) -> list[T]:
+    """タプルの日別増分を列ごとに累積し、各日の累積値を finish で変換する。"""
+    return [
+        finish(totals)
+        for totals in accumulate(daily, lambda acc, row: tuple(a + b for a, b in zip(acc, row)))
+    ]
@@ -0,0 +1,78 @@
+"""DB 接続プールの待ち時間の計測と状態の取得（GET /api/v1/admin/db-pool）。
+
+SQLAlchemy のプールは貸出中・オーバーフロー数は返すが、接続を得るまでの待ち時間は記録しない。
+QueuePool / AsyncAdaptedQueuePool を継承し、接続の取得（空きがなければ待つ、または新規接続する）に
+掛かった時間とタイムアウト回数をプールごとに集計する。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.schemas.admin import DbPoolStatus
+
+
+@dataclass
+class PoolWaitStats:
+    count: int = 0
+    total_sec: float = 0.0
+    max_sec: float = 0.0
+    timeouts: int = 0
+
+
+class _TimedPoolMixin:
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+        self._wait_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._wait_lock:
+                stats = self.wait_stats
+                stats.count += 1
+                stats.total_sec += elapsed
+                stats.max_sec = max(stats.max_sec, elapsed)
+                stats.timeouts += timed_out
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(name: str, engine: Engine) -> DbPoolStatus:
+    """エンジンのプールの現在値。QueuePool 以外（SQLite のメモリ DB など）は件数が取れない項目を None にする。"""
+    pool = engine.pool
+    stats: PoolWaitStats | None = getattr(pool, "wait_stats", None)
+    is_queue = isinstance(pool, QueuePool)
+    return DbPoolStatus(
+        name=name,
+        pool_class=type(pool).__name__,
+        size=pool.size() if is_queue else None,
+        max_overflow=pool._max_overflow if is_queue else None,
+        checked_out=pool.checkedout() if is_queue else None,
+        checked_in=pool.checkedin() if is_queue else None,
+        overflow=max(pool.overflow(), 0) if is_queue else None,
+        waits=stats.count if stats else 0,
+        wait_total_ms=round(stats.total_sec * 1000, 3) if stats else 0.0,
+        wait_max_ms=round(stats.max_sec * 1000, 3) if stats else 0.0,
+        timeouts=stats.timeouts if stats else 0,
+    )
@@ -0,0 +1,66 @@
+"""大きな一覧レスポンスを Pydantic を経由せずに JSON 化するヘルパー。
+
+日別・担当者別の実績は 1 プロジェクトで数万行になる。行ごとに Pydantic モデルを作り、
+FastAPI が response_model で再検証してから標準の json で書き出す経路は CPU 負荷が大きいため、
+Core の select の結果行を orjson で直接バイト列にし、一定行数ごとに StreamingResponse へ流す。
+"""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Iterator, Sequence
+from typing import Any
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+# 1 回の fetch・1 チャンクあたりの行数（psycopg2 ではサーバーサイドカーソルの取得単位にもなる）
+JSON_CHUNK_ROWS = 2000
+
+
+def dumps(value: Any) -> bytes:
+    """orjson で UTF-8 の JSON バイト列にする（date・datetime は ISO 8601 文字列になる）。"""
+    return orjson.dumps(value)
+
+
+def iter_json_array(
+    rows: Iterable[Sequence[Any]],
+    keys: Sequence[str],
+    chunk_rows: int = JSON_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """行（タプル）を keys をキーにしたオブジェクトの JSON 配列として chunk_rows 行ずつ出力する。"""
+    yield b"["
+    first = True
+    chunk: list[dict[str, Any]] = []
+    for row in rows:
+        chunk.append(dict(zip(keys, row)))
+        if len(chunk) >= chunk_rows:
+            yield (b"" if first else b",") + dumps(chunk)[1:-1]
+            first = False
+            chunk = []
+    if chunk:
+        yield (b"" if first else b",") + dumps(chunk)[1:-1]
+    yield b"]"
+
+
+async def aiter_json_array(
+    rows: AsyncIterable[Sequence[Any]],
+    keys: Sequence[str],
+    chunk_rows: int = JSON_CHUNK_ROWS,
+) -> AsyncIterator[bytes]:
+    """iter_json_array の非同期版。AsyncSession.stream の結果をそのまま受け取る。"""
+    yield b"["
+    first = True
+    chunk: list[dict[str, Any]] = []
+    async for row in rows:
+        chunk.append(dict(zip(keys, row)))
+        if len(chunk) >= chunk_rows:
+            yield (b"" if first else b",") + dumps(chunk)[1:-1]
+            first = False
+            chunk = []
+    if chunk:
+        yield (b"" if first else b",") + dumps(chunk)[1:-1]
+    yield b"]"
+
+
+class JSONStreamingResponse(StreamingResponse):
+    media_type = "application/json"
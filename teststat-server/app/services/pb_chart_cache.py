@@ -0,0 +1,51 @@
+"""PB図レスポンスのサーバー側キャッシュ。
+
+(testing_id, label, include_past_plans) ごとにシリアライズ済みの PbChartResponse を
+データバージョン（app.services.data_version）と一緒に保持する。書き込みでバージョンが
+進むと次の読み取りで自動的に再計算される。ETag も同じバージョンから作るため、
+変更がなければ DB に触れずに 304 を返せる。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+# 壁掛けダッシュボードの同時表示数（プロジェクト数 × label 数）を十分に収める件数。
+_MAX_ENTRIES = 1024
+
+PbChartCacheKey = tuple[int, str | None, bool]
+
+_lock = threading.Lock()
+_entries: OrderedDict[PbChartCacheKey, tuple[str, bytes]] = OrderedDict()
+
+
+def pb_chart_etag(key: PbChartCacheKey, version: str) -> str:
+    testing_id, label, include_past_plans = key
+    digest = hashlib.sha1(
+        f"{testing_id}\0{label}\0{include_past_plans}\0{version}".encode("utf-8")
+    ).hexdigest()[:20]
+    return f'W/"pb-{digest}"'
+
+
+def get_cached_pb_chart(key: PbChartCacheKey, version: str) -> bytes | None:
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        _entries.move_to_end(key)
+        return entry[1]
+
+
+def store_pb_chart(key: PbChartCacheKey, version: str, body: bytes) -> None:
+    with _lock:
+        _entries[key] = (version, body)
+        _entries.move_to_end(key)
+        while len(_entries) > _MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def clear_pb_chart_cache() -> None:
+    with _lock:
+        _entries.clear()
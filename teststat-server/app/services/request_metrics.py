@@ -0,0 +1,239 @@
+"""リクエスト単位の性能計測。GET /metrics で Prometheus のテキスト形式（0.0.4）に出力する。
+
+- ルート（パスのテンプレート）ごとの処理時間・SQL 件数・DB 時間のヒストグラムとリクエスト数
+- SLOW_QUERY_MS 以上掛かった SQL の件数と、SQL 文・パラメータのログ（WARNING）
+- instrumented() を付けた関数（get_pb_chart・list_projects など）の処理時間のヒストグラム
+- 接続プールの貸出数などのゲージ（app.services.db_pool）
+
+SQL の件数・時間は SQLAlchemy の before/after_cursor_execute で数え、リクエストごとの集計先は
+contextvars で渡す（同期ルートのスレッドプール・run_sync でもコンテキストが引き継がれる）。
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.schemas.admin import DbPoolStatus
+
+logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+# ログに残す SQL 文・パラメータの最大文字数
+_LOG_TEXT_LIMIT = 2000
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("teststat_request_stats", default=None)
+_LOCK = threading.Lock()
+_request_seconds: dict[tuple[str, str], _Histogram] = {}
+_request_queries: dict[tuple[str, str], _Histogram] = {}
+_request_db_seconds: dict[tuple[str, str], _Histogram] = {}
+_requests_total: dict[tuple[str, str, str], int] = {}
+_function_seconds: dict[str, _Histogram] = {}
+_slow_queries_total = 0
+
+
+def start_request() -> tuple[RequestStats, Token]:
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token: Token, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+    _current.reset(token)
+    key = (method, route)
+    with _LOCK:
+        _request_seconds.setdefault(key, _Histogram(_LATENCY_BUCKETS)).observe(seconds)
+        _request_queries.setdefault(key, _Histogram(_QUERY_COUNT_BUCKETS)).observe(stats.queries)
+        _request_db_seconds.setdefault(key, _Histogram(_LATENCY_BUCKETS)).observe(stats.db_seconds)
+        status_key = (method, route, str(status_code))
+        _requests_total[status_key] = _requests_total.get(status_key, 0) + 1
+
+
+def install_query_hooks(engine: Engine, slow_query_ms: int) -> None:
+    """エンジンの SQL をリクエストの集計に加え、slow_query_ms 以上のものをログに出す（0 でログなし）。"""
+    threshold = slow_query_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        _record_query(statement, parameters, elapsed, threshold)
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(exception_context) -> None:
+        # 失敗した SQL は after_cursor_execute が呼ばれないため、開始時刻だけ捨てる
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+def _record_query(statement: str, parameters: Any, elapsed: float, threshold: float) -> None:
+    global _slow_queries_total
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if threshold and elapsed >= threshold:
+        with _LOCK:
+            _slow_queries_total += 1
+        logger.warning(
+            "slow query %.1f ms: %s parameters=%s",
+            elapsed * 1000,
+            " ".join(statement.split())[:_LOG_TEXT_LIMIT],
+            repr(parameters)[:_LOG_TEXT_LIMIT],
+        )
+
+
+def instrumented(name: str) -> Callable[[Callable[..., _T]], Callable[..., _T]]:
+    """関数の処理時間を teststat_function_duration_seconds{function=name} に記録する。"""
+
+    def decorate(func: Callable[..., _T]) -> Callable[..., _T]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> _T:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with _LOCK:
+                    _function_seconds.setdefault(name, _Histogram(_LATENCY_BUCKETS)).observe(elapsed)
+
+        return wrapper
+
+    return decorate
+
+
+def reset_metrics() -> None:
+    global _slow_queries_total
+    with _LOCK:
+        for store in (_request_seconds, _request_queries, _request_db_seconds, _requests_total, _function_seconds):
+            store.clear()
+        _slow_queries_total = 0
+
+
+def render_metrics(pools: Iterable[DbPoolStatus] = ()) -> str:
+    lines: list[str] = []
+    with _LOCK:
+        _render_histograms(
+            lines, "teststat_http_request_duration_seconds", "ルートごとのリクエスト処理時間",
+            _request_seconds, ("method", "route"),
+        )
+        _render_histograms(
+            lines, "teststat_http_request_db_queries", "1 リクエストで実行した SQL の件数",
+            _request_queries, ("method", "route"),
+        )
+        _render_histograms(
+            lines, "teststat_http_request_db_seconds", "1 リクエストの SQL 実行時間の合計",
+            _request_db_seconds, ("method", "route"),
+        )
+        lines.append("# HELP teststat_http_requests_total ルート・ステータスごとのリクエスト数")
+        lines.append("# TYPE teststat_http_requests_total counter")
+        for (method, route, status_code), count in sorted(_requests_total.items()):
+            lines.append(f"teststat_http_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+        lines.append("# HELP teststat_db_slow_queries_total SLOW_QUERY_MS 以上掛かった SQL の件数")
+        lines.append("# TYPE teststat_db_slow_queries_total counter")
+        lines.append(f"teststat_db_slow_queries_total {_slow_queries_total}")
+        _render_histograms(
+            lines, "teststat_function_duration_seconds", "計測対象の関数の処理時間",
+            {(name,): histogram for name, histogram in _function_seconds.items()}, ("function",),
+        )
+    _render_pools(lines, list(pools))
+    return "\n".join(lines) + "\n"
+
+
+def _render_histograms(
+    lines: list[str],
+    name: str,
+    help_text: str,
+    histograms: dict[tuple[str, ...], _Histogram],
+    label_names: tuple[str, ...],
+) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(**labels, le=_format(bound))} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(**labels)} {_format(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+
+def _render_pools(lines: list[str], pools: list[DbPoolStatus]) -> None:
+    gauges = (
+        ("teststat_db_pool_checked_out", "貸出中の接続数", "checked_out"),
+        ("teststat_db_pool_overflow", "プールの大きさを超えて開いている接続数", "overflow"),
+        ("teststat_db_pool_wait_seconds_max", "接続取得の最長待ち時間", "wait_max_ms"),
+    )
+    for name, help_text, field in gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for pool in pools:
+            value = getattr(pool, field)
+            if value is None:
+                continue
+            if field.endswith("_ms"):
+                value = value / 1000
+            lines.append(f"{name}{_labels(pool=pool.name)} {_format(value)}")
+    for name, help_text, field, scale in (
+        ("teststat_db_pool_waits_total", "接続の取得回数", "waits", 1),
+        ("teststat_db_pool_wait_seconds_total", "接続取得の待ち時間の合計", "wait_total_ms", 1000),
+        ("teststat_db_pool_timeouts_total", "接続取得のタイムアウト回数", "timeouts", 1),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for pool in pools:
+            lines.append(f"{name}{_labels(pool=pool.name)} {_format(getattr(pool, field) / scale)}")
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
@@ -0,0 +1,159 @@
+"""SharePoint（Graph API）上の収集元ファイルのメタデータ取得。
+
+ファイル本体は tstat がダウンロードする。ここでは変更検知のために driveItem の
+eTag / lastModifiedDateTime だけを `$batch` でまとめて取得する。
+
+アクセストークンは tstat と同じく Azure CLI（`az account get-access-token`）から取得する。
+HTTP 呼び出しは _build_client() 経由にしており、テストでは MockTransport に差し替える。
+"""
+
+from __future__ import annotations
+
+import base64
+import shutil
+import subprocess
+from dataclasses import dataclass
+from datetime import datetime
+
+import httpx
+
+from app.config import Settings, get_settings
+
+GRAPH_RESOURCE = "https://graph.microsoft.com"
+_HTTP_TIMEOUT = 30.0
+# Graph JSON batching の 1 リクエストあたりの上限
+_BATCH_LIMIT = 20
+
+
+class SharePointError(Exception):
+    """SharePoint / Graph 連携の基底例外。"""
+
+
+class SharePointAuthError(SharePointError):
+    """トークン取得失敗・401/403。"""
+
+
+@dataclass(frozen=True)
+class SourceVersion:
+    etag: str | None
+    last_modified: datetime | None
+
+
+def encode_share_id(url: str) -> str:
+    """共有 URL を Graph `/shares` の shareId にエンコードする（tstat の RemoteSource と同じ規則）。"""
+    b64 = base64.b64encode(url.strip().encode("utf-8")).decode("ascii")
+    return "u!" + b64.rstrip("=").replace("/", "_").replace("+", "-")
+
+
+def fetch_source_versions(
+    urls: list[str],
+    settings: Settings | None = None,
+) -> dict[str, SourceVersion | None]:
+    """共有 URL ごとの現在の eTag / 更新日時を返す。
+
+    個別に取得できなかった URL（404 など）は None。呼び出し側は「変更あり」として扱う。
+    トークン取得失敗や 401/403 は SharePointAuthError を送出する。
+    """
+    settings = settings or get_settings()
+    unique_urls = list(dict.fromkeys(url for url in urls if url))
+    if not unique_urls:
+        return {}
+    token = _get_access_token(settings)
+    endpoint = settings.graph_endpoint.rstrip("/")
+    versions: dict[str, SourceVersion | None] = {}
+    with _build_client() as client:
+        for start in range(0, len(unique_urls), _BATCH_LIMIT):
+            chunk = unique_urls[start:start + _BATCH_LIMIT]
+            versions.update(_fetch_batch(client, endpoint, token, chunk))
+    return versions
+
+
+def _fetch_batch(
+    client: httpx.Client,
+    endpoint: str,
+    token: str,
+    urls: list[str],
+) -> dict[str, SourceVersion | None]:
+    body = {
+        "requests": [
+            {
+                "id": str(index),
+                "method": "GET",
+                "url": f"/shares/{encode_share_id(url)}/driveItem?$select=eTag,lastModifiedDateTime",
+            }
+            for index, url in enumerate(urls)
+        ]
+    }
+    try:
+        response = client.post(
+            f"{endpoint}/$batch",
+            json=body,
+            headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
+        )
+    except httpx.HTTPError as exc:
+        raise SharePointError(f"Graph API への接続に失敗しました: {exc}") from exc
+    if response.status_code in (401, 403):
+        raise SharePointAuthError("Graph API の認証に失敗しました")
+    if response.status_code >= 400:
+        raise SharePointError(f"Graph API が予期しない応答を返しました: {response.status_code}")
+
+    versions: dict[str, SourceVersion | None] = {url: None for url in urls}
+    for item in response.json().get("responses", []):
+        try:
+            url = urls[int(item.get("id"))]
+        except (TypeError, ValueError, IndexError):
+            continue
+        status_code = int(item.get("status") or 0)
+        if status_code in (401, 403):
+            raise SharePointAuthError("Graph API の認証に失敗しました")
+        if status_code != 200:
+            continue
+        data = item.get("body") or {}
+        versions[url] = SourceVersion(
+            etag=data.get("eTag"),
+            last_modified=_parse_datetime(data.get("lastModifiedDateTime")),
+        )
+    return versions
+
+
+def _parse_datetime(value: object) -> datetime | None:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        # DB の DateTime はタイムゾーンなしで保持しているため UTC のまま naive にする
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _build_client() -> httpx.Client:
+    """HTTP クライアントを生成する。テストでは MockTransport 注入のため差し替える。"""
+    return httpx.Client(timeout=_HTTP_TIMEOUT)
+
+
+def _get_access_token(settings: Settings) -> str:
+    # Windows の az は az.cmd のため、shell=False で起動できるよう PATHEXT 込みで解決する
+    az_command = shutil.which(settings.az_command) or settings.az_command
+    args = [
+        az_command,
+        "account", "get-access-token",
+        "--resource", GRAPH_RESOURCE,
+        "--query", "accessToken",
+        "-o", "tsv",
+    ]
+    try:
+        completed = subprocess.run(
+            args,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=60,
+            shell=False,
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        raise SharePointAuthError(f"Azure CLI の実行に失敗しました: {exc}") from exc
+    token = (completed.stdout or "").strip()
+    if completed.returncode != 0 or not token:
+        raise SharePointAuthError("Graph アクセストークンを取得できません。`az login` の状態を確認してください。")
+    return token
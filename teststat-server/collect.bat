@@ -4,11 +4,18 @@ cd /d "%~dp0"
 if not exist logs mkdir logs
 
 if /I "%~1"=="api" goto api
+if /I "%~1"=="api-changed" goto api_changed
+set COLLECT_ARGS=
+if /I "%~1"=="changed" set COLLECT_ARGS=--changed-only
 
 if exist .venv\Scripts\activate.bat call .venv\Scripts\activate.bat
-python -m scripts.collect_labels >> logs\collect_%date:~0,4%%date:~5,2%%date:~8,2%.log 2>&1
+python -m scripts.collect_labels %COLLECT_ARGS% >> logs\collect_%date:~0,4%%date:~5,2%%date:~8,2%.log 2>&1
 exit /b %ERRORLEVEL%
 
 :api
 powershell -NoProfile -ExecutionPolicy Bypass -Command "Invoke-WebRequest -Method POST -Uri http://localhost:18000/api/v1/collect -UseBasicParsing" >> logs\collect_%date:~0,4%%date:~5,2%%date:~8,2%.log 2>&1
 exit /b %ERRORLEVEL%
+
+:api_changed
+powershell -NoProfile -ExecutionPolicy Bypass -Command "Invoke-WebRequest -Method POST -Uri http://localhost:18000/api/v1/collect/changed -UseBasicParsing" >> logs\collect_%date:~0,4%%date:~5,2%%date:~8,2%.log 2>&1
+exit /b %ERRORLEVEL%
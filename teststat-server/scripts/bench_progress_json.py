@@ -0,0 +1,136 @@
+"""日別・担当者別実績 API の JSON 出力のベンチマーク。
+
+一時 SQLite に rows 行の実績を作り、次の 2 経路を同じ TestClient で比較する。
+
+- pydantic: 行ごとに Pydantic モデルを作り、response_model で再検証して返す従来の経路
+- stream:   現在の /progress/{id}/daily・/people（Core の select → orjson → StreamingResponse）
+
+    python -m scripts.bench_progress_json --rows 50000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+
+import app.models  # noqa: F401,E402
+from app.crud.progress import get_daily_progress, get_person_progress  # noqa: E402
+from app.database import Base, get_db  # noqa: E402
+from app.models.progress import DailyPersonProgress, DailyProgress, Testing  # noqa: E402
+from app.routers.progress import router as progress_router  # noqa: E402
+from app.schemas.progress import DailyProgressItem, PersonProgressItem  # noqa: E402
+from app.services import json_stream  # noqa: E402
+
+TESTING_ID = 1001
+
+
+def _seed(db: Session, rows: int) -> None:
+    db.add(Testing(testing_id=TESTING_ID, project_name="bench"))
+    db.flush()
+    start = date(2026, 1, 1)
+    db.bulk_insert_mappings(DailyProgress, [
+        {
+            "testing_id": TESTING_ID,
+            "file_name": f"file{i % 50:02d}.xlsx",
+            "label": f"TEST{i % 7:03d}",
+            "environment": "env-a",
+            "date": start + timedelta(days=i // 50),
+            "result_pass": i % 13,
+            "result_fixed": i % 3,
+            "result_fail": i % 5,
+            "result_blocked": 0,
+            "result_suspend": 0,
+            "result_na": 1,
+            "completed": i % 11,
+            "executed": i % 17,
+            "planned": i % 19,
+        }
+        for i in range(rows)
+    ])
+    db.bulk_insert_mappings(DailyPersonProgress, [
+        {
+            "testing_id": TESTING_ID,
+            "file_name": f"file{i % 50:02d}.xlsx",
+            "label": f"TEST{i % 7:03d}",
+            "environment": "env-a",
+            "date": start + timedelta(days=i // 50),
+            "person": f"担当者{i % 40:02d}",
+            "count": i % 9,
+            "completed": i % 7,
+            "executed": i % 8,
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+
+
+def _build_app(db: Session) -> FastAPI:
+    bench_app = FastAPI()
+    bench_app.include_router(progress_router)
+    bench_app.dependency_overrides[get_db] = lambda: db
+
+    @bench_app.get("/legacy/{testing_id}/daily", response_model=list[DailyProgressItem])
+    def legacy_daily(testing_id: int, session: Session = Depends(get_db)) -> list[DailyProgressItem]:
+        return get_daily_progress(session, testing_id)
+
+    @bench_app.get("/legacy/{testing_id}/people", response_model=list[PersonProgressItem])
+    def legacy_people(testing_id: int, session: Session = Depends(get_db)) -> list[PersonProgressItem]:
+        return get_person_progress(session, testing_id)
+
+    return bench_app
+
+
+def _measure(client: TestClient, path: str, repeat: int) -> tuple[float, int]:
+    client.get(path)  # ウォームアップ
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        elapsed = time.perf_counter() - started
+        response.raise_for_status()
+        size = len(response.content)
+        best = min(best, elapsed)
+    return best, size
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="日別・担当者別実績 API の JSON 出力を比較する")
+    parser.add_argument("--rows", type=int, default=50000, help="日別・担当者別それぞれの行数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数（最速値を採る）")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite+pysqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)()
+        try:
+            _seed(db, args.rows)
+            client = TestClient(_build_app(db))
+            print(f"rows={args.rows} repeat={args.repeat} orjson={'yes' if json_stream.orjson else 'no'}")
+            print(f"{'endpoint':<8} {'path':<9} {'best ms':>9} {'rows/s':>12} {'bytes':>11}")
+            for name in ("daily", "people"):
+                for label, path in (
+                    ("pydantic", f"/legacy/{TESTING_ID}/{name}"),
+                    ("stream", f"/api/v1/progress/{TESTING_ID}/{name}"),
+                ):
+                    elapsed, size = _measure(client, path, args.repeat)
+                    print(f"{name:<8} {label:<9} {elapsed * 1000:>9.1f} {args.rows / elapsed:>12,.0f} {size:>11,}")
+        finally:
+            db.close()
+            engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,19 @@
 from __future__ import annotations
 
-from app.services.collector import collect_all_with_new_session
+import argparse
 
+from app.services.collector import collect_all_with_new_session, collect_changed_with_new_session
 
-def main() -> int:
-    result = collect_all_with_new_session()
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="SharePoint 上の収集元ファイルから実績を収集する")
+    parser.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="前回の収集成功時から eTag が変わったファイルを持つプロジェクトだけを収集する",
+    )
+    args = parser.parse_args(argv)
+    result = collect_changed_with_new_session() if args.changed_only else collect_all_with_new_session()
     print(result.model_dump_json(indent=2))
     if result.auth_error:
         return 2
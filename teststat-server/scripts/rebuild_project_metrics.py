@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import argparse
+
+from app.crud.project import check_project_metrics
+from app.database import SessionLocal
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="プロジェクト一覧の集計値（project_metrics）を実績・計画から計算し直し、食い違う行を作り直す"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="書き込まずに食い違いだけを表示する（食い違いがあれば終了コード 1）",
+    )
+    args = parser.parse_args(argv)
+    with SessionLocal() as db:
+        mismatches = check_project_metrics(db, repair=not args.check)
+    for item in mismatches:
+        detail = "行なし" if item.missing else ", ".join(item.fields)
+        print(f"{item.testing_id}: {detail}")
+    print(f"{len(mismatches)} 件{'の食い違い' if args.check else 'を作り直しました'}")
+    if args.check and mismatches:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -16,57 +16,60 @@ function Log($msg) {
     Write-Host $line
 }
 
-Log "sync_bugs.ps1 start BaseUrl=$BaseUrl"
+Log "sync_bugs.ps1 start BaseUrl=$BaseUrl Incremental=$($env:SYNC_BUGS_INCREMENTAL -eq 'true')"
 
+$pollSec = if ($env:SYNC_BUGS_POLL_SEC) { [int]$env:SYNC_BUGS_POLL_SEC } else { 5 }
+# SYNC_BUGS_INCREMENTAL=true で前回同期以降に更新された Bug だけを取得する
+$syncUri = "$BaseUrl/api/v1/bugs/sync"
+if ($env:SYNC_BUGS_INCREMENTAL -eq "true") { $syncUri = "$syncUri`?incremental=true" }
+
+# 全プロジェクトをサーバー側で一括同期する（WIQL は親・種別・タグの組み合わせごとに 1 回、
+# 重複する Work Item のフィールド取得も 1 回にまとめられる）
 try {
-    $projects = Invoke-RestMethod -Method GET -Uri "$BaseUrl/api/v1/projects" -UseBasicParsing
+    $started = Invoke-RestMethod -Method POST -Uri $syncUri -UseBasicParsing
 } catch {
-    Log "プロジェクト一覧取得失敗: $($_.Exception.Message)"
+    $code = $_.Exception.Response.StatusCode.value__
+    if ($code -eq 409) {
+        Log "一括同期が実行中のためスキップします (409)"
+        exit 0
+    }
+    Log "一括同期の開始に失敗: HTTP=$code $($_.Exception.Message)"
     exit 1
 }
 
-$targets = @($projects | Where-Object { $_.bug_count_source -eq "azure_devops" -and -not $_.archived })
-if ($targets.Count -eq 0) {
+if ($started.targets -eq 0) {
     Log "対象プロジェクトなし (bug_count_source=azure_devops のプロジェクトがありません)"
-    exit 0
 }
+Log "対象プロジェクト $($started.targets) 件"
 
-Log "対象プロジェクト $($targets.Count) 件"
-
-$failed = 0
-$authErr = 0
-
-foreach ($p in $targets) {
-    $tid  = $p.testing_id
-    $name = $p.name
+do {
+    Start-Sleep -Seconds $pollSec
     try {
-        $r = Invoke-RestMethod -Method POST -Uri "$BaseUrl/api/v1/projects/$tid/bugs/sync" -UseBasicParsing
-        Log "testing_id=$tid ($name) 成功 fetched=$($r.fetched) open=$($r.open_count) suspended=$($r.suspended_count) resolved=$($r.resolved_count)"
+        $status = Invoke-RestMethod -Method GET -Uri "$BaseUrl/api/v1/bugs/sync/status" -UseBasicParsing
     } catch {
-        $code = $_.Exception.Response.StatusCode.value__
-        if ($code -eq 502) {
-            $authErr++
-            Log "testing_id=$tid ($name) 認証エラー (502) - Azure DevOps PAT を確認してください"
-        } elseif ($code -eq 503) {
-            $failed++
-            Log "testing_id=$tid ($name) 設定なし (503) - Azure DevOps 連携が設定されていません"
-        } elseif ($code -eq 404) {
-            $failed++
-            Log "testing_id=$tid ($name) 親 Work Item 未検出 (404)"
-        } elseif ($code -eq 409) {
-            Log "testing_id=$tid ($name) アーカイブ済みのためスキップ (409)"
-        } else {
-            $failed++
-            Log "testing_id=$tid ($name) 失敗 HTTP=$code $($_.Exception.Message)"
-        }
+        Log "進捗取得失敗: $($_.Exception.Message)"
+        exit 1
+    }
+} while ($null -eq $status -or $status.status -ne "finished")
+
+Log "WIQL $($status.queries) 件 / 取得 Work Item $($status.work_items) 件"
+foreach ($r in $status.synced) {
+    Log "testing_id=$($r.testing_id) 成功 fetched=$($r.fetched) open=$($r.open_count) suspended=$($r.suspended_count) resolved=$($r.resolved_count)"
+}
+foreach ($f in $status.failed) {
+    switch ($f.reason) {
+        "auth"           { Log "testing_id=$($f.testing_id) 認証エラー - Azure DevOps PAT を確認してください" }
+        "not_configured" { Log "testing_id=$($f.testing_id) 設定なし - Azure DevOps 連携が設定されていません" }
+        "not_found"      { Log "testing_id=$($f.testing_id) 親 Work Item 未検出" }
+        default          { Log "testing_id=$($f.testing_id) 失敗 $($f.message)" }
     }
 }
 
-if ($authErr -gt 0) {
+if ($status.auth_error) {
     Log "sync_bugs.ps1 end exit=2 (認証エラーあり)"
     exit 2
 }
-if ($failed -gt 0) {
+if ($status.failed.Count -gt 0) {
     Log "sync_bugs.ps1 end exit=1 (失敗あり)"
     exit 1
 }
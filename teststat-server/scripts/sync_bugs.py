@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import argparse
+
+from app.services.bug_sync import sync_all_bugs
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="bug_count_source=azure_devops の全プロジェクトの不具合を Azure DevOps から一括同期する"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="前回同期以降に更新された Bug だけを取得する（System.ChangedDate 基準）",
+    )
+    args = parser.parse_args(argv)
+    result = sync_all_bugs(incremental=args.incremental)
+    print(result.model_dump_json(indent=2))
+    if result.auth_error:
+        return 2
+    if result.failed:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
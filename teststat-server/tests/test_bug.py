@@ -1,7 +1,12 @@
+import asyncio
+import json
 import os
 import sys
+import threading
+import time
 import unittest
 from datetime import date, datetime
+from unittest.mock import patch
 
 SERVER_ROOT = os.path.dirname(os.path.dirname(__file__))
 sys.path.insert(0, SERVER_ROOT)
@@ -10,7 +15,7 @@ os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
 import httpx  # noqa: E402
 from fastapi import FastAPI  # noqa: E402
 from fastapi.testclient import TestClient  # noqa: E402
-from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy import create_engine, event, select  # noqa: E402
 from sqlalchemy.orm import sessionmaker  # noqa: E402
 from sqlalchemy.pool import StaticPool  # noqa: E402
 
@@ -25,11 +30,14 @@ from app.crud.bug import (  # noqa: E402
     replace_bugs,
 )
 from app.crud.pb_chart import get_pb_chart  # noqa: E402
-from app.crud.project import create_project  # noqa: E402
+from app.crud.project import create_project, update_project  # noqa: E402
 from app.database import Base  # noqa: E402
+from app.models.bug import BugSnapshot  # noqa: E402
 from app.models.progress import TestResultBugSnapshot, Testing  # noqa: E402
-from app.schemas.project import ProjectCreate  # noqa: E402
+from app.models.project import Project  # noqa: E402
+from app.schemas.project import ProjectCreate, ProjectUpdate  # noqa: E402
 from app.services.azure_devops import BugWorkItem  # noqa: E402
+from app.services.bug_sync import get_bug_sync_status, sync_all_bugs, sync_project_bugs_incremental  # noqa: E402
 
 
 def make_settings(**overrides) -> Settings:
@@ -198,7 +206,7 @@ class TestRemoteMode(unittest.TestCase):
         self.assertEqual(
             captured["fields"],
             "System.Title,System.State,System.CreatedDate,Microsoft.VSTS.Scheduling.StartDate,"
-            "Microsoft.VSTS.Common.ClosedDate,Custom.FinishDate",
+            "Microsoft.VSTS.Common.ClosedDate,Custom.FinishDate,System.ChangedDate",
         )
 
     def test_ignore_status_filtered_remote(self):
@@ -232,6 +240,253 @@ class TestRemoteMode(unittest.TestCase):
         with self.assertRaises(ado.WorkItemNotFound):
             ado.fetch_child_bugs(1001, make_settings())
 
+    def _workitems_handler(self, ids, on_batch=None):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/wiql"):
+                return httpx.Response(200, json={"workItems": [{"id": i} for i in ids]})
+            if on_batch is not None:
+                on_batch()
+            batch = [int(i) for i in request.url.params["ids"].split(",")]
+            return httpx.Response(200, json={"value": [
+                {"id": i, "fields": {"System.State": "Active"}} for i in batch
+            ]})
+        return handler
+
+    def test_batches_are_fetched_in_parallel_on_a_shared_client(self):
+        lock = threading.Lock()
+        state = {"running": 0, "max": 0}
+
+        def on_batch():
+            with lock:
+                state["running"] += 1
+                state["max"] = max(state["max"], state["running"])
+            time.sleep(0.05)
+            with lock:
+                state["running"] -= 1
+
+        built = []
+        transport = httpx.MockTransport(self._workitems_handler(list(range(1, 751)), on_batch))
+        original = ado._build_client
+
+        def build():
+            built.append(1)
+            return httpx.Client(transport=transport, timeout=10.0)
+
+        ado._build_client = build
+        self.addCleanup(lambda: setattr(ado, "_build_client", original))
+        settings = make_settings(AZURE_DEVOPS_MAX_CONCURRENCY=3)
+        bugs = ado.fetch_child_bugs(1001, settings)
+        ado.fetch_child_bugs(1001, settings)
+
+        self.assertEqual([b.work_item_id for b in bugs], list(range(1, 751)))
+        self.assertEqual(state["max"], 3)
+        self.assertEqual(len(built), 1)  # 2 回の同期で同じクライアントを使い回す
+
+    def test_throttled_response_is_retried_after_retry_after(self):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0"})
+            return httpx.Response(200, json={"workItems": []})
+
+        self._install_transport(handler)
+        self.assertEqual(ado.fetch_child_bugs(1001, make_settings()), [])
+        self.assertEqual(len(calls), 2)
+
+        self._install_transport(lambda r: httpx.Response(429, headers={"Retry-After": "0"}))
+        with self.assertRaises(ado.AzureDevOpsError):
+            ado.fetch_child_bugs(1001, make_settings(AZURE_DEVOPS_MAX_RETRIES=1))
+
+    def test_retry_after_accepts_seconds_and_http_date(self):
+        self.assertEqual(ado._retry_after(httpx.Response(429, headers={"Retry-After": "2"})), 2.0)
+        self.assertEqual(ado._retry_after(httpx.Response(429, headers={"Retry-After": "600"})), ado._RETRY_MAX_SEC)
+        past = "Wed, 21 Oct 2015 07:28:00 GMT"
+        self.assertEqual(ado._retry_after(httpx.Response(503, headers={"Retry-After": past})), 0.0)
+        self.assertEqual(ado._retry_after(httpx.Response(429)), ado._RETRY_DEFAULT_SEC)
+
+    def test_async_fetch_returns_bugs_in_id_order(self):
+        transport = httpx.MockTransport(self._workitems_handler(list(range(1, 451))))
+        original = ado._build_async_client
+        ado._build_async_client = lambda: httpx.AsyncClient(transport=transport, timeout=10.0)
+        self.addCleanup(lambda: setattr(ado, "_build_async_client", original))
+
+        async def run():
+            try:
+                return await ado.fetch_child_bugs_async(1001, make_settings(AZURE_DEVOPS_MAX_CONCURRENCY=2))
+            finally:
+                await ado.aclose_clients()
+
+        bugs = asyncio.run(run())
+        self.assertEqual([b.work_item_id for b in bugs], list(range(1, 451)))
+
+
+class TestBulkSync(unittest.TestCase):
+    def setUp(self):
+        self.db = make_session()
+        # 1001 と 1002 は同じ親・種別・タグ、1003 は別の親（Bug 9002 が重なる）
+        create_project(self.db, ProjectCreate(testing_id=1001, name="A", bug_parent_work_item_id=500))
+        create_project(self.db, ProjectCreate(testing_id=1002, name="B", bug_parent_work_item_id=500))
+        create_project(self.db, ProjectCreate(testing_id=1003, name="C"))
+        create_project(self.db, ProjectCreate(testing_id=1004, name="D"))
+        create_project(self.db, ProjectCreate(testing_id=1005, name="E", bug_count_source="test_result"))
+        self.wiql_parents = []
+        self.fetched_ids = []
+        children = {500: [9001, 9002], 1003: [9002, 9003]}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/wiql"):
+                query = json.loads(request.content)["query"]
+                parent = int(query.split("[System.Parent] = ")[1].split()[0])
+                self.wiql_parents.append(parent)
+                if parent not in children:
+                    return httpx.Response(404, json={})
+                return httpx.Response(200, json={"workItems": [{"id": i} for i in children[parent]]})
+            ids = [int(i) for i in request.url.params["ids"].split(",")]
+            self.fetched_ids.extend(ids)
+            return httpx.Response(200, json={"value": [
+                {"id": i, "fields": {"System.Title": f"bug {i}", "System.State": "Active",
+                                     "System.CreatedDate": "2026-05-01T00:00:00Z"}}
+                for i in ids
+            ]})
+
+        transport = httpx.MockTransport(handler)
+        original = ado._build_async_client
+        ado._build_async_client = lambda: httpx.AsyncClient(transport=transport, timeout=10.0)
+        self.addCleanup(lambda: setattr(ado, "_build_async_client", original))
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_runs_one_wiql_per_query_key_and_fetches_each_bug_once(self):
+        result = sync_all_bugs(self.db, settings=make_settings())
+
+        self.assertEqual(sorted(self.wiql_parents), [500, 1003, 1004])
+        self.assertEqual(sorted(self.fetched_ids), [9001, 9002, 9003])
+        self.assertEqual((result.status, result.targets, result.queries, result.work_items), ("finished", 4, 3, 3))
+        self.assertEqual({item.testing_id: item.fetched for item in result.synced}, {1001: 2, 1002: 2, 1003: 2})
+        self.assertEqual([(f.testing_id, f.reason) for f in result.failed], [(1004, "not_found")])
+        self.assertEqual(get_bug_sync_status(), result)
+        rows = self.db.execute(
+            select(BugSnapshot.testing_id, BugSnapshot.bug_work_item_id).order_by(BugSnapshot.testing_id, BugSnapshot.bug_work_item_id)
+        ).all()
+        self.assertEqual(
+            [tuple(row) for row in rows],
+            [(1001, 9001), (1001, 9002), (1002, 9001), (1002, 9002), (1003, 9002), (1003, 9003)],
+        )
+
+    def test_router_starts_background_sync_and_reports_status(self):
+        from app.database import get_db
+        from app.routers.bug import router as bug_router
+
+        app = FastAPI()
+        app.include_router(bug_router)
+        app.dependency_overrides[get_db] = lambda: self.db
+        with patch("app.services.bug_sync.SessionLocal", return_value=self.db), \
+                patch("app.services.bug_sync.get_settings", return_value=make_settings()), \
+                patch.object(self.db, "close"):
+            res = TestClient(app).post("/api/v1/bugs/sync")
+            status = TestClient(app).get("/api/v1/bugs/sync/status").json()
+
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.json(), {"started": True, "targets": 4})
+        self.assertEqual(status["status"], "finished")
+        self.assertEqual(len(status["synced"]), 3)
+
+
+class TestIncrementalSync(unittest.TestCase):
+    def setUp(self):
+        self.db = make_session()
+        create_project(self.db, ProjectCreate(testing_id=1001, name="P"))
+        self.project = self.db.scalar(select(Project).where(Project.testing_id == 1001))
+        self.wiql = []
+        self.all_ids = [9001, 9002, 9003]
+        self.changed_ids = []
+        self.items = {
+            9001: ("Active", "2026-05-01T08:00:00.100Z"),
+            9002: ("Active", "2026-05-02T08:00:00.200Z"),
+            9003: ("Active", "2026-05-03T08:00:00.300Z"),
+        }
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path.endswith("/wiql"):
+                query = json.loads(request.content)["query"]
+                self.wiql.append((query, dict(request.url.params)))
+                ids = self.changed_ids if "System.ChangedDate" in query else self.all_ids
+                return httpx.Response(200, json={"workItems": [{"id": i} for i in ids]})
+            ids = [int(i) for i in request.url.params["ids"].split(",")]
+            return httpx.Response(200, json={"value": [
+                {"id": i, "fields": {"System.Title": f"bug {i}", "System.State": self.items[i][0],
+                                     "System.CreatedDate": "2026-05-01T00:00:00Z",
+                                     "System.ChangedDate": self.items[i][1]}}
+                for i in ids
+            ]})
+
+        transport = httpx.MockTransport(handler)
+        original = ado._build_client
+        ado._build_client = lambda: httpx.Client(transport=transport, timeout=10.0)
+        self.addCleanup(lambda: setattr(ado, "_build_client", original))
+
+    def tearDown(self):
+        self.db.close()
+
+    def _rows(self):
+        return {
+            row.bug_work_item_id: row.state
+            for row in self.db.scalars(select(BugSnapshot).where(BugSnapshot.testing_id == 1001))
+        }
+
+    def test_first_sync_is_full_and_records_watermark(self):
+        res = sync_project_bugs_incremental(self.db, self.project, settings=make_settings())
+
+        self.assertEqual(res.fetched, 3)
+        self.assertEqual(len(self.wiql), 1)
+        self.assertNotIn("System.ChangedDate", self.wiql[0][0])
+        self.assertEqual(self.project.bug_changed_watermark, datetime(2026, 5, 3, 8, 0, 0, 300000))
+        self.assertIsNotNone(self.project.bug_reconciled_at)
+
+    def test_changes_are_upserted_and_ignored_states_removed(self):
+        settings = make_settings()
+        sync_project_bugs_incremental(self.db, self.project, settings=settings)
+        self.wiql.clear()
+        self.changed_ids = [9002, 9003]
+        self.items[9002] = ("Closed", "2026-05-04T09:00:00.000Z")
+        self.items[9003] = ("Removed", "2026-05-04T10:00:00.000Z")
+
+        res = sync_project_bugs_incremental(self.db, self.project, settings=settings)
+
+        self.assertEqual(len(self.wiql), 1)
+        query, params = self.wiql[0]
+        self.assertIn("[System.ChangedDate] >= '2026-05-03T08:00:00.300Z'", query)
+        self.assertEqual(params["timePrecision"], "true")
+        self.assertEqual(self._rows(), {9001: "Active", 9002: "Closed"})
+        self.assertEqual(res.fetched, 2)
+        self.assertEqual(self.project.bug_changed_watermark, datetime(2026, 5, 4, 9, 0))
+
+    def test_reconcile_removes_bugs_no_longer_under_parent(self):
+        settings = make_settings(AZURE_DEVOPS_BUG_RECONCILE_HOURS=24)
+        sync_project_bugs_incremental(self.db, self.project, settings=settings)
+        self.all_ids = [9002, 9003]
+
+        sync_project_bugs_incremental(self.db, self.project, settings=settings)
+        self.assertEqual(set(self._rows()), {9001, 9002, 9003})
+
+        self.project.bug_reconciled_at = datetime(2026, 1, 1)
+        self.db.commit()
+        sync_project_bugs_incremental(self.db, self.project, settings=settings)
+        self.assertEqual(set(self._rows()), {9002, 9003})
+        self.assertGreater(self.project.bug_reconciled_at, datetime(2026, 1, 1))
+
+    def test_changing_query_settings_resets_watermark(self):
+        sync_project_bugs_incremental(self.db, self.project, settings=make_settings())
+        update_project(self.db, 1001, ProjectUpdate(name="renamed"))
+        self.assertIsNotNone(self.project.bug_changed_watermark)
+
+        update_project(self.db, 1001, ProjectUpdate(bug_tag="regression"))
+        self.assertIsNone(self.project.bug_changed_watermark)
+        self.assertIsNone(self.project.bug_reconciled_at)
+
 
 class TestCrud(unittest.TestCase):
     def setUp(self):
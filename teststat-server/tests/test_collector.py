@@ -1,25 +1,83 @@
+import gzip
+import json
 import os
+import subprocess
 import sys
+import tempfile
+import threading
+import time
 import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
 
 SERVER_ROOT = os.path.dirname(os.path.dirname(__file__))
 sys.path.insert(0, SERVER_ROOT)
 os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
 
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
 from sqlalchemy import create_engine, event  # noqa: E402
 from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
 
 import app.models  # noqa: F401,E402
+from app.crud.collect_run import (  # noqa: E402
+    create_collect_run,
+    estimate_collect_costs,
+    estimate_collect_timeouts,
+    finish_collect_run,
+    get_collect_run_status,
+    list_collect_logs,
+    mark_collect_target_finished,
+    mark_collect_target_running,
+)
 from app.crud.plan import create_plan_label  # noqa: E402
 from app.crud.project import create_project, update_project  # noqa: E402
-from app.database import Base  # noqa: E402
+from app.database import Base, get_db  # noqa: E402
+from app.schemas.collect import CollectFailure, CollectResult  # noqa: E402
 from app.schemas.plan import PlanLabelCreate  # noqa: E402
 from app.schemas.project import ProjectCreate, ProjectUpdate  # noqa: E402
-from app.services.collector import CollectFile, CollectTarget, build_list_yaml, count_collect_targets, _load_targets  # noqa: E402
+from app.config import Settings  # noqa: E402
+from app.models.collect import CollectLog  # noqa: E402
+from app.models.plan import PlanLabel  # noqa: E402
+from app.models.progress import FileProgress  # noqa: E402
+from app.services import collector, collector_inprocess, sharepoint  # noqa: E402
+from app.services.collector_inprocess import InprocessOutcome, run_target_inprocess  # noqa: E402
+from app.services.collector import (  # noqa: E402
+    OUTPUT_TAIL_BYTES,
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    CollectFile,
+    CollectTarget,
+    _CollectQueue,
+    _load_targets,
+    _run_tstat,
+    build_list_yaml,
+    collect_all,
+    collect_changed,
+    count_collect_targets,
+)
+
+# inprocess モードの子プロセスで実際に import する teststat-cli
+TSTAT_CLI_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "teststat-cli")
+
+
+def write_fake_tstat(directory: str, body: str) -> str:
+    """TSTAT_COMMAND に指定できる、body を実行するだけの Python スクリプト。"""
+    script = os.path.join(directory, "fake_tstat.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("import sys, time\n" + body)
+    return f'"{sys.executable}" "{script}"'
 
 
 def make_session():
-    engine = create_engine("sqlite+pysqlite:///:memory:", connect_args={"check_same_thread": False})
+    # 収集の中断テストでは別スレッドから同じインメモリ DB を使うため、接続を 1 本に固定する
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
 
     @event.listens_for(engine, "connect")
     def set_sqlite_pragma(conn, _):
@@ -124,6 +182,781 @@ class TestCollector(unittest.TestCase):
             ),
         )
 
+    def test_collect_all_runs_targets_concurrently(self):
+        for testing_id in (3001, 3002):
+            create_plan_label(self.db, testing_id, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        create_project(self.db, ProjectCreate(testing_id=3003, name="Project C"))
+        create_plan_label(self.db, 3003, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+
+        running = 0
+        max_running = 0
+        lock = threading.Lock()
+
+        def fake_run_tstat(settings, yaml_path, **kwargs):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            returncode = 1 if "3002" in yaml_path.name else 0
+            return subprocess.CompletedProcess(args=[], returncode=returncode, stdout="", stderr="aggregate failed")
+
+        with tempfile.TemporaryDirectory() as log_dir, patch("app.services.collector._run_tstat", side_effect=fake_run_tstat):
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                TSTAT_COMMAND="tstat",
+                COLLECT_LOG_DIR=log_dir,
+                COLLECT_CONCURRENCY=3,
+            )
+            result = collect_all(self.db, settings=settings)
+
+        self.assertEqual(max_running, 3)
+        self.assertEqual(result.targets, 3)
+        self.assertEqual(sorted(result.succeeded), [3001, 3003])
+        self.assertEqual([failure.testing_id for failure in result.failed], [3002])
+        self.assertIsNotNone(result.finished_at)
+
+        progress = get_collect_run_status(self.db, timeout_sec=600)
+        self.assertEqual(progress.status, "finished")
+        self.assertEqual(progress.kind, "all")
+        self.assertEqual((progress.queued, progress.running, progress.succeeded, progress.failed), (0, 0, 2, 1))
+        states = {item.testing_id: (item.state, item.reason) for item in progress.items}
+        self.assertEqual(states[3001], ("succeeded", None))
+        self.assertEqual(states[3002], ("failed", "aggregate"))
+        self.assertTrue(all(item.started_at and item.finished_at for item in progress.items))
+
+    def test_collect_changed_only_runs_targets_with_new_etag(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        create_plan_label(self.db, 3002, PlanLabelCreate(label="B", source_url="https://example.com/b.xlsx"))
+        etags = {"https://example.com/a.xlsx": '"{A},1"', "https://example.com/b.xlsx": '"{B},1"'}
+        batch_sizes = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.assertEqual(request.url.path, "/v1.0/$batch")
+            self.assertEqual(request.headers["Authorization"], "Bearer token")
+            requests = json.loads(request.content)["requests"]
+            batch_sizes.append(len(requests))
+            share_ids = {sharepoint.encode_share_id(url): url for url in etags}
+            responses = []
+            for item in requests:
+                share_id = item["url"].split("/")[2]
+                responses.append({
+                    "id": item["id"],
+                    "status": 200,
+                    "body": {"eTag": etags[share_ids[share_id]], "lastModifiedDateTime": "2026-07-06T01:02:03Z"},
+                })
+            return httpx.Response(200, json={"responses": responses})
+
+        executed = []
+
+        def fake_run_tstat(settings, yaml_path, **kwargs):
+            executed.append(yaml_path.name)
+            return subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr="")
+
+        with tempfile.TemporaryDirectory() as log_dir, \
+                patch("app.services.collector._run_tstat", side_effect=fake_run_tstat), \
+                patch("app.services.sharepoint._get_access_token", return_value="token"), \
+                patch("app.services.sharepoint._build_client", side_effect=lambda: httpx.Client(transport=httpx.MockTransport(handler))):
+            settings = Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_COMMAND="tstat", COLLECT_LOG_DIR=log_dir)
+            first = collect_changed(self.db, settings=settings)
+            second = collect_changed(self.db, settings=settings)
+            etags["https://example.com/b.xlsx"] = '"{B},2"'
+            third = collect_changed(self.db, settings=settings)
+
+        self.assertEqual(sorted(first.succeeded), [3001, 3002])
+        self.assertEqual(second.targets, 0)
+        self.assertEqual(third.succeeded, [3002])
+        self.assertEqual(executed, ["collect_3001.yaml", "collect_3002.yaml", "collect_3002.yaml"])
+        self.assertEqual(batch_sizes, [2, 2, 2])
+        label = self.db.query(PlanLabel).filter_by(testing_id=3002, label="B").one()
+        self.assertEqual(label.source_etag, '"{B},2"')
+        self.assertEqual(label.source_last_modified, datetime(2026, 7, 6, 1, 2, 3))
+        self.assertEqual(get_collect_run_status(self.db, timeout_sec=600).kind, "changed")
+
+    def test_collect_changed_reports_graph_auth_error_without_running_tstat(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+
+        with patch("app.services.collector._run_tstat") as run_tstat, \
+                patch("app.services.sharepoint._get_access_token", side_effect=sharepoint.SharePointAuthError("az login")):
+            result = collect_changed(self.db, settings=Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_COMMAND="tstat"))
+
+        run_tstat.assert_not_called()
+        self.assertTrue(result.auth_error)
+        self.assertEqual([failure.reason for failure in result.failed], ["auth"])
+
+    def test_estimate_collect_costs_uses_history_per_file(self):
+        started = datetime(2026, 7, 6, 1, 0, 0)
+        run_id = create_collect_run(
+            self.db,
+            [(3001, "Project A"), (3002, "Project B")],
+            kind="all",
+            testing_id=None,
+            concurrency=1,
+            started_at=started,
+            file_counts={3001: 2, 3002: 1},
+        )
+        mark_collect_target_running(self.db, run_id, 3001, started)
+        mark_collect_target_finished(self.db, run_id, 3001, None, started + timedelta(seconds=100))
+        mark_collect_target_running(self.db, run_id, 3002, started)
+        mark_collect_target_finished(
+            self.db, run_id, 3002,
+            CollectFailure(testing_id=3002, reason="download", message="not found"),
+            started + timedelta(seconds=5),
+        )
+
+        costs = estimate_collect_costs(self.db, {3001: 3, 3002: 1}, now=started + timedelta(days=1))
+        self.assertEqual(costs[3001], 150)
+        # 失敗した実行は見積もりに使わず、全体の 1 ファイルあたり平均（50 秒）で見積もる
+        self.assertEqual(costs[3002], 50)
+
+    def test_collect_all_starts_larger_targets_first(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        create_plan_label(self.db, 3002, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        create_plan_label(self.db, 3002, PlanLabelCreate(label="B", source_url="https://example.com/b.xlsx"))
+        executed = []
+
+        def fake_run_tstat(settings, yaml_path, **kwargs):
+            executed.append(yaml_path.name)
+            return subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr="")
+
+        with tempfile.TemporaryDirectory() as log_dir, patch("app.services.collector._run_tstat", side_effect=fake_run_tstat):
+            settings = Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_COMMAND="tstat", COLLECT_LOG_DIR=log_dir)
+            collect_all(self.db, settings=settings)
+
+        self.assertEqual(executed, ["collect_3002.yaml", "collect_3001.yaml"])
+        progress = get_collect_run_status(self.db, timeout_sec=600)
+        self.assertEqual([item.testing_id for item in progress.items], [3002, 3001])
+
+    def test_collect_inprocess_writes_progress_without_tstat(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        create_plan_label(self.db, 3002, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        update_project(self.db, 3002, ProjectUpdate(archived=True))
+        received = []
+
+        def fake_inprocess(settings, target, timeout_sec=None, *, control=None):
+            received.append(target)
+            payload = {
+                "testing_id": target.testing_id,
+                "project_name": target.project_name,
+                "files": [{
+                    "file_name": "a.xlsx",
+                    "label": "A",
+                    "total_cases": 10,
+                    "available_cases": 10,
+                    "excluded_cases": 0,
+                    "completed": 4,
+                    "executed": 5,
+                    "not_run": 5,
+                    "completed_rate": 40.0,
+                    "executed_rate": 50.0,
+                    "results": {"Pass": 4, "Fail": 1},
+                    "daily": [{"date": "2026-07-06", "Pass": 4, "Fail": 1, "completed": 4, "executed": 5}],
+                }],
+            }
+            return InprocessOutcome(payload=payload, warnings=["[B] SharePointダウンロードに失敗しました"])
+
+        with tempfile.TemporaryDirectory() as log_dir, \
+                patch("app.services.collector.run_target_inprocess", side_effect=fake_inprocess), \
+                patch("app.services.collector._run_tstat") as run_tstat:
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                COLLECT_MODE="inprocess",
+                TSTAT_CLI_DIR="/opt/teststat-cli",
+                COLLECT_LOG_DIR=log_dir,
+            )
+            result = collect_all(self.db, settings=settings)
+
+        run_tstat.assert_not_called()
+        self.assertEqual([target.testing_id for target in received], [3001])
+        self.assertEqual(result.succeeded, [3001])
+        stored = self.db.query(FileProgress).filter_by(testing_id=3001).one()
+        self.assertEqual((stored.completed, stored.result_fail), (4, 1))
+
+    def test_collect_inprocess_reports_ingest_failure_as_report_error(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        invalid = InprocessOutcome(payload={"testing_id": 3001, "project_name": "Project A", "files": [{"file_name": ""}]})
+        failed = InprocessOutcome(error="処理可能なファイルが見つかりませんでした", warnings=["[A] SharePointダウンロードに失敗しました"])
+
+        with tempfile.TemporaryDirectory() as log_dir, \
+                patch("app.services.collector.run_target_inprocess", side_effect=[invalid, failed]):
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                COLLECT_MODE="inprocess",
+                TSTAT_CLI_DIR="/opt/teststat-cli",
+                COLLECT_LOG_DIR=log_dir,
+            )
+            first = collect_all(self.db, settings=settings)
+            second = collect_all(self.db, settings=settings)
+
+        self.assertEqual([failure.reason for failure in first.failed], ["report"])
+        self.assertEqual([failure.reason for failure in second.failed], ["download"])
+
+    def test_collect_inprocess_reports_database_error_and_keeps_running(self):
+        from sqlalchemy.exc import OperationalError
+
+        for testing_id in (3001, 3002):
+            create_plan_label(self.db, testing_id, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+
+        def fake_inprocess(settings, target, timeout_sec=None, *, control=None):
+            return InprocessOutcome(payload={"testing_id": target.testing_id})
+
+        def fake_replace(db, payload):
+            if payload["testing_id"] == 3001:
+                raise OperationalError("INSERT INTO file_progress ...", {}, Exception("database is locked"))
+
+        with tempfile.TemporaryDirectory() as log_dir, \
+                patch("app.services.collector.run_target_inprocess", side_effect=fake_inprocess), \
+                patch("app.services.collector.ProgressRequest.model_validate", side_effect=lambda payload: payload), \
+                patch("app.services.collector.replace_progress", side_effect=fake_replace), \
+                patch.object(self.db, "rollback", wraps=self.db.rollback) as rollback:
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                COLLECT_MODE="inprocess",
+                TSTAT_CLI_DIR="/opt/teststat-cli",
+                COLLECT_LOG_DIR=log_dir,
+            )
+            result = collect_all(self.db, settings=settings)
+
+        rollback.assert_called()
+        self.assertEqual(result.succeeded, [3002])
+        self.assertEqual([(failure.testing_id, failure.reason) for failure in result.failed], [(3001, "report")])
+        self.assertIn("database is locked", result.failed[0].message)
+
+    @unittest.skipUnless(hasattr(os, "mkfifo"), "FIFO で集計中の子プロセスを止めておく")
+    def test_inprocess_timeout_stops_only_its_own_process(self):
+        target = CollectTarget(testing_id=3001, project_name="Project A", files=())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # 設定ファイルを FIFO にし、書き込むまで子プロセスを open で待たせる
+            hung_config, slow_config = os.path.join(tmp, "hung.json"), os.path.join(tmp, "slow.json")
+            os.mkfifo(hung_config)
+            os.mkfifo(slow_config)
+            outcomes = {}
+
+            def run(name, config_path, timeout_sec):
+                settings = Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_CLI_DIR=TSTAT_CLI_DIR, TSTAT_CONFIG=config_path)
+                outcomes[name] = run_target_inprocess(settings, target, timeout_sec)
+
+            threads = [
+                threading.Thread(target=run, args=("hung", hung_config, 2)),
+                threading.Thread(target=run, args=("slow", slow_config, 60)),
+            ]
+            for thread in threads:
+                thread.start()
+            threads[0].join()
+            self.assertEqual(outcomes["hung"].error, "collector timed out after 2 seconds")
+
+            # タイムアウトした target の後も、同時に集計中だった target はそのまま完了する
+            with open(slow_config, "w", encoding="utf-8") as f:
+                f.write("{}")
+            threads[1].join()
+
+        self.assertIn("read_definition", outcomes["slow"].error)
+        self.assertNotIn("異常終了", outcomes["slow"].error)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "RLIMIT は Linux のみ")
+    def test_inprocess_worker_applies_memory_and_per_target_cpu_limits(self):
+        import resource
+
+        from types import SimpleNamespace
+
+        with patch("resource.setrlimit") as setrlimit, \
+                patch("resource.getrusage", return_value=SimpleNamespace(ru_utime=100.2, ru_stime=4.5)), \
+                patch("resource.getrlimit", return_value=(resource.RLIM_INFINITY, resource.RLIM_INFINITY)):
+            collector_inprocess._limit_worker_memory(512)
+            collector_inprocess._limit_task_cpu(30)
+
+        setrlimit.assert_any_call(resource.RLIMIT_AS, (512 * 1024 * 1024, 512 * 1024 * 1024))
+        # 使い回すワーカーでは、それまでに使った CPU 時間 + 上限までを次の target に許す
+        setrlimit.assert_any_call(resource.RLIMIT_CPU, (135, resource.RLIM_INFINITY))
+
+    @unittest.skipUnless(hasattr(os, "mkfifo"), "FIFO で集計中のワーカーを止めておく")
+    def test_inprocess_reuses_worker_until_it_fails(self):
+        target = CollectTarget(testing_id=3001, project_name="Project A", files=())
+        self.addCleanup(collector_inprocess.shutdown_inprocess_workers)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config_path = os.path.join(tmp, "config.json")
+            with open(config_path, "w", encoding="utf-8") as f:
+                f.write("{}")
+            settings = Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_CLI_DIR=TSTAT_CLI_DIR, TSTAT_CONFIG=config_path)
+            collector_inprocess.shutdown_inprocess_workers()
+
+            pids = []
+            for _ in range(2):
+                outcome = run_target_inprocess(settings, target, 60)
+                self.assertIn("read_definition", outcome.error)
+                pids.append([worker.process.pid for worker in collector_inprocess._IDLE_WORKERS])
+            # 2 件目も起動済みのワーカーで集計する
+            self.assertEqual(len(pids[0]), 1)
+            self.assertEqual(pids[0], pids[1])
+
+            # タイムアウトしたワーカーは待機列へ戻さない
+            os.remove(config_path)
+            os.mkfifo(config_path)
+            outcome = run_target_inprocess(settings, target, 1)
+            self.assertTrue(outcome.timed_out)
+            self.assertEqual(collector_inprocess._IDLE_WORKERS, [])
+
+    def test_worker_and_ingest_exceptions_fail_only_their_target(self):
+        for testing_id in (3001, 3002):
+            create_plan_label(self.db, testing_id, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            # TSTAT_COMMAND の実行ファイルが無い（Popen が OSError）
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                TSTAT_COMMAND=os.path.join(log_dir, "missing-tstat"),
+                COLLECT_LOG_DIR=log_dir,
+            )
+            result = collect_all(self.db, settings=settings)
+
+            self.assertEqual(sorted(failure.testing_id for failure in result.failed), [3001, 3002])
+            self.assertTrue(all("missing-tstat" in failure.message for failure in result.failed))
+            self.assertEqual(self.db.query(CollectLog).filter(CollectLog.exit_code == 1).count(), 2)
+            self.assertEqual(get_collect_run_status(self.db, timeout_sec=600).status, "finished")
+            self.assertEqual(collector._RUN_CONTROLS, {})
+
+            def fake_inprocess(settings, target, timeout_sec=None, *, control=None):
+                return InprocessOutcome(payload={"testing_id": target.testing_id})
+
+            def fake_replace(db, payload):
+                if payload["testing_id"] == 3001:
+                    raise RuntimeError("unexpected")
+
+            with patch("app.services.collector.run_target_inprocess", side_effect=fake_inprocess), \
+                    patch("app.services.collector.ProgressRequest.model_validate", side_effect=lambda payload: payload), \
+                    patch("app.services.collector.replace_progress", side_effect=fake_replace):
+                settings = Settings(
+                    DATABASE_URL="sqlite+pysqlite:///:memory:",
+                    COLLECT_MODE="inprocess",
+                    TSTAT_CLI_DIR="/opt/teststat-cli",
+                    COLLECT_LOG_DIR=log_dir,
+                )
+                result = collect_all(self.db, settings=settings)
+
+        self.assertEqual(result.succeeded, [3002])
+        self.assertEqual([(failure.testing_id, failure.reason) for failure in result.failed], [(3001, "other")])
+        self.assertIn("unexpected", result.failed[0].message)
+
+    def test_unexpected_error_finishes_run_and_waits_for_running_targets(self):
+        for testing_id in (3001, 3002):
+            create_plan_label(self.db, testing_id, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        ran = []
+
+        def fake_run_tstat(settings, yaml_path, **kwargs):
+            time.sleep(0.2)
+            # 呼び出し元が先に抜けても、作業ディレクトリは実行中の target が終わるまで残る
+            ran.append(yaml_path.exists())
+            return subprocess.CompletedProcess(args=[], returncode=0, stdout="", stderr="")
+
+        with tempfile.TemporaryDirectory() as log_dir, \
+                patch("app.services.collector._run_tstat", side_effect=fake_run_tstat), \
+                patch("app.services.collector._store_log", side_effect=OSError("disk full")):
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                TSTAT_COMMAND="tstat",
+                COLLECT_LOG_DIR=log_dir,
+                COLLECT_CONCURRENCY=2,
+            )
+            with self.assertRaises(OSError):
+                collect_all(self.db, settings=settings)
+
+        self.assertEqual(ran, [True, True])
+        self.assertEqual(get_collect_run_status(self.db, timeout_sec=600).status, "finished")
+        self.assertEqual(collector._RUN_CONTROLS, {})
+
+    def test_estimate_collect_timeouts_scales_slowest_history(self):
+        started = datetime(2026, 7, 6, 1, 0, 0)
+        run_id = create_collect_run(
+            self.db, [(3001, "Project A")], kind="all", testing_id=None, concurrency=1,
+            started_at=started, file_counts={3001: 2},
+        )
+        mark_collect_target_running(self.db, run_id, 3001, started)
+        mark_collect_target_finished(self.db, run_id, 3001, None, started + timedelta(seconds=100))
+
+        now = started + timedelta(days=1)
+        timeouts = estimate_collect_timeouts(
+            self.db, {3001: 3, 3002: 1}, max_sec=600, factor=3.0, min_sec=120, now=now
+        )
+        self.assertEqual(timeouts, {3001: 450, 3002: 600})
+        small = estimate_collect_timeouts(self.db, {3001: 1}, max_sec=600, factor=1.0, min_sec=120, now=now)
+        self.assertEqual(small, {3001: 120})
+        disabled = estimate_collect_timeouts(self.db, {3001: 3}, max_sec=600, factor=0, min_sec=120, now=now)
+        self.assertEqual(disabled, {3001: 600})
+
+    def test_run_tstat_keeps_only_output_tail_in_memory_and_logs_full_output(self):
+        target = CollectTarget(testing_id=3001, project_name="Project A", files=())
+        with tempfile.TemporaryDirectory() as work_dir:
+            command = write_fake_tstat(
+                work_dir,
+                "sys.stdout.write('x' * 400000 + '\\n')\n"
+                "print('{\"error\": \"aggregate failed\"}')\n"
+                "sys.exit(1)\n",
+            )
+            settings = Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_COMMAND=command, COLLECT_LOG_DIR=work_dir)
+            yaml_path = collector.Path(work_dir) / "collect_3001.yaml"
+            yaml_path.write_text(build_list_yaml(target), encoding="utf-8")
+
+            completed = _run_tstat(settings, yaml_path)
+            log_path = collector._write_failure_output(settings, target, yaml_path, completed, datetime.now())
+            with gzip.open(log_path, "rt", encoding="utf-8") as f:
+                log_text = f.read()
+
+        self.assertEqual(completed.returncode, 1)
+        self.assertLessEqual(len(completed.stdout), OUTPUT_TAIL_BYTES)
+        self.assertEqual(collector._classify_failure(3001, completed).message, "aggregate failed")
+        self.assertIn("x" * 400000, log_text)
+
+    def test_parse_output_reads_json_larger_than_tail_from_stdout_file(self):
+        target = CollectTarget(testing_id=3001, project_name="Project A", files=())
+        with tempfile.TemporaryDirectory() as work_dir:
+            command = write_fake_tstat(
+                work_dir,
+                "import json\n"
+                "print('downloading {a.xlsx}')\n"
+                "print(json.dumps({'total': 3, 'rows': ['y' * 100] * 5000}, indent=2))\n",
+            )
+            settings = Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_COMMAND=command, COLLECT_LOG_DIR=work_dir)
+            yaml_path = collector.Path(work_dir) / "collect_3001.yaml"
+            yaml_path.write_text(build_list_yaml(target), encoding="utf-8")
+
+            completed = _run_tstat(settings, yaml_path)
+            output = collector._parse_output(completed, collector._output_paths(yaml_path)[0])
+
+        self.assertLessEqual(len(completed.stdout), OUTPUT_TAIL_BYTES)
+        self.assertIsNone(collector._parse_output(completed))
+        self.assertEqual(output["total"], 3)
+        self.assertEqual(len(output["rows"]), 5000)
+
+    def test_collect_stores_structured_log_and_prunes_expired_rows(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        create_plan_label(self.db, 3002, PlanLabelCreate(label="B", source_url="https://example.com/b.xlsx"))
+        output = json.dumps({"error": "401 Unauthorized", "warnings": ["w1"]}, indent=2)
+
+        def fake_run_tstat(settings, yaml_path, **kwargs):
+            if "3001" in yaml_path.name:
+                return subprocess.CompletedProcess(args=[], returncode=0, stdout='{"total": 3}\n', stderr="")
+            # JSON の前に進捗表示の行があっても、行頭の { から解析する
+            return subprocess.CompletedProcess(args=[], returncode=1, stdout="downloading {a.xlsx}\n" + output, stderr="")
+
+        with tempfile.TemporaryDirectory() as log_dir, patch("app.services.collector._run_tstat", side_effect=fake_run_tstat):
+            settings = Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_COMMAND="tstat", COLLECT_LOG_DIR=log_dir)
+            self.db.add(CollectLog(
+                testing_id=3001, project_name="Project A", mode="subprocess", exit_code=0,
+                finished_at=datetime.now() - timedelta(days=31),
+            ))
+            self.db.commit()
+            result = collect_all(self.db, settings=settings)
+            logs = list_collect_logs(self.db)
+            failed = list_collect_logs(self.db, testing_id=3002, failed_only=True)
+            with gzip.open(failed[0].log_path, "rt", encoding="utf-8") as f:
+                log_text = f.read()
+
+        self.assertEqual(result.failed[0].reason, "auth")
+        self.assertEqual(result.failed[0].message, "401 Unauthorized / w1")
+        self.assertEqual(len(logs), 2)
+        succeeded = next(log for log in logs if log.testing_id == 3001)
+        self.assertIsNone(succeeded.reason)
+        self.assertEqual(succeeded.output, {"total": 3})
+        self.assertIsNone(succeeded.log_path)
+        self.assertIsNotNone(succeeded.duration_ms)
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0].output["error"], "401 Unauthorized")
+        self.assertEqual(failed[0].stdout_bytes, len(("downloading {a.xlsx}\n" + output).encode("utf-8")))
+        self.assertIsNotNone(failed[0].run_id)
+        self.assertIn("downloading {a.xlsx}", log_text)
+
+    def test_run_tstat_terminates_process_after_timeout(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            command = write_fake_tstat(work_dir, "time.sleep(30)\n")
+            settings = Settings(DATABASE_URL="sqlite+pysqlite:///:memory:", TSTAT_COMMAND=command)
+            yaml_path = collector.Path(work_dir) / "collect_3001.yaml"
+            yaml_path.write_text("files: []\n", encoding="utf-8")
+
+            begin = time.monotonic()
+            completed = _run_tstat(settings, yaml_path, timeout_sec=1)
+
+        self.assertLess(time.monotonic() - begin, 15)
+        self.assertEqual(completed.returncode, collector.TIMEOUT_RETURNCODE)
+        self.assertIn("timed out after 1 seconds", completed.stderr)
+
+    def test_cancel_collect_run_stops_running_and_queued_targets(self):
+        for testing_id in (3001, 3002):
+            create_plan_label(self.db, testing_id, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                TSTAT_COMMAND=write_fake_tstat(work_dir, "time.sleep(30)\n"),
+                COLLECT_LOG_DIR=work_dir,
+            )
+            results = []
+            worker = threading.Thread(target=lambda: results.append(collect_all(self.db, settings=settings)))
+            begin = time.monotonic()
+            worker.start()
+            while not collector._RUN_CONTROLS and time.monotonic() - begin < 10:
+                time.sleep(0.05)
+            time.sleep(0.3)
+            run_id = next(iter(collector._RUN_CONTROLS))
+            self.assertTrue(collector.cancel_collect_run(run_id))
+            worker.join(timeout=20)
+
+        self.assertLess(time.monotonic() - begin, 20)
+        self.assertEqual(sorted(failure.reason for failure in results[0].failed), ["cancelled", "cancelled"])
+        self.assertFalse(collector.cancel_collect_run(run_id))
+        self.assertEqual(get_collect_run_status(self.db, run_id, timeout_sec=600).status, "cancelled")
+
+    @unittest.skipUnless(hasattr(os, "mkfifo"), "FIFO で集計中の子プロセスを止めておく")
+    def test_cancel_collect_run_stops_inprocess_child(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            # 設定ファイルを FIFO にし、集計中の子プロセスを open で待たせる
+            config_path = os.path.join(work_dir, "config.json")
+            os.mkfifo(config_path)
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                COLLECT_MODE="inprocess",
+                TSTAT_CLI_DIR=TSTAT_CLI_DIR,
+                TSTAT_CONFIG=config_path,
+                COLLECT_LOG_DIR=work_dir,
+            )
+            results = []
+            worker = threading.Thread(target=lambda: results.append(collect_all(self.db, settings=settings)))
+            begin = time.monotonic()
+            worker.start()
+            while not any(control._processes for control in list(collector._RUN_CONTROLS.values())):
+                self.assertLess(time.monotonic() - begin, 20)
+                time.sleep(0.05)
+            run_id = next(iter(collector._RUN_CONTROLS))
+            self.assertTrue(collector.cancel_collect_run(run_id))
+            worker.join(timeout=20)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual([failure.reason for failure in results[0].failed], ["cancelled"])
+        self.assertEqual(self.db.query(CollectLog).one().exit_code, collector.CANCELLED_RETURNCODE)
+        self.assertEqual(get_collect_run_status(self.db, run_id, timeout_sec=600).status, "cancelled")
+
+    def test_inprocess_timeout_is_recorded_with_timeout_returncode(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        timed_out = InprocessOutcome(error="collector timed out after 5 seconds", timed_out=True)
+
+        with tempfile.TemporaryDirectory() as log_dir, \
+                patch("app.services.collector.run_target_inprocess", return_value=timed_out):
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                COLLECT_MODE="inprocess",
+                TSTAT_CLI_DIR="/opt/teststat-cli",
+                COLLECT_LOG_DIR=log_dir,
+            )
+            result = collect_all(self.db, settings=settings)
+
+        self.assertEqual([failure.testing_id for failure in result.failed], [3001])
+        self.assertEqual(self.db.query(CollectLog).one().exit_code, collector.TIMEOUT_RETURNCODE)
+
+    def test_snapshot_compaction_after_collect_is_throttled(self):
+        create_plan_label(self.db, 3001, PlanLabelCreate(label="A", source_url="https://example.com/a.xlsx"))
+        failed = InprocessOutcome(error="処理可能なファイルが見つかりませんでした")
+
+        with tempfile.TemporaryDirectory() as log_dir, \
+                patch.object(collector, "_LAST_SNAPSHOT_COMPACTION", None), \
+                patch("app.services.collector.run_target_inprocess", return_value=failed), \
+                patch("app.services.collector.compact_progress_snapshots") as compact:
+            settings = Settings(
+                DATABASE_URL="sqlite+pysqlite:///:memory:",
+                COLLECT_MODE="inprocess",
+                TSTAT_CLI_DIR="/opt/teststat-cli",
+                COLLECT_LOG_DIR=log_dir,
+            )
+            collect_all(self.db, settings=settings)
+            collect_all(self.db, settings=settings)
+            self.assertEqual(compact.call_count, 1)
+
+            # 間隔が過ぎたら次の収集の後に再び行う
+            collector._LAST_SNAPSHOT_COMPACTION -= timedelta(hours=25)
+            collect_all(self.db, settings=settings)
+            self.assertEqual(compact.call_count, 2)
+
+            collector._LAST_SNAPSHOT_COMPACTION = None
+            collect_all(self.db, settings=settings.model_copy(update={"progress_snapshot_compact_interval_hours": 0}))
+            self.assertEqual(compact.call_count, 2)
+
+    def test_collect_run_status_estimates_eta_and_detects_interrupted_runs(self):
+        started = datetime(2026, 7, 5, 1, 0, 0)
+        run_id = create_collect_run(
+            self.db,
+            [(3001, "Project A"), (3002, "Project B"), (3003, "Project C"), (3004, "Project D")],
+            kind="all",
+            testing_id=None,
+            concurrency=2,
+            started_at=started,
+        )
+        mark_collect_target_running(self.db, run_id, 3001, started)
+        mark_collect_target_finished(self.db, run_id, 3001, None, started + timedelta(seconds=60))
+        mark_collect_target_running(self.db, run_id, 3002, started)
+        mark_collect_target_finished(
+            self.db,
+            run_id,
+            3002,
+            CollectFailure(testing_id=3002, reason="download", message="not found"),
+            started + timedelta(seconds=120),
+        )
+        mark_collect_target_running(self.db, run_id, 3003, started + timedelta(seconds=120))
+
+        progress = get_collect_run_status(self.db, run_id, timeout_sec=600, now=started + timedelta(seconds=150))
+        self.assertEqual(progress.status, "running")
+        self.assertEqual((progress.queued, progress.running, progress.succeeded, progress.failed), (1, 1, 1, 1))
+        self.assertEqual(progress.elapsed_sec, 150)
+        self.assertEqual(next(item for item in progress.items if item.testing_id == 3003).elapsed_sec, 30)
+        # 平均 90 秒: 実行中の残り 60 秒 + 待機 1 件 90 秒 を 2 並列で割る
+        self.assertEqual(progress.eta_sec, 75)
+
+        stale = get_collect_run_status(self.db, run_id, timeout_sec=600, now=started + timedelta(hours=1))
+        self.assertEqual(stale.status, "interrupted")
+        self.assertIsNone(stale.eta_sec)
+
+
+
+class TestCollectQueue(unittest.TestCase):
+    def test_interactive_jobs_jump_ahead_and_bulk_jobs_run_longest_first(self):
+        jobs = _CollectQueue()
+        release = threading.Event()
+        order = []
+
+        def job(name):
+            def run():
+                order.append(name)
+                return name
+            return run
+
+        blocker = jobs.submit(1, release.wait, priority=PRIORITY_BULK, cost=0, max_workers=1)
+        futures = [
+            jobs.submit(2, job("bulk-short"), priority=PRIORITY_BULK, cost=10, max_workers=1),
+            jobs.submit(3, job("bulk-long"), priority=PRIORITY_BULK, cost=300, max_workers=1),
+            jobs.submit(4, job("bulk-mid"), priority=PRIORITY_BULK, cost=60, max_workers=1),
+            jobs.submit(5, job("interactive"), priority=PRIORITY_INTERACTIVE, cost=10, max_workers=1),
+        ]
+        release.set()
+        blocker.result(timeout=5)
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertEqual(order, ["interactive", "bulk-long", "bulk-mid", "bulk-short"])
+
+    def test_same_testing_id_never_runs_concurrently(self):
+        jobs = _CollectQueue()
+        running = set()
+        overlaps = []
+        lock = threading.Lock()
+
+        def run(testing_id):
+            with lock:
+                if testing_id in running:
+                    overlaps.append(testing_id)
+                running.add(testing_id)
+            time.sleep(0.02)
+            with lock:
+                running.discard(testing_id)
+
+        futures = [
+            jobs.submit(testing_id, lambda testing_id=testing_id: run(testing_id), priority=PRIORITY_BULK, cost=1, max_workers=4)
+            for testing_id in (1, 1, 2, 1)
+        ]
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertEqual(overlaps, [])
+
+
+class TestCollectProgressRouter(unittest.TestCase):
+    def setUp(self):
+        from app.routers.collect import router as collect_router
+
+        self.engine = create_engine(
+            "sqlite+pysqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine, autoflush=False, autocommit=False, expire_on_commit=False)
+        self.db = self.Session()
+        self.app = FastAPI()
+        self.app.include_router(collect_router)
+        self.app.dependency_overrides[get_db] = lambda: self.db
+        self.client = TestClient(self.app)
+        # SSE はポーリングごとに SessionLocal から短命のセッションを開く
+        patcher = patch("app.routers.collect.SessionLocal", self.Session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_progress_is_null_before_any_run(self):
+        response = self.client.get("/api/v1/collect/progress")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json())
+        self.assertEqual(self.client.get("/api/v1/collect/runs/1").status_code, 404)
+
+    def test_progress_and_stream_report_latest_run(self):
+        started = datetime.now()
+        run_id = create_collect_run(
+            self.db, [(3001, "Project A")], kind="project", testing_id=3001, concurrency=1, started_at=started
+        )
+        mark_collect_target_running(self.db, run_id, 3001, started)
+
+        body = self.client.get("/api/v1/collect/progress").json()
+        self.assertEqual(body["run_id"], run_id)
+        self.assertEqual(body["status"], "running")
+        self.assertEqual(body["items"][0]["state"], "running")
+
+        mark_collect_target_finished(self.db, run_id, 3001, None, datetime.now())
+        finish_collect_run(
+            self.db,
+            run_id,
+            CollectResult(targets=1, succeeded=[3001], failed=[], auth_error=False, started_at=started),
+        )
+        with self.client.stream("GET", f"/api/v1/collect/progress/stream?run_id={run_id}") as response:
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+            text = "".join(response.iter_text())
+        self.assertIn("event: progress", text)
+        self.assertIn('"status":"finished"', text)
+        self.assertEqual(self.client.get(f"/api/v1/collect/runs/{run_id}").json()["succeeded"], 1)
+
+    def test_stream_polls_with_a_new_session_until_run_finishes(self):
+        started = datetime.now()
+        run_id = create_collect_run(
+            self.db, [(3001, "Project A")], kind="project", testing_id=3001, concurrency=1, started_at=started
+        )
+        mark_collect_target_running(self.db, run_id, 3001, started)
+        opened = []
+
+        def open_session():
+            # 2 回目のポーリングの前に、別スレッドの収集が実行を終えたことにする
+            if len(opened) == 1:
+                finish_collect_run(
+                    self.db,
+                    run_id,
+                    CollectResult(targets=1, succeeded=[3001], failed=[], auth_error=False, started_at=started),
+                )
+            session = self.Session()
+            opened.append(session)
+            return session
+
+        with patch("app.routers.collect.SessionLocal", side_effect=open_session), \
+                patch("app.routers.collect.PROGRESS_POLL_INTERVAL_SEC", 0.01):
+            with self.client.stream("GET", f"/api/v1/collect/progress/stream?run_id={run_id}") as response:
+                events = [line for line in response.iter_lines() if line.startswith("data: ")]
+
+        self.assertEqual(len(opened), 2)
+        self.assertIn('"status":"running"', events[0])
+        self.assertIn('"status":"finished"', events[1])
+
 
 if __name__ == "__main__":
     unittest.main()
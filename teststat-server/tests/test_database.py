@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+import unittest
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
+
+from sqlalchemy import create_engine, exc, text  # noqa: E402
+
+from app.config import Settings  # noqa: E402
+from app.database import async_database_url, engine_options, install_sqlite_pragmas  # noqa: E402
+from app.services.db_pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, pool_status  # noqa: E402
+
+
+def make_settings(**overrides) -> Settings:
+    values = {"DATABASE_URL": "sqlite+pysqlite:///:memory:"}
+    values.update({key: str(value) for key, value in overrides.items()})
+    return Settings(**values)
+
+
+class TestEngineOptions(unittest.TestCase):
+    def test_postgresql_pool_and_statement_timeout(self):
+        settings = make_settings(DB_POOL_SIZE=8, DB_MAX_OVERFLOW=2, DB_POOL_RECYCLE_SEC=600, DB_STATEMENT_TIMEOUT_MS=15000)
+        url = "postgresql://u:p@db:5432/teststat"
+
+        options = engine_options(url, settings)
+        self.assertIs(options["poolclass"], TimedQueuePool)
+        self.assertEqual((options["pool_size"], options["max_overflow"], options["pool_recycle"]), (8, 2, 600))
+        self.assertEqual(options["connect_args"], {"options": "-c statement_timeout=15000"})
+
+        async_options = engine_options(async_database_url(url), settings, is_async=True)
+        self.assertIs(async_options["poolclass"], TimedAsyncAdaptedQueuePool)
+        self.assertEqual(async_options["connect_args"], {"server_settings": {"statement_timeout": "15000"}})
+
+    def test_statement_timeout_disabled_and_sqlite_memory_keeps_default_pool(self):
+        self.assertNotIn("connect_args", engine_options("postgresql://u@db/teststat", make_settings()))
+        self.assertEqual(engine_options("sqlite+pysqlite:///:memory:", make_settings()), {"pool_pre_ping": True})
+
+    def test_async_database_url(self):
+        self.assertEqual(async_database_url("postgresql://u:p@db:5432/x"), "postgresql+asyncpg://u:p@db:5432/x")
+        self.assertEqual(async_database_url("sqlite+pysqlite:///data/x.db"), "sqlite+aiosqlite:///data/x.db")
+        with self.assertRaises(ValueError):
+            async_database_url("mysql://u@db/x")
+
+
+class TestSqliteFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url = f"sqlite+pysqlite:///{os.path.join(self.tmp.name, 'test.db')}"
+        self.settings = make_settings(
+            DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT_SEC=0.05, SQLITE_BUSY_TIMEOUT_MS=1234
+        )
+        self.engine = create_engine(self.url, **engine_options(self.url, self.settings))
+        install_sqlite_pragmas(self.engine, self.settings)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_pragmas_are_set_per_connection(self):
+        with self.engine.connect() as conn:
+            values = {
+                name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+            }
+        self.assertEqual(values, {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "busy_timeout": 1234,
+            "cache_size": -65536,
+            "mmap_size": 256 * 1024 * 1024,
+        })
+
+    def test_reader_is_not_blocked_by_exclusive_write_transaction(self):
+        # ロールバックジャーナルでは EXCLUSIVE ロック中の読み取りは "database is locked" になる
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        reader = create_engine(self.url, **engine_options(self.url, self.settings))
+        install_sqlite_pragmas(reader, self.settings)
+        try:
+            with self.engine.connect() as writer:
+                writer.execute(text("BEGIN EXCLUSIVE"))
+                writer.execute(text("INSERT INTO t (id) VALUES (1)"))
+                with reader.connect() as conn:
+                    self.assertEqual(conn.execute(text("SELECT COUNT(*) FROM t")).scalar(), 0)
+                writer.execute(text("COMMIT"))
+        finally:
+            reader.dispose()
+
+    def test_pool_status_counts_checkouts_waits_and_timeouts(self):
+        with self.engine.connect():
+            status = pool_status("sync", self.engine)
+            self.assertEqual((status.size, status.checked_out, status.overflow), (1, 1, 0))
+            with self.assertRaises(exc.TimeoutError):
+                self.engine.connect()
+        status = pool_status("sync", self.engine)
+        self.assertEqual((status.checked_out, status.checked_in, status.waits, status.timeouts), (0, 1, 2, 1))
+        self.assertGreaterEqual(status.wait_max_ms, 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+from datetime import date
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, SERVER_ROOT)
+
+from app.services.date_series import DayRange, cumulative_columns, remaining  # noqa: E402
+
+
+class DaySeriesTests(unittest.TestCase):
+    def setUp(self):
+        self.days = DayRange(date(2026, 5, 1), date(2026, 5, 5))
+
+    def test_dates_and_empty_range(self):
+        self.assertEqual(len(self.days), 5)
+        self.assertEqual(self.days.dates()[-1], date(2026, 5, 5))
+        self.assertEqual(len(DayRange(date(2026, 5, 2), date(2026, 5, 1))), 0)
+
+    def test_dense_ignores_dates_outside_range(self):
+        values = self.days.dense({date(2026, 4, 30): 9, date(2026, 5, 2): 3, date(2026, 5, 6): 9}, 0)
+        self.assertEqual(values, [0, 3, 0, 0, 0])
+
+    def test_reindex_aligns_overlapping_days(self):
+        source = DayRange(date(2026, 4, 29), date(2026, 5, 2))
+        self.assertEqual(self.days.reindex(source, [1, 2, 3, 4], None), [3, 4, None, None, None])
+        later = DayRange(date(2026, 5, 4), date(2026, 5, 9))
+        self.assertEqual(self.days.reindex(later, [7, 8, 9, 10, 11, 12], None), [None, None, None, 7, 8])
+
+    def test_forward_fill_carries_last_value_until_last_mark(self):
+        values = self.days.forward_fill({date(2026, 5, 2): 10, date(2026, 5, 4): 6}, leading=12)
+        self.assertEqual(values, [12, 10, 10, 6, None])
+
+    def test_remaining_and_cumulative_columns(self):
+        self.assertEqual(remaining(10, [0, 3, 2]), [10, 7, 5])
+        self.assertEqual(
+            cumulative_columns([(2, 0), (1, 1), (0, 0)], lambda totals: totals[0] - totals[1]),
+            [2, 2, 2],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
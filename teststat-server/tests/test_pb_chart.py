@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 import unittest
 from datetime import date
 
@@ -13,6 +14,7 @@ from sqlalchemy.orm import sessionmaker  # noqa: E402
 import app.models  # noqa: F401
 from app.crud.pb_chart import get_pb_chart  # noqa: E402
 from app.crud.plan import create_plan, create_plan_label  # noqa: E402
+from app.crud.progress import rebuild_daily_progress_rollups  # noqa: E402
 from app.crud.project import create_project  # noqa: E402
 from app.database import Base  # noqa: E402
 from app.schemas.plan import PlanCreate, PlanDailyIn, PlanLabelCreate  # noqa: E402
@@ -30,8 +32,37 @@ def make_session():
     return sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)()
 
 
+def make_file_databases(directory: str):
+    """ルーターのテスト用。同期・非同期（async ルート）の両エンジンで同じ SQLite ファイルを開く。"""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.database import async_database_url
+
+    url = f"sqlite+pysqlite:///{os.path.join(directory, 'test.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    # 接続を TestClient のイベントループに残さないよう、非同期側はプールしない
+    async_session = async_sessionmaker(
+        bind=create_async_engine(async_database_url(url), poolclass=NullPool), expire_on_commit=False
+    )
+
+    async def get_test_async_db():
+        async with async_session() as db:
+            yield db
+
+    return engine, get_test_async_db
+
+
+def data_version_etag_for(engine, path: str) -> str | None:
+    from app.middleware import data_version_etag
+
+    with sessionmaker(bind=engine)() as db:
+        return data_version_etag(db, path, b"")
+
+
 def _insert_actuals(db, testing_id: int, rows: list[tuple[str | None, date, int]]):
-    """(label, date, executed) のリストを daily_progress へ直接挿入。"""
+    """(label, date, executed) のリストを daily_progress へ直接挿入し、日別集計を作り直す。"""
     from app.models.progress import DailyProgress, Testing
     # testings レコードが必要（FK）
     from sqlalchemy import select
@@ -47,6 +78,7 @@ def _insert_actuals(db, testing_id: int, rows: list[tuple[str | None, date, int]
             result_blocked=0, result_suspend=0, result_na=0,
         ))
     db.commit()
+    rebuild_daily_progress_rollups(db, testing_id)
 
 
 def _insert_file_progress(db, testing_id: int, label: str | None, available: int, executed: int = 0):
@@ -439,6 +471,7 @@ class TestPbChart(unittest.TestCase):
         self.db.execute(update(DailyProgress).values(completed=6))
         self.db.execute(update(FileProgress).values(completed=6))
         self.db.commit()
+        rebuild_daily_progress_rollups(self.db, 1001)
 
         chart = get_pb_chart(self.db, 1001, label="TEST001")
         point = self._point_by_date(chart, date(2026, 5, 1))
@@ -701,6 +734,46 @@ class TestPbChart(unittest.TestCase):
             [(2, 0, 0), (2, 0, 0), (2, 0, 0), (3, 0, 0), (3, 0, 0), (3, 0, 0)],
         )
 
+    # ---- クエリ数 ----
+
+    def _count_queries(self, func):
+        statements: list[str] = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = self.db.get_bind()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            func()
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return len(statements)
+
+    def test_query_count_does_not_grow_with_labels_and_past_plans(self):
+        self._make_plan(label="TEST001", total=80, daily_counts=[16] * 5)
+        self._make_plan(label="TEST001", total=100, daily_counts=[20] * 5)
+        self._make_plan(label="TEST002", total=50, daily_counts=[10] * 5)
+        create_plan_label(self.db, 1001, PlanLabelCreate(label="TEST002", is_disabled=True))
+        _insert_file_progress(self.db, 1001, "TEST001", available=100, executed=10)
+        _insert_actuals(self.db, 1001, [("TEST001", date(2026, 5, 1), 10)])
+        baseline = self._count_queries(lambda: get_pb_chart(self.db, 1001, label=None, include_past_plans=True))
+
+        for index in range(3, 8):
+            label = f"TEST00{index}"
+            self._make_plan(label=label, total=50, daily_counts=[10] * 5)
+            self._make_plan(label=label, total=60, daily_counts=[12] * 5)
+            _insert_file_progress(self.db, 1001, label, available=50, executed=5)
+            _insert_actuals(self.db, 1001, [(label, date(2026, 5, 2), 5)])
+
+        for label in (None, "TEST001", "TEST002"):
+            count = self._count_queries(
+                lambda: get_pb_chart(self.db, 1001, label=label, include_past_plans=True)
+            )
+            self.assertLessEqual(count, baseline)
+        # project / plan_labels / plans / plan_daily / daily / file / bug_snapshots / pb_chart_settings
+        self.assertLessEqual(baseline, 8)
+
     # ---- 存在しないプロジェクト ----
 
     def test_unknown_project_raises(self):
@@ -710,5 +783,250 @@ class TestPbChart(unittest.TestCase):
         self.assertEqual(ctx.exception.status_code, 404)
 
 
+
+class TestPbChartRouter(unittest.TestCase):
+    def setUp(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from app.database import get_async_db, get_db
+        from app.routers.plan import router as plan_router
+        from app.services.pb_chart_cache import clear_pb_chart_cache
+
+        # バージョンは DB ごとに 0 から始まるため、前のテストのキャッシュを残さない
+        clear_pb_chart_cache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine, get_test_async_db = make_file_databases(self.tmp.name)
+        self.db = sessionmaker(bind=self.engine, autoflush=False, autocommit=False, expire_on_commit=False)()
+        create_project(self.db, ProjectCreate(testing_id=1001, name="テストP"))
+        app = FastAPI()
+        app.include_router(plan_router)
+        app.dependency_overrides[get_db] = lambda: self.db
+        app.dependency_overrides[get_async_db] = get_test_async_db
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _make_plan(self, total: int):
+        daily = [PlanDailyIn(date=date(2026, 5, i + 1), planned_count=total // 5) for i in range(5)]
+        create_plan(self.db, 1001, PlanCreate(
+            label="TEST001", planned_total_cases=total,
+            start_date=START, end_date=END, activate=True, daily=daily,
+        ))
+
+    def test_returns_etag_and_not_modified_until_data_changes(self):
+        self._make_plan(100)
+        first = self.client.get("/api/v1/projects/1001/pb-chart")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["planned_total_cases"], 100)
+        etag = first.headers["etag"]
+
+        cached = self.client.get("/api/v1/projects/1001/pb-chart", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.headers["etag"], etag)
+
+        self._make_plan(150)
+        changed = self.client.get("/api/v1/projects/1001/pb-chart", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["etag"], etag)
+        self.assertEqual(changed.json()["planned_total_cases"], 150)
+
+    def test_aggregating_reads_run_in_threadpool(self):
+        import inspect
+
+        from app.routers.plan import router as plan_router
+        from app.routers.progress import router as progress_router
+        from app.routers.project import router as project_router
+
+        # 集計を伴う参照をイベントループ上で実行すると、その間ほかのリクエストがすべて止まる
+        endpoints = {
+            route.path: route.endpoint
+            for router in (plan_router, progress_router, project_router)
+            for route in router.routes
+            if "GET" in route.methods
+        }
+        for path in (
+            "/api/v1/projects/{testing_id}/pb-chart",
+            "/api/v1/projects/{testing_id}/dashboard",
+            "/api/v1/projects",
+            "/api/v1/projects/{testing_id}",
+            "/api/v1/progress/{testing_id}",
+            "/api/v1/progress/{testing_id}/as-of",
+        ):
+            with self.subTest(path=path):
+                self.assertFalse(inspect.iscoroutinefunction(endpoints[path]))
+
+    def test_write_from_another_process_invalidates_cache(self):
+        self._make_plan(100)
+        etag = self.client.get("/api/v1/projects/1001/pb-chart").headers["etag"]
+
+        # 収集・不具合同期のスクリプトと同じく、API とは別の接続から書き込む
+        script_engine = create_engine(self.engine.url)
+        self.addCleanup(script_engine.dispose)
+        with sessionmaker(bind=script_engine, autoflush=False, expire_on_commit=False)() as script_db:
+            daily = [PlanDailyIn(date=date(2026, 5, i + 1), planned_count=40) for i in range(5)]
+            create_plan(script_db, 1001, PlanCreate(
+                label="TEST001", planned_total_cases=200,
+                start_date=START, end_date=END, activate=True, daily=daily,
+            ))
+
+        changed = self.client.get("/api/v1/projects/1001/pb-chart", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["planned_total_cases"], 200)
+
+    def test_cache_is_keyed_by_label_and_past_plans(self):
+        self._make_plan(100)
+        all_labels = self.client.get("/api/v1/projects/1001/pb-chart")
+        with_past = self.client.get("/api/v1/projects/1001/pb-chart", params={"include_past_plans": True})
+        other_label = self.client.get("/api/v1/projects/1001/pb-chart", params={"label": "OTHER"})
+
+        self.assertEqual(len({all_labels.headers["etag"], with_past.headers["etag"], other_label.headers["etag"]}), 3)
+        self.assertEqual(all_labels.json()["planned_total_cases"], 100)
+        self.assertIsNone(other_label.json()["planned_total_cases"])
+
+    def test_unknown_project_is_not_cached(self):
+        self.assertEqual(self.client.get("/api/v1/projects/9999/pb-chart").status_code, 404)
+        create_project(self.db, ProjectCreate(testing_id=9999, name="後から登録"))
+        self.assertEqual(self.client.get("/api/v1/projects/9999/pb-chart").status_code, 200)
+
+
+class TestDashboardRouter(unittest.TestCase):
+    def setUp(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from app.database import get_async_db, get_db
+        from app.middleware import CompressionMiddleware, DataVersionETagMiddleware
+        from app.routers.plan import router as plan_router
+        from app.routers.progress import router as progress_router
+        from app.services.pb_chart_cache import clear_pb_chart_cache
+
+        clear_pb_chart_cache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine, self.get_test_async_db = make_file_databases(self.tmp.name)
+        self.db = sessionmaker(bind=self.engine, autoflush=False, autocommit=False, expire_on_commit=False)()
+        create_project(self.db, ProjectCreate(testing_id=1001, name="テストP"))
+        create_plan_label(self.db, 1001, PlanLabelCreate(label="OFF", is_disabled=True))
+        daily = [PlanDailyIn(date=date(2026, 5, i + 1), planned_count=20) for i in range(5)]
+        create_plan(self.db, 1001, PlanCreate(
+            label="TEST001", planned_total_cases=100,
+            start_date=START, end_date=END, activate=True, daily=daily,
+        ))
+        _insert_file_progress(self.db, 1001, "TEST001", 100)
+        _insert_file_progress(self.db, 1001, "OFF", 40, executed=40)
+        _insert_actuals(self.db, 1001, [("TEST001", date(2026, 5, 1), 15), ("TEST001", date(2026, 5, 2), 25)])
+        app = FastAPI()
+        app.include_router(plan_router)
+        app.include_router(progress_router)
+        app.add_middleware(CompressionMiddleware, minimum_size=1024)
+        app.add_middleware(DataVersionETagMiddleware, session_dependency=self.get_test_async_db)
+        app.dependency_overrides[get_db] = lambda: self.db
+        app.dependency_overrides[get_async_db] = self.get_test_async_db
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_matches_individual_endpoints(self):
+        dashboard = self.client.get("/api/v1/projects/1001/dashboard").json()
+
+        self.assertEqual(dashboard["testing_id"], 1001)
+        self.assertEqual(dashboard["summary"], self.client.get("/api/v1/progress/1001").json())
+        self.assertEqual(dashboard["files"], self.client.get("/api/v1/progress/1001/files").json())
+        self.assertEqual(dashboard["daily"], self.client.get("/api/v1/progress/1001/daily").json())
+        self.assertEqual(dashboard["people"], self.client.get("/api/v1/progress/1001/people").json())
+        self.assertEqual(dashboard["plan_labels"], self.client.get("/api/v1/projects/1001/plan-labels").json())
+        self.assertEqual(dashboard["pb_chart"], self.client.get("/api/v1/projects/1001/pb-chart").json())
+
+    def test_pb_chart_computed_with_preload_matches_standalone(self):
+        from app.services.pb_chart_cache import clear_pb_chart_cache
+
+        dashboard = self.client.get("/api/v1/projects/1001/dashboard", params={"label": "TEST001"}).json()
+        clear_pb_chart_cache()
+        standalone = self.client.get("/api/v1/projects/1001/pb-chart", params={"label": "TEST001"}).json()
+        self.assertEqual(dashboard["pb_chart"], standalone)
+
+    def test_fields_selection(self):
+        res = self.client.get("/api/v1/projects/1001/dashboard", params={"fields": "plan_labels, summary"})
+        self.assertEqual(list(res.json()), ["testing_id", "summary", "plan_labels"])
+        bad = self.client.get("/api/v1/projects/1001/dashboard", params={"fields": "summary,unknown"})
+        self.assertEqual(bad.status_code, 422)
+
+    def test_summary_is_null_without_actuals_and_unknown_project_404(self):
+        create_project(self.db, ProjectCreate(testing_id=1002, name="未実施"))
+        self.assertIsNone(self.client.get("/api/v1/projects/1002/dashboard").json()["summary"])
+        self.assertEqual(self.client.get("/api/v1/projects/9999/dashboard").status_code, 404)
+
+    def test_gzip_and_not_modified(self):
+        res = self.client.get("/api/v1/projects/1001/dashboard", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(res.headers["content-encoding"], "gzip")
+        self.assertEqual(res.json()["testing_id"], 1001)
+        plain = self.client.get("/api/v1/projects/1001/dashboard", headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", plain.headers)
+
+        etag = res.headers["etag"]
+        cached = self.client.get("/api/v1/projects/1001/dashboard", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        other = self.client.get(
+            "/api/v1/projects/1001/dashboard", params={"fields": "summary"}, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(other.status_code, 200)
+
+    def test_not_modified_skips_route_and_expires_on_write(self):
+        from app.database import get_db
+        from app.services.data_version import bump_data_version
+
+        etag = self.client.get("/api/v1/progress/1001/files").headers["etag"]
+        self.assertTrue(etag.startswith('W/"dv-'))
+        # 304 はルート（DB）を呼ばない
+        route_db = self.client.app.dependency_overrides.pop(get_db)
+        cached = self.client.get("/api/v1/progress/1001/files", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.headers["etag"], etag)
+
+        self.client.app.dependency_overrides[get_db] = route_db
+        bump_data_version(self.db, 1001)
+        self.db.commit()
+        refreshed = self.client.get("/api/v1/progress/1001/files", headers={"If-None-Match": etag})
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed.headers["etag"], etag)
+
+    def test_not_modified_expires_on_write_from_another_process(self):
+        from app.crud.bug import delete_bug_count_data
+
+        etag = self.client.get("/api/v1/progress/1001/files").headers["etag"]
+        list_etag = data_version_etag_for(self.engine, "/api/v1/projects")
+
+        # 収集・不具合同期のスクリプトと同じく、API とは別の接続から書き込む
+        script_engine = create_engine(self.engine.url)
+        self.addCleanup(script_engine.dispose)
+        with sessionmaker(bind=script_engine, autoflush=False, expire_on_commit=False)() as script_db:
+            delete_bug_count_data(script_db, 1001)
+
+        refreshed = self.client.get("/api/v1/progress/1001/files", headers={"If-None-Match": etag})
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed.headers["etag"], etag)
+        self.assertNotEqual(data_version_etag_for(self.engine, "/api/v1/projects"), list_etag)
+
+    def test_small_body_not_compressed(self):
+        res = self.client.get("/api/v1/projects/1001/plan-labels", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn("content-encoding", res.headers)
+
+    def test_global_etag_changes_with_any_testing(self):
+        from app.middleware import data_version_etag
+        from app.services.data_version import bump_data_version
+
+        before = data_version_etag(self.db, "/api/v1/projects", b"")
+        bump_data_version(self.db, 2002)
+        self.assertNotEqual(data_version_etag(self.db, "/api/v1/projects", b""), before)
+        self.assertIsNone(data_version_etag(self.db, "/api/v1/projects/1001/bugs/open", b""))
+
+
 if __name__ == "__main__":
     unittest.main()
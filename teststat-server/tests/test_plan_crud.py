@@ -29,6 +29,7 @@ from app.crud.project import create_project, update_project  # noqa: E402
 from app.models.progress import (  # noqa: E402
     DailyPersonProgress,
     DailyProgress,
+    DailyProgressRollup,
     FileProgress,
     TestResultBugSnapshot as BugSnapshotModel,
     Testing as TestingModel,
@@ -143,6 +144,10 @@ class TestPlanCRUD(unittest.TestCase):
                 result_pass=1, result_fixed=0, result_fail=0, result_blocked=0, result_suspend=0,
                 result_na=0, completed=1, executed=1, planned=None,
             ),
+            DailyProgressRollup(
+                testing_id=1001, label=label, date=START, result_pass=1, result_fixed=0, result_fail=0,
+                result_blocked=0, result_suspend=0, result_na=0, completed=1, executed=1,
+            ),
             DailyPersonProgress(
                 testing_id=1001, file_name="cli.xlsx", label=label, environment=None, date=START,
                 person="tester", count=1,
@@ -167,6 +172,7 @@ class TestPlanCRUD(unittest.TestCase):
         self.assertEqual(updated.label, "RENAMED_LABEL")
         self.assertEqual(self.db.scalar(select(FileProgress.label)), "RENAMED_LABEL")
         self.assertEqual(self.db.scalar(select(DailyProgress.label)), "RENAMED_LABEL")
+        self.assertEqual(self.db.scalar(select(DailyProgressRollup.label)), "RENAMED_LABEL")
         self.assertEqual(self.db.scalar(select(DailyPersonProgress.label)), "RENAMED_LABEL")
         self.assertEqual(self.db.scalar(select(BugSnapshotModel.label)), "RENAMED_LABEL")
         self.assertEqual([plan.label for plan in list_plans(self.db, 1001)], ["RENAMED_LABEL"])
@@ -217,6 +223,7 @@ class TestPlanCRUD(unittest.TestCase):
 
         self.assertIsNone(self.db.scalar(select(FileProgress)))
         self.assertIsNone(self.db.scalar(select(DailyProgress)))
+        self.assertIsNone(self.db.scalar(select(DailyProgressRollup)))
         self.assertIsNone(self.db.scalar(select(DailyPersonProgress)))
         self.assertIsNone(self.db.scalar(select(BugSnapshotModel)))
         self.assertEqual(list_plans(self.db, 1001), [])
@@ -1,8 +1,10 @@
 import os
 import sys
+import json
 import unittest
-from datetime import datetime
+from datetime import date, datetime
 
+from pydantic import ValidationError
 from sqlalchemy import create_engine, select
 from sqlalchemy.orm import sessionmaker
 
@@ -10,12 +12,13 @@ SERVER_ROOT = os.path.dirname(os.path.dirname(__file__))
 sys.path.insert(0, SERVER_ROOT)
 os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
 
-from app.crud.progress import get_daily_progress, get_file_progress, get_progress_summary, replace_progress  # noqa: E402
+from app.crud.progress import ProgressRowQuery, daily_progress_page, get_daily_progress, get_file_progress, get_person_progress, get_progress_summary, person_progress_page, rebuild_daily_progress_rollups, replace_progress, stream_daily_progress_json, stream_person_progress_json  # noqa: E402
 from app.database import Base  # noqa: E402
 from app.models.plan import PlanLabel  # noqa: E402
 from app.models.project import Project  # noqa: E402
-from app.models.progress import DailyPersonProgress, DailyProgress, FileProgress, TestResultBugSnapshot  # noqa: E402
-from app.schemas.progress import ProgressRequest  # noqa: E402
+from app.models.progress import DailyPersonProgress, DailyProgress, DailyProgressRollup, FileProgress, TestResultBugSnapshot  # noqa: E402
+from app.schemas.progress import DailyProgressItem, PersonProgressItem, ProgressRequest  # noqa: E402
+from app.services import json_stream  # noqa: E402
 
 
 def make_payload(
@@ -84,6 +87,21 @@ def make_payload(
     )
 
 
+def to_columnar(payload: ProgressRequest) -> ProgressRequest:
+    """行形式の payload を daily / by_person が列形式の同じ内容の payload にする。"""
+    data = payload.model_dump(mode="json", by_alias=True)
+    for file_payload in data["files"]:
+        daily, people = file_payload["daily"], file_payload["by_person"]
+        file_payload["daily"] = {
+            key: [row[key] for row in daily]
+            for key in ("date", "Pass", "Fixed", "Fail", "Blocked", "Suspend", "N/A", "completed", "executed", "planned")
+        }
+        file_payload["by_person"] = {
+            key: [row[key] for row in people] for key in ("date", "person", "count", "completed", "executed")
+        }
+    return ProgressRequest.model_validate(data)
+
+
 class ProgressCrudTests(unittest.TestCase):
     def setUp(self):
         self.engine = create_engine("sqlite+pysqlite:///:memory:")
@@ -115,6 +133,202 @@ class ProgressCrudTests(unittest.TestCase):
         self.assertEqual(len(daily), 1)
         self.assertEqual(daily[0].pass_count, 4)
 
+    def test_columnar_payload_stores_same_rows_as_row_payload(self):
+        def stored():
+            daily = [
+                (row.file_name, row.date, row.result_pass, row.result_fail, row.completed, row.executed, row.planned)
+                for row in self.db.scalars(select(DailyProgress).order_by(DailyProgress.date))
+            ]
+            people = [
+                (row.date, row.person, row.count, row.completed, row.executed)
+                for row in self.db.scalars(select(DailyPersonProgress).order_by(DailyPersonProgress.date, DailyPersonProgress.person))
+            ]
+            rollups = [(row.date, row.result_pass) for row in self.db.scalars(select(DailyProgressRollup).order_by(DailyProgressRollup.date))]
+            bugs = [
+                (row.snapshot_date, row.detected_count, row.fixed_count)
+                for row in self.db.scalars(select(TestResultBugSnapshot).order_by(TestResultBugSnapshot.snapshot_date))
+            ]
+            return daily, people, rollups, bugs
+
+        payload = make_payload(extra_daily=[{"date": "2026-05-02", "Pass": 2, "Fail": 3, "completed": 2, "executed": 5, "planned": 9}])
+        payload.files[0].by_person.append(payload.files[0].by_person[0].model_copy(update={"date": date(2026, 5, 2), "completed": 1}))
+
+        rows_response = replace_progress(self.db, payload)
+        from_rows = stored()
+        columnar = to_columnar(payload)
+        self.assertIsInstance(columnar.files[0].daily.date, list)
+        self.assertEqual(replace_progress(self.db, columnar), rows_response)
+        self.assertEqual(stored(), from_rows)
+        self.assertIn((date(2026, 5, 2), "Alice", 3, 1, 3), from_rows[1])
+
+    def test_columnar_payload_validates_lengths_and_counts(self):
+        data = to_columnar(make_payload()).model_dump(mode="json", by_alias=True)
+        data["files"][0]["daily"]["Pass"] = [1, 2]
+        with self.assertRaisesRegex(ValidationError, "Pass has 2 items, expected 1"):
+            ProgressRequest.model_validate(data)
+        data["files"][0]["daily"]["Pass"] = [-1]
+        with self.assertRaisesRegex(ValidationError, "daily.columnar.Pass.0"):
+            ProgressRequest.model_validate(data)
+
+        # 省略した列は 0 として取り込む
+        data["files"][0]["daily"] = {"date": ["2026-05-01"], "Pass": [2]}
+        data["files"][0]["by_person"] = {"date": [], "person": [], "count": []}
+        response = replace_progress(self.db, ProgressRequest.model_validate(data))
+        self.assertEqual((response.inserted_daily_rows, response.inserted_person_rows), (1, 0))
+        daily = get_daily_progress(self.db, 1001)
+        self.assertEqual((daily[0].pass_count, daily[0].fail, daily[0].planned), (2, 0, None))
+
+    def test_streamed_json_matches_pydantic_serialization(self):
+        from pydantic import TypeAdapter
+
+        extra = [
+            {"date": f"2026-05-{day:02d}", "Pass": day, "completed": day, "executed": day, "planned": 3}
+            for day in range(2, 8)
+        ]
+        replace_progress(self.db, make_payload(extra_daily=extra))
+        expected_daily = TypeAdapter(list[DailyProgressItem]).dump_json(get_daily_progress(self.db, 1001), by_alias=True)
+        expected_people = TypeAdapter(list[PersonProgressItem]).dump_json(get_person_progress(self.db, 1001))
+
+        self.assertEqual(b"".join(stream_daily_progress_json(self.db, 1001)), expected_daily)
+        self.assertEqual(b"".join(stream_person_progress_json(self.db, 1001)), expected_people)
+        self.assertEqual(b"".join(stream_daily_progress_json(self.db, 9999)), b"[]")
+
+    def test_iter_json_array_joins_chunks(self):
+        rows = [(i, f"p{i}") for i in range(5)]
+        chunks = list(json_stream.iter_json_array(rows, ("id", "person"), chunk_rows=2))
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(
+            json_stream.dumps([{"id": i, "person": f"p{i}"} for i in range(5)]),
+            b"".join(chunks),
+        )
+
+    def _seed_week(self):
+        extra = [
+            {"date": f"2026-05-{day:02d}", "Pass": day, "completed": day, "executed": day, "planned": 3}
+            for day in range(2, 8)
+        ]
+        replace_progress(self.db, make_payload(extra_daily=extra))
+        for day in range(2, 8):
+            self.db.add(DailyPersonProgress(
+                testing_id=1001, file_name="sample1.xlsx", label="TEST001", environment="env-a",
+                date=date(2026, 5, day), person="Alice", count=day, completed=day, executed=day,
+            ))
+        self.db.commit()
+
+    def _rows(self, page):
+        return json.loads(b"".join(page.body))
+
+    def test_keyset_pagination_walks_all_rows_once(self):
+        self._seed_week()
+        expected = self._rows(daily_progress_page(self.db, 1001, ProgressRowQuery()))
+        collected, cursor, pages = [], None, 0
+        while True:
+            page = daily_progress_page(self.db, 1001, ProgressRowQuery(limit=3, cursor=cursor))
+            collected.extend(self._rows(page))
+            pages += 1
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(collected, expected)
+
+        people = []
+        cursor = None
+        while True:
+            page = person_progress_page(self.db, 1001, ProgressRowQuery(limit=4, cursor=cursor))
+            people.extend(self._rows(page))
+            if (cursor := page.next_cursor) is None:
+                break
+        self.assertEqual(people, self._rows(person_progress_page(self.db, 1001, ProgressRowQuery())))
+
+    def test_filters_by_date_range_label_and_person(self):
+        self._seed_week()
+        rows = self._rows(daily_progress_page(
+            self.db, 1001, ProgressRowQuery(date_from=date(2026, 5, 3), date_to=date(2026, 5, 5), labels=("TEST001",))
+        ))
+        self.assertEqual([row["date"] for row in rows], ["2026-05-03", "2026-05-04", "2026-05-05"])
+        self.assertEqual(self._rows(daily_progress_page(self.db, 1001, ProgressRowQuery(labels=("OTHER",)))), [])
+        people = self._rows(person_progress_page(self.db, 1001, ProgressRowQuery(persons=("Bob",))))
+        self.assertEqual([(row["date"], row["person"]) for row in people], [("2026-05-01", "Bob")])
+
+    def test_week_and_total_granularity_fold_dates(self):
+        self._seed_week()
+        weekly = self._rows(daily_progress_page(self.db, 1001, ProgressRowQuery(granularity="week")))
+        # 2026-05-01〜03 は 04-27 週、05-04〜07 は 05-04 週
+        self.assertEqual([(row["date"], row["Pass"], row["planned"]) for row in weekly], [
+            ("2026-04-27", 4 + 2 + 3, 6),
+            ("2026-05-04", 4 + 5 + 6 + 7, 12),
+        ])
+        total = self._rows(person_progress_page(self.db, 1001, ProgressRowQuery(granularity="total")))
+        self.assertEqual({row["person"]: (row["date"], row["count"]) for row in total}, {
+            "Alice": ("2026-05-07", 3 + sum(range(2, 8))),
+            "Bob": ("2026-05-01", 3),
+        })
+
+    def test_invalid_cursor_and_paged_aggregation_are_rejected(self):
+        from fastapi import HTTPException
+
+        from app.crud.progress import _encode_cursor
+
+        with self.assertRaises(HTTPException) as ctx:
+            daily_progress_page(self.db, 1001, ProgressRowQuery(cursor="not-a-cursor"))
+        self.assertEqual(ctx.exception.status_code, 422)
+        # 形は合っていても値の型が並び順の列と合わない cursor
+        for values in (
+            ["2026-06-01", 1, "", 10],
+            ["2026-06-01", "a.xlsx", None, 10],
+            ["2026-06-01", "a.xlsx", "", "10"],
+            ["2026-06-01", "a.xlsx", "", True],
+            [20260601, "a.xlsx", "", 10],
+        ):
+            with self.subTest(values=values), self.assertRaises(HTTPException) as ctx:
+                daily_progress_page(self.db, 1001, ProgressRowQuery(cursor=_encode_cursor(tuple(values)), limit=10))
+            self.assertEqual(ctx.exception.status_code, 422)
+        with self.assertRaises(HTTPException):
+            daily_progress_page(self.db, 1001, ProgressRowQuery(granularity="week", limit=10))
+
+    def test_router_returns_next_cursor_header(self):
+        import tempfile
+
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.pool import NullPool
+
+        from app.database import async_database_url, get_async_db
+        from app.routers.progress import router
+
+        # 参照ルートは非同期セッションを使うため、同期・非同期の両エンジンで同じ SQLite ファイルを開く
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        url = f"sqlite+pysqlite:///{os.path.join(tmp.name, 'test.db')}"
+        self.db.close()
+        self.engine.dispose()
+        self.engine = create_engine(url)
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine, expire_on_commit=False)()
+        self._seed_week()
+        async_session = async_sessionmaker(
+            bind=create_async_engine(async_database_url(url), poolclass=NullPool), expire_on_commit=False
+        )
+
+        async def get_test_async_db():
+            async with async_session() as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[get_async_db] = get_test_async_db
+        client = TestClient(app)
+
+        first = client.get("/api/v1/progress/1001/daily", params={"limit": 5})
+        self.assertEqual(len(first.json()), 5)
+        rest = client.get("/api/v1/progress/1001/daily", params={"limit": 5, "cursor": first.headers["x-next-cursor"]})
+        self.assertEqual(len(rest.json()), 2)
+        self.assertNotIn("x-next-cursor", rest.headers)
+        people = client.get("/api/v1/progress/1001/people", params=[("person", "Bob"), ("person", "Alice"), ("date_to", "2026-05-02")])
+        self.assertEqual([row["person"] for row in people.json()], ["Alice", "Bob", "Alice"])
+
     def test_replace_progress_saves_source_url_as_plan_label(self):
         replace_progress(
             self.db,
@@ -202,6 +416,26 @@ class ProgressCrudTests(unittest.TestCase):
         self.assertEqual(get_progress_summary(self.db, 1001).results.pass_count, 2)
         self.assertEqual(get_progress_summary(self.db, 2002).results.pass_count, 8)
 
+    def test_replace_progress_maintains_daily_rollups_across_files(self):
+        payload = make_payload(testing_id=1001, file_name="a.xlsx", pass_count=4)
+        other = make_payload(testing_id=1001, file_name="b.xlsx", pass_count=2).files[0]
+        replace_progress(self.db, payload.model_copy(update={"files": [*payload.files, other]}))
+
+        def rollups():
+            return [
+                (row.label, row.date.isoformat(), row.result_pass, row.completed, row.executed)
+                for row in self.db.scalars(select(DailyProgressRollup).where(DailyProgressRollup.testing_id == 1001))
+            ]
+
+        self.assertEqual(rollups(), [("TEST001", "2026-05-01", 6, 10, 12)])
+
+        replace_progress(self.db, make_payload(testing_id=1001, file_name="a.xlsx", pass_count=3))
+        self.assertEqual(rollups(), [("TEST001", "2026-05-01", 3, 5, 6)])
+
+        # 再構築しても取り込み時の集計と一致する
+        rebuild_daily_progress_rollups(self.db, 1001)
+        self.assertEqual(rollups(), [("TEST001", "2026-05-01", 3, 5, 6)])
+
     def test_replace_progress_stores_detected_and_current_states_by_date(self):
         # 単一取込。detected = その日の検出数(Fail+Suspend+Fixed)、suspend/fixed は現在値。
         payload = make_payload(
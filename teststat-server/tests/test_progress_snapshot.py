@@ -0,0 +1,175 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
+
+from app.crud.progress import replace_progress  # noqa: E402
+from app.crud.progress_snapshot import compact_progress_snapshots, get_progress_as_of, list_progress_snapshots  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models.progress import ProgressSnapshot  # noqa: E402
+from app.schemas.progress import ProgressRequest  # noqa: E402
+
+
+def make_file(label: str, passed: int, daily_date: str = "2026-05-01") -> dict:
+    return {
+        "file_name": f"{label}.xlsx",
+        "label": label,
+        "total_cases": 10,
+        "available_cases": 8,
+        "excluded_cases": 2,
+        "completed": passed,
+        "executed": passed,
+        "not_run": 8 - passed,
+        "completed_rate": passed / 8 * 100,
+        "executed_rate": passed / 8 * 100,
+        "daily": [{"date": daily_date, "Pass": passed, "completed": passed, "executed": passed}],
+    }
+
+
+def make_payload(sent_at: str, *files: dict) -> ProgressRequest:
+    return ProgressRequest.model_validate(
+        {"testing_id": 1001, "project_name": "Project", "sent_at": sent_at, "files": list(files)}
+    )
+
+
+class ProgressSnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite+pysqlite:///:memory:")
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine, expire_on_commit=False)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def snapshots(self):
+        return [
+            (row.label, row.sent_at.isoformat(), row.file_count, row.downsampled)
+            for row in self.db.scalars(select(ProgressSnapshot).order_by(ProgressSnapshot.sent_at, ProgressSnapshot.label))
+        ]
+
+    def as_of(self, at: str, labels=()):
+        result = get_progress_as_of(self.db, 1001, datetime.fromisoformat(at), labels)
+        return {item.label: (item.completed, [day.pass_count for day in item.daily]) for item in result.labels}
+
+    def test_appends_only_changed_labels_and_tombstones_removed_ones(self):
+        replace_progress(self.db, make_payload("2026-05-01T09:00:00", make_file("A", 1), make_file("B", 2)))
+        replace_progress(self.db, make_payload("2026-05-02T09:00:00", make_file("A", 1), make_file("B", 3)))
+        replace_progress(self.db, make_payload("2026-05-03T09:00:00", make_file("A", 4)))
+        replace_progress(self.db, make_payload("2026-05-04T09:00:00", make_file("A", 4)))
+
+        self.assertEqual(self.snapshots(), [
+            ("A", "2026-05-01T09:00:00", 1, False),
+            ("B", "2026-05-01T09:00:00", 1, False),
+            ("B", "2026-05-02T09:00:00", 1, False),
+            ("A", "2026-05-03T09:00:00", 1, False),
+            ("B", "2026-05-03T09:00:00", 0, False),
+        ])
+        self.assertEqual(self.as_of("2026-05-01T12:00:00"), {"A": (1, [1]), "B": (2, [2])})
+        self.assertEqual(self.as_of("2026-05-02T12:00:00"), {"A": (1, [1]), "B": (3, [3])})
+        self.assertEqual(self.as_of("2026-05-05T00:00:00"), {"A": (4, [4])})
+        self.assertEqual(self.as_of("2026-05-02T12:00:00", ("B",)), {"B": (3, [3])})
+        # 履歴より前は空、履歴の無い testing_id は None
+        self.assertEqual(self.as_of("2026-04-30T00:00:00"), {})
+        self.assertIsNone(get_progress_as_of(self.db, 9999, datetime(2026, 5, 1)))
+        self.assertEqual(len(list_progress_snapshots(self.db, 1001, since=datetime(2026, 5, 2))), 3)
+
+    def test_latest_row_per_label_is_flagged_for_the_next_comparison(self):
+        replace_progress(self.db, make_payload("2026-05-01T09:00:00", make_file("A", 1), make_file("B", 2)))
+        replace_progress(self.db, make_payload("2026-05-03T09:00:00", make_file("A", 4), make_file("B", 2)))
+        # 遅れて届いた古い送信は履歴に残すが、最新の行は置き換えない
+        replace_progress(self.db, make_payload("2026-05-02T09:00:00", make_file("A", 3), make_file("B", 2)))
+
+        latest = {
+            row.label: (row.sent_at.isoformat(), row.completed)
+            for row in self.db.scalars(select(ProgressSnapshot).where(ProgressSnapshot.is_latest.is_(True)))
+        }
+        self.assertEqual(latest, {"A": ("2026-05-03T09:00:00", 4), "B": ("2026-05-01T09:00:00", 2)})
+        self.assertEqual(self.as_of("2026-05-02T12:00:00"), {"A": (3, [3]), "B": (2, [2])})
+
+        # 最新と同じ内容なら行を追加しない
+        replace_progress(self.db, make_payload("2026-05-04T09:00:00", make_file("A", 4), make_file("B", 2)))
+        self.assertEqual(len(self.snapshots()), 4)
+
+    def test_compaction_downsamples_per_day_and_keeps_state_at_retention_boundary(self):
+        for sent_at, passed in (
+            ("2026-01-01T09:00:00", 1),
+            ("2026-01-01T18:00:00", 2),
+            ("2026-01-02T09:00:00", 3),
+            ("2026-03-01T09:00:00", 4),
+            ("2026-03-01T18:00:00", 5),
+        ):
+            replace_progress(self.db, make_payload(sent_at, make_file("A", passed), make_file("B", 1)))
+        replace_progress(self.db, make_payload("2026-03-02T09:00:00", make_file("A", 5)))
+
+        result = compact_progress_snapshots(self.db, datetime(2026, 3, 3), downsample_days=30, retention_days=0)
+        self.assertEqual((result.downsampled, result.expired), (1, 0))
+        self.assertEqual([row for row in self.snapshots() if row[0] == "A"], [
+            ("A", "2026-01-01T18:00:00", 1, True),
+            ("A", "2026-01-02T09:00:00", 1, True),
+            ("A", "2026-03-01T09:00:00", 1, False),
+            ("A", "2026-03-01T18:00:00", 1, False),
+        ])
+        # 間引き済みの行は次回の対象にならない
+        self.assertEqual(compact_progress_snapshots(self.db, datetime(2026, 3, 3), 30, 0).downsampled, 0)
+
+        # 2026-01-15 より前は、その時点で有効な 1 行（A は 01-02、B は 01-01）だけ残る
+        result = compact_progress_snapshots(self.db, datetime(2026, 3, 3), downsample_days=0, retention_days=47)
+        self.assertEqual(result.expired, 1)
+        self.assertEqual(self.as_of("2026-02-01T00:00:00"), {"A": (3, [3]), "B": (1, [1])})
+
+        # B の墓標（03-02）が保持期間の境界より前になると、B の行はすべて消える
+        compact_progress_snapshots(self.db, datetime(2026, 4, 10), downsample_days=0, retention_days=30)
+        self.assertEqual(self.as_of("2026-04-10T00:00:00"), {"A": (5, [5])})
+        self.assertNotIn("B", {row[0] for row in self.snapshots()})
+
+
+class ProgressSnapshotRouterTests(unittest.TestCase):
+    def test_as_of_and_snapshot_list_routes(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        from app.database import get_db
+        from app.routers.progress import router
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        url = f"sqlite+pysqlite:///{os.path.join(tmp.name, 'test.db')}"
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            replace_progress(db, make_payload("2026-05-01T09:00:00", make_file("A", 1)))
+            replace_progress(db, make_payload("2026-05-02T09:00:00", make_file("A", 2)))
+
+        def get_test_db():
+            with Session() as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(router)
+        app.dependency_overrides[get_db] = get_test_db
+        client = TestClient(app)
+
+        # タイムゾーン付きは UTC に変換して比較する（+09:00 の 18:00 = UTC 09:00）
+        res = client.get("/api/v1/progress/1001/as-of", params={"at": "2026-05-02T18:00:00+09:00"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["labels"][0]["daily"], [{"Pass": 2, "Fixed": 0, "Fail": 0, "Blocked": 0, "Suspend": 0, "N/A": 0, "date": "2026-05-01", "completed": 2, "executed": 2}])
+        res = client.get("/api/v1/progress/1001/as-of", params={"at": "2026-05-02T17:59:59+09:00"})
+        self.assertEqual(res.json()["labels"][0]["completed"], 1)
+        self.assertEqual(client.get("/api/v1/progress/9999/as-of", params={"at": "2026-05-02T00:00:00"}).status_code, 404)
+        listed = client.get("/api/v1/progress/1001/snapshots", params={"limit": 1}).json()
+        self.assertEqual([(row["sent_at"], row["completed"]) for row in listed], [("2026-05-02T09:00:00", 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
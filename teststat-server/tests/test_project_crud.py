@@ -1,11 +1,11 @@
 import os
 import sys
+import tempfile
 import unittest
 
 from sqlalchemy import create_engine
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy.pool import StaticPool
 
 SERVER_ROOT = os.path.dirname(os.path.dirname(__file__))
 sys.path.insert(0, SERVER_ROOT)
@@ -13,6 +13,7 @@ os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
 
 from sqlalchemy.orm import sessionmaker  # noqa: E402
 
+from app.crud.progress import rebuild_daily_progress_rollups  # noqa: E402
 from app.crud.project import create_project, delete_project, get_project, list_projects, update_project, update_project_order  # noqa: E402
 from app.database import Base  # noqa: E402
 from app.models import Project  # noqa: E402
@@ -28,6 +29,29 @@ def make_session():
     return Session()
 
 
+def make_file_databases(directory: str):
+    """ルーターのテスト用。同期・非同期（async ルート）の両エンジンで同じ SQLite ファイルを開く。"""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from app.database import async_database_url
+
+    url = f"sqlite+pysqlite:///{os.path.join(directory, 'test.db')}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    import app.models  # noqa: F401
+    Base.metadata.create_all(engine)
+    # 接続を TestClient のイベントループに残さないよう、非同期側はプールしない
+    async_session = async_sessionmaker(
+        bind=create_async_engine(async_database_url(url), poolclass=NullPool), expire_on_commit=False
+    )
+
+    async def get_test_async_db():
+        async with async_session() as db:
+            yield db
+
+    return engine, get_test_async_db
+
+
 class TestProjectCRUD(unittest.TestCase):
     def setUp(self):
         self.db = make_session()
@@ -429,6 +453,7 @@ class TestProjectCRUD(unittest.TestCase):
             ]
         )
         self.db.commit()
+        rebuild_daily_progress_rollups(self.db, 5004)
 
         p = get_project(self.db, 5004)
 
@@ -474,29 +499,222 @@ class TestProjectCRUD(unittest.TestCase):
             )
         )
         self.db.commit()
+        rebuild_daily_progress_rollups(self.db, 5005)
 
         p = get_project(self.db, 5005)
 
         self.assertAlmostEqual(p.actual_vs_plan_rate, 46.67, places=2)
         self.assertEqual(p.actual_vs_plan_delay_days, 1.6)
 
+    def _add_project_with_metrics(self, testing_id: int):
+        from app.models.plan import Plan, PlanDaily, PlanLabel
+        from app.models.progress import DailyProgress, FileProgress, Testing
+        from datetime import date, datetime
+
+        self.db.add(Testing(testing_id=testing_id, project_name=f"P{testing_id}", updated_at=datetime(2026, 6, 3)))
+        self.db.commit()
+        create_project(self.db, ProjectCreate(testing_id=testing_id, name=f"P{testing_id}"))
+        self.db.add(PlanLabel(testing_id=testing_id, label="OFF", is_disabled=True))
+        for label, total in (("A", 20), ("OFF", 10), ("PLAN_ONLY", 30)):
+            plan = Plan(
+                testing_id=testing_id,
+                label=label,
+                version=1,
+                is_active=True,
+                planned_total_cases=total,
+                start_date=date(2026, 6, 1),
+                end_date=date(2026, 6, 4),
+            )
+            self.db.add(plan)
+            self.db.flush()
+            self.db.add_all(
+                PlanDaily(plan_id=plan.id, date=date(2026, 6, day), planned_count=total // 4)
+                for day in range(1, 5)
+            )
+        for label in ("A", "OFF"):
+            self.db.add(
+                FileProgress(
+                    testing_id=testing_id, file_name=f"{label}.xlsx", label=label,
+                    total_cases=20, available_cases=20, excluded_cases=0, completed=5, executed=6,
+                    not_run=14, completed_rate=25, executed_rate=30, result_pass=5, result_fixed=0,
+                    result_fail=1, result_blocked=0, result_suspend=0, result_na=0,
+                    sent_at=datetime(2026, 6, 3),
+                )
+            )
+            self.db.add(
+                DailyProgress(
+                    testing_id=testing_id, file_name=f"{label}.xlsx", label=label,
+                    date=date(2026, 6, 2), completed=5, executed=6,
+                )
+            )
+        self.db.commit()
+        rebuild_daily_progress_rollups(self.db, testing_id)
+
+    def _count_queries(self, func):
+        from sqlalchemy import event
+
+        statements: list[str] = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = self.db.get_bind()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            func()
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return len(statements)
+
+    def test_list_projects_query_count_does_not_grow_with_projects(self):
+        self._add_project_with_metrics(6001)
+        self._add_project_with_metrics(6002)
+        baseline = self._count_queries(lambda: list_projects(self.db))
+
+        for testing_id in range(6003, 6013):
+            self._add_project_with_metrics(testing_id)
+        create_project(self.db, ProjectCreate(testing_id=6100, name="実績なし"))
+
+        self.assertEqual(self._count_queries(lambda: list_projects(self.db)), baseline)
+        # projects と project_metrics の結合 1 回だけ
+        self.assertEqual(baseline, 1)
+
+    def test_list_projects_metrics_match_get_project(self):
+        self._add_project_with_metrics(6001)
+        self._add_project_with_metrics(6002)
+        create_project(self.db, ProjectCreate(testing_id=6100, name="実績なし"))
+
+        listed = {p.testing_id: p for p in list_projects(self.db)}
+
+        for testing_id in (6001, 6002, 6100):
+            single = get_project(self.db, testing_id)
+            self.assertEqual(listed[testing_id].actual_completed_rate, single.actual_completed_rate)
+            self.assertEqual(listed[testing_id].actual_vs_plan_rate, single.actual_vs_plan_rate)
+            self.assertEqual(listed[testing_id].actual_vs_plan_delay_days, single.actual_vs_plan_delay_days)
+        # A の実績 20 件 + 実績未送信の PLAN_ONLY 30 件、OFF は無効ラベルとして除外
+        self.assertEqual(listed[6001].actual_completed_rate, 10)
+        # 6/2 までの計画 (A 10 + PLAN_ONLY 14) に対し実績 6
+        self.assertEqual(listed[6001].actual_vs_plan_rate, 25)
+
+    def test_list_projects_reflects_plan_label_and_progress_writes(self):
+        from app.crud.plan import create_plan, delete_project_label, update_project_label
+        from app.crud.progress import replace_progress
+        from app.schemas.plan import PlanCreate, PlanDailyIn, ProjectLabelUpdate
+        from app.schemas.progress import ProgressRequest
+        from datetime import date
+
+        self._add_project_with_metrics(6001)
+
+        def assert_list_matches_live():
+            listed = next(p for p in list_projects(self.db) if p.testing_id == 6001)
+            self.assertEqual(listed, get_project(self.db, 6001))
+            return listed
+
+        before = assert_list_matches_live()
+        update_project_label(self.db, 6001, ProjectLabelUpdate(label="PLAN_ONLY", is_disabled=True))
+        self.assertEqual(assert_list_matches_live().active_plan_count, before.active_plan_count - 1)
+        create_plan(
+            self.db,
+            6001,
+            PlanCreate(
+                label="A",
+                planned_total_cases=20,
+                start_date=date(2026, 6, 1),
+                end_date=date(2026, 6, 2),
+                daily=[PlanDailyIn(date=date(2026, 6, 1), planned_count=10), PlanDailyIn(date=date(2026, 6, 2), planned_count=10)],
+            ),
+        )
+        self.assertEqual(assert_list_matches_live().actual_vs_plan_rate, 30)
+        replace_progress(
+            self.db,
+            ProgressRequest.model_validate({
+                "testing_id": 6001,
+                "project_name": "P6001",
+                "sent_at": "2026-06-04T09:00:00",
+                "files": [{
+                    "file_name": "A.xlsx", "label": "A", "total_cases": 20, "available_cases": 20,
+                    "excluded_cases": 0, "completed": 20, "executed": 20, "not_run": 0,
+                    "completed_rate": 100, "executed_rate": 100,
+                    "daily": [{"date": "2026-06-03", "Pass": 20, "completed": 20, "executed": 20}],
+                }],
+            }),
+        )
+        self.assertTrue(assert_list_matches_live().actual_all_completed)
+        delete_project_label(self.db, 6001, "A")
+        listed = assert_list_matches_live()
+        self.assertEqual((listed.has_actuals, listed.actual_completed), (True, 0))
+
+    def test_check_project_metrics_reports_and_repairs_drift(self):
+        from app.crud.project import PROJECT_METRIC_FIELDS, check_project_metrics
+        from app.models import ProjectMetrics
+        from sqlalchemy import delete, select
+
+        self._add_project_with_metrics(6001)
+        self._add_project_with_metrics(6002)
+        self.assertEqual(check_project_metrics(self.db), [])
+
+        self.db.scalar(select(ProjectMetrics).where(ProjectMetrics.testing_id == 6001)).actual_completed = 99
+        self.db.execute(delete(ProjectMetrics).where(ProjectMetrics.testing_id == 6002))
+        self.db.commit()
+        mismatches = check_project_metrics(self.db)
+        self.assertEqual(
+            [(item.testing_id, item.missing, item.fields) for item in mismatches],
+            [(6001, False, ["actual_completed"]), (6002, True, list(PROJECT_METRIC_FIELDS))],
+        )
+        # 一覧は書き込まず、行が無いプロジェクトは既定値で返す
+        self.assertEqual(
+            {p.testing_id: p.actual_completed for p in list_projects(self.db)},
+            {6001: 99, 6002: 0},
+        )
+        self.assertIsNone(self.db.get(ProjectMetrics, 6002))
+        check_project_metrics(self.db, repair=True)
+        self.assertEqual(check_project_metrics(self.db), [])
+        self.assertEqual(list_projects(self.db)[0].actual_completed, 5)
+        delete_project(self.db, 6002)
+        self.assertIsNone(self.db.get(ProjectMetrics, 6002))
+
+    def test_refresh_project_metrics_upserts_row_written_concurrently(self):
+        from datetime import datetime
+        from unittest.mock import patch
+
+        import app.crud.project as project_crud
+        from app.models import ProjectMetrics
+        from sqlalchemy import insert
+
+        self._add_project_with_metrics(6001)
+        self.db.get(ProjectMetrics, 6001).actual_completed = 99
+        self.db.commit()
+        compute = project_crud._compute_project_metrics
+
+        def compute_while_another_writer_inserts(db, testing_ids):
+            # 集計中に別の書き込みが先に初回の行を作った状態
+            self.db.execute(insert(ProjectMetrics).values(testing_id=6002, refreshed_at=datetime(2026, 6, 1)))
+            return compute(db, testing_ids)
+
+        self.db.add(Project(testing_id=6002, name="P6002"))
+        with patch.object(project_crud, "_compute_project_metrics", side_effect=compute_while_another_writer_inserts):
+            rows = project_crud.refresh_project_metrics(self.db, [6001, 6002])
+        self.db.commit()
+
+        self.assertEqual(sorted(rows), [6001, 6002])
+        # 読み込み済みだった 6001 の行もセッション上で新しい値になる
+        self.assertEqual(self.db.get(ProjectMetrics, 6001).actual_completed, 5)
+        self.assertEqual(self.db.get(ProjectMetrics, 6002).active_plan_count, 0)
+
 class TestProjectRouter(unittest.TestCase):
     def setUp(self):
-        from app.database import get_db
+        from app.database import get_async_db, get_db
         from app.routers.project import router as project_router
         import app.routers.project as project_mod
 
-        self.engine = create_engine(
-            "sqlite+pysqlite:///:memory:",
-            connect_args={"check_same_thread": False},
-            poolclass=StaticPool,
-        )
-        Base.metadata.create_all(self.engine)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine, get_test_async_db = make_file_databases(self.tmp.name)
         Session = sessionmaker(bind=self.engine, autoflush=False, autocommit=False, expire_on_commit=False)
         self.db = Session()
         self.app = FastAPI()
         self.app.include_router(project_router)
         self.app.dependency_overrides[get_db] = lambda: self.db
+        self.app.dependency_overrides[get_async_db] = get_test_async_db
         self.client = TestClient(self.app)
         self._original_validate = project_mod.validate_work_item_type
         project_mod.validate_work_item_type = lambda work_item_id, settings: None
@@ -506,8 +724,8 @@ class TestProjectRouter(unittest.TestCase):
 
         project_mod.validate_work_item_type = self._original_validate
         self.db.close()
-        Base.metadata.drop_all(self.engine)
         self.engine.dispose()
+        self.tmp.cleanup()
 
     def test_patch_pb_chart_range_source_persists_and_is_returned(self):
         res = self.client.post("/api/v1/projects", json={"testing_id": 9002, "name": "P"})
@@ -524,6 +742,8 @@ class TestProjectRouter(unittest.TestCase):
         reread = self.client.get("/api/v1/projects/9002")
         self.assertEqual(reread.status_code, 200)
         self.assertEqual(reread.json()["pb_chart_range_source"], "project_period")
+        # CLI はこのヘッダーを見て進捗 payload を列形式で送る
+        self.assertEqual(reread.headers["x-progress-formats"], "rows, columnar")
 
     def test_patch_bug_axis_max_persists_and_can_be_cleared(self):
         res = self.client.post(
@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+import unittest
+
+SERVER_ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, SERVER_ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from app.middleware import RequestMetricsMiddleware  # noqa: E402
+from app.services import request_metrics  # noqa: E402
+from app.services.db_pool import pool_status  # noqa: E402
+from app.services.request_metrics import install_query_hooks, instrumented, render_metrics, reset_metrics  # noqa: E402
+
+# 約 30 万行を数える再帰 CTE。遅い SQL のログの確認に使う
+SLOW_SQL = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 300000) SELECT COUNT(*) FROM n"
+
+
+class TestRequestMetrics(unittest.TestCase):
+    def setUp(self):
+        reset_metrics()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite+pysqlite:///{os.path.join(self.tmp.name, 'test.db')}")
+        install_query_hooks(self.engine, slow_query_ms=1)
+
+        @instrumented("count_items")
+        def count_items(times: int) -> int:
+            with self.engine.connect() as conn:
+                return sum(conn.execute(text("SELECT 1")).scalar() for _ in range(times))
+
+        app = FastAPI()
+        app.add_middleware(RequestMetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        def read_item(item_id: int) -> dict:
+            return {"count": count_items(3)}
+
+        @app.get("/async-items")
+        async def read_async_items() -> dict:
+            return {"count": 0}
+
+        @app.get("/slow")
+        def read_slow() -> dict:
+            with self.engine.connect() as conn:
+                return {"count": conn.execute(text(SLOW_SQL)).scalar()}
+
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+        reset_metrics()
+
+    def test_records_route_template_query_count_and_function_time(self):
+        self.assertEqual(self.client.get("/items/1").json(), {"count": 3})
+        self.client.get("/items/2")
+        self.client.get("/async-items")
+        self.client.get("/missing")
+
+        body = render_metrics()
+        self.assertIn('teststat_http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 2', body)
+        # 1 リクエスト 3 件なので le="2" には入らず le="5" に入る
+        self.assertIn('teststat_http_request_db_queries_bucket{method="GET",route="/items/{item_id}",le="2"} 0', body)
+        self.assertIn('teststat_http_request_db_queries_bucket{method="GET",route="/items/{item_id}",le="5"} 2', body)
+        self.assertIn('teststat_http_request_db_queries_sum{method="GET",route="/items/{item_id}"} 6', body)
+        self.assertIn('teststat_http_request_db_queries_sum{method="GET",route="/async-items"} 0', body)
+        self.assertIn('teststat_http_requests_total{method="GET",route="unmatched",status="404"} 1', body)
+        self.assertIn('teststat_function_duration_seconds_count{function="count_items"} 2', body)
+
+    def test_slow_query_is_logged_with_parameters_and_counted(self):
+        with self.assertLogs(request_metrics.logger, level="WARNING") as logs:
+            self.assertEqual(self.client.get("/slow").json(), {"count": 300000})
+        self.assertIn("slow query", logs.output[0])
+        self.assertIn("WITH RECURSIVE", logs.output[0])
+        self.assertIn("teststat_db_slow_queries_total 1", render_metrics())
+
+    def test_queries_outside_requests_are_not_attributed(self):
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        self.client.get("/async-items")
+        self.assertIn('teststat_http_request_db_queries_sum{method="GET",route="/async-items"} 0', render_metrics())
+
+    def test_pool_gauges(self):
+        with self.engine.connect():
+            body = render_metrics([pool_status("sync", self.engine)])
+        self.assertIn('teststat_db_pool_checked_out{pool="sync"} 1', body)
+        self.assertIn('teststat_db_pool_timeouts_total{pool="sync"} 0', body)
+
+
+if __name__ == "__main__":
+    unittest.main()